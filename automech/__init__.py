@@ -1,6 +1,23 @@
-"""Central AutoMech routines."""
+"""Central AutoMech routines.
+
+The `query` module and the `run` function are imported on first use, since they import
+the chemistry libraries.
+"""
+
+import importlib
+
+from . import subtasks
+from .base import check_log
+
+_LAZY_ATTRS = {"query": ".query", "run": ".base._0run"}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+    return module if name == "query" else getattr(module, name)
 
-from . import query, subtasks
-from .base import check_log, run
 
 __all__ = ["query", "subtasks", "check_log", "run"]
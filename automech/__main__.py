@@ -0,0 +1,6 @@
+""" Run the AutoMech command-line interface with `python -m automech`
+"""
+
+from .cli import main
+
+main()
@@ -1,22 +1,88 @@
 """ Main AutoMech execution script
 """
 
+from pathlib import Path
+
 import autofile
 from drivers import esdriver, ktpdriver, procdriver, thermodriver, transdriver
 from mechlib.amech_io import parser as ioparser
 from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
 
 # import argparse
-from mechlib.filesys import prefix_fs
+from mechlib.filesys import layers, prefix_fs, readcache
+
+from ._2cache import cache_key, cached, find_cache_dir
+
+PROFILE_FILE = "profile.json"
 
 
-def run(path: str = ".", safemode_off: bool = False):
+def run(
+    path: str = ".",
+    safemode_off: bool = False,
+    theory_path: str | None = None,
+    use_cache: bool = True,
+    profile: bool = False,
+    log_level: str | None = None,
+    log_path: str | Path | None = None,
+    json_log_path: str | Path | None = None,
+):
     """Central Execution script to launch a MechDriver process which will
     parse all of the user-supplied input files in a specified directory, then
     launches all of the requested electronic structure, transport,
     thermochemistry and kinetics calculations via their associated
     sub-drivers.
+
+    :param path: The job run directory
+    :param safemode_off: Turn off safemode?
+    :param theory_path: The path to theory.dat, relative to the job run directory
+        (default: inp/theory.dat)
+    :param use_cache: Load the parsed theory, model, species, and PES dictionaries from
+        the input cache, if they are there?
+    :param profile: Record the time spent in each driver, task, job, and external
+        script, writing a Chrome trace to `profile.json` and printing a summary at exit?
+    :param log_level: The lowest level of message to print (default: AUTOMECH_LOG_LEVEL
+        if set, otherwise INFO, or DEBUG if `print_debug` is set in run.dat)
+    :param log_path: A file to also write messages to, through a buffer
+    :param json_log_path: A file to also write messages to, as JSON lines
     """
+    ioprinter.configure_logging(
+        level=log_level, log_path=log_path, json_path=json_log_path
+    )
+    # Read packed points, cache reads, and write atomically in the save filesystem
+    layers.install()
+
+    run_kwargs = {
+        "path": path,
+        "safemode_off": safemode_off,
+        "theory_path": theory_path,
+        "use_cache": use_cache,
+        "log_level": log_level,
+    }
+    if not profile:
+        _run(**run_kwargs)
+        return
+
+    profiler.enable()
+    try:
+        _run(**run_kwargs)
+    finally:
+        trace_path = Path(path) / PROFILE_FILE
+        profiler.write_trace(trace_path)
+        ioprinter.info_message(f"\nProfile summary (trace written to {trace_path}):")
+        ioprinter.info_message(profiler.summary_string())
+        ioprinter.info_message(readcache.stats_string())
+        profiler.disable()
+
+
+def _run(
+    path: str = ".",
+    safemode_off: bool = False,
+    theory_path: str | None = None,
+    use_cache: bool = True,
+    log_level: str | None = None,
+):
+    """Parse the input and run the requested drivers (see `run()`)"""
     if safemode_off:
         autofile.turn_off_safemode()
         ioprinter.info_message("Running with safemode turned OFF...")
@@ -29,22 +95,23 @@ def run(path: str = ".", safemode_off: bool = False):
     # Parse all of the input
     ioprinter.program_header("inp")
 
-    ioprinter.info_message("\nReading files provided in the inp directory...")
-    input = ioparser.read_amech_input(path)
+    with profiler.span("parse", "input"):
+        ioprinter.info_message("\nReading files provided in the inp directory...")
+        input = ioparser.read_amech_input(path, thy_path=theory_path)
+
+        ioprinter.info_message("\nParsing input files for runtime parameters...")
+        inp_key_dct = ioparser.run.input_dictionary(input["run"])
+        pes_idx_dct, spc_idx_dct = ioparser.run.chem_idxs(input["run"])
+        thy_dct, kmod_dct, smod_dct, spc_dct, glob_dct, pes_dct = input_dictionaries(
+            input, inp_key_dct, cache_dir=find_cache_dir(path) if use_cache else None
+        )
+        tsk_lst_dct = ioparser.run.tasks(input["run"], thy_dct)
+        pes_rlst, spc_rlst = ioparser.rlst.run_lst(
+            pes_dct, spc_dct, pes_idx_dct, spc_idx_dct
+        )
+    if inp_key_dct["print_debug"] and log_level is None:
+        ioprinter.set_log_level("DEBUG")
 
-    ioprinter.info_message("\nParsing input files for runtime parameters...")
-    thy_dct = ioparser.thy.theory_dictionary(input["thy"])
-    kmod_dct, smod_dct = ioparser.models.models_dictionary(input["mod"], thy_dct)
-    inp_key_dct = ioparser.run.input_dictionary(input["run"])
-    pes_idx_dct, spc_idx_dct = ioparser.run.chem_idxs(input["run"])
-    tsk_lst_dct = ioparser.run.tasks(input["run"], thy_dct)
-    spc_dct, glob_dct = ioparser.spc.species_dictionary(
-        input["spc"], input["dat"], input["geo"], input["act"], inp_key_dct, "csv"
-    )
-    pes_dct = ioparser.mech.pes_dictionary(input["mech"], "chemkin", spc_dct)
-    pes_rlst, spc_rlst = ioparser.rlst.run_lst(
-        pes_dct, spc_dct, pes_idx_dct, spc_idx_dct
-    )
     # Do a check
     ioprinter.info_message("\nFinal check if all required input provided...")
     ioparser.run.check_inputs(tsk_lst_dct, pes_dct, kmod_dct, smod_dct)
@@ -56,44 +123,28 @@ def run(path: str = ".", safemode_off: bool = False):
     es_tsks = tsk_lst_dct.get("es")
     if es_tsks is not None:
         ioprinter.program_header("es")
-        esdriver.run(
-            pes_rlst,
-            spc_rlst,
-            es_tsks,
-            spc_dct,
-            glob_dct,
-            thy_dct,
-            inp_key_dct["run_prefix"],
-            inp_key_dct["save_prefix"],
-            print_debug=inp_key_dct["print_debug"],
-        )
+        with profiler.span("es", "driver"):
+            esdriver.run(
+                pes_rlst,
+                spc_rlst,
+                es_tsks,
+                spc_dct,
+                glob_dct,
+                thy_dct,
+                inp_key_dct["run_prefix"],
+                inp_key_dct["save_prefix"],
+                print_debug=inp_key_dct["print_debug"],
+            )
         ioprinter.program_exit("es")
 
     therm_tsks = tsk_lst_dct.get("thermo")
     if therm_tsks is not None:
         ioprinter.program_header("thermo")
-        thermodriver.run(
-            pes_rlst,
-            spc_rlst,
-            therm_tsks,
-            kmod_dct,
-            smod_dct,
-            spc_dct,
-            thy_dct,
-            inp_key_dct["run_prefix"],
-            inp_key_dct["save_prefix"],
-            path,
-        )
-        ioprinter.program_exit("thermo")
-
-    trans_tsks = tsk_lst_dct.get("trans")
-    if trans_tsks is not None:
-        ioprinter.program_header("trans")
-        if pes_dct:
-            transdriver.run(
+        with profiler.span("thermo", "driver"):
+            thermodriver.run(
                 pes_rlst,
                 spc_rlst,
-                trans_tsks,
+                therm_tsks,
                 kmod_dct,
                 smod_dct,
                 spc_dct,
@@ -102,41 +153,62 @@ def run(path: str = ".", safemode_off: bool = False):
                 inp_key_dct["save_prefix"],
                 path,
             )
+        ioprinter.program_exit("thermo")
+
+    trans_tsks = tsk_lst_dct.get("trans")
+    if trans_tsks is not None:
+        ioprinter.program_header("trans")
+        if pes_dct:
+            with profiler.span("trans", "driver"):
+                transdriver.run(
+                    pes_rlst,
+                    spc_rlst,
+                    trans_tsks,
+                    kmod_dct,
+                    smod_dct,
+                    spc_dct,
+                    thy_dct,
+                    inp_key_dct["run_prefix"],
+                    inp_key_dct["save_prefix"],
+                    path,
+                )
         ioprinter.program_exit("trans")
 
     ktp_tsks = tsk_lst_dct.get("ktp")
     if ktp_tsks is not None:
         ioprinter.program_header("ktp")
-        ktpdriver.run(
-            pes_rlst,
-            input["pesgrp"],
-            ktp_tsks,
-            spc_dct,
-            glob_dct,
-            thy_dct,
-            kmod_dct,
-            smod_dct,
-            inp_key_dct["run_prefix"],
-            inp_key_dct["save_prefix"],
-            path,
-        )
+        with profiler.span("ktp", "driver"):
+            ktpdriver.run(
+                pes_rlst,
+                input["pesgrp"],
+                ktp_tsks,
+                spc_dct,
+                glob_dct,
+                thy_dct,
+                kmod_dct,
+                smod_dct,
+                inp_key_dct["run_prefix"],
+                inp_key_dct["save_prefix"],
+                path,
+            )
         ioprinter.program_exit("ktp")
 
     proc_tsks = tsk_lst_dct.get("proc")
     if proc_tsks is not None:
         ioprinter.program_header("proc")
-        procdriver.run(
-            pes_rlst,
-            spc_rlst,
-            proc_tsks,
-            spc_dct,
-            thy_dct,
-            kmod_dct,
-            smod_dct,
-            inp_key_dct["run_prefix"],
-            inp_key_dct["save_prefix"],
-            path,
-        )
+        with profiler.span("proc", "driver"):
+            procdriver.run(
+                pes_rlst,
+                spc_rlst,
+                proc_tsks,
+                spc_dct,
+                thy_dct,
+                kmod_dct,
+                smod_dct,
+                inp_key_dct["run_prefix"],
+                inp_key_dct["save_prefix"],
+                path,
+            )
         ioprinter.program_exit("proc")
 
     # Check if any drivers were requested to be run
@@ -148,5 +220,64 @@ def run(path: str = ".", safemode_off: bool = False):
         )
 
     # Exit Program
+    ioprinter.debug_message(readcache.stats_string())
     ioprinter.obj("vspace")
     ioprinter.program_exit("amech")
+
+
+def input_dictionaries(
+    input: dict, inp_key_dct: dict, cache_dir: str | Path | None = None
+) -> tuple[dict, dict, dict, dict, dict, dict]:
+    """Parse the theory, model, species, and PES dictionaries from the input
+
+    These only depend on the input files that are shared by all of the subtasks of a
+    job, so they are cached under a hash of those files.
+
+    :param input: The input strings, from `ioparser.read_amech_input()`
+    :param inp_key_dct: The input block of run.dat, as a dictionary
+    :param cache_dir: The input cache directory (if `None`, the cache is not used)
+    :return: The theory, kinetic and species model, species, global species, and PES
+        dictionaries
+    """
+
+    def _model_dictionaries():
+        thy_dct = ioparser.thy.theory_dictionary(input["thy"])
+        kmod_dct, smod_dct = ioparser.models.models_dictionary(input["mod"], thy_dct)
+        return thy_dct, kmod_dct, smod_dct
+
+    def _species_dictionaries():
+        spc_dct, glob_dct = ioparser.spc.species_dictionary(
+            input["spc"], input["dat"], input["geo"], input["act"], inp_key_dct, "csv"
+        )
+        pes_dct = ioparser.mech.pes_dictionary(input["mech"], "chemkin", spc_dct)
+        return spc_dct, glob_dct, pes_dct
+
+    if cache_dir is None:
+        return (*_model_dictionaries(), *_species_dictionaries())
+
+    mod_key = cache_key(input["thy"], input["mod"])
+    spc_key = cache_key(
+        input["spc"],
+        input["dat"],
+        sorted(input["geo"].items()),
+        sorted(input["act"].items()),
+        inp_key_dct.get("canonical"),
+        input["mech"],
+    )
+    ioprinter.info_message(f"Using the input cache in {cache_dir}")
+    return (
+        *cached(cache_dir, "models", mod_key, _model_dictionaries),
+        *cached(cache_dir, "species", spc_key, _species_dictionaries),
+    )
+
+
+def warm_input_cache(path: str | Path = ".", cache_dir: str | Path | None = None):
+    """Parse the input in a run directory into the input cache, without running it
+
+    :param path: The job run directory
+    :param cache_dir: The input cache directory (if `None`, it is found from the path)
+    """
+    cache_dir = find_cache_dir(path) if cache_dir is None else cache_dir
+    input = ioparser.read_amech_input(path)
+    inp_key_dct = ioparser.run.input_dictionary(input["run"])
+    input_dictionaries(input, inp_key_dct, cache_dir=cache_dir)
@@ -2,6 +2,8 @@
 """
 
 import enum
+import json
+import os
 import re
 from pathlib import Path
 
@@ -20,13 +22,23 @@ class Status(enum.Enum):
 
 STATUS_WIDTH = 7
 
+EXIT_MESSAGE = b"EXITING AUTOMECHANIC"
+WARNING_REGEX = re.compile(r"(?<!Future)Warning", flags=re.IGNORECASE)
+TAIL_SIZE = 1 << 16  # bytes at the end of the log to search for the exit message
+CHUNK_SIZE = 1 << 22  # bytes to read at a time when scanning for warnings
+CHECK_CACHE_FILE = ".check_log.json"
 
-def check_log(path: str = ".", log: bool=False) -> tuple[Status, str | None]:
+
+def check_log(
+    path: str = ".", log: bool = False, cache: bool = False
+) -> tuple[Status, str | None]:
     """Check an AutoMech log file to see if it succeeded
 
     :param path: The path to the log file or directory. If the path is a directory, the
         log file must be called `out.log`.
     :param log: Whether to print the result to the terminal.
+    :param cache: Whether to cache the result in the log directory, so that repeated
+        checks only need to scan newly appended bytes.
     """
     path: Path = Path(path)
     assert path.exists(), f"Path does not exist: {path}"
@@ -34,7 +46,7 @@ def check_log(path: str = ".", log: bool=False) -> tuple[Status, str | None]:
         path /= "out.log"
     assert path.is_file(), f"File does not exist: {path}"
 
-    status, line = _check_log(path)
+    status, line = _check_log(path, cache=cache)
 
     if log:
         print(f"{str(path) + ' ':.<80} {colored_status_string(status)}")
@@ -44,10 +56,16 @@ def check_log(path: str = ".", log: bool=False) -> tuple[Status, str | None]:
     return (status, line)
 
 
-def _check_log(log_path: str | Path) -> tuple[Status, str | None]:
+def _check_log(log_path: str | Path, cache: bool = False) -> tuple[Status, str | None]:
     """Check a log file, returning the status and the line that triggered it.
 
+    The exit message is searched for at the end of the file, and the warning scan reads
+    the file in chunks. If caching, the scan results are stored in the log directory,
+    keyed on the size and modification time of the log, and the warning scan resumes
+    from where the previous one stopped.
+
     :param log_path: The log file path
+    :param cache: Whether to use and update the on-disk cache
     :return: The status and the line triggering the status, if applicable
     """
     log_path = Path(log_path)
@@ -56,20 +74,124 @@ def _check_log(log_path: str | Path) -> tuple[Status, str | None]:
         status = Status.TBD
         return (status, line)
 
-    log = log_path.read_text().strip()
-    has_exit_message = re.search("EXITING AUTOMECHANIC", log)
+    cache_path = log_path.parent / CHECK_CACHE_FILE
+    cache_dct = _read_check_cache(cache_path) if cache else {}
+    scan_dct = cache_dct.get(log_path.name)
+    log_stat = log_path.stat()
+    if scan_dct is None or (scan_dct["size"], scan_dct["mtime"]) != (
+        log_stat.st_size,
+        log_stat.st_mtime,
+    ):
+        scan_dct = _scan_log(log_path, scan_dct)
+        if cache:
+            cache_dct[log_path.name] = scan_dct
+            _write_check_cache(cache_path, cache_dct)
+
     has_is_running_file = Path(f"{log_path}_IS_RUNNING").exists()
-    if not has_exit_message:
+    if not scan_dct["exit"]:
         status = Status.RUNNING if has_is_running_file else Status.ERROR
-        line = log.splitlines()[-1] if log else ''
+        line = scan_dct["last_line"]
         return (status, line)
 
-    warning_match = re.search(r".*(?<!Future)Warning.*", log, flags=re.IGNORECASE)
-    status = Status.WARNING if warning_match else Status.OK
-    line = warning_match.group(0) if warning_match else None
+    line = scan_dct["warning"]
+    status = Status.WARNING if line is not None else Status.OK
     return (status, line)
 
 
+def _scan_log(log_path: Path, scan_dct: dict | None = None) -> dict:
+    """Scan a log file for the exit message, its last line, and the first warning
+
+    If the results of a previous scan are passed in and the log has only been appended
+    to since, the warning scan resumes from the previous offset.
+
+    :param log_path: The log file path
+    :param scan_dct: The results of a previous scan of this log, if any
+    :return: The scan results
+    """
+    log_stat = log_path.stat()
+    with open(log_path, "rb") as log_file:
+        # Read the tail of the file for the exit message and the last line
+        log_file.seek(max(log_stat.st_size - TAIL_SIZE, 0))
+        tail = log_file.read().strip()
+        last_line = tail.rsplit(b"\n", 1)[-1].decode(errors="replace")
+
+        # Resume the warning scan, if the file has only been appended to since the
+        # last scan (checked by comparing the bytes just before the previous offset)
+        offset, mark, warning = 0, "", None
+        if scan_dct is not None and scan_dct["size"] <= log_stat.st_size:
+            prev_mark = scan_dct["mark"]
+            log_file.seek(max(scan_dct["offset"] - len(prev_mark), 0))
+            if log_file.read(len(prev_mark)).decode("latin-1") == prev_mark:
+                offset, mark, warning = scan_dct["offset"], prev_mark, scan_dct["warning"]
+
+        # Scan complete lines in chunks, stopping at the first warning
+        log_file.seek(offset)
+        rest = b""
+        while warning is None and (chunk := log_file.read(CHUNK_SIZE)):
+            lines, newline, rest = (rest + chunk).rpartition(b"\n")
+            if newline:
+                warning = _first_warning_line(lines)
+                offset += len(lines) + 1
+                mark = (lines + newline)[-64:].decode("latin-1")
+        if warning is None and rest:
+            warning = _first_warning_line(rest)
+
+    return {
+        "size": log_stat.st_size,
+        "mtime": log_stat.st_mtime,
+        "offset": offset,
+        "mark": mark,
+        "exit": EXIT_MESSAGE in tail,
+        "last_line": last_line,
+        "warning": warning,
+    }
+
+
+def _first_warning_line(text: bytes) -> str | None:
+    """Find the first line containing a warning in a block of text
+
+    :param text: The text, as bytes
+    :return: The line, if there is one
+    """
+    text = text.decode(errors="replace")
+    match = WARNING_REGEX.search(text)
+    if match is None:
+        return None
+
+    start = text.rfind("\n", 0, match.start()) + 1
+    end = text.find("\n", match.end())
+    return text[start:] if end < 0 else text[start:end]
+
+
+def _read_check_cache(cache_path: Path) -> dict[str, dict]:
+    """Read the log check cache for a directory
+
+    :param cache_path: The cache file path
+    :return: The cached scan results, by log file name
+    """
+    if not cache_path.exists():
+        return {}
+
+    try:
+        return json.loads(cache_path.read_text())
+    except ValueError:
+        return {}
+
+
+def _write_check_cache(cache_path: Path, cache_dct: dict[str, dict]) -> None:
+    """Write the log check cache for a directory, replacing it atomically
+
+    :param cache_path: The cache file path
+    :param cache_dct: The cached scan results, by log file name
+    """
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}")
+    try:
+        tmp_path.write_text(json.dumps(cache_dct))
+        tmp_path.replace(cache_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
 def colored_status_string(status: Status) -> str:
     """Get a colored status string
 
@@ -0,0 +1,103 @@
+""" Content-hashed cache of parsed AutoMech input
+
+Parsing the species and mechanism input is slow, and every subtask of a large job
+parses the same species.csv and mechanism.dat. The parsed dictionaries are pickled in a
+cache directory next to `inp/`, under a SHA-256 hash of the input they were parsed from
+and the versions of the packages that parsed them, so a changed input or an upgraded
+package never gets a stale result.
+"""
+
+import hashlib
+import importlib.metadata
+import os
+import pickle
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import TypeVar
+
+CACHE_DIR = ".input_cache"
+CACHE_VERSION = 1
+CACHE_PACKAGES = ("mechdriver", "autochem", "autoio", "autofile", "mechanalyzer")
+
+T = TypeVar("T")
+
+
+def find_cache_dir(path: str | Path = ".") -> Path:
+    """Find the input cache directory for a run directory
+
+    This looks in the run directory and its parents, so that subtasks share the cache
+    written by `automech subtasks setup`. If there is none, the cache goes in the run
+    directory.
+
+    :param path: The run directory
+    :return: The cache directory
+    """
+    path = Path(path).resolve()
+    for dir_path in (path, *path.parents):
+        if (dir_path / CACHE_DIR).is_dir():
+            return dir_path / CACHE_DIR
+    return path / CACHE_DIR
+
+
+def package_versions() -> list[str]:
+    """Get the versions of the packages that parse the input
+
+    :return: The versions, as `name==version` strings
+    """
+    versions = []
+    for name in CACHE_PACKAGES:
+        try:
+            versions.append(f"{name}=={importlib.metadata.version(name)}")
+        except importlib.metadata.PackageNotFoundError:
+            versions.append(f"{name}==?")
+    return versions
+
+
+def cache_key(*parts) -> str:
+    """Hash a set of inputs, along with the Python and package versions
+
+    :param parts: The inputs, which must have deterministic `repr()`s
+    :return: The SHA-256 hash, as a hex string
+    """
+    hasher = hashlib.sha256()
+    for part in (CACHE_VERSION, sys.version, *package_versions(), *parts):
+        data = repr(part).encode()
+        hasher.update(len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+def cached(cache_dir: str | Path, name: str, key: str, func: Callable[[], T]) -> T:
+    """Load a value from the cache, or compute it and add it to the cache
+
+    Unreadable cache entries are recomputed, and values that can't be written to the
+    cache are returned anyway.
+
+    :param cache_dir: The cache directory
+    :param name: A name for the value, used to name the cache file
+    :param key: The key for the value, from `cache_key()`
+    :param func: A function computing the value
+    :return: The value
+    """
+    cache_path = Path(cache_dir) / f"{name}-{key}.pkl"
+    if cache_path.exists():
+        try:
+            with open(cache_path, "rb") as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            print(f"Ignoring unreadable cache file {cache_path}")
+
+    value = func()
+
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as err:
+        print(f"Could not write cache file {cache_path}: {err}")
+        tmp_path.unlink(missing_ok=True)
+
+    return value
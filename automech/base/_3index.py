@@ -0,0 +1,71 @@
+""" Catalog of the conformers in the save filesystem
+
+The catalog lets the thermo and kinetics drivers look up the conformers and energies at
+a level of theory without walking the save filesystem. See `mechlib.filesys.catalog`.
+"""
+
+from pathlib import Path
+
+
+def rebuild_index(path: str | Path = ".", save_path: str | Path | None = None) -> int:
+    """Create the catalog of the conformers in a save filesystem, or rebuild it from
+    scratch
+
+    Once the catalog exists, runs that save to this filesystem keep it up to date.
+
+    :param path: The job run directory
+    :param save_path: The save filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :return: The number of conformers indexed
+    """
+    from mechlib.filesys import catalog, layers
+
+    layers.install()
+    save_path = save_prefix(path=path, save_path=save_path)
+    count = catalog.rebuild(str(save_path))
+    print(f"Indexed {count} conformers in {save_path / catalog.CATALOG_NAME}")
+    return count
+
+
+def save_prefix(path: str | Path = ".", save_path: str | Path | None = None) -> Path:
+    """Get the save filesystem prefix of a job
+
+    :param path: The job run directory
+    :param save_path: The save filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :return: The save filesystem prefix
+    """
+    save_path, _ = filesystem_prefixes(path=path, save_path=save_path)
+    return save_path
+
+
+def filesystem_prefixes(
+    path: str | Path = ".",
+    save_path: str | Path | None = None,
+    run_path: str | Path | None = None,
+) -> tuple[Path, Path]:
+    """Get the save and run filesystem prefixes of a job
+
+    :param path: The job run directory
+    :param save_path: The save filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :param run_path: The run filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :return: The save and run filesystem prefixes
+    """
+    from ..subtasks._0setup import (
+        filesystem_paths_from_run_dict,
+        parse_run_dat,
+        read_input_files,
+    )
+
+    path = Path(path)
+    if save_path is None or run_path is None:
+        run_dct = parse_run_dat(read_input_files(path).get("run.dat"))
+        save_path0, run_path0 = filesystem_paths_from_run_dict(run_dct)
+        save_path = path / save_path0 if save_path is None else save_path
+        run_path = path / run_path0 if run_path is None else run_path
+
+    save_path = Path(save_path)
+    assert save_path.is_dir(), f"Save filesystem not found: {save_path}"
+    return save_path, Path(run_path)
@@ -0,0 +1,163 @@
+""" Maintenance of the save and run filesystems
+
+See `mechlib.filesys.archive` for the packed archive format, `mechlib.filesys.gc` for
+how run jobs are judged removable, and `mechlib.filesys.check` for the integrity
+checks.
+"""
+
+import time
+from pathlib import Path
+
+from ._3index import filesystem_prefixes, save_prefix
+
+
+def pack(
+    path: str | Path = ".", save_path: str | Path | None = None, unpack: bool = False
+) -> int:
+    """Pack the points of every scan and tau filesystem in a save filesystem into one
+    archive per filesystem, or unpack them
+
+    Run this while no jobs are writing to the save filesystem. Packing can be
+    interrupted and run again. Packed points are only found by readers that go
+    through `mechlib.filesys.layers`, as `automech run`, `automech fs`,
+    `automech.query`, and `bin/automated_insert.py` do.
+
+    :param path: The job run directory
+    :param save_path: The save filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :param unpack: Unpack the archives instead?
+    :return: The number of points packed, or files unpacked
+    """
+    from mechlib.filesys import archive, layers
+
+    layers.install()
+    save_path = save_prefix(path=path, save_path=save_path)
+    nfs, count = archive.pack_tree(str(save_path), unpack_=unpack)
+    if unpack:
+        print(f"Unpacked {count} files from {nfs} filesystems in {save_path}")
+    else:
+        print(f"Packed {count} points from {nfs} filesystems in {save_path}")
+    return count
+
+
+def gc(
+    path: str | Path = ".",
+    save_path: str | Path | None = None,
+    run_path: str | Path | None = None,
+    max_age: float = 24.0,
+    dry_run: bool = False,
+    compact: bool = False,
+) -> int:
+    """Remove the jobs that are no longer needed from the run filesystem
+
+    This removes jobs whose results are in the save filesystem, jobs that died while
+    running (so that runs no longer skip them), and external program (MESS, ThermP,
+    ProjRot, ...) job directories, along with `_IS_RUNNING` markers of subtask workers
+    that died. See `mechlib.filesys.gc`. Failed jobs are kept.
+
+    :param path: The job run directory
+    :param save_path: The save filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :param run_path: The run filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :param max_age: How long, in hours, a running job, an external program job, or a
+        subtask log with an `_IS_RUNNING` marker has to be untouched to be removed
+    :param dry_run: Only report what would be removed?
+    :param compact: Also pack the scans and tau samples in the save filesystem?
+    :return: The number of jobs and markers removed (or that would be removed)
+    """
+    from mechlib.filesys import gc as fs_gc
+    from mechlib.filesys import layers
+
+    from ..subtasks import SUBTASK_DIR
+
+    layers.install()
+    save_path, run_path = filesystem_prefixes(
+        path=path, save_path=save_path, run_path=run_path
+    )
+    assert run_path.is_dir(), f"Run filesystem not found: {run_path}"
+
+    garbage = fs_gc.find_garbage(str(run_path), str(save_path), max_age=max_age * 3600)
+    markers = orphaned_running_markers(Path(path) / SUBTASK_DIR, max_age=max_age)
+    descs = {
+        "saved": "jobs with saved results",
+        "stale": "jobs that died while running",
+        "build": "external program jobs",
+    }
+    for key, desc in descs.items():
+        print(f"{len(garbage[key])} {desc}")
+    print(f"{len(markers)} orphaned _IS_RUNNING markers")
+
+    count = sum(map(len, garbage.values())) + len(markers)
+    if not dry_run:
+        jobs = [job for jobs in garbage.values() for job in jobs]
+        count = fs_gc.delete(jobs, str(run_path))
+        for marker in markers:
+            marker.unlink(missing_ok=True)
+        count += len(markers)
+        print(f"Removed {count} jobs and markers from {run_path}")
+
+    if compact:
+        pack(path=path, save_path=save_path)
+
+    return count
+
+
+def check_fs(
+    path: str | Path = ".",
+    save_path: str | Path | None = None,
+    output: str | Path = "fs_check.json",
+    nprocs: int | None = None,
+) -> int:
+    """Check the integrity of every conformer in a save filesystem, in parallel
+
+    This reads the files of each species and transition state conformer and writes
+    the issues found to a report. Issues include geometries without energies, files
+    that don't parse, jobs still marked as running, and z-matrices without torsions.
+    See `mechlib.filesys.check`.
+
+    :param path: The job run directory
+    :param save_path: The save filesystem prefix
+        (if `None`, the value in run.dat is used, relative to the job run directory)
+    :param output: The path to the report, which is written as CSV if it ends in
+        .csv, and as JSON otherwise
+    :param nprocs: The number of processes (if `None`, the number of CPUs)
+    :return: The number of issues found
+    """
+    from mechlib.filesys import check as fs_check
+    from mechlib.filesys import layers
+
+    layers.install()
+    save_path = save_prefix(path=path, save_path=save_path)
+    assert save_path.is_dir(), f"Save filesystem not found: {save_path}"
+
+    ncnfs, issues = fs_check.check(str(save_path), nprocs=nprocs)
+    fs_check.write_report(issues, str(output))
+
+    counts = {}
+    for issue in issues:
+        counts[issue["kind"]] = counts.get(issue["kind"], 0) + 1
+    print(f"Checked {ncnfs} conformers in {save_path}")
+    for kind, count in sorted(counts.items()):
+        print(f"{count} {kind}")
+    print(f"Wrote {len(issues)} issues to {output}")
+    return len(issues)
+
+
+def orphaned_running_markers(subtask_path: str | Path, max_age: float) -> list[Path]:
+    """Find the `_IS_RUNNING` markers of subtask workers that died
+
+    A worker writes to its log as it runs, so a marker whose log hasn't been modified
+    for longer than the maximum age (or is missing) is orphaned.
+
+    :param subtask_path: The path to the subtask directories
+    :param max_age: The maximum age of the log, in hours
+    :return: The orphaned markers
+    """
+    cutoff = time.time() - max_age * 3600
+    markers = []
+    for marker in Path(subtask_path).rglob("*_IS_RUNNING"):
+        log_path = marker.with_name(marker.name.removesuffix("_IS_RUNNING"))
+        if not log_path.exists() or log_path.stat().st_mtime < cutoff:
+            markers.append(marker)
+    return markers
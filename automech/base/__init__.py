@@ -1,6 +1,32 @@
-"""Base functions."""
+"""Base functions.
+
+The `run` function is imported on first use, since it imports every driver.
+"""
+
+import importlib
 
-from ._0run import run
 from ._1check import STATUS_WIDTH, Status, check_log, colored_status_string
+from ._3index import rebuild_index
+from ._4fs import check_fs, gc, pack
+
+_LAZY_ATTRS = {"run": "._0run"}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+
 
-__all__ = ["run", "check_log", "STATUS_WIDTH", "Status", "colored_status_string"]
+__all__ = [
+    "run",
+    "rebuild_index",
+    "pack",
+    "gc",
+    "check_fs",
+    "check_log",
+    "STATUS_WIDTH",
+    "Status",
+    "colored_status_string",
+]
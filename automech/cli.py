@@ -1,9 +1,15 @@
+"""AutoMech command-line interface
+
+Subcommands import what they need when they are called, so that quick commands like
+`automech check-log` and `automech subtasks status` don't import the chemistry libraries.
+"""
+
 import subprocess
 
 import click
 
 from . import subtasks
-from .base import Status, check_log, run
+from .base import Status, check_log
 
 
 @click.group()
@@ -17,7 +23,45 @@ def main():
     "-p", "--path", default=".", show_default=True, help="The job run directory"
 )
 @click.option("-S", "--safemode-off", is_flag=True, help="Turn off safemode?")
-def run_(path: str = ".", safemode_off: bool = False):
+@click.option(
+    "-T",
+    "--theory-dat",
+    default=None,
+    help="Read theory.dat from this path, relative to the job run directory "
+    "[default: inp/theory.dat]",
+)
+@click.option(
+    "-C", "--no-cache", is_flag=True, help="Parse the input without the input cache?"
+)
+@click.option(
+    "-P",
+    "--profile",
+    is_flag=True,
+    help="Write a timing trace to profile.json and print a summary at exit?",
+)
+@click.option(
+    "-L",
+    "--log-level",
+    default=None,
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False),
+    help="The lowest level of message to print [default: INFO]",
+)
+@click.option(
+    "--log-file", default=None, help="Also write messages to this file, buffered"
+)
+@click.option(
+    "--json-log", default=None, help="Also write messages to this file, as JSON lines"
+)
+def run_(
+    path: str = ".",
+    safemode_off: bool = False,
+    theory_dat: str | None = None,
+    no_cache: bool = False,
+    profile: bool = False,
+    log_level: str | None = None,
+    log_file: str | None = None,
+    json_log: str | None = None,
+):
     """Run central workflow
 
     Central Execution script to launch a MechDriver process which will
@@ -29,7 +73,18 @@ def run_(path: str = ".", safemode_off: bool = False):
     The AutoMech directory must contain an `inp/` subdirectory with the following
     required files: run.dat, theory.dat, models.dat, species.csv, mechanism.dat
     """
-    run(path=path, safemode_off=safemode_off)
+    from .base import run
+
+    run(
+        path=path,
+        safemode_off=safemode_off,
+        theory_path=theory_dat,
+        use_cache=not no_cache,
+        profile=profile,
+        log_level=log_level,
+        log_path=log_file,
+        json_log_path=json_log,
+    )
 
 
 @main.command("check-log")
@@ -45,6 +100,156 @@ def check_log_(path: str = "."):
     check_log(path=path, log=True)
 
 
+@main.group("fs")
+def fs_():
+    """Maintain the save filesystem"""
+    pass
+
+
+@fs_.command("rebuild-index")
+@click.option(
+    "-p", "--path", default=".", show_default=True, help="The job run directory"
+)
+@click.option(
+    "-s",
+    "--save-path",
+    default=None,
+    help="The save filesystem prefix [default: the value in run.dat]",
+)
+def rebuild_index_(path: str = ".", save_path: str | None = None):
+    """Index the conformers in the save filesystem
+
+    This creates (or rebuilds) a catalog of the conformers, energies, and zero-point
+    energies in the save filesystem, which runs use to find and sort conformers without
+    walking the filesystem. Once it exists, runs keep it up to date.
+    """
+    from .base import rebuild_index
+
+    rebuild_index(path=path, save_path=save_path)
+
+
+@fs_.command("pack")
+@click.option(
+    "-p", "--path", default=".", show_default=True, help="The job run directory"
+)
+@click.option(
+    "-s",
+    "--save-path",
+    default=None,
+    help="The save filesystem prefix [default: the value in run.dat]",
+)
+@click.option("-u", "--unpack", is_flag=True, help="Unpack the archives instead?")
+def pack_(path: str = ".", save_path: str | None = None, unpack: bool = False):
+    """Pack scans and tau samples into archives
+
+    This moves the points of each scan (including IRC scans) and tau sampling
+    filesystem, which each have their own directory with several files, into one
+    append-only archive per filesystem, which runs read from as before. Run it while no
+    jobs are writing to the save filesystem.
+    """
+    from .base import pack
+
+    pack(path=path, save_path=save_path, unpack=unpack)
+
+
+@fs_.command("gc")
+@click.option(
+    "-p", "--path", default=".", show_default=True, help="The job run directory"
+)
+@click.option(
+    "-s",
+    "--save-path",
+    default=None,
+    help="The save filesystem prefix [default: the value in run.dat]",
+)
+@click.option(
+    "-r",
+    "--run-path",
+    default=None,
+    help="The run filesystem prefix [default: the value in run.dat]",
+)
+@click.option(
+    "-a",
+    "--max-age",
+    default=24.0,
+    show_default=True,
+    help="How long, in hours, a running job or log must be untouched to be removed",
+)
+@click.option(
+    "-n", "--dry-run", is_flag=True, help="Only report what would be removed?"
+)
+@click.option(
+    "-c", "--compact", is_flag=True, help="Also pack the save filesystem scans?"
+)
+def gc_(
+    path: str = ".",
+    save_path: str | None = None,
+    run_path: str | None = None,
+    max_age: float = 24.0,
+    dry_run: bool = False,
+    compact: bool = False,
+):
+    """Remove jobs that are no longer needed from the run filesystem
+
+    This removes jobs whose results are in the save filesystem, jobs that died while
+    running, external program (MESS, ThermP, ProjRot, ...) jobs, and the _IS_RUNNING
+    markers of subtask workers that died. Failed jobs are kept, since runs use them to
+    decide whether to retry. With --compact, this also packs the scans and tau samples
+    in the save filesystem (see `automech fs pack`).
+    """
+    from .base import gc
+
+    gc(
+        path=path,
+        save_path=save_path,
+        run_path=run_path,
+        max_age=max_age,
+        dry_run=dry_run,
+        compact=compact,
+    )
+
+
+@fs_.command("check")
+@click.option(
+    "-p", "--path", default=".", show_default=True, help="The job run directory"
+)
+@click.option(
+    "-s",
+    "--save-path",
+    default=None,
+    help="The save filesystem prefix [default: the value in run.dat]",
+)
+@click.option(
+    "-o",
+    "--output",
+    default="fs_check.json",
+    show_default=True,
+    help="The report (written as CSV if it ends in .csv, and as JSON otherwise)",
+)
+@click.option(
+    "-j",
+    "--nprocs",
+    default=None,
+    type=int,
+    help="The number of processes [default: the number of CPUs]",
+)
+def check_(
+    path: str = ".",
+    save_path: str | None = None,
+    output: str = "fs_check.json",
+    nprocs: int | None = None,
+):
+    """Check the integrity of the save filesystem
+
+    This reads the files of every species and transition state conformer in parallel
+    processes and reports geometries without energies, files that don't parse, jobs
+    still marked as running, z-matrices without torsions, and so on.
+    """
+    from .base import check_fs
+
+    check_fs(path=path, save_path=save_path, output=output, nprocs=nprocs)
+
+
 @main.group("subtasks")
 def subtasks_():
     """Run AutoMech subtasks in parallel"""
@@ -86,12 +291,19 @@ def subtasks_():
         "Options: els(=els-spc,els-pes), thermo, ktp"
     ),
 )
+@click.option(
+    "-W",
+    "--no-warm-cache",
+    is_flag=True,
+    help="Skip parsing the shared input into the input cache?",
+)
 def subtasks_setup_(
     path: str = ".",
     out_path: str = subtasks.SUBTASK_DIR,
     save_path: str | None = None,
     run_path: str | None = None,
     task_groups: str = "els,thermo,ktp",
+    no_warm_cache: bool = False,
 ):
     """Set-up subtasks from a user-supplied AutoMech directory
 
@@ -104,6 +316,7 @@ def subtasks_setup_(
         save_path=save_path,
         run_path=run_path,
         task_groups=task_groups.split(","),
+        warm_cache=not no_warm_cache,
     )
 
 
@@ -137,12 +350,43 @@ def subtasks_setup_(
     is_flag=True,
     help="Tar the subtask data and save filesystem after running?",
 )
+@click.option(
+    "-l",
+    "--local",
+    default=False,
+    is_flag=True,
+    help="Run on the local machine in a process pool, without SSH?",
+)
+@click.option(
+    "-m",
+    "--max-attempts",
+    default=subtasks.RetryPolicy.max_attempts,
+    show_default=True,
+    help="The maximum number of attempts for each worker, including the first",
+)
+@click.option(
+    "-b",
+    "--backoff",
+    default=subtasks.RetryPolicy.backoff,
+    show_default=True,
+    help="The delay before retrying a failed worker, in seconds (doubled each time)",
+)
+@click.option(
+    "--retry-scf",
+    default=False,
+    is_flag=True,
+    help="Also retry workers that failed on SCF convergence?",
+)
 def subtasks_run_(
     nodes: tuple[str, ...],
     path: str = subtasks.SUBTASK_DIR,
     activation_hook: str | None = None,
     statuses: str = f"{Status.TBD.value}",
     tar: bool = False,
+    local: bool = False,
+    max_attempts: int = subtasks.RetryPolicy.max_attempts,
+    backoff: float = subtasks.RetryPolicy.backoff,
+    retry_scf: bool = False,
 ):
     """Run subtasks in parallel on an Ad Hoc SSH Cluster
 
@@ -151,12 +395,18 @@ def subtasks_run_(
     or
         csed-00{08..10}
 
+    Alternatively, use `--local` to run on the current machine, without nodes.
+
+    Workers that are killed or run out of memory are retried, with more memory for the
+    latter, up to `--max-attempts` times.
     """
+    assert nodes or local, "Provide a list of nodes, or run with `--local`"
+
     # For convenience, grab the Pixi activation hook automatically, if using Pixi
     # environment and activation hook is `None`
-    result = subprocess.run(["pixi", "shell-hook"], capture_output=True, text=True)
-    if activation_hook is None and result.stdout:
-        activation_hook = result.stdout
+    if activation_hook is None and not local:
+        result = subprocess.run(["pixi", "shell-hook"], capture_output=True, text=True)
+        activation_hook = result.stdout or None
 
     subtasks.run(
         path=path,
@@ -164,6 +414,16 @@ def subtasks_run_(
         activation_hook=activation_hook,
         statuses=list(map(Status, statuses.split(","))),
         tar=tar,
+        local=local,
+        retry_policy=subtasks.RetryPolicy(
+            max_attempts=max_attempts,
+            backoff=backoff,
+            failures=(
+                (*subtasks.RetryPolicy.failures, subtasks.Failure.SCF)
+                if retry_scf
+                else subtasks.RetryPolicy.failures
+            ),
+        ),
     )
 
 
@@ -1,10 +1,46 @@
-"""Functions for querying the filesystem."""
+"""Functions for querying the filesystem.
 
-import itertools
+Species and reactions are looked up by ChI in an SQLite index in the root of the file
+system (`.query_index.sqlite`), which also caches the ChI of each SMILES. The index is
+built on first use and brought up to date when a lookup misses, by listing the species
+or reaction directories without comparing them and adding the new ones, so repeated
+lookups don't scan the whole file system. A process lists the directories at most once
+every `REFRESH_SECONDS` for each table. If the index can't be written, such as in a
+read-only file system, lookups still work, from what is listed in memory. Use the batch
+functions (`base_species_paths_from_root` and `base_reaction_paths_from_root`) to
+resolve many species or reactions in one pass.
+
+The file system is read through the layers of `mechlib.filesys.layers`, like the
+`automech run` and `automech fs` entry points do, so that packed scan and tau points
+are found.
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Iterator, Sequence
 
 import autofile
 import automol
 
+INDEX_NAME = ".query_index.sqlite"
+INDEX_TIMEOUT = 60.0
+REFRESH_SECONDS = 10.0
+# SQLite limits the number of parameters in a statement
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS smiles (smi TEXT PRIMARY KEY, chi TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS species (key TEXT PRIMARY KEY, path TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS reactions (key TEXT PRIMARY KEY, path TEXT NOT NULL);
+"""
+
+# When this process last listed the directories of each table of each index, and
+# the paths it found
+_LISTINGS = {}
+
 
 # Paths from root
 def transition_state_paths_from_root(
@@ -19,6 +55,7 @@ def transition_state_paths_from_root(
     :param basis: The electronic structure basis set
     :return: The transition state paths
     """
+    _install_layers()
     rxn_path = base_reaction_path_from_root(root_path, rsmis=rsmis, psmis=psmis)
     thy_path = theory_path_from_prefix(rxn_path, method, basis)
     ts_fs = autofile.fs.transition_state(thy_path)
@@ -34,6 +71,7 @@ def species_paths_from_root(root_path: str, smi, method, basis) -> list[str]:
     :param basis: The electronic structure basis set
     :return: The transition state paths
     """
+    _install_layers()
     spc_path = base_species_path_from_root(root_path, smi=smi)
     thy_path = theory_path_from_prefix(spc_path, method, basis)
     return [thy_path]
@@ -50,12 +88,24 @@ def base_species_path_from_root(root_path: str, smi) -> str:
     :param smi: Species SMILES
     :return: The file system path
     """
-    chi = automol.smiles.chi(smi)
-    spc_fs = autofile.fs.species(root_path)
-    for locs in spc_fs[-1].existing():
-        chi0, *_ = locs
-        if chi == chi0:
-            return spc_fs[-1].path(locs)
+    _install_layers()
+    (path,) = base_species_paths_from_root(root_path, [smi])
+    return path
+
+
+def base_species_paths_from_root(
+    root_path: str, smis: Sequence[str]
+) -> list[str | None]:
+    """Get the species file system paths from the root path, given a list of SMILES
+
+    :param root_path: The root path of the file system
+    :param smis: Species SMILES
+    :return: The file system path of each species, or `None` if it isn't there
+    """
+    _install_layers()
+    with _index(root_path) as con:
+        keys = [json.dumps(chi) for chi in _chis(con, smis)]
+        return _lookup(con, root_path, "species", keys)
 
 
 def base_reaction_path_from_root(root_path: str, rsmis, psmis) -> str:
@@ -66,14 +116,31 @@ def base_reaction_path_from_root(root_path: str, rsmis, psmis) -> str:
     :param psmis: Product SMILES
     :returns: The file system path
     """
-    rchis = list(map(automol.smiles.chi, rsmis))
-    pchis = list(map(automol.smiles.chi, psmis))
-    rxn_fs = autofile.fs.reaction(root_path)
-    for locs in rxn_fs[-1].existing():
-        (rchis0, pchis0), *_ = locs
-        for rchis1, pchis1 in itertools.permutations([rchis0, pchis0]):
-            if rchis1 == rchis and pchis1 == pchis:
-                return rxn_fs[-1].path(locs)
+    _install_layers()
+    (path,) = base_reaction_paths_from_root(root_path, [(rsmis, psmis)])
+    return path
+
+
+def base_reaction_paths_from_root(
+    root_path: str, rxn_smis: Sequence[tuple[Sequence[str], Sequence[str]]]
+) -> list[str | None]:
+    """Get the reaction file system paths from the root path, given a list of reactions
+
+    A reaction is found in either direction.
+
+    :param root_path: The root path of the file system
+    :param rxn_smis: The reactant and product SMILES of each reaction
+    :return: The file system path of each reaction, or `None` if it isn't there
+    """
+    _install_layers()
+    with _index(root_path) as con:
+        smis = [smi for rsmis, psmis in rxn_smis for smi in [*rsmis, *psmis]]
+        chis = iter(_chis(con, smis))
+        keys = [
+            json.dumps([[next(chis) for _ in rsmis], [next(chis) for _ in psmis]])
+            for rsmis, psmis in rxn_smis
+        ]
+        return _lookup(con, root_path, "reactions", keys)
 
 
 # Paths from prefix
@@ -85,6 +152,7 @@ def theory_path_from_prefix(prefix: str, method: str, basis: str) -> str:
     :param basis: The electronic structure basis set
     :return: The file system path
     """
+    _install_layers()
     thy_fs = autofile.fs.theory(prefix)
     method = method.lower()
     basis = basis.lower()
@@ -100,6 +168,7 @@ def conformers_locators_from_prefix(prefix: str) -> list[object]:
     :param prefix: The prefix of the conformer file system
     :return: The locator values
     """
+    _install_layers()
     cnf_fs = autofile.fs.conformer(prefix)
     return list(cnf_fs[-1].existing())
 
@@ -109,6 +178,7 @@ def visualize_conformers_from_prefix(prefix: str):
 
     :param prefix: The prefix of the conformer file system
     """
+    _install_layers()
     cnf_fs = autofile.fs.conformer(prefix)
     for cnf_locs in conformers_locators_from_prefix(prefix):
         geo = cnf_fs[-1].file.geometry.read(cnf_locs)
@@ -123,3 +193,167 @@ def visualize_conformers_from_prefix(prefix: str):
         print(numpy.round(hess, 6))
         print(f"freqs = {freqs}")
         print(cnf_fs[-1].file.harmonic_frequencies.path(cnf_locs))
+
+
+# Index
+def _install_layers():
+    """Read the file system through the layers of `mechlib.filesys.layers`, so that
+    scan and tau points packed by `automech fs pack` are found"""
+    from mechlib.filesys import layers
+
+    layers.install()
+
+
+@contextlib.contextmanager
+def _index(root_path: str) -> Iterator[sqlite3.Connection]:
+    """Open the query index of a file system
+
+    If the index can't be opened, a temporary one is used. Writes go through `_write`,
+    each in its own short transaction.
+
+    :param root_path: The root path of the file system
+    :yield: The connection to the index
+    """
+    try:
+        index_path = os.path.join(root_path, INDEX_NAME)
+        con = sqlite3.connect(index_path, timeout=INDEX_TIMEOUT)
+        con.executescript(_SCHEMA)
+    except sqlite3.Error:
+        con = sqlite3.connect(":memory:")
+        con.executescript(_SCHEMA)
+
+    try:
+        with con:
+            yield con
+    finally:
+        con.close()
+
+
+def _chis(con: sqlite3.Connection, smis: Sequence[str]) -> list[str]:
+    """Get the ChI of each SMILES, converting only those not already in the index
+
+    :param con: The connection to the index
+    :param smis: The SMILES
+    :return: The ChIs
+    """
+    chi_dct = dict(_select(con, "smiles", "smi", "chi", set(smis)))
+    new_rows = [(smi, automol.smiles.chi(smi)) for smi in set(smis) - chi_dct.keys()]
+    _write(con, "INSERT OR REPLACE INTO smiles VALUES (?, ?)", new_rows)
+    chi_dct.update(new_rows)
+    return [chi_dct[smi] for smi in smis]
+
+
+def _lookup(
+    con: sqlite3.Connection, root_path: str, table: str, keys: Sequence[str]
+) -> list[str | None]:
+    """Look up paths in the index, refreshing it if any are missing
+
+    Between refreshes, missing keys are looked up in the directories this process last
+    listed, which also stand in for the index if it can't be written.
+
+    :param con: The connection to the index
+    :param root_path: The root path of the file system
+    :param table: The table to look in, "species" or "reactions"
+    :param keys: The keys to look up
+    :return: The path for each key, or `None` if it isn't in the file system
+    """
+    path_dct = {}
+    for key, rel_path in _select(con, table, "key", "path", set(keys)):
+        path = os.path.join(root_path, rel_path)
+        if os.path.isdir(path):
+            path_dct[key] = path
+
+    missing = set(keys) - path_dct.keys()
+    if missing:
+        listing_key = (os.path.abspath(root_path), table)
+        last, rel_path_dct = _LISTINGS.get(listing_key, (None, {}))
+        if last is None or time.monotonic() - last > REFRESH_SECONDS:
+            rel_path_dct = _refresh(con, root_path, table)
+            _LISTINGS[listing_key] = (time.monotonic(), rel_path_dct)
+        for key in missing & rel_path_dct.keys():
+            path = os.path.join(root_path, rel_path_dct[key])
+            if os.path.isdir(path):
+                path_dct[key] = path
+
+    return [path_dct.get(key) for key in keys]
+
+
+def _refresh(con: sqlite3.Connection, root_path: str, table: str) -> dict[str, str]:
+    """Bring a table of the index up to date with the file system
+
+    The directories are listed outside of any transaction, and only the keys that are
+    new, or whose directories were removed, are written. The first directory listed
+    for each key wins, as it did before the index.
+
+    :param con: The connection to the index
+    :param root_path: The root path of the file system
+    :param table: The table to refresh, "species" or "reactions"
+    :return: The path of each key in the file system, relative to the root path
+    """
+    fs_ = (autofile.fs.species if table == "species" else autofile.fs.reaction)(
+        root_path
+    )
+    rel_path_dct = {}
+    for locs in fs_[-1].existing():
+        rel_path = os.path.relpath(fs_[-1].path(locs), root_path)
+        if table == "species":
+            chi, *_ = locs
+            keys = [chi]
+        else:
+            (rchis, pchis), *_ = locs
+            keys = [[list(rchis), list(pchis)], [list(pchis), list(rchis)]]
+        for key in keys:
+            rel_path_dct.setdefault(json.dumps(key), rel_path)
+
+    # Keys whose directories were removed are written again
+    indexed = {
+        key
+        for key, rel_path in con.execute(f"SELECT key, path FROM {table}")
+        if rel_path_dct.get(key) == rel_path
+    }
+    rows = [
+        (key, rel_path) for key, rel_path in rel_path_dct.items() if key not in indexed
+    ]
+    _write(con, f"INSERT OR REPLACE INTO {table} VALUES (?, ?)", rows)
+    return rel_path_dct
+
+
+def _write(con: sqlite3.Connection, query: str, rows: Sequence[tuple]):
+    """Write rows to the index in a transaction of their own, if it can be written
+
+    The index only saves work, so an index that is read-only, or locked for longer
+    than the timeout, is left as it is.
+
+    :param con: The connection to the index
+    :param query: The statement to run for each row
+    :param rows: The rows
+    """
+    if not rows:
+        return
+    try:
+        with con:
+            con.executemany(query, rows)
+    except sqlite3.OperationalError:
+        pass
+
+
+def _select(
+    con: sqlite3.Connection, table: str, key_col: str, val_col: str, keys: set[str]
+) -> list[tuple[str, str]]:
+    """Select the rows of a table for a set of keys, in chunks
+
+    :param con: The connection to the index
+    :param table: The table
+    :param key_col: The key column
+    :param val_col: The value column
+    :param keys: The keys
+    :return: The key and value of each row found
+    """
+    keys = sorted(keys)
+    rows = []
+    for start in range(0, len(keys), _QUERY_CHUNK):
+        chunk = keys[start : start + _QUERY_CHUNK]
+        marks = ", ".join("?" * len(chunk))
+        query = f"SELECT {key_col}, {val_col} FROM {table} WHERE {key_col} IN ({marks})"
+        rows.extend(con.execute(query, chunk))
+    return rows
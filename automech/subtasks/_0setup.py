@@ -11,13 +11,15 @@ from collections import defaultdict
 from collections.abc import Sequence
 from pathlib import Path
 
-import automol
 import more_itertools as mit
 import pandas
 import pyparsing as pp
 import yaml
 from pyparsing import common as ppc
 
+from ..base._2cache import CACHE_DIR
+from . import SUBTASK_DIR, _3history
+
 COMMENT_REGEX = re.compile(r"#.*$", flags=re.M)
 ALL_KEY = "all"
 
@@ -31,9 +33,16 @@ GROUP_TASK_AND_KEY_TYPE = {
     "ktp": ("ktp", "pes"),
 }
 COMBINED_TASK_GROUPS = ("thermo", "ktp")
+# Groups whose subtasks must finish before a given group's subtasks can start
+GROUP_DEPENDENCIES = {
+    "els-spc": (),
+    "els-pes": ("els-spc",),
+    "thermo": ("els-spc",),
+    "ktp": ("els-pes", "thermo"),
+}
 
-SUBTASK_DIR = "subtasks"
 INFO_FILE = "info.yaml"
+DEPS_FILE = "deps.yaml"
 
 ROTOR_TASKS = ("hr_scan",)
 SAMP_TASKS = ("conf_samp",)
@@ -61,6 +70,10 @@ class Task:
     nprocs: int
     subtask_keys: list[str]
     subtask_nworkers: list[int]
+    theory: str | None = None
+    subtask_chis: list[str | None] = dataclasses.field(default_factory=list)
+    # Predicted wall time for each worker, in hours, from the history database
+    subtask_costs: list[float | None] = dataclasses.field(default_factory=list)
 
 
 def setup(
@@ -69,6 +82,8 @@ def setup(
     save_path: str | Path | None = None,
     run_path: str | Path | None = None,
     task_groups: Sequence[str] = DEFAULT_TASK_GROUPS,
+    history_path: str | Path = _3history.HISTORY_PATH,
+    warm_cache: bool = True,
 ):
     """Creates run directories for each task/species/TS and returns the paths in tables
 
@@ -83,6 +98,10 @@ def setup(
     :param run_path: The path to the run filesystem
         (if `None`, the value in run.dat is used)
     :param task_groups: The task groups to set up
+    :param history_path: The path to the database of previous subtask runs, used to
+        balance the number of workers per subtask
+    :param warm_cache: Parse the shared input once into the input cache, so that the
+        subtasks don't each have to parse it?
     :return: DataFrames of run paths, whose columns (species/TS index) are independent
         and can be run in parallel, but whose rows (tasks) are potentially sequential
     """
@@ -110,6 +129,7 @@ def setup(
 
     # Set up the subtasks for each group
     run_group_ids = []
+    warm_path = None
     for task_group in task_groups:
         group_id = GROUP_ID.get(task_group)
         task_type, key_type = GROUP_TASK_AND_KEY_TYPE.get(task_group)
@@ -120,9 +140,11 @@ def setup(
             key_type=key_type,
             group_id=group_id,
             out_path=out_path,
+            history_path=history_path,
         )
         if ret is not None:
             run_group_ids.append(group_id)
+            warm_path = warm_path or ret.iloc[0][ret.columns[1]]
 
     # Write the subtask info to YAML
     info_path = out_path / INFO_FILE
@@ -135,6 +157,20 @@ def setup(
     }
     info_path.write_text(yaml.safe_dump(info_dct))
 
+    # Write the subtask dependency graph to YAML
+    deps_path = out_path / DEPS_FILE
+    print(f"Writing subtask dependencies to {deps_path}")
+    write_dependency_graph(dependency_graph(out_path, run_group_ids), deps_path)
+
+    # Parse the input shared by all subtasks into the input cache, using the input files
+    # of one of them
+    if warm_cache and warm_path is not None:
+        from ..base._0run import warm_input_cache
+
+        cache_dir = out_path / CACHE_DIR
+        print(f"Warming the input cache in {cache_dir}")
+        warm_input_cache(warm_path, cache_dir=cache_dir)
+
 
 def setup_subtask_group(
     run_dct: dict[str, str],
@@ -143,6 +179,7 @@ def setup_subtask_group(
     key_type: str | None = None,
     group_id: str | int | None = None,
     out_path: str | Path = SUBTASK_DIR,
+    history_path: str | Path = _3history.HISTORY_PATH,
 ) -> pandas.DataFrame | None:
     """Set up a group of subtasks from a run dictionary, creating run directories and
     returning them in a table
@@ -151,6 +188,7 @@ def setup_subtask_group(
     :param task_type: The type of task: 'els', 'thermo', or 'ktp'
     :param key_type: The type of subtask key: 'spc', 'pes', or `None`
     :param group_id: The group ID, used to name files and folders
+    :param history_path: The path to the database of previous subtask runs
     :return: A DataFrame of run paths, whose columns (subtasks) are independent and can
         be run in parallel, but whose rows (tasks) are potentially sequential
     """
@@ -164,7 +202,9 @@ def setup_subtask_group(
     block_keys = ["input"] + (["pes", "spc"] if key_type is None else [key_type])
 
     # Parse tasks and subtask keys for this group
-    tasks = determine_task_list(run_dct, file_dct, task_type, key_type)
+    tasks = determine_task_list(
+        run_dct, file_dct, task_type, key_type, history_path=history_path
+    )
 
     # If the task list is empty, return `None`
     if not tasks:
@@ -213,15 +253,20 @@ def determine_task_list(
     file_dct: dict[str, str],
     task_type: str,
     key_type: str | None = None,
+    history_path: str | Path = _3history.HISTORY_PATH,
 ) -> list[Task]:
     """Set up a group of subtasks from a run dictionary, creating run directories and
     returning them in a table
 
+    If the history database has previous runs of a task, its workers are redistributed
+    among the subtasks in proportion to their predicted cost.
     """
     subpes_dct = subpes_dict_from_mechanism_dat(file_dct.get("mechanism.dat"))
     keys = subtask_keys_from_run_dict(
         run_dct, task_type, key_type, subpes_dct=subpes_dct
     )
+    chis = subtask_chis(file_dct, subtask_keys=keys)
+    sizes = [None if c is None else heavy_atom_count_from_inchi(c) for c in chis]
 
     tasks: list[Task] = [
         Task(
@@ -233,6 +278,8 @@ def determine_task_list(
             subtask_nworkers=parse_subtasks_nworkers(
                 task_line, file_dct, subtask_keys=keys
             ),
+            theory=parse_task_fields(task_line).get("runlvl"),
+            subtask_chis=chis,
         )
         for task_line in task_lines_from_run_dict(run_dct, task_type, key_type)
     ]
@@ -243,6 +290,25 @@ def determine_task_list(
         task.line = "\n".join(t.line for t in tasks)
         tasks = [task]
 
+    for task in tasks:
+        works = _3history.predicted_work(
+            task.name,
+            task.theory,
+            keys=keys,
+            chis=chis,
+            sizes=sizes,
+            path=history_path,
+        )
+        total_nworkers = sum(task.subtask_nworkers)
+        if works and None not in works and total_nworkers > len(works):
+            task.subtask_nworkers = _3history.balanced_worker_counts(
+                works, total_nworkers
+            )
+        task.subtask_costs = [
+            None if w is None else w / (n * task.nprocs)
+            for w, n in zip(works, task.subtask_nworkers, strict=True)
+        ]
+
     return tasks
 
 
@@ -350,10 +416,7 @@ def parse_subtasks_nworkers(
         field_dct = parse_task_fields(task_line)
 
         # Get the list of ChIs ordered by subtask key
-        spc_df = parse_species_csv(file_dct.get("species.csv"))
-        if "inchi" not in spc_df:
-            spc_df["inchi"] = spc_df["smiles"].apply(automol.smiles.inchi)
-        chis = [spc_df.iloc[int(k) - 1]["inchi"] for k in subtask_keys]
+        chis = subtask_chis(file_dct, subtask_keys=subtask_keys)
 
         # Determine the number of workers per subtask
         if task_name in ROTOR_TASKS:
@@ -366,6 +429,26 @@ def parse_subtasks_nworkers(
     return nworkers_lst
 
 
+def subtask_chis(
+    file_dct: dict[str, str], subtask_keys: list[str]
+) -> list[str | None]:
+    """Get the ChI of the species for each subtask key
+
+    :param file_dct: The file dictionary
+    :param subtask_keys: The subtask keys
+    :return: The ChI for each species subtask key, or `None` for other keys
+    """
+    import automol
+
+    if not all(k.isdigit() for k in subtask_keys):
+        return [None] * len(subtask_keys)
+
+    spc_df = parse_species_csv(file_dct.get("species.csv"))
+    if "inchi" not in spc_df:
+        spc_df["inchi"] = spc_df["smiles"].apply(automol.smiles.inchi)
+    return [spc_df.iloc[int(k) - 1]["inchi"] for k in subtask_keys]
+
+
 # Functions acting on theory.dat data
 def parse_theory_dat(theory_dat: str) -> dict[str, dict[str, str]]:
     """Parse a theory.dat file into a dictionary of dictionaries
@@ -406,6 +489,8 @@ def rotor_count_from_inchi(chi: str) -> int:
     :param chi: An InChI or AMChI string
     :return: The rotor count
     """
+    import automol
+
     gra = automol.amchi.graph(chi, stereo=False)
     # If there are no torsions at all, return 1
     if not len(automol.graph.rotational_bond_keys(gra, with_ch_rotors=True)):
@@ -415,6 +500,18 @@ def rotor_count_from_inchi(chi: str) -> int:
     return nrotor
 
 
+def heavy_atom_count_from_inchi(chi: str) -> int:
+    """Determine the number of heavy atoms in a molecule from its InChI or AMChI string
+
+    :param chi: An InChI or AMChI string
+    :return: The heavy atom count
+    """
+    import automol
+
+    fml = automol.amchi.formula(chi)
+    return sum(n for s, n in fml.items() if s != "H")
+
+
 def sample_count_from_inchi(
     chi: str,
     param_a: int = 12,
@@ -437,6 +534,8 @@ def sample_count_from_inchi(
     :param param_d: The `d` parameter used to calculate the sample count
     :return: The sample count
     """
+    import automol
+
     gra = automol.amchi.graph(chi, stereo=False)
     # If there are no torsions at all, return 1
     if not len(automol.graph.rotational_bond_keys(gra, with_ch_rotors=True)):
@@ -668,6 +767,119 @@ def read_task_list(path: str | Path) -> list[Task]:
     return [Task(**d) for d in yaml_tasks]
 
 
+# Subtask dependencies
+def dependency_graph(
+    path: str | Path, group_ids: Sequence[str | int]
+) -> dict[str, list[str]]:
+    """Determine the dependency graph of a set of subtasks
+
+    The graph maps each subtask path onto the subtask paths that must succeed before it
+    can start. Within a group, each subtask depends on the previous task for the same
+    key. Across groups, the first task for a key depends on the last task for each
+    matching key in the groups listed in `GROUP_DEPENDENCIES`. Species and channels are
+    matched by index. Since channels cannot be mapped onto their species without
+    sorting the mechanism, a PES subtask conservatively depends on every species
+    subtask in the groups it depends on.
+
+    :param path: The path where the AutoMech subtasks were set up
+    :param group_ids: The group IDs, in the order they should be run
+    :return: The dependency graph, mapping each subtask path onto its dependencies
+    """
+    path = Path(path)
+    group_name = {str(v): k for k, v in GROUP_ID.items()}
+
+    # For each group, get the column of subtask paths for each key
+    columns_dct: dict[str, dict[str, list[str]]] = {}
+    for group_id in map(str, group_ids):
+        df = pandas.read_csv(path / f"{group_id}.csv")
+        columns_dct[group_name[group_id]] = {
+            k: list(map(str, df[k].dropna())) for k in df.columns if k != TableKey.task
+        }
+
+    graph = {}
+    for name, columns in columns_dct.items():
+        dep_columns_lst = [
+            columns_dct[n] for n in GROUP_DEPENDENCIES[name] if n in columns_dct
+        ]
+        for key, subtask_paths in columns.items():
+            first_deps = [
+                dep_columns[k][-1]
+                for dep_columns in dep_columns_lst
+                for k in dependency_keys(key, list(dep_columns))
+            ]
+            for subtask_path, prev_path in zip(
+                subtask_paths, [None, *subtask_paths[:-1]]
+            ):
+                graph[subtask_path] = first_deps if prev_path is None else [prev_path]
+
+    return graph
+
+
+def dependency_keys(key: str, dep_keys: Sequence[str]) -> list[str]:
+    """Determine which subtask keys of another group a given subtask key depends on
+
+    Examples:
+        '1'        with ['1', '2']        ->  ['1']
+        '1: 1-2'   with ['1: 1', '1: 3']  ->  ['1: 1']
+        '1: 1-2'   with ['1', '2']        ->  ['1', '2']
+        'all'      with ['1', '2']        ->  ['1', '2']
+
+    :param key: The subtask key
+    :param dep_keys: The subtask keys of the other group
+    :return: The subtask keys that this one depends on
+    """
+    if key == ALL_KEY or ALL_KEY in dep_keys:
+        return list(dep_keys)
+
+    pidx, idxs = parse_subtask_key(key)
+    if pidx is not None and not any(":" in k for k in dep_keys):
+        return list(dep_keys)
+
+    return [
+        k
+        for k in dep_keys
+        if (dep_key := parse_subtask_key(k))[0] == pidx and set(dep_key[1]) & set(idxs)
+    ]
+
+
+def parse_subtask_key(key: str) -> tuple[int | None, list[int]]:
+    """Parse a species or PES subtask key into its PES index and species/channel indices
+
+    Examples:
+        '1'           ->  (None, [1])
+        '1: 2'        ->  (1, [2])
+        '1: 1-3,5'    ->  (1, [1, 2, 3, 5])
+
+    :param key: The subtask key
+    :return: The PES index (`None` for species) and the species or channel indices
+    """
+    if ":" not in key:
+        return (None, parse_index_series(key))
+
+    pidx, idxs = key.split(":")
+    return (int(pidx), parse_index_series(idxs.strip()))
+
+
+def write_dependency_graph(graph: dict[str, list[str]], path: str | Path) -> None:
+    """Write a subtask dependency graph out in YAML format
+
+    :param graph: The dependency graph
+    :param path: The path to the YAML file to write
+    """
+    path = Path(path)
+    path.write_text(yaml.safe_dump(graph, default_flow_style=None, sort_keys=False))
+
+
+def read_dependency_graph(path: str | Path) -> dict[str, list[str]]:
+    """Read a subtask dependency graph from a YAML file
+
+    :param path: The path to the YAML file
+    :return: The dependency graph
+    """
+    path = Path(path)
+    return yaml.safe_load(path.read_text())
+
+
 # Generic string formatting functions
 def format_block(inp: str) -> str:
     """Format a block with nice indentation
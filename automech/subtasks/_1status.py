@@ -1,7 +1,9 @@
 """ Standalone script to run AutoMech subtasks in parallel on an Ad Hoc SSH Cluster
 """
 
+import functools
 import itertools
+import time
 from collections.abc import Sequence
 from pathlib import Path
 
@@ -30,6 +32,9 @@ def status(
     :param path: The path where the AutoMech subtasks were set up
     :param check_file: Log file for writing paths to be checked
     :Param wrap: Wrap to include this many subtask columns per row
+
+    If the subtasks have costs predicted from the history database, this also prints
+    the remaining core-hours and the estimated time to completion
     """
     path = Path(path)
     assert (
@@ -43,6 +48,8 @@ def status(
     work_path = info_dct[InfoKey.work_path]
 
     check_records = []
+    remaining_core_hours = 0.0
+    running_nprocs = 0
     for group_id in group_ids:
         df = pandas.read_csv(path / f"{group_id}.csv")
         tasks = read_task_list(path / f"{group_id}.yaml")
@@ -67,11 +74,26 @@ def status(
                     for p, (s, L) in log_dct.items()
                     if s != Status.OK
                 )
+                if skey in task.subtask_keys:
+                    remaining_core_hours += remaining_subtask_core_hours(
+                        task, task.subtask_keys.index(skey), log_dct
+                    )
+                    running_nprocs += task.nprocs * sum(
+                        s == Status.RUNNING for s, _ in log_dct.values()
+                    )
 
             print_task_row(task.name, subtask_stats, label_width=twidth, wrap=wrap)
 
         print()
 
+    if remaining_core_hours:
+        eta = (
+            f"{remaining_core_hours / running_nprocs:.1f} hours"
+            if running_nprocs
+            else "(nothing running)"
+        )
+        print(f"Remaining: {remaining_core_hours:.1f} core-hours | ETA: {eta}\n")
+
     check_lines = []
     if check_records:
         check_lines.append(f"Non-OK log files in {work_path}:")
@@ -95,6 +117,9 @@ def log_paths_with_check_results(
 ) -> dict[str, tuple[Status, str | None]]:
     """Get a dictionary of log file paths and statuses at a given path
 
+    The check results are cached in the directory, so that repeated calls only scan the
+    parts of the log files that were appended since the last call.
+
     :param path: The directory path
     :return: A dictionary mapping log paths onto log check results
     """
@@ -102,10 +127,36 @@ def log_paths_with_check_results(
     if not log_paths:
         return {}
 
-    log_checks = list(map(check_log, log_paths))
+    log_checks = list(map(functools.partial(check_log, cache=True), log_paths))
     return dict(zip(log_paths, log_checks, strict=True))
 
 
+def remaining_subtask_core_hours(
+    task: Task, idx: int, log_dct: dict[str, tuple[Status, str | None]]
+) -> float:
+    """Estimate the core-hours remaining for a subtask, from its predicted cost
+
+    Workers that have not started are counted at their full predicted wall time, and
+    running workers at their predicted wall time minus the time since they started.
+
+    :param task: The task
+    :param idx: The index of the subtask key
+    :param log_dct: A dictionary mapping log paths onto log check results
+    :return: The remaining core-hours, or 0 if the cost was not predicted
+    """
+    cost = task.subtask_costs[idx] if task.subtask_costs else None
+    if cost is None:
+        return 0.0
+
+    hours = cost * (task.subtask_nworkers[idx] - len(log_dct))
+    for log_path, (stat, _) in log_dct.items():
+        is_running_path = Path(f"{log_path}_IS_RUNNING")
+        if stat == Status.RUNNING and is_running_path.exists():
+            start_time = is_running_path.stat().st_mtime
+            hours += max(cost - (time.time() - start_time) / 3600, 0.0)
+    return max(hours, 0.0) * task.nprocs
+
+
 def parse_subtask_status(
     log_dct: dict[str, tuple[Status, str | None]], small_thresh: float = 0.2
 ) -> Status:
@@ -1,27 +1,57 @@
 """ Standalone script to run AutoMech subtasks in parallel on an Ad Hoc SSH Cluster
 """
 
+import concurrent.futures
+import dataclasses
+import math
+import os
+import shlex
 import subprocess
-import tarfile
+import resource
+import sys
+import time
 from collections.abc import Sequence
 from pathlib import Path
 
 import pandas
 import yaml
 
-from ..base import Status
+from ..base import Status, check_log
+from . import _3history
+from ._4archive import tar_directory, untar_directory
+from ._5retry import (
+    RetryPolicy,
+    classify_failure,
+    escalate_theory_dat,
+    escalated_resources,
+    retry_delay,
+    should_retry,
+)
 from ._0setup import (
+    DEPS_FILE,
     INFO_FILE,
     SUBTASK_DIR,
     InfoKey,
     TableKey,
     Task,
+    dependency_graph,
+    heavy_atom_count_from_inchi,
+    read_dependency_graph,
     read_task_list,
 )
 from ._1status import log_paths_with_check_results, parse_subtask_status
 
-SCRIPT_DIR = Path(__file__).parent / "scripts"
-RUN_SCRIPT = str(SCRIPT_DIR / "run_adhoc.sh")
+NWORK_MAX = 10  # maximum SSH login capacity for some nodes
+DONE_STATUSES = (Status.OK, Status.OK_1E, Status.WARNING)
+
+
+@dataclasses.dataclass
+class Host:
+    name: str | None  # `None` for the local machine
+    mem: int  # free memory, in GB
+    nprocs: int  # free cores
+    nwork: int = 0  # number of running workers
+    nwork_max: int | None = None
 
 
 def run(
@@ -30,16 +60,25 @@ def run(
     activation_hook: str | None = None,
     statuses: Sequence[Status] = (Status.TBD,),
     tar: bool = False,
+    local: bool = False,
+    history_path: str | Path = _3history.HISTORY_PATH,
+    retry_policy: RetryPolicy = RetryPolicy(),
 ) -> None:
     """Runs subtasks in parallel on Ad Hoc cluster
 
     Assumes the subtasks were set up at this path using `automech subtasks setup`
 
+    Each subtask is started as soon as the subtasks it depends on have succeeded,
+    rather than waiting for the entire previous task or group to finish.
+
     :param path: The path where the AutoMech subtasks were set up
     :param nodes: A comma-separated list of nodes to run on
     :param activation_hook: Shell commands for activating the AutoMech environment on the remote
     :param statuses: A comma-separated list of status to run or re-run
     :param tar: Tar the subtask data and save filesystem after running?
+    :param local: Run on the local machine in a process pool, instead of on `nodes`?
+    :param history_path: The path to the database for recording subtask runs
+    :param retry_policy: The policy for retrying failed workers
     """
     path = Path(path)
     assert (
@@ -57,6 +96,16 @@ def run(
     run_path.mkdir(exist_ok=True)
     save_path.mkdir(exist_ok=True)
 
+    # Read the dependency graph, or determine it for subtasks set up without one
+    deps_path = path / DEPS_FILE
+    graph = (
+        read_dependency_graph(deps_path)
+        if deps_path.exists()
+        else dependency_graph(path, group_ids)
+    )
+
+    # Gather the task and key index for each subtask, in run order
+    subtask_dct: dict[str, tuple[Task, int]] = {}
     for group_id in group_ids:
         tasks = read_task_list(path / f"{group_id}.yaml")
         if not tasks:
@@ -67,41 +116,435 @@ def run(
             task: Task = tasks[task_key]
             assert row[TableKey.task] == task.name, f"{row} does not match {task.name}"
 
-            subtask_paths = []
-            subtask_logs = []
-
-            for key, nworkers in zip(
-                task.subtask_keys, task.subtask_nworkers, strict=True
-            ):
+            for idx, key in enumerate(task.subtask_keys):
                 assert key in row, f"Key {key} not present in row:\n{row}"
-                subtask_path = row.get(key)
-                status = parse_subtask_status(
-                    log_paths_with_check_results(subtask_path)
-                )
-                if status in statuses:
-                    subtask_paths.extend([subtask_path] * nworkers)
-                    subtask_logs.extend([f"out{i}.log" for i in range(nworkers)])
-
-            if subtask_paths:
-                run_args = [
-                    RUN_SCRIPT,
-                    work_path,
-                    f"{task.mem}",
-                    f"{task.nprocs}",
-                    ",".join(subtask_paths),
-                    ",".join(subtask_logs),
-                    ",".join(nodes),
-                    "" if activation_hook is None else activation_hook,
-                ]
-                subprocess.run(run_args)
+                subtask_dct[str(row.get(key))] = (task, idx)
+
+    hosts = [local_host()] if local else list(map(remote_host, nodes))
+    for host in hosts:
+        print(
+            f"Host {host.name or 'localhost'}: Memory={host.mem} | Nprocs={host.nprocs}"
+        )
+
+    run_subtask_graph(
+        work_path,
+        subtask_dct=subtask_dct,
+        graph=graph,
+        hosts=hosts,
+        statuses=statuses,
+        activation_hook=activation_hook,
+        history_path=history_path,
+        retry_policy=retry_policy,
+    )
 
     if tar:
         tar_subtask_data(path)
 
 
+def run_subtask_graph(
+    work_path: str | Path,
+    subtask_dct: dict[str, tuple[Task, int]],
+    graph: dict[str, list[str]],
+    hosts: Sequence[Host],
+    statuses: Sequence[Status] = (Status.TBD,),
+    activation_hook: str | None = None,
+    history_path: str | Path = _3history.HISTORY_PATH,
+    retry_policy: RetryPolicy = RetryPolicy(),
+) -> None:
+    """Run subtask workers on a set of hosts, following a dependency graph
+
+    A subtask is queued once all of the subtasks it depends on have succeeded. Queued
+    workers are dispatched longest predicted wall time first (unknown first of all),
+    each to the host with the fewest free cores that still has room for it. A host with
+    no running workers will always accept one, even if it is too small. The wall time,
+    peak memory, and status of each worker is recorded in the history database.
+
+    A worker that fails is classified from the last line of its log and, if the retry
+    policy allows it, re-queued after a backoff delay, with more memory if it ran out.
+    The log of each failed attempt is kept as `out{i}.log.{attempt}`.
+
+    :param work_path: The path where the user ran `automech subtasks setup`
+    :param subtask_dct: The task and key index for each subtask path, in run order
+    :param graph: The dependency graph, mapping subtask paths onto their dependencies
+    :param hosts: The hosts to run on
+    :param statuses: A comma-separated list of status to run or re-run
+    :param activation_hook: Shell commands for activating the AutoMech environment on
+        remote hosts
+    :param history_path: The path to the database for recording subtask runs
+    :param retry_policy: The policy for retrying failed workers
+    """
+    status_dct = {
+        p: parse_subtask_status(log_paths_with_check_results(p)) for p in subtask_dct
+    }
+    waiting = [p for p, s in status_dct.items() if s in statuses]
+    unfinished = set(waiting)
+    nleft_dct = {p: t.subtask_nworkers[i] for p, (t, i) in subtask_dct.items()}
+
+    # Track the attempt number, resources, and earliest start time of each worker
+    attempt_dct: dict[tuple[str, str], int] = {}
+    resource_dct: dict[tuple[str, str], tuple[int, int]] = {}
+    start_dct: dict[tuple[str, str], float] = {}
+
+    def _cost(worker: tuple[str, str]) -> float:
+        task, idx = subtask_dct[worker[0]]
+        cost = task.subtask_costs[idx] if task.subtask_costs else None
+        return -math.inf if cost is None else -cost
+
+    def _is_ready(subtask_path: str) -> bool:
+        return all(
+            d not in unfinished and status_dct.get(d, Status.OK) in DONE_STATUSES
+            for d in graph.get(subtask_path, ())
+        )
+
+    queue: list[tuple[str, str]] = []
+    running: dict[concurrent.futures.Future, tuple[str, str, Host]] = {}
+    local_nprocs = sum(h.nprocs for h in hosts if h.name is None)
+    remote_nwork = sum(h.nwork_max or 1 for h in hosts if h.name is not None)
+    with (
+        concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(local_nprocs, 1), max_tasks_per_child=1
+        ) as local_executor,
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(remote_nwork, 1)
+        ) as remote_executor,
+    ):
+        while True:
+            # Queue the workers of each subtask whose dependencies have succeeded
+            for subtask_path in [p for p in waiting if _is_ready(p)]:
+                waiting.remove(subtask_path)
+                task, _ = subtask_dct[subtask_path]
+                for i in range(nleft_dct[subtask_path]):
+                    worker = (subtask_path, f"out{i}.log")
+                    # Drop any escalated theory.dat left over from an earlier run
+                    worker_theory_path(
+                        Path(work_path) / subtask_path, worker[1]
+                    ).unlink(missing_ok=True)
+                    queue.append(worker)
+                    attempt_dct[worker] = 1
+                    resource_dct[worker] = (task.mem, task.nprocs)
+                    start_dct[worker] = 0.0
+            queue.sort(key=_cost)
+
+            # Dispatch queued workers to hosts with enough free resources
+            for worker in list(queue):
+                mem, nprocs = resource_dct[worker]
+                hosts_ = [h for h in hosts if host_fits(h, mem, nprocs)]
+                if start_dct[worker] > time.time() or not hosts_:
+                    continue
+
+                host = min(hosts_, key=lambda h: h.nprocs)
+
+                queue.remove(worker)
+                host_claim(host, mem, nprocs)
+                subtask_path, subtask_log = worker
+                future = (
+                    local_executor.submit(
+                        run_subtask, work_path, subtask_path, subtask_log
+                    )
+                    if host.name is None
+                    else remote_executor.submit(
+                        run_subtask_remotely,
+                        host.name,
+                        work_path,
+                        subtask_path,
+                        subtask_log,
+                        activation_hook,
+                    )
+                )
+                running[future] = (subtask_path, subtask_log, host)
+
+            if not running and not queue:
+                break
+
+            # Wait for a worker to finish, or for a delayed retry to come due
+            timeout = (
+                max(min(start_dct[w] for w in queue) - time.time(), 0.0)
+                if queue
+                else None
+            )
+            if not running:
+                time.sleep(timeout)
+                continue
+
+            done, _ = concurrent.futures.wait(
+                running,
+                timeout=timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+
+            # Record each finished worker, then retry it or update its subtask
+            for future in done:
+                subtask_path, subtask_log, host = running.pop(future)
+                worker = (subtask_path, subtask_log)
+                wall_time, peak_rss, returncode = future.result()
+                task, idx = subtask_dct[subtask_path]
+                mem, nprocs = resource_dct[worker]
+                host_release(host, mem, nprocs)
+                log_path = Path(work_path) / subtask_path / subtask_log
+                log_status, line = check_log(log_path, log=True)
+                chi = task.subtask_chis[idx] if task.subtask_chis else None
+                _3history.record_run(
+                    task=task.name,
+                    key=task.subtask_keys[idx],
+                    chi=chi,
+                    theory=task.theory,
+                    nprocs=nprocs,
+                    nworkers=task.subtask_nworkers[idx],
+                    size=None if chi is None else heavy_atom_count_from_inchi(chi),
+                    wall_time=wall_time / 3600,
+                    peak_rss=peak_rss,
+                    status=log_status.value,
+                    path=history_path,
+                )
+
+                attempt = attempt_dct[worker]
+                failure = classify_failure(line, returncode, peak_rss, mem)
+                if log_status == Status.ERROR and should_retry(
+                    retry_policy, failure, attempt
+                ):
+                    delay = retry_delay(retry_policy, attempt)
+                    mem_, nprocs_ = escalated_resources(
+                        retry_policy, failure, mem, nprocs
+                    )
+                    print(
+                        f"Retrying {log_path} ({failure.value}) in {delay:.0f} s: "
+                        f"Memory={mem_} | Nprocs={nprocs_}"
+                    )
+                    log_path.rename(log_path.with_name(f"{subtask_log}.{attempt}"))
+                    if (mem_, nprocs_) != (mem, nprocs) and task.theory is not None:
+                        escalate_subtask_theory(
+                            Path(work_path) / subtask_path,
+                            subtask_log,
+                            task.theory,
+                            mem_,
+                            nprocs_,
+                        )
+                    attempt_dct[worker] = attempt + 1
+                    resource_dct[worker] = (mem_, nprocs_)
+                    start_dct[worker] = time.time() + delay
+                    queue.append(worker)
+                    continue
+
+                nleft_dct[subtask_path] -= 1
+                if not nleft_dct[subtask_path]:
+                    unfinished.remove(subtask_path)
+                    status_dct[subtask_path] = parse_subtask_status(
+                        log_paths_with_check_results(subtask_path)
+                    )
+
+    for subtask_path in waiting:
+        print(f"Skipping {subtask_path}: Its dependencies did not succeed")
+
+
+def run_subtask(
+    work_path: str | Path, subtask_path: str | Path, subtask_log: str
+) -> tuple[float, float, int]:
+    """Run one subtask worker in a child process, writing all output to its log
+
+    The `_IS_RUNNING` marker exists for as long as the worker is running, so that
+    `automech subtasks status` can tell running workers from failed ones. Running
+    AutoMech in a child process means that a worker killed for running out of memory
+    does not take down the process pool. This should only be called in a dedicated
+    process, so that the peak memory is that of this worker alone.
+
+    :param work_path: The path where the user ran `automech subtasks setup`
+    :param subtask_path: The subtask path
+    :param subtask_log: The log file name
+    :return: The wall time, in seconds, the peak memory of the child process and any of
+        its own child processes, in GB, and the exit code
+    """
+    command = [sys.executable, "-m", "automech", "run", "-p", str(subtask_path)]
+    command.extend(worker_theory_args(Path(work_path) / subtask_path, subtask_log))
+    log_path = Path(work_path) / subtask_path / subtask_log
+    is_running_path = Path(f"{log_path}_IS_RUNNING")
+    is_running_path.touch()
+    start_time = time.perf_counter()
+    with open(log_path, "w") as log_file:
+        print(f"Host: {os.uname().nodename}", file=log_file)
+        print(f"| Working directory: {work_path}", file=log_file)
+        print(
+            f"| Command: automech {shlex.join(command[3:])}", file=log_file, flush=True
+        )
+        result = subprocess.run(
+            command,
+            cwd=work_path,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            check=False,
+        )
+    is_running_path.unlink(missing_ok=True)
+
+    wall_time = time.perf_counter() - start_time
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (wall_time, peak_rss / 1000000, result.returncode)
+
+
+def run_subtask_remotely(
+    node: str,
+    work_path: str | Path,
+    subtask_path: str | Path,
+    subtask_log: str,
+    activation_hook: str | None = None,
+) -> tuple[float, None, int]:
+    """Run one subtask worker on a remote node over SSH, writing all output to its log
+
+    :param node: The node to run on
+    :param work_path: The path where the user ran `automech subtasks setup`
+    :param subtask_path: The subtask path
+    :param subtask_log: The log file name
+    :param activation_hook: Shell commands for activating the AutoMech environment
+    :return: The wall time, in seconds, the peak memory (not available remotely), and
+        the exit code
+    """
+    log_path = shlex.quote(f"{subtask_path}/{subtask_log}")
+    is_running_path = shlex.quote(f"{subtask_path}/{subtask_log}_IS_RUNNING")
+    run_command = shlex.join(
+        [
+            "automech",
+            "run",
+            "-p",
+            str(subtask_path),
+            *worker_theory_args(Path(work_path) / subtask_path, subtask_log),
+        ]
+    )
+    command = "\n".join(
+        [
+            f"cd {shlex.quote(str(work_path))};",
+            f"touch {is_running_path};",
+            f"eval {shlex.quote(activation_hook or '')} &&",
+            f"{run_command} &> {log_path};",
+            "returncode=$?;",
+            f"rm {is_running_path};",
+            "exit $returncode",
+        ]
+    )
+    start_time = time.perf_counter()
+    result = subprocess.run(
+        ["ssh", node, command], stdin=subprocess.DEVNULL, check=False
+    )
+    return (time.perf_counter() - start_time, None, result.returncode)
+
+
+def worker_theory_path(subtask_path: str | Path, subtask_log: str) -> Path:
+    """Get the path to the theory.dat of one worker of a subtask
+
+    The other workers of the subtask keep using the shared theory.dat.
+
+    :param subtask_path: The subtask path
+    :param subtask_log: The log file name of the worker
+    :return: The path
+    """
+    return Path(subtask_path) / "inp" / f"theory_{Path(subtask_log).stem}.dat"
+
+
+def worker_theory_args(subtask_path: str | Path, subtask_log: str) -> list[str]:
+    """Get the `automech run` arguments for the theory.dat of one worker of a subtask
+
+    :param subtask_path: The subtask path
+    :param subtask_log: The log file name of the worker
+    :return: The arguments, which are empty if the worker uses the shared theory.dat
+    """
+    theory_path = worker_theory_path(subtask_path, subtask_log)
+    if not theory_path.exists():
+        return []
+    return ["-T", str(theory_path.relative_to(subtask_path))]
+
+
+def escalate_subtask_theory(
+    subtask_path: str | Path, subtask_log: str, runlvl: str, mem: int, nprocs: int
+) -> None:
+    """Set the memory and nprocs of a theory level for one worker of a subtask
+
+    The worker gets its own copy of the subtask's theory.dat, so that the other workers
+    of the subtask keep their resources.
+
+    :param subtask_path: The subtask path
+    :param subtask_log: The log file name of the worker
+    :param runlvl: The theory level
+    :param mem: The memory, in GB
+    :param nprocs: The number of cores
+    """
+    theory_path = worker_theory_path(subtask_path, subtask_log)
+    if not theory_path.exists():
+        theory_path = Path(subtask_path) / "inp" / "theory.dat"
+    if theory_path.exists():
+        theory_dat = theory_path.read_text()
+        worker_theory_path(subtask_path, subtask_log).write_text(
+            escalate_theory_dat(theory_dat, runlvl, mem, nprocs)
+        )
+
+
+def host_fits(host: Host, mem: int, nprocs: int) -> bool:
+    """Determine whether a worker with these requirements can be started on a host
+
+    :param host: The host
+    :param mem: The memory (in GB) required by the worker
+    :param nprocs: The number of cores required by the worker
+    :return: `True` if it fits, `False` if not
+    """
+    if not host.nwork:
+        return True
+
+    if host.nwork_max is not None and host.nwork >= host.nwork_max:
+        return False
+
+    return mem <= host.mem and nprocs <= host.nprocs
+
+
+def host_claim(host: Host, mem: int, nprocs: int) -> None:
+    """Claim the resources for a worker on a host
+
+    :param host: The host
+    :param mem: The memory (in GB) required by the worker
+    :param nprocs: The number of cores required by the worker
+    """
+    host.mem -= mem
+    host.nprocs -= nprocs
+    host.nwork += 1
+
+
+def host_release(host: Host, mem: int, nprocs: int) -> None:
+    """Release the resources for a worker on a host
+
+    :param host: The host
+    :param mem: The memory (in GB) required by the worker
+    :param nprocs: The number of cores required by the worker
+    """
+    host.mem += mem
+    host.nprocs += nprocs
+    host.nwork -= 1
+
+
+def local_host() -> Host:
+    """Determine the cores and memory available on the local machine
+
+    :return: The host
+    """
+    mem = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1000000000
+    nprocs = len(os.sched_getaffinity(0))
+    return Host(name=None, mem=mem, nprocs=nprocs)
+
+
+def remote_host(node: str) -> Host:
+    """Determine the cores and memory available on a remote node, using SSH
+
+    :param node: The node
+    :return: The host
+    """
+    command = "grep MemTotal /proc/meminfo | awk '{print $2}'; nproc --all"
+    result = subprocess.run(
+        ["ssh", node, command], capture_output=True, text=True, check=True
+    )
+    mem_kb, nprocs = map(int, result.stdout.split())
+    return Host(name=node, mem=mem_kb // 1000000, nprocs=nprocs, nwork_max=NWORK_MAX)
+
+
 def tar_subtask_data(path: str | Path = SUBTASK_DIR) -> None:
     """Tar the save directory for a subtask run
 
+    Only the files that changed since the last time are added to the archives.
+
     :param path: The path where the AutoMech subtasks were set up
     """
     path = Path(path)
@@ -117,10 +560,14 @@ def tar_subtask_data(path: str | Path = SUBTASK_DIR) -> None:
     tar_directory(save_path)
 
 
-def untar_subtask_data(path: str | Path = SUBTASK_DIR) -> None:
+def untar_subtask_data(
+    path: str | Path = SUBTASK_DIR, save_subpaths: Sequence[str] | None = None
+) -> None:
     """Un-tar the save directory for a subtask run, if it exists
 
     :param path: The path where the AutoMech subtasks were set up
+    :param save_subpaths: Restore only these subtrees of the save filesystem (for
+        example, a species or reaction directory), given as paths relative to it
     """
     untar_directory(path)
 
@@ -133,29 +580,4 @@ def untar_subtask_data(path: str | Path = SUBTASK_DIR) -> None:
     info_dct = yaml.safe_load(info_path.read_text())
     save_path = Path(info_dct[InfoKey.save_path])
 
-    untar_directory(save_path)
-
-
-def tar_directory(dir_path: str | Path) -> None:
-    """Tar a directory in its current location
-
-    :param path: The path to a directory
-    """
-    dir_path = Path(dir_path)
-    tar_path = dir_path.with_suffix(".tgz")
-    print(f"Tarring {dir_path} into {tar_path}...")
-    with tarfile.open(tar_path, "w:gz") as tar:
-        tar.add(dir_path, arcname=dir_path.name)
-
-
-def untar_directory(dir_path: str | Path) -> None:
-    """Un-tar a directory in its current location
-
-    :param path: The path where the AutoMech subtasks were set up
-    """
-    dir_path = Path(dir_path)
-    tar_path = dir_path.with_suffix(".tgz")
-    if tar_path.exists():
-        print(f"Un-tarring {tar_path} into {dir_path}...")
-        with tarfile.open(tar_path, "r") as tar:
-            tar.extractall(dir_path.parent)
+    untar_directory(save_path, subpaths=save_subpaths)
@@ -0,0 +1,210 @@
+""" Database of historical subtask runs, used to predict the cost of new subtasks
+"""
+
+import math
+import sqlite3
+import time
+from collections import defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+
+HISTORY_PATH = Path.home() / ".automech" / "history.sqlite"
+SUCCESS_STATUSES = ("OK", "WARNING")
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS runs (
+        task TEXT NOT NULL,
+        key TEXT,
+        chi TEXT,
+        theory TEXT,
+        nprocs INTEGER NOT NULL,
+        nworkers INTEGER NOT NULL,
+        size INTEGER,
+        wall_time REAL NOT NULL,
+        peak_rss REAL,
+        status TEXT NOT NULL,
+        timestamp REAL NOT NULL
+    )
+"""
+CREATE_INDEX = """
+    CREATE INDEX IF NOT EXISTS runs_key ON runs (task, theory, chi, nprocs)
+"""
+
+
+def connect(path: str | Path = HISTORY_PATH) -> sqlite3.Connection:
+    """Connect to the history database, creating it if it doesn't exist
+
+    :param path: The path to the database
+    :return: The database connection
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=60)
+    con.execute(CREATE_TABLE)
+    con.execute(CREATE_INDEX)
+    return con
+
+
+def record_run(
+    task: str,
+    key: str | None,
+    chi: str | None,
+    theory: str | None,
+    nprocs: int,
+    nworkers: int,
+    size: int | None,
+    wall_time: float,
+    peak_rss: float | None,
+    status: str,
+    path: str | Path = HISTORY_PATH,
+) -> None:
+    """Record the run of one subtask worker
+
+    :param task: The task name
+    :param key: The subtask key
+    :param chi: The species ChI, if this is a species subtask
+    :param theory: The theory level (`runlvl`) of the task
+    :param nprocs: The number of cores used by the worker
+    :param nworkers: The number of workers for the subtask
+    :param size: The size of the species, as a number of heavy atoms
+    :param wall_time: The wall time of the worker, in hours
+    :param peak_rss: The peak resident memory of the worker, in GB
+    :param status: The exit status of the worker
+    :param path: The path to the database
+    """
+    with connect(path) as con:
+        con.execute(
+            "INSERT INTO runs (task, key, chi, theory, nprocs, nworkers, size, "
+            "wall_time, peak_rss, status, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                task,
+                key,
+                chi,
+                theory,
+                nprocs,
+                nworkers,
+                size,
+                wall_time,
+                peak_rss,
+                status,
+                time.time(),
+            ),
+        )
+    con.close()
+
+
+def predicted_work(
+    task: str,
+    theory: str | None,
+    keys: Sequence[str],
+    chis: Sequence[str | None],
+    sizes: Sequence[int | None],
+    path: str | Path = HISTORY_PATH,
+) -> list[float | None]:
+    """Predict the total work for a list of subtasks, in core-hours
+
+    The work for a species or PES that has been run before is the average over its
+    previous runs. Otherwise, the work for a species is estimated from a power law in
+    the species size, fitted to the previous runs of the same task at the same theory
+    level.
+
+    :param task: The task name
+    :param theory: The theory level (`runlvl`) of the task
+    :param keys: The subtask keys
+    :param chis: The species ChIs, or `None` for subtasks that aren't species
+    :param sizes: The species sizes, as numbers of heavy atoms
+    :param path: The path to the database
+    :return: The predicted work for each subtask, or `None` if it can't be predicted
+    """
+    if not Path(path).exists():
+        return [None] * len(chis)
+
+    placeholders = ", ".join("?" * len(SUCCESS_STATUSES))
+    with connect(path) as con:
+        rows = con.execute(
+            "SELECT key, chi, size, wall_time * nprocs * nworkers FROM runs "
+            f"WHERE task = ? AND theory IS ? AND status IN ({placeholders})",
+            (task, theory, *SUCCESS_STATUSES),
+        ).fetchall()
+    con.close()
+
+    # Average the work for each species, or for each PES if there is no species
+    works_dct = defaultdict(list)
+    size_dct = {}
+    for key, chi, size, work in rows:
+        ident = _identifier(key, chi)
+        if ident is not None:
+            works_dct[ident].append(work)
+            size_dct[ident] = size
+    work_dct = {i: sum(ws) / len(ws) for i, ws in works_dct.items()}
+
+    # Fit log(work) = a + b log(size) to the species averages
+    points = [
+        (math.log(size_dct[i]), math.log(w))
+        for i, w in work_dct.items()
+        if size_dct[i] and w > 0
+    ]
+    coeffs = _linear_fit(points)
+
+    works = []
+    for key, chi, size in zip(keys, chis, sizes, strict=True):
+        ident = _identifier(key, chi)
+        if ident in work_dct:
+            works.append(work_dct[ident])
+        elif coeffs is not None and size:
+            intercept, slope = coeffs
+            works.append(math.exp(intercept + slope * math.log(size)))
+        else:
+            works.append(None)
+    return works
+
+
+def _identifier(key: str | None, chi: str | None) -> tuple[str, str] | None:
+    """Identify the species or PES of a subtask across runs
+
+    :param key: The subtask key
+    :param chi: The species ChI, if this is a species subtask
+    :return: The identifier, or `None` if there is neither a ChI nor a key
+    """
+    if chi is not None:
+        return ("chi", chi)
+    if key is not None:
+        return ("key", key)
+    return None
+
+
+def _linear_fit(points: Sequence[tuple[float, float]]) -> tuple[float, float] | None:
+    """Least-squares fit of a line to a set of points
+
+    If all points have the same abscissa, this returns a flat line through their mean.
+
+    :param points: The (x, y) points
+    :return: The intercept and slope, or `None` if there are no points
+    """
+    if not points:
+        return None
+
+    npts = len(points)
+    x_mean = sum(x for x, _ in points) / npts
+    y_mean = sum(y for _, y in points) / npts
+    sxx = sum((x - x_mean) ** 2 for x, _ in points)
+    sxy = sum((x - x_mean) * (y - y_mean) for x, y in points)
+    slope = sxy / sxx if sxx > 0 else 0.0
+    return (y_mean - slope * x_mean, slope)
+
+
+def balanced_worker_counts(
+    works: Sequence[float], total_nworkers: int
+) -> list[int]:
+    """Distribute workers among subtasks in proportion to their predicted work
+
+    :param works: The predicted work for each subtask
+    :param total_nworkers: The total number of workers to distribute
+    :return: The number of workers for each subtask (at least 1 each)
+    """
+    total_work = sum(works)
+    if not total_work:
+        return [1] * len(works)
+
+    return [max(round(w / total_work * total_nworkers), 1) for w in works]
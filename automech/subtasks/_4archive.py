@@ -0,0 +1,304 @@
+""" Incremental, chunked archives of large directories (such as the save filesystem)
+
+An archive of `<name>/` is stored next to it in `<name>.archive/`, which contains a
+manifest and a series of compressed tar chunks. The manifest maps each file and
+directory path onto the chunk holding its latest version, along with the size and
+modification time it had when it was archived. Archiving again only adds the entries
+that changed since the last manifest, in new chunks, so unchanged data is never
+rewritten. Chunks are compressed and extracted in parallel, and subtrees can be
+restored on their own.
+
+Entries that were modified or removed leave their old versions in earlier chunks.
+Chunks that no entry refers to any more are deleted, and the entries still in a chunk
+that is mostly old versions (less than `REWRITE_FRACTION` of its bytes) are archived
+again, from the directory, so that the chunk can be deleted too.
+
+Legacy `<name>.tgz` archives can still be extracted.
+"""
+
+import concurrent.futures
+import gzip
+import json
+import os
+import tarfile
+from collections import defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+
+import more_itertools as mit
+
+ARCHIVE_SUFFIX = ".archive"
+LEGACY_SUFFIX = ".tgz"
+MANIFEST_FILE = "manifest.json.gz"
+MANIFEST_VERSION = 1
+CHUNK_NFILES = 5000  # maximum number of entries per chunk
+CHUNK_NBYTES = 1 << 28  # maximum number of uncompressed bytes per chunk
+REWRITE_FRACTION = 0.5  # rewrite chunks with less than this fraction still in use
+
+
+class ManifestKey:
+    version = "version"
+    chunks = "chunks"  # chunk file names, in the order they were written
+    entries = "entries"  # {path: [chunk index, size, mtime_ns]}; size -1 for dirs
+    nbytes = "nbytes"  # the number of bytes of entries each chunk was written with
+
+
+def tar_directory(dir_path: str | Path, nprocs: int | None = None) -> None:
+    """Archive a directory in its current location, adding only what has changed
+
+    :param dir_path: The path to a directory
+    :param nprocs: The number of processes to compress chunks with (default: all cores)
+    """
+    dir_path = Path(dir_path)
+    arch_path = dir_path.with_suffix(ARCHIVE_SUFFIX)
+    arch_path.mkdir(exist_ok=True)
+    manifest = read_manifest(arch_path)
+    print(f"Archiving {dir_path} into {arch_path}...")
+
+    # Find the entries that were added or modified since the last manifest
+    old_entries = manifest[ManifestKey.entries]
+    new_entries = {}
+    changed = []
+    for rel_path, size, mtime in walk_directory(dir_path):
+        old_entry = old_entries.get(rel_path)
+        if old_entry is not None and old_entry[1:] == [size, mtime]:
+            new_entries[rel_path] = old_entry
+        else:
+            new_entries[rel_path] = [None, size, mtime]
+            changed.append((rel_path, size))
+
+    print(
+        f"Found {len(changed)} new or modified entries, "
+        f"{len(set(old_entries) - set(new_entries))} removed"
+    )
+
+    # Drop the chunks that are no longer used, archiving the entries still in the
+    # mostly unused ones again
+    old_names = manifest[ManifestKey.chunks]
+    old_nbytes = manifest.get(ManifestKey.nbytes, [None] * len(old_names))
+    live_nbytes = defaultdict(int)
+    for idx, size, _ in new_entries.values():
+        if idx is not None:
+            live_nbytes[idx] += entry_nbytes(size)
+    rewrite = {
+        idx
+        for idx, nbytes in enumerate(old_nbytes)
+        if nbytes is not None and live_nbytes[idx] < REWRITE_FRACTION * nbytes
+    }
+    nrewrite = 0
+    for rel_path, entry in new_entries.items():
+        if entry[0] in rewrite:
+            new_entries[rel_path] = [None, *entry[1:]]
+            changed.append((rel_path, entry[1]))
+            nrewrite += 1
+    keep = [
+        idx for idx in range(len(old_names)) if live_nbytes[idx] and idx not in rewrite
+    ]
+    new_idxs = {idx: new_idx for new_idx, idx in enumerate(keep)}
+    for entry in new_entries.values():
+        if entry[0] is not None:
+            entry[0] = new_idxs[entry[0]]
+    chunk_names = [old_names[idx] for idx in keep]
+    chunk_nbytes = [old_nbytes[idx] for idx in keep]
+    if len(keep) < len(old_names):
+        print(
+            f"Dropping {len(old_names) - len(keep)} unused chunks, "
+            f"archiving {nrewrite} entries from them again"
+        )
+
+    # Split the changed entries into chunks and compress them in parallel
+    chunks = list(
+        mit.constrained_batches(
+            changed,
+            max_size=CHUNK_NBYTES,
+            max_count=CHUNK_NFILES,
+            get_len=lambda e: max(e[1], 0),
+            strict=False,
+        )
+    )
+    # New chunks are numbered after every chunk written so far, so that they don't
+    # overwrite a chunk that the current manifest still uses
+    start = max((chunk_number(n) + 1 for n in old_names), default=0)
+    names = [f"{i:06d}{LEGACY_SUFFIX}" for i in range(start, start + len(chunks))]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nprocs) as executor:
+        futures = [
+            executor.submit(
+                write_chunk, arch_path / n, dir_path, [p for p, _ in chunk]
+            )
+            for n, chunk in zip(names, chunks, strict=True)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+    for idx, chunk in enumerate(chunks, start=len(chunk_names)):
+        for rel_path, _ in chunk:
+            new_entries[rel_path][0] = idx
+
+    # Only update the manifest once all of the chunks have been written, and only
+    # delete the unused chunks (and any left by an interrupted run) after that
+    manifest[ManifestKey.chunks] = chunk_names + names
+    manifest[ManifestKey.nbytes] = chunk_nbytes + [
+        sum(entry_nbytes(size) for _, size in chunk) for chunk in chunks
+    ]
+    manifest[ManifestKey.entries] = new_entries
+    write_manifest(arch_path, manifest)
+    for chunk_path in arch_path.glob(f"*{LEGACY_SUFFIX}"):
+        if chunk_path.name not in manifest[ManifestKey.chunks]:
+            chunk_path.unlink()
+
+
+def untar_directory(
+    dir_path: str | Path,
+    subpaths: Sequence[str] | None = None,
+    nprocs: int | None = None,
+) -> None:
+    """Restore a directory in its current location, if it has been archived
+
+    :param dir_path: The path to a directory
+    :param subpaths: Restore only these subtrees, given as paths relative to the
+        directory (ignored for legacy archives)
+    :param nprocs: The number of processes to extract chunks with (default: all cores)
+    """
+    dir_path = Path(dir_path)
+    arch_path = dir_path.with_suffix(ARCHIVE_SUFFIX)
+    tar_path = dir_path.with_suffix(LEGACY_SUFFIX)
+
+    if not (arch_path / MANIFEST_FILE).exists():
+        if tar_path.exists():
+            print(f"Un-tarring {tar_path} into {dir_path}...")
+            with tarfile.open(tar_path, "r") as tar:
+                tar.extractall(dir_path.parent)
+        return
+
+    manifest = read_manifest(arch_path)
+    prefixes = None if subpaths is None else [p.strip("/") for p in subpaths]
+    print(f"Restoring {dir_path} from {arch_path}...")
+
+    # Group the requested entries by the chunk holding their latest version
+    chunk_names = manifest[ManifestKey.chunks]
+    members_dct = defaultdict(list)
+    for rel_path, (idx, *_) in manifest[ManifestKey.entries].items():
+        if prefixes is None or any(
+            rel_path == p or rel_path.startswith(f"{p}/") for p in prefixes
+        ):
+            members_dct[chunk_names[idx]].append(rel_path)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nprocs) as executor:
+        futures = [
+            executor.submit(read_chunk, arch_path / n, dir_path, rel_paths)
+            for n, rel_paths in members_dct.items()
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+
+def entry_nbytes(size: int) -> int:
+    """The number of bytes an entry takes up in a chunk, before compression
+
+    :param size: The size of the entry (-1 for directories)
+    :return: The number of bytes, counting its tar header
+    """
+    return max(size, 0) + tarfile.BLOCKSIZE
+
+
+def chunk_number(name: str) -> int:
+    """The number of a chunk, from its file name
+
+    :param name: The file name of the chunk
+    :return: The number
+    """
+    return int(name.removesuffix(LEGACY_SUFFIX))
+
+
+def walk_directory(dir_path: str | Path) -> list[tuple[str, int, int]]:
+    """Walk a directory, returning the size and modification time of each entry
+
+    :param dir_path: The path to a directory
+    :return: The relative path, size (-1 for directories), and modification time (in
+        nanoseconds) of each file and subdirectory
+    """
+    dir_path = Path(dir_path)
+    entries = []
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(dir_path / rel_dir) as it:
+            for entry in it:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                stat = entry.stat(follow_symlinks=False)
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append((rel_path, -1, stat.st_mtime_ns))
+                    stack.append(rel_path)
+                else:
+                    entries.append((rel_path, stat.st_size, stat.st_mtime_ns))
+    return entries
+
+
+def write_chunk(
+    chunk_path: str | Path, dir_path: str | Path, rel_paths: Sequence[str]
+) -> None:
+    """Write a set of entries from a directory into a compressed tar chunk
+
+    Entries are stored under the directory name, as in a legacy archive.
+
+    :param chunk_path: The path to the chunk
+    :param dir_path: The path to the directory
+    :param rel_paths: The paths of the entries, relative to the directory
+    """
+    dir_path = Path(dir_path)
+    with tarfile.open(chunk_path, "w:gz") as tar:
+        for rel_path in rel_paths:
+            tar.add(
+                dir_path / rel_path,
+                arcname=f"{dir_path.name}/{rel_path}",
+                recursive=False,
+            )
+
+
+def read_chunk(
+    chunk_path: str | Path, dir_path: str | Path, rel_paths: Sequence[str]
+) -> None:
+    """Extract a set of entries from a compressed tar chunk into a directory
+
+    :param chunk_path: The path to the chunk
+    :param dir_path: The path to the directory
+    :param rel_paths: The paths of the entries, relative to the directory
+    """
+    dir_path = Path(dir_path)
+    names = {f"{dir_path.name}/{p}" for p in rel_paths}
+    with tarfile.open(chunk_path, "r") as tar:
+        members = [m for m in tar if m.name in names]
+        tar.extractall(dir_path.parent, members=members)
+
+
+def read_manifest(arch_path: str | Path) -> dict:
+    """Read the manifest of an archive, or return an empty one if there is none
+
+    :param arch_path: The path to the archive
+    :return: The manifest
+    """
+    manifest_path = Path(arch_path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {
+            ManifestKey.version: MANIFEST_VERSION,
+            ManifestKey.chunks: [],
+            ManifestKey.entries: {},
+        }
+
+    with gzip.open(manifest_path, "rt") as file:
+        manifest = json.load(file)
+    assert manifest[ManifestKey.version] == MANIFEST_VERSION, manifest_path
+    return manifest
+
+
+def write_manifest(arch_path: str | Path, manifest: dict) -> None:
+    """Write the manifest of an archive, replacing the previous one atomically
+
+    :param arch_path: The path to the archive
+    :param manifest: The manifest
+    """
+    manifest_path = Path(arch_path) / MANIFEST_FILE
+    tmp_path = manifest_path.with_name(f"{MANIFEST_FILE}.tmp")
+    with gzip.open(tmp_path, "wt") as file:
+        json.dump(manifest, file)
+    tmp_path.replace(manifest_path)
@@ -0,0 +1,146 @@
+""" Policy for automatically retrying failed subtask workers
+"""
+
+import dataclasses
+import enum
+import re
+
+OOM_REGEX = re.compile(
+    r"MemoryError|out of memory|Cannot allocate memory|insufficient memory|"
+    r"std::bad_alloc|oom.kill",
+    flags=re.IGNORECASE,
+)
+SCF_REGEX = re.compile(
+    r"SCF.*(not|fail|unable).*conver|conver.*fail|no.?conv", flags=re.IGNORECASE
+)
+# Messages from the shell, SSH, or the scheduler when a process is killed, such as
+# "/bin/sh: line 1: 1234 Killed ..." or "Connection to node1 closed by remote host."
+KILLED_REGEX = re.compile(
+    r"(^|\d\s+)(Killed|Terminated|Hangup)\b|\bBroken pipe\b|"
+    r"\bConnection to \S+ closed\b|\b(killed by|received|caught) signal\b|"
+    r"\bSIG(KILL|TERM|HUP)\b",
+)
+# Exit codes for a process killed by a signal (negative locally, 128 + N over SSH), or
+# for a lost SSH connection (255)
+KILLED_RETURNCODES = (-9, -15, -1, 137, 143, 129, 255)
+# A killed worker is assumed to have run out of memory if its peak memory came this
+# close to what it requested
+OOM_MEM_FRACTION = 0.9
+
+
+class Failure(enum.Enum):
+    OOM = "out of memory"
+    SCF = "SCF no-conv"
+    KILLED = "killed"
+    OTHER = "other"
+
+
+@dataclasses.dataclass
+class RetryPolicy:
+    max_attempts: int = 3  # total attempts per worker, including the first
+    backoff: float = 60.0  # delay before the first retry, in seconds
+    backoff_factor: float = 2.0  # the delay is multiplied by this for each retry
+    mem_factor: float = 1.5  # memory is multiplied by this on out-of-memory retries
+    nprocs_factor: float = 1.0  # nprocs is multiplied by this on out-of-memory retries
+    # SCF convergence failures are not retried by default, since they are reproducible
+    failures: tuple[Failure, ...] = (Failure.OOM, Failure.KILLED)
+
+
+def classify_failure(
+    line: str | None,
+    returncode: int | None = None,
+    peak_rss: float | None = None,
+    mem: int | None = None,
+) -> Failure:
+    """Classify the failure of a worker from the last line of its log
+
+    :param line: The last line of the log file
+    :param returncode: The exit code of the worker, if known
+    :param peak_rss: The peak memory of the worker, in GB, if known
+    :param mem: The memory requested by the worker, in GB
+    :return: The failure type
+    """
+    line = "" if line is None else line
+    if OOM_REGEX.search(line):
+        return Failure.OOM
+    if SCF_REGEX.search(line):
+        return Failure.SCF
+    if KILLED_REGEX.search(line) or returncode in KILLED_RETURNCODES:
+        if peak_rss is not None and mem and peak_rss >= OOM_MEM_FRACTION * mem:
+            return Failure.OOM
+        return Failure.KILLED
+    return Failure.OTHER
+
+
+def should_retry(policy: RetryPolicy, failure: Failure, attempt: int) -> bool:
+    """Decide whether to retry a failed worker
+
+    :param policy: The retry policy
+    :param failure: The failure type
+    :param attempt: The number of the attempt that failed, starting from 1
+    :return: `True` if the worker should be retried
+    """
+    return failure in policy.failures and attempt < policy.max_attempts
+
+
+def retry_delay(policy: RetryPolicy, attempt: int) -> float:
+    """Get the delay before retrying a failed worker, with exponential backoff
+
+    :param policy: The retry policy
+    :param attempt: The number of the attempt that failed, starting from 1
+    :return: The delay, in seconds
+    """
+    return policy.backoff * policy.backoff_factor ** (attempt - 1)
+
+
+def escalated_resources(
+    policy: RetryPolicy, failure: Failure, mem: int, nprocs: int
+) -> tuple[int, int]:
+    """Get the memory and nprocs for retrying a failed worker
+
+    :param policy: The retry policy
+    :param failure: The failure type
+    :param mem: The memory (in GB) of the failed attempt
+    :param nprocs: The number of cores of the failed attempt
+    :return: The memory and nprocs for the next attempt
+    """
+    if failure != Failure.OOM:
+        return (mem, nprocs)
+
+    return (
+        max(round(mem * policy.mem_factor), mem + 1),
+        max(round(nprocs * policy.nprocs_factor), nprocs),
+    )
+
+
+def escalate_theory_dat(theory_dat: str, runlvl: str, mem: int, nprocs: int) -> str:
+    """Set the memory and nprocs of one level in the contents of a theory.dat file
+
+    Keys that the level doesn't set yet are added at the end of its block.
+
+    :param theory_dat: The contents of the theory.dat file, as a string
+    :param runlvl: The level to modify
+    :param mem: The new memory, in GB
+    :param nprocs: The new number of cores
+    :return: The modified theory.dat contents
+    """
+    block_regex = re.compile(
+        rf"^(\s*level\s+{re.escape(runlvl)}\s*$)(.*?)(^\s*end\s+level)",
+        flags=re.MULTILINE | re.DOTALL,
+    )
+
+    def _replace(match: re.Match) -> str:
+        block = match.group(2)
+        indent = next(
+            (re.match(r"\s*", ln).group() for ln in block.splitlines() if ln.strip()),
+            "    ",
+        )
+        for key, val in (("mem", mem), ("nprocs", nprocs)):
+            block, nsub = re.subn(
+                rf"(^\s*{key}\s*=\s*)\S+", rf"\g<1>{val}", block, flags=re.MULTILINE
+            )
+            if not nsub:
+                block += f"{indent}{key} = {val}\n"
+        return match.group(1) + block + match.group(3)
+
+    return block_regex.sub(_replace, theory_dat, count=1)
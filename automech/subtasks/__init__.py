@@ -1,8 +1,30 @@
-"""Subtask functions."""
+"""Subtask functions.
+
+The setup, status, and run functions are imported on first use, so that the CLI can
+start without importing pandas, pyparsing, and the rest of their dependencies.
+"""
+
+import importlib
+
+from ._5retry import Failure, RetryPolicy
+
+SUBTASK_DIR = "subtasks"
+
+_LAZY_ATTRS = {
+    "setup": "._0setup",
+    "status": "._1status",
+    "run": "._2run",
+    "tar_subtask_data": "._2run",
+    "untar_subtask_data": "._2run",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
 
-from ._0setup import SUBTASK_DIR, setup
-from ._1status import status
-from ._2run import run, tar_subtask_data, untar_subtask_data
 
 __all__ = [
     "setup",
@@ -11,4 +33,6 @@ __all__ = [
     "run",
     "tar_subtask_data",
     "untar_subtask_data",
+    "Failure",
+    "RetryPolicy",
 ]
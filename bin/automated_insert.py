@@ -10,11 +10,9 @@ from mechanalyzer.inf import thy as tinfo
 from mechanalyzer.inf import rxn as rinfo
 from mechanalyzer.inf import spc as sinfo
 import elstruct
-from automol.geom import ring_fragments_geometry as _fragment_ring_geo
+from mechlib.filesys import cnfindex
+from mechlib.filesys import layers
 from mechlib.filesys import save
-from mechroutines.es._routines.conformer import _saved_cnf_info
-from mechroutines.es._routines.conformer import _sym_unique
-from mechroutines.es._routines.conformer import _geo_unique
 
 THEORY_DCT = {
     'lvl_wbs': {
@@ -127,11 +125,11 @@ THEORY_DCT = {
         'basis':  'cc-pvtz'}}
 
 
-def parse_user_locs(insert_dct, geo, cnf_fs):
+def parse_user_locs(insert_dct, geo, cnf_idx):
     rid = insert_dct['rid']
     cid = insert_dct['cid']
     if rid is None:
-        rid = rng_loc_for_geo(geo, cnf_fs)
+        rid = rng_loc_for_geo(geo, cnf_idx)
     if rid is None:
         rid = autofile.schema.generate_new_ring_id()
     if cid is None:
@@ -754,6 +752,8 @@ def get_zrxn(geo, rxn_info, rxn_class):
 
 def main(insert_dct):
 
+    # Write the save filesystem atomically, and find packed points
+    layers.install()
     prefix = read_user_filesystem(insert_dct)
     # parse method from insert input file
     thy_info = parse_user_theory(insert_dct)
@@ -808,8 +808,9 @@ def main(insert_dct):
             prefix, rxn_info, mod_thy_info,
             ts_locs=insert_dct['ts_locs'], locs=None)
     cnf_fs = fs_array[-1]
-    locs = parse_user_locs(insert_dct, geo, cnf_fs)
-    if not locs_match(geo, cnf_fs, locs):
+    cnf_idx = cnfindex.load(cnf_fs, mod_thy_info)
+    locs = parse_user_locs(insert_dct, geo, cnf_idx)
+    if not locs_match(geo, cnf_fs, locs, cnf_idx):
         print(
             'I refuse to save this geometry until user specified' +
             ' info matches the info in user given output')
@@ -821,12 +822,11 @@ def main(insert_dct):
         method=method, basis=basis, status=autofile.schema.RunStatus.SUCCESS)
     inf_obj.utc_end_time = autofile.schema.utc_time()
     inf_obj.utc_start_time = autofile.schema.utc_time()
-    _, saved_geos, saved_enes = _saved_cnf_info(
-        cnf_fs, mod_thy_info)
-    if _geo_unique(geo, ene, saved_geos, saved_enes, zrxn=zrxn):
-        sym_id = _sym_unique(
-            geo, ene, saved_geos, saved_enes)
-        if sym_id is None:
+    if cnfindex.is_unique(cnf_idx, geo, ene, zrxn=zrxn):
+        sym_locs = cnfindex.symmetric_duplicate(cnf_idx, geo, ene)
+        if sym_locs is not None:
+            print(' - Structure is not symmetrically unique.')
+        if sym_locs is None:
             if cnf_fs[0].file.info.exists():
                 rinf_obj = cnf_fs[0].file.info.read()
             else:
@@ -884,10 +884,10 @@ def species_match(geo, spc_info):
     return match
 
 
-def locs_match(geo, cnf_fs, locs):
+def locs_match(geo, cnf_fs, locs, cnf_idx):
     match = True
     rid = locs[0]
-    geo_rid = rng_loc_for_geo(geo, cnf_fs)
+    geo_rid = rng_loc_for_geo(geo, cnf_idx)
     if geo_rid is not None:
         if geo_rid != rid:
             print(
@@ -899,28 +899,17 @@ def locs_match(geo, cnf_fs, locs):
     return match
 
 
-def rng_loc_for_geo(geo, cnf_fs):
+def rng_loc_for_geo(geo, cnf_idx):
     rid = None
-    frag_geo = _fragment_ring_geo(geo)
-    if frag_geo is not None:
-        frag_zma = automol.geom.zmatrix(frag_geo)
-    checked_rids = []
-    for locs in cnf_fs[-1].existing():
-        current_rid, _ = locs
-        if current_rid in checked_rids:
-            continue
-        if cnf_fs[-1].file.geometry.exists(locs):
-            checked_rids.append(current_rid)
-            locs_geo = cnf_fs[-1].file.geometry.read(locs)
-            frag_locs_geo = _fragment_ring_geo(locs_geo)
-            if frag_locs_geo is None:
-                rid = locs[0]
-                break
-            frag_locs_zma = automol.geom.zmatrix(frag_locs_geo)
-            if automol.zmat.almost_equal(
-                    frag_locs_zma, frag_zma, dist_rtol=0.1, ang_atol=.4):
-                rid = locs[0]
-                break
+    frag_zma = cnfindex.ring_fragment_zmatrix(geo)
+    for current_rid, frag_locs_zma in cnfindex.ring_fragments(cnf_idx):
+        if frag_locs_zma is None:
+            rid = current_rid
+            break
+        if automol.zmat.almost_equal(
+                frag_locs_zma, frag_zma, dist_rtol=0.1, ang_atol=.4):
+            rid = current_rid
+            break
     return rid
 
 
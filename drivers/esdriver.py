@@ -15,6 +15,7 @@
 from mechroutines.es import run_tsk
 from mechlib.amech_io import parser
 from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
 
 
 def run(pes_rlst, spc_rlst,
@@ -94,7 +95,8 @@ def run(pes_rlst, spc_rlst,
 
             # Run the electronic structure task for all spc in queue
             for spc_name in obj_queue:
-                run_tsk(tsk, spc_dct, spc_name,
-                        thy_dct, es_keyword_dct,
-                        run_prefix, save_prefix,
-                        print_debug=print_debug)
+                with profiler.span(tsk, 'es', spc=spc_name):
+                    run_tsk(tsk, spc_dct, spc_name,
+                            thy_dct, es_keyword_dct,
+                            run_prefix, save_prefix,
+                            print_debug=print_debug)
@@ -16,6 +16,7 @@ from mechroutines.ktp import label as ktp_label
 from mechlib.amech_io import parser
 from mechlib.amech_io import rate_paths
 from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
 from mechlib.reaction import split_unstable_pes
 
 
@@ -99,21 +100,24 @@ def run(pes_rlst, pes_grp_dct,
             if write_rate_tsk is not None:
                 nprocs = write_rate_tsk[-1]['nprocs']
                 tsk_key_dct = write_rate_tsk[-1]
-                pes_param_dct = ktp_tasks.write_messrate_task(
-                    pesgrp_num, pes_inf, all_rxn_lst[pesgrp_num],
-                    tsk_key_dct, pes_param_dct,
-                    spc_dct,
-                    thy_dct, pes_mod_dct, spc_mod_dct,
-                    all_instab_chnls[pesgrp_num], label_dct,
-                    rate_paths_dct, run_prefix, save_prefix, nprocs=nprocs)
+                with profiler.span('write_mess', 'ktp', pes=pes_inf):
+                    pes_param_dct = ktp_tasks.write_messrate_task(
+                        pesgrp_num, pes_inf, all_rxn_lst[pesgrp_num],
+                        tsk_key_dct, pes_param_dct,
+                        spc_dct,
+                        thy_dct, pes_mod_dct, spc_mod_dct,
+                        all_instab_chnls[pesgrp_num], label_dct,
+                        rate_paths_dct, run_prefix, save_prefix,
+                        nprocs=nprocs)
 
             # Run mess to produce rates (currently nothing from tsk lst used)
             if run_rate_tsk is not None:
                 nprocs = run_rate_tsk[-1]['nprocs']
                 tsk_key_dct = run_rate_tsk[-1]
-                ktp_tasks.run_messrate_task(
-                    pes_inf, all_rxn_lst[pesgrp_num],
-                    tsk_key_dct, spc_dct, rate_paths_dct)
+                with profiler.span('run_mess', 'ktp', pes=pes_inf):
+                    ktp_tasks.run_messrate_task(
+                        pes_inf, all_rxn_lst[pesgrp_num],
+                        tsk_key_dct, spc_dct, rate_paths_dct)
 
         # ---------------------------------------- #
         # FIT THE COMBINES RATES FOR ENTIRE GROUP  #
@@ -123,10 +127,11 @@ def run(pes_rlst, pes_grp_dct,
         if run_fit_tsk is not None:
             nprocs = run_fit_tsk[-1]['nprocs']
             tsk_key_dct = run_fit_tsk[-1]
-            ktp_tasks.run_fits_task(
-                pes_grp_rlst, pes_param_dct, rate_paths_dct, mdriver_path,
-                pes_mod_dct, spc_mod_dct, thy_dct,
-                tsk_key_dct, spc_dct)
+            with profiler.span('run_fits', 'ktp'):
+                ktp_tasks.run_fits_task(
+                    pes_grp_rlst, pes_param_dct, rate_paths_dct, mdriver_path,
+                    pes_mod_dct, spc_mod_dct, thy_dct,
+                    tsk_key_dct, spc_dct)
 
 
 # ------- #
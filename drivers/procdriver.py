@@ -7,6 +7,7 @@ from mechroutines.proc import run_tsk
 from mechroutines.proc import write_missing_data_report
 from mechlib.amech_io import parser
 from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
 
 
 def run(pes_rlst, spc_rlst,
@@ -70,12 +71,13 @@ def run(pes_rlst, spc_rlst,
 
 
         # Run task and collate info about missing data
-        missing_data += run_tsk(
-            tsk, obj_queue,
-            prnt_keyword_dct,
-            spc_dct, thy_dct,
-            spc_mod_dct, pes_mod_dct,
-            run_prefix, save_prefix, mdriver_path)
+        with profiler.span(tsk, 'proc', obj=obj):
+            missing_data += run_tsk(
+                tsk, obj_queue,
+                prnt_keyword_dct,
+                spc_dct, thy_dct,
+                spc_mod_dct, pes_mod_dct,
+                run_prefix, save_prefix, mdriver_path)
 
     # Write a report that details what data is missing
     write_missing_data_report(missing_data, spc_dct)
@@ -22,6 +22,7 @@ from mechlib import filesys
 from mechlib.amech_io import writer
 from mechlib.amech_io import parser
 from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
 from mechlib.amech_io import thermo_paths
 from mechlib.reaction import split_unstable_full
 from autorun import execute_function_in_parallel
@@ -100,16 +101,18 @@ def run(pes_rlst, spc_rlst,
 
     # Write and Run MESSPF inputs to generate the partition functions
     if write_messpf_tsk is not None:
-        thermo_tasks.write_messpf_task(
-            write_messpf_tsk, spc_locs_dct, spc_dct,
-            pes_mod_dct, spc_mod_dct,
-            run_prefix, save_prefix, thm_paths_dct)
+        with profiler.span('write_mess', 'thermo'):
+            thermo_tasks.write_messpf_task(
+                write_messpf_tsk, spc_locs_dct, spc_dct,
+                pes_mod_dct, spc_mod_dct,
+                run_prefix, save_prefix, thm_paths_dct)
 
     # Run the MESSPF files that have been written
     if run_messpf_tsk is not None:
-        thermo_tasks.run_messpf_task(
-            run_messpf_tsk, spc_locs_dct, spc_dct,
-            thm_paths_dct)
+        with profiler.span('run_mess', 'thermo'):
+            thermo_tasks.run_messpf_task(
+                run_messpf_tsk, spc_locs_dct, spc_dct,
+                thm_paths_dct)
 
     # Use MESS partition functions to compute thermo quantities
     if run_fit_tsk is not None:
@@ -121,10 +124,11 @@ def run(pes_rlst, spc_rlst,
         # Get the reference scheme and energies (ref in different place)
         ref_scheme = pes_mod_dct_i['therm_fit']['ref_scheme']
         ref_enes = pes_mod_dct_i['therm_fit']['ref_enes']
-        spc_dct = thermo_tasks.get_heats_of_formation(
-            spc_locs_dct, spc_dct, spc_mods, spc_mod_dct,
-            ref_scheme, ref_enes, run_prefix, save_prefix, 
-            nprocs=nprocs)
+        with profiler.span('heats_of_formation', 'thermo'):
+            spc_dct = thermo_tasks.get_heats_of_formation(
+                spc_locs_dct, spc_dct, spc_mods, spc_mod_dct,
+                ref_scheme, ref_enes, run_prefix, save_prefix,
+                nprocs=nprocs)
 
         # Combine species for pf generation
         tsk_key_dct = run_fit_tsk[-1]
@@ -139,9 +143,10 @@ def run(pes_rlst, spc_rlst,
                 thm_paths_dct)
 
         # Write the NASA polynomials in CHEMKIN format
-        ckin_nasa_str_dct, ckin_path = thermo_tasks.nasa_polynomial_task(
-            mdriver_path, spc_locs_dct, thm_paths_dct, spc_dct,
-            spc_mod_dct, spc_mods, sort_info_lst, ref_scheme, spc_grp_dct)
+        with profiler.span('run_fits', 'thermo'):
+            ckin_nasa_str_dct, ckin_path = thermo_tasks.nasa_polynomial_task(
+                mdriver_path, spc_locs_dct, thm_paths_dct, spc_dct,
+                spc_mod_dct, spc_mods, sort_info_lst, ref_scheme, spc_grp_dct)
 
         for idx, nasa_str in ckin_nasa_str_dct.items():
             ioprinter.print_thermo(
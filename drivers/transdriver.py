@@ -15,6 +15,7 @@
 from mechroutines.trans import run_tsk
 from mechlib.amech_io import parser
 from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
 from mechlib.reaction import split_unstable_full
 
 
@@ -49,7 +50,8 @@ def run(pes_rlst, spc_rlst,
 
     for tsk_lst in trans_tsk_lst:
         [_, tsk, etrans_keyword_dct] = tsk_lst
-        run_tsk(tsk, spc_queue,
-                spc_dct, thy_dct, pes_mod_dct,
-                etrans_keyword_dct,
-                run_prefix, save_prefix, mdriver_path)
+        with profiler.span(tsk, 'trans'):
+            run_tsk(tsk, spc_queue,
+                    spc_dct, thy_dct, pes_mod_dct,
+                    etrans_keyword_dct,
+                    run_prefix, save_prefix, mdriver_path)
@@ -5,6 +5,7 @@ from mechlib.amech_io import writer
 from mechlib.amech_io import reader
 from mechlib.amech_io import parser
 from mechlib.amech_io import printer
+from mechlib.amech_io import profiler
 from mechlib.amech_io._path import thermo_paths
 from mechlib.amech_io._path import rate_paths
 from mechlib.amech_io._path import output_path
@@ -16,6 +17,7 @@ __all__ = [
     'reader',
     'parser',
     'printer',
+    'profiler',
     'thermo_paths',
     'rate_paths',
     'output_path',
@@ -24,12 +24,15 @@ INP_FILE = {
 #     'geo' : '.xyz files'
 
 
-def read_amech_input(job_path):
+def read_amech_input(job_path, thy_path=None):
     """ Reads all MechDriver input files provided by the user into strings.
         All whitespace and comment lines are stripped from the files.
 
         :param job_path: directory path where all input files exist
         :type job_path: str
+        :param thy_path: path to the theory file, relative to `job_path`,
+            if not the default inp/theory.dat
+        :type thy_path: str
         :rtype: dict[str:str]
     """
 
@@ -39,7 +42,7 @@ def read_amech_input(job_path):
         remove_comments='#', remove_whitespace=True)
 
     thy_str = ioformat.pathtools.read_file(
-        job_path, INP_FILE['thy'][1],
+        job_path, thy_path or INP_FILE['thy'][1],
         remove_comments='#', remove_whitespace=True)
 
     mod_str = ioformat.pathtools.read_file(
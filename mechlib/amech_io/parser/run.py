@@ -67,7 +67,9 @@ TSK_KEY_DCT = {
     'find_ts': (('spc', 'ts'), BASE + MREF + ('nobarrier', 'varecof_nprocs')),
     'conf_pucker': (('spc', 'ts'), BASE + ('cnf_range', 'sort', 
                                            'algorithm','thresholds','eps','checks','rand_tors')),
-    'conf_samp': (('spc', 'ts'), BASE + ('cnf_range', 'sort', 'resave',)),
+    'conf_samp': (('spc', 'ts'), BASE + ('cnf_range', 'sort', 'resave',
+                                         'samp_nprocs', 'conv_nsamp',
+                                         'conv_ewin', 'conv_unseen')),
     'conf_energy': (('spc', 'ts'), BASE + ('cnf_range', 'sort',)),
     'conf_grad': (('spc', 'ts'), BASE + ('cnf_range', 'sort',)),
     'conf_hess': (('spc', 'ts'), BASE + ('cnf_range', 'sort',)),
@@ -82,7 +84,7 @@ TSK_KEY_DCT = {
     'hr_vpt2': (('spc', 'ts'), BASE + ('tors_model', 'cnf_range', 'sort',)),
     'hr_reopt': (('spc', 'ts'), BASE + ('tors_model', 'hrthresh',
                                         'cnf_range', 'sort',)),
-    'tau_samp': (('spc', 'ts'), BASE + ('resave',)),
+    'tau_samp': (('spc', 'ts'), BASE + ('resave', 'conv_pf_err')),
     'tau_energy': (('spc', 'ts'), BASE),
     'tau_grad': (('spc', 'ts'), BASE),
     'tau_hess': (('spc', 'ts'), BASE + ('hessmax',)),
@@ -148,6 +150,12 @@ TSK_VAL_DCT = {
     'nobarrier': ((str,), ('pst', 'rpvtst', 'vrctst'), None),
     're_id': ((bool,), (True, False), False),
     'varecof_nprocs': ((int,), (), 10),
+    'samp_nprocs': ((int,), (), None),   # run several samples at once
+    # stop sampling early once converged
+    'conv_nsamp': ((int,), (), None),    # samples without a new conformer
+    'conv_ewin': ((float,), (), 1.0),    # kcal/mol window of new conformers
+    'conv_unseen': ((float,), (), None),   # chance of an unseen conformer
+    'conv_pf_err': ((float,), (), None),   # tau partition function error (%)
     #adl added arguments for ring puckering
     'algorithm': ((str,), 
                   ('crest','pucker','torsions','robust','torsions2','etkdg'), 'pucker'),
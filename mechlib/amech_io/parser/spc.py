@@ -11,6 +11,7 @@ from phydat import symm, eleclvl, phycon
 from mechlib.reaction import rxnid
 from mechlib.reaction import _util as rxn_util
 from mechlib.filesys import reaction_fs
+from mechlib.amech_io.printer import debug_message
 from mechlib.amech_io.parser._keywrd import defaults_from_val_dct
 from mechlib.amech_io.parser._keywrd import check_dct1, right_update, separate_subdct
 
@@ -83,9 +84,9 @@ def species_dictionary(
     spc_dct = mechanalyzer.parser.new_spc.parse_mech_spc_dct(
         spc_str, canon_ent=run_dct['canonical'])
     dat_blocks = ioformat.ptt.named_end_blocks(dat_str, 'spc', footer='spc')
-    print('dat blocks', dat_blocks)
+    debug_message('dat blocks', dat_blocks)
     dat_dct = ioformat.ptt.keyword_dcts_from_blocks(dat_blocks)
-    print('dat dct', dat_dct)
+    debug_message('dat dct', dat_dct)
 
     # Merge all of the species inputs into a dictionary
     mod_spc_dct, glob_dct = modify_spc_dct(spc_dct, dat_dct, geo_dct, act_dct)
@@ -5,10 +5,18 @@ from mechlib.amech_io.printer._lib import obj
 from mechlib.amech_io.printer._format import format_message
 
 from mechlib.amech_io.printer._print import message
+from mechlib.amech_io.printer._print import banner
 from mechlib.amech_io.printer._print import debug_message
 from mechlib.amech_io.printer._print import info_message
 from mechlib.amech_io.printer._print import error_message
 from mechlib.amech_io.printer._print import warning_message
+from mechlib.amech_io.printer._log import configure_logging
+from mechlib.amech_io.printer._log import set_log_level
+from mechlib.amech_io.printer._log import debug_enabled
+from mechlib.amech_io.printer._log import flush_logging
+from mechlib.amech_io.printer._log import log_level
+from mechlib.amech_io.printer._log import forward_logging
+from mechlib.amech_io.printer._log import log_listener
 
 # General MechDriver Runtime Messages
 from mechlib.amech_io.printer._run import runlst
@@ -79,10 +87,18 @@ __all__ = [
     'format_message',
 
     'message',
+    'banner',
     'debug_message',
     'info_message',
     'error_message',
     'warning_message',
+    'configure_logging',
+    'set_log_level',
+    'debug_enabled',
+    'flush_logging',
+    'log_level',
+    'forward_logging',
+    'log_listener',
 
     # General Runtime Messages
     'runlst',
@@ -0,0 +1,231 @@
+"""
+  Logging backend for the printer functions
+
+  Messages go through a `logging` logger, so that they can be filtered by
+  level before they are formatted. By default, messages at INFO and above are
+  written to standard output. A buffered log file and a JSON-lines log file
+  can be added with `configure_logging`. The default level can be set with
+  the AUTOMECH_LOG_LEVEL environment variable.
+
+  Worker processes end without flushing their handlers, so a pool of them
+  sends its messages to the main process through a queue instead
+  (`forward_logging` in each worker, and `log_listener` around the pool).
+"""
+
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import sys
+
+from mechlib.amech_io.printer._format import format_message
+
+
+LOGGER = logging.getLogger('mechdriver')
+LEVEL_ENV = 'AUTOMECH_LOG_LEVEL'
+BUFFER_SIZE = 1 << 20
+
+
+class _LazyMessage:
+    """ A message that is only formatted if a sink writes it
+    """
+
+    __slots__ = ('label', 'args', 'newline', 'indent', 'prefix')
+
+    def __init__(self, label, args, newline=None, indent=None, prefix=None):
+        self.label = label
+        self.args = args
+        self.newline = newline
+        self.indent = indent
+        self.prefix = prefix
+
+    def __str__(self):
+        parts = [format_message(self.label, self.newline, self.indent)]
+        parts.extend(map(str, self.args))
+        if self.prefix is not None:
+            parts.insert(0, self.prefix)
+        return ' '.join(parts)
+
+
+class _ConsoleHandler(logging.Handler):
+    """ Writes messages to the current standard output, so that redirecting
+        `sys.stdout` redirects the log
+    """
+
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + '\n')
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+
+class _BufferedFileHandler(logging.Handler):
+    """ Writes messages to a file through a large buffer, which is flushed
+        on errors and when the program exits
+    """
+
+    def __init__(self, path, level=logging.NOTSET):
+        super().__init__(level)
+        # pylint: disable=consider-using-with
+        self.stream = open(path, 'a', buffering=BUFFER_SIZE, encoding='utf-8')
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + '\n')
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+    def flush(self):
+        if not self.stream.closed:
+            self.stream.flush()
+
+    def close(self):
+        self.flush()
+        self.stream.close()
+        super().close()
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    """ Formats each message as a JSON object on a single line
+    """
+
+    def format(self, record):
+        return json.dumps({
+            'time': record.created,
+            'level': record.levelname,
+            'pid': record.process,
+            'message': record.getMessage(),
+        })
+
+
+def configure_logging(level=None, console=True, log_path=None,
+                      json_path=None):
+    """ Set the log level and the sinks that messages are written to,
+        replacing any previous configuration
+
+        :param level: the lowest level to write, such as 'DEBUG' or 'INFO'
+            (default: AUTOMECH_LOG_LEVEL if set, otherwise 'INFO')
+        :type level: str or int
+        :param console: write messages to standard output?
+        :type console: bool
+        :param log_path: path to a log file to append messages to
+        :type log_path: str
+        :param json_path: path to a JSON-lines file to append messages to
+        :type json_path: str
+    """
+
+    for handler in list(LOGGER.handlers):
+        LOGGER.removeHandler(handler)
+        handler.close()
+
+    if console:
+        LOGGER.addHandler(_ConsoleHandler())
+    if log_path is not None:
+        LOGGER.addHandler(_BufferedFileHandler(log_path))
+    if json_path is not None:
+        handler = _BufferedFileHandler(json_path)
+        handler.setFormatter(_JsonLinesFormatter())
+        LOGGER.addHandler(handler)
+
+    LOGGER.propagate = False
+    set_log_level(level)
+
+
+def set_log_level(level=None):
+    """ Set the lowest level of message to write
+
+        :param level: the level, such as 'DEBUG' or 'INFO' (default:
+            AUTOMECH_LOG_LEVEL if set, otherwise 'INFO')
+        :type level: str or int
+    """
+    if level is None:
+        level = os.environ.get(LEVEL_ENV, 'INFO')
+    if isinstance(level, str):
+        level = level.upper()
+    LOGGER.setLevel(level)
+
+
+def log_level():
+    """ Get the lowest level of message that is written
+
+        :rtype: int
+    """
+    return LOGGER.level
+
+
+def forward_logging(queue, level=None):
+    """ Send the messages of a worker process to a queue, for the main
+        process to write (see `log_listener`)
+
+        The handlers inherited from the main process are dropped without
+        being flushed or closed, since the main process writes to the same
+        sinks.
+
+        :param queue: the queue, such as a `multiprocessing.Queue`
+        :param level: the lowest level to send (default: the inherited one)
+        :type level: int
+    """
+    LOGGER.handlers = [logging.handlers.QueueHandler(queue)]
+    LOGGER.propagate = False
+    if level is not None:
+        LOGGER.setLevel(level)
+
+
+@contextlib.contextmanager
+def log_listener(queue):
+    """ Write the messages that worker processes send to a queue (see
+        `forward_logging`) to the sinks of this process, until the block
+        ends
+
+        :param queue: the queue, such as a `multiprocessing.Queue`
+    """
+    listener = logging.handlers.QueueListener(
+        queue, *LOGGER.handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        yield
+    finally:
+        listener.stop()
+
+
+def debug_enabled():
+    """ Determine whether debug messages are being written
+
+        :rtype: bool
+    """
+    return LOGGER.isEnabledFor(logging.DEBUG)
+
+
+def flush_logging():
+    """ Flush any buffered messages to their files
+    """
+    for handler in LOGGER.handlers:
+        handler.flush()
+
+
+def log(level, message_label, args, newline=None, indent=None, prefix=None):
+    """ Log a message, without formatting it unless the level is enabled
+    """
+    if LOGGER.isEnabledFor(level):
+        LOGGER.log(level, _LazyMessage(
+            message_label, args, newline=newline, indent=indent,
+            prefix=prefix))
+
+
+def log_always(message_label, args, newline=None, indent=None):
+    """ Log a message at INFO, whatever the log level, for the program
+        banners that `check_log` and `automech subtasks status` look for
+    """
+    LOGGER.handle(LOGGER.makeRecord(
+        LOGGER.name, logging.INFO, '(banner)', 0,
+        _LazyMessage(message_label, args, newline=newline, indent=indent),
+        None, None))
+
+
+configure_logging()
+# Flush before forking, so that child processes don't inherit (and then
+# write out a second copy of) the buffered messages
+os.register_at_fork(before=flush_logging)
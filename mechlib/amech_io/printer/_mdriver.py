@@ -4,6 +4,7 @@
 
 import random
 from mechlib.amech_io.printer._lib import obj
+from mechlib.amech_io.printer._print import banner
 from mechlib.amech_io.printer._print import message
 
 
@@ -19,7 +20,7 @@ def program_header(driver):
         'es': ES_MSG,
         'proc': PRINT_MSG
     }
-    message(header_dct[driver])
+    banner(header_dct[driver])
 
 
 def program_exit(driver):
@@ -34,7 +35,7 @@ def program_exit(driver):
         'es': ES_EXIT_MSG,
         'proc': PRINT_EXIT_MSG
     }
-    message(header_dct[driver]+'\n')
+    banner(header_dct[driver]+'\n')
 
 
 def driver_tasks(
@@ -1,17 +1,19 @@
 """ drivers for coordinate scans
 """
 
+from mechlib.amech_io.printer._print import message
+
 
 def hrpotentials(tors_pots):
     """ Check hr pot to see if a new mimnimum is needed
     """
 
-    print('\nHR potentials...')
+    message('\nHR potentials...')
     for name in tors_pots:
 
-        print(f'- Rotor {name}')
+        message(f'- Rotor {name}')
         pot_str = ''
         for pot in tors_pots[name].values():
             pot_str += f' {pot:.2f}'
 
-        print(f'- Pot:{pot_str}')
+        message(f'- Pot:{pot_str}')
@@ -1,54 +1,53 @@
 """
   Various status messages
+
+  Extra arguments are converted to strings and joined with spaces, as with
+  `print`, but only if the message's level is enabled. For large payloads,
+  pass them as arguments rather than building the string beforehand.
 """
 
-from mechlib.amech_io.printer._format import format_message
+import logging
+
+from mechlib.amech_io.printer._log import log
+from mechlib.amech_io.printer._log import log_always
 
 
 def message(message_label, *args, newline=None, indent=None):
     """ Print a general message to output.
     """
-    if len(args) > 0:
-        print(format_message(message_label, newline, indent), *args)
-    else:
-        print(format_message(message_label, newline, indent))
+    log(logging.INFO, message_label, args, newline=newline, indent=indent)
+
+
+def banner(message_label, *args, newline=None, indent=None):
+    """ Print a program banner to output, whatever the log level.
+    """
+    log_always(message_label, args, newline=newline, indent=indent)
 
 
 def debug_message(message_label, *args,
                   newline=None, indent=None, print_debug=True):
-    """ Print a debug message to output.
+    """ Print a debug message to output, if the log level is DEBUG.
     """
     if print_debug:
-        _msg = format_message(message_label, newline, indent)
-        if len(args) > 0:
-            print('Debug: ', _msg, *args)
-        else:
-            print('Debug: ', _msg)
+        log(logging.DEBUG, message_label, args,
+            newline=newline, indent=indent, prefix='Debug: ')
 
 
 def info_message(message_label, *args, newline=None, indent=None):
     """ Print an info message to output.
     """
-    if len(args) > 0:
-        print(format_message(message_label, newline, indent), *args)
-    else:
-        print(format_message(message_label, newline, indent))
+    log(logging.INFO, message_label, args, newline=newline, indent=indent)
 
 
 def error_message(message_label, *args, newline=None, indent=None):
     """ Print an error message to output.
     """
-    if len(args) > 0:
-        print('ERROR: ', format_message(message_label, newline, indent), *args)
-    else:
-        print('ERROR: ', format_message(message_label, newline, indent))
+    log(logging.ERROR, message_label, args,
+        newline=newline, indent=indent, prefix='ERROR: ')
 
 
 def warning_message(message_label, *args, newline=None, indent=None):
     """ Print a warning message to output.
     """
-    _msg = format_message(message_label, newline, indent)
-    if len(args) > 0:
-        print('WARNING: ', _msg, *args)
-    else:
-        print('WARNING: ', _msg)
+    log(logging.WARNING, message_label, args,
+        newline=newline, indent=indent, prefix='WARNING: ')
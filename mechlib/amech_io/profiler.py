@@ -0,0 +1,226 @@
+""" Lightweight instrumentation for timing the parts of a MechDriver run
+
+    A span records the wall time, CPU time, child-process time, and the bytes
+    read by the process over a block of code. When profiling is enabled, the
+    spans are collected into a Chrome trace (viewable in chrome://tracing or
+    https://ui.perfetto.dev) and summarized at the end of the run. When it is
+    disabled, spans do nothing.
+
+    Spans are recorded in the main MechDriver process, and in the worker
+    processes that run Monte Carlo samples, which send their spans back with
+    each result (`worker_init`, `take_events`, `add_events`). Work done in
+    processes launched by `autorun.execute_function_in_parallel` shows up as
+    the wall time of the span that launched them.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+
+_PROFILE = {
+    'enabled': False,
+    'start': 0.0,
+    'events': [],
+}
+
+
+def enable():
+    """ Turn on profiling and clear any previously recorded spans, and
+        instrument the external script runner (MESS, ProjRot, ThermP, PAC99)
+    """
+    _PROFILE['enabled'] = True
+    _PROFILE['start'] = time.perf_counter()
+    _PROFILE['events'] = []
+    instrument_scripts()
+
+
+def disable():
+    """ Turn off profiling
+    """
+    _PROFILE['enabled'] = False
+
+
+def start_time():
+    """ Get the time profiling was enabled at, to pass to worker processes
+
+        :return: the `time.perf_counter` time, or None if profiling is off
+        :rtype: float
+    """
+    return _PROFILE['start'] if _PROFILE['enabled'] else None
+
+
+def worker_init(start=None):
+    """ Set up profiling in a worker process, dropping any spans inherited
+        from the main process
+
+        :param start: the time profiling was enabled at in the main process
+            (see `start_time`), or None if it is off
+        :type start: float
+    """
+    _PROFILE['enabled'] = start is not None
+    if start is not None:
+        _PROFILE['start'] = start
+    _PROFILE['events'] = []
+
+
+def take_events():
+    """ Remove and return the spans recorded so far, such as in a worker
+        process, to send to the main process
+
+        :rtype: list(dict)
+    """
+    events = _PROFILE['events']
+    _PROFILE['events'] = []
+    return events
+
+
+def add_events(events):
+    """ Add spans recorded in another process, if profiling is enabled
+
+        :param events: the spans (see `take_events`)
+        :type events: list(dict)
+    """
+    if _PROFILE['enabled']:
+        _PROFILE['events'].extend(events)
+
+
+def enabled():
+    """ Determine whether profiling is turned on
+
+        :rtype: bool
+    """
+    return _PROFILE['enabled']
+
+
+@contextlib.contextmanager
+def span(name, cat='task', **args):
+    """ Record a span over a block of code, if profiling is enabled
+
+        :param name: the name of the span, such as the task or job name
+        :type name: str
+        :param cat: the category of the span, used to group the summary
+        :type cat: str
+        :param args: labels for the span, such as the species name
+    """
+
+    if not _PROFILE['enabled']:
+        yield
+        return
+
+    start = _counters()
+    try:
+        yield
+    finally:
+        end = _counters()
+        wall, cpu, child, nbytes = (e - s for e, s in zip(end, start))
+        _PROFILE['events'].append({
+            'name': str(name),
+            'cat': cat,
+            'ph': 'X',
+            'ts': (start[0] - _PROFILE['start']) * 1e6,
+            'dur': wall * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {
+                **{key: str(val) for key, val in args.items()},
+                'cpu_s': cpu,
+                'child_s': child,
+                'read_bytes': nbytes,
+            }
+        })
+
+
+def instrument_scripts():
+    """ Wrap `autorun.run_script` in a span everywhere it has been imported
+
+        The script name is looked up in `autorun.SCRIPT_DCT`, so MESS, ProjRot,
+        ThermP, and PAC99 runs show up under their own names.
+    """
+
+    import autorun
+
+    run_script = getattr(autorun.run_script, '__wrapped__', autorun.run_script)
+    script_names = {val: key for key, val in autorun.SCRIPT_DCT.items()}
+
+    def _run_script(script_str, run_dir, *args, **kwargs):
+        name = script_names.get(script_str, 'script')
+        with span(name, 'script', run_dir=run_dir):
+            return run_script(script_str, run_dir, *args, **kwargs)
+
+    _run_script.__wrapped__ = run_script
+
+    for module in list(sys.modules.values()):
+        if (getattr(module, '__name__', '').startswith('autorun') and
+                getattr(module, 'run_script', None) is run_script):
+            module.run_script = _run_script
+
+
+def write_trace(path):
+    """ Write the recorded spans to a Chrome trace JSON file
+
+        :param path: path to the trace file
+        :type path: str
+    """
+    with open(path, 'w', encoding='utf-8') as fobj:
+        json.dump({'traceEvents': _PROFILE['events'],
+                   'displayTimeUnit': 'ms'}, fobj)
+
+
+def summary_string(nrows=30):
+    """ Build a table summarizing the recorded spans, grouped by category
+        and name and sorted by total wall time (which includes nested spans)
+
+        :param nrows: the maximum number of rows to include
+        :type nrows: int
+        :rtype: str
+    """
+
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0])
+    for event in _PROFILE['events']:
+        total = totals[(event['cat'], event['name'])]
+        total[0] += 1
+        total[1] += event['dur'] / 1e6
+        total[2] += event['args']['cpu_s']
+        total[3] += event['args']['child_s']
+        total[4] += event['args']['read_bytes']
+
+    header = (f"{'category':<10} {'name':<30} {'count':>6} {'wall (s)':>10} "
+              f"{'cpu (s)':>10} {'child (s)':>10} {'read (MB)':>10}")
+    lines = [header, '-' * len(header)]
+    rows = sorted(totals.items(), key=lambda x: x[1][1], reverse=True)
+    for (cat, name), (count, wall, cpu, child, nbytes) in rows[:nrows]:
+        lines.append(
+            f'{cat:<10} {name[:30]:<30} {count:>6} {wall:>10.2f} '
+            f'{cpu:>10.2f} {child:>10.2f} {nbytes / 1e6:>10.1f}')
+
+    return '\n'.join(lines)
+
+
+def _counters():
+    """ Read the current wall time, CPU time, child-process time, and bytes
+        read by this process
+    """
+    times = os.times()
+    return (time.perf_counter(),
+            time.process_time(),
+            times.children_user + times.children_system,
+            _bytes_read())
+
+
+def _bytes_read():
+    """ Read the number of bytes this process has read through system calls,
+        from /proc/self/io (0 where that is not available)
+    """
+    try:
+        with open('/proc/self/io', 'rb') as fobj:
+            for line in fobj:
+                if line.startswith(b'rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
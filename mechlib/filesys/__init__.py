@@ -7,6 +7,23 @@ from mechlib.filesys._build import prefix_fs
 from mechlib.filesys._build import reaction_fs
 from mechlib.filesys._build import root_locs
 from mechlib.filesys._rct import rcts_cnf_fs
+from mechlib.filesys._complete import is_complete
+from mechlib.filesys._complete import mark_complete
+from mechlib.filesys._complete import wait_for_save
+from mechlib.filesys._lock import atomic_write
+from mechlib.filesys._lock import increment_nsamp
+from mechlib.filesys._lock import locked
+from mechlib.filesys._lock import read_nsamp
+from mechlib.filesys._lock import update_info
+from mechlib.filesys import archive
+from mechlib.filesys import catalog
+from mechlib.filesys import check
+from mechlib.filesys import cnfindex
+from mechlib.filesys import fingerprint
+from mechlib.filesys import jobreg
+from mechlib.filesys import layers
+from mechlib.filesys import readcache
+from mechlib.filesys import scan
 from mechlib.filesys import mincnf
 from mechlib.filesys import models
 from mechlib.filesys import read
@@ -19,6 +36,23 @@ __all__ = [
     'reaction_fs',
     'root_locs',
     'rcts_cnf_fs',
+    'is_complete',
+    'mark_complete',
+    'wait_for_save',
+    'atomic_write',
+    'increment_nsamp',
+    'locked',
+    'read_nsamp',
+    'update_info',
+    'archive',
+    'catalog',
+    'check',
+    'cnfindex',
+    'fingerprint',
+    'jobreg',
+    'layers',
+    'readcache',
+    'scan',
     'mincnf',
     'models',
     'read',
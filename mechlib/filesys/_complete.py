@@ -0,0 +1,115 @@
+"""
+  Completion markers for conformers in the save filesystem
+
+  A conformer's geometry is saved before its energy, so a process reading the
+  save filesystem can find a conformer that another process is still saving.
+  Once everything has been saved, the saving process writes a marker file
+  into the conformer directory. Readers that find a conformer without the
+  data they need can then skip it right away if it is complete, and
+  otherwise poll for the data with a short, growing interval, up to a timeout.
+"""
+
+import os
+import sys
+import time
+
+from mechlib.amech_io import printer as ioprinter
+
+
+COMPLETE_MARKER = '.complete'
+WAIT_ENV = 'AUTOMECH_SAVE_WAIT'
+# Conformers saved longer ago than this are assumed to be complete, for
+# save filesystems written before the markers were
+SAVE_WINDOW = 120.
+POLL_START = 0.1
+POLL_MAX = 5.
+
+
+def mark_complete(cnf_path):
+    """ Mark a conformer as completely saved, atomically
+
+        :param cnf_path: path to the conformer directory
+        :type cnf_path: str
+    """
+    marker_path = os.path.join(cnf_path, COMPLETE_MARKER)
+    tmp_path = f'{marker_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fobj:
+        fobj.write(f'{time.time()}\n')
+    os.replace(tmp_path, marker_path)
+
+
+def is_complete(cnf_path):
+    """ Determine whether a conformer has been marked as completely saved
+
+        :param cnf_path: path to the conformer directory
+        :type cnf_path: str
+        :rtype: bool
+    """
+    return os.path.exists(os.path.join(cnf_path, COMPLETE_MARKER))
+
+
+def save_wait_timeout():
+    """ The longest time to wait for a conformer that is being saved, which
+        is AUTOMECH_SAVE_WAIT if set, and otherwise SAVE_WINDOW when running
+        interactively and 0 (don't wait) when not
+
+        :rtype: float
+    """
+    timeout = os.environ.get(WAIT_ENV)
+    if timeout is not None:
+        return float(timeout)
+    interactive = sys.stdin is not None and sys.stdin.isatty()
+    return SAVE_WINDOW if interactive else 0.
+
+
+def wait_for_save(cnf_path, ready, saved_seconds=None, timeout=None):
+    """ Wait for data that is being saved to a conformer by another process
+
+        Returns right away if the data is there, or if the conformer is
+        marked complete (so the data is not coming), or if its geometry was
+        saved more than SAVE_WINDOW seconds ago. Otherwise, polls until the
+        data appears, the conformer is marked complete, or the timeout passes.
+
+        :param cnf_path: path to the conformer directory
+        :type cnf_path: str
+        :param ready: function that determines whether the data is there
+        :type ready: callable
+        :param saved_seconds: time since the conformer geometry was saved
+        :type saved_seconds: float
+        :param timeout: the longest time to wait, in seconds (default:
+            `save_wait_timeout()`)
+        :type timeout: float
+        :return: whether the data is there
+        :rtype: bool
+    """
+
+    if ready():
+        return True
+    if is_complete(cnf_path):
+        return False
+
+    if timeout is None:
+        timeout = save_wait_timeout()
+    if saved_seconds is not None:
+        timeout = min(timeout, SAVE_WINDOW - saved_seconds)
+    if timeout <= 0.:
+        return False
+
+    ioprinter.info_message(
+        f'Conformer at {cnf_path} is still being saved, '
+        f'waiting up to {timeout:.1f} seconds')
+    deadline = time.monotonic() + timeout
+    delay = POLL_START
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0.:
+            ioprinter.info_message(' - Gave up waiting')
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(2 * delay, POLL_MAX)
+        if ready():
+            ioprinter.info_message(' - The data is now saved')
+            return True
+        if is_complete(cnf_path):
+            ioprinter.info_message(' - Conformer was saved without the data')
+            return ready()
@@ -0,0 +1,167 @@
+"""
+  Safe concurrent writes to a shared save filesystem
+
+  Many processes write to the same save filesystem at once, so:
+   - every autofile data file is written to a temporary file in the same
+     directory and renamed over the target, so that readers never see a
+     partly written file (`write_data_file`, which `layers.install` routes
+     autofile's writes through);
+   - read-modify-write updates of info files, such as the sample counts of
+     conformer trunks and branches, hold an `fcntl` lock on a lock file next
+     to the info file (`locked`, `update_info`, `increment_nsamp`), so that
+     concurrent updates are never lost.
+"""
+
+import contextlib
+import fcntl
+import os
+
+from mechlib.amech_io import printer as ioprinter
+
+
+LOCK_SUFFIX = '.lock'
+
+_STATE = {
+    'locking': True,
+}
+
+
+def write_data_file(dfile, val, dir_pth, write_):
+    """ Write an autofile data file atomically (see `atomic_write`)
+
+        :param dfile: the data file
+        :type dfile: autofile.model.DataFile
+        :param val: the value to write
+        :param dir_pth: the directory holding the file
+        :type dir_pth: str
+        :param write_: autofile's own write method, used for data files
+            without a writer
+        :type write_: callable
+    """
+    writer_ = getattr(dfile, 'writer_', None)
+    if writer_ is None:
+        return write_(dfile, val, dir_pth)
+    assert os.path.isdir(dir_pth), f'{dir_pth} is not a directory'
+    return atomic_write(dfile.path(dir_pth), writer_(val))
+
+
+def atomic_write(path, contents):
+    """ Write a file by writing a temporary file in the same directory and
+        renaming it, so that readers see either the old or the new file
+
+        :param path: path to the file
+        :type path: str
+        :param contents: the contents of the file
+        :type contents: str or bytes
+    """
+    mode = 'wb' if isinstance(contents, bytes) else 'w'
+    tmp_path = _hidden_path(path, f'.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, mode) as fobj:
+            fobj.write(contents)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextlib.contextmanager
+def locked(path):
+    """ Hold an exclusive advisory lock for a file while updating it
+
+        The lock is on a separate, hidden lock file next to it, which is left
+        in place. If the filesystem doesn't support locks, this warns once and
+        goes ahead without the lock.
+
+        :param path: path to the file
+        :type path: str
+    """
+
+    if not _STATE['locking']:
+        yield
+        return
+
+    with open(_hidden_path(path, LOCK_SUFFIX), 'a', encoding='utf-8') as fobj:
+        try:
+            fcntl.lockf(fobj, fcntl.LOCK_EX)
+        except OSError as err:
+            ioprinter.warning_message(
+                f'Could not lock {path} ({err}); '
+                'updating files without locks from now on')
+            _STATE['locking'] = False
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            fcntl.lockf(fobj, fcntl.LOCK_UN)
+
+
+def update_info(ds, update, locs=(), default=None):
+    """ Read, update, and write an info file, holding its lock
+
+        :param ds: the data series holding the info file, such as cnf_fs[1]
+        :type ds: autofile.model.DataSeries
+        :param update: function that takes the info object and returns the
+            updated info object
+        :type update: callable
+        :param locs: the locators of the info file
+        :param default: function that makes an info object, if there is none
+        :type default: callable
+        :return: the updated info object
+    """
+    info_file = ds.file.info
+    with locked(info_file.path(locs)):
+        if info_file.exists(locs):
+            inf_obj = info_file.read(locs)
+        else:
+            inf_obj = default()
+        inf_obj = update(inf_obj)
+        info_file.write(inf_obj, locs)
+    return inf_obj
+
+
+def read_nsamp(ds, locs=()):
+    """ Get the sample count of a conformer trunk or branch
+
+        :param ds: the data series holding the info file, such as cnf_fs[1]
+        :type ds: autofile.model.DataSeries
+        :param locs: the locators of the info file
+        :return: the count, or None if there is no info file
+        :rtype: int
+    """
+    info_file = ds.file.info
+    if not info_file.exists(locs):
+        return None
+    return info_file.read(locs).nsamp
+
+
+def increment_nsamp(ds, locs=(), default=None, start=None):
+    """ Add one to the sample count of a conformer trunk or branch, holding
+        the lock on its info file, so that concurrent increments are not lost
+
+        :param ds: the data series holding the info file, such as cnf_fs[1]
+        :type ds: autofile.model.DataSeries
+        :param locs: the locators of the info file
+        :param default: function that makes an info object, if there is none
+        :type default: callable
+        :param start: a count to increment from if it is higher than the one
+            in the info file, such as one counted from the run filesystem
+        :type start: int
+        :return: the updated info object
+    """
+
+    def _update(inf_obj):
+        inf_obj.nsamp = max(inf_obj.nsamp, start or 0) + 1
+        return inf_obj
+
+    return update_info(ds, _update, locs=locs, default=default)
+
+
+def _hidden_path(path, suffix):
+    """ Path to a hidden file next to a file, which autofile won't mistake
+        for a filesystem layer
+    """
+    dir_path, name = os.path.split(path)
+    return os.path.join(dir_path, f'.{name}{suffix}')
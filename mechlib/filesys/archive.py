@@ -0,0 +1,622 @@
+"""
+  Packed archives for high-cardinality layers of the save filesystem
+
+  Scans (including IRC points) and tau samples store every point in its own
+  directory tree, with separate geometry, energy, z-matrix, info, input, and
+  output files, which uses up inode quotas and makes reads slow on parallel
+  filesystems. `pack` moves the points of one such filesystem into a single
+  archive in its top directory: an append-only data file, holding the file
+  contents back to back, and a binary index of (key length, offset, size)
+  records followed by the key, which is the path of the file relative to the
+  archive. Later records for a key replace earlier ones, and a removal record
+  (a tombstone) for a directory drops every earlier record below it.
+
+  Once `layers.install` has been called, autofile reads fall back to the
+  archive for files that are not on disk, so packed points read the same as
+  unpacked ones, including through `existing()` for the point layer. Writing
+  to a packed point first writes all of its files back out and drops it from
+  the archive, so a point is never partly packed and partly on disk, and
+  removing its directory later removes it for good. `remove` drops a packed
+  point without writing it out. Packing the filesystem again moves the
+  points on disk back into the archive.
+
+  Replaced and removed records leave their contents in the data file, so
+  `pack` compacts an archive once they take up `COMPACT_FRACTION` of it:
+  the files still indexed are copied to new data and index files, the new
+  index is renamed to a ready marker once both are complete, and then the
+  two are renamed over the old ones. A compaction cut short before the
+  marker is written is abandoned, and one cut short after it is finished
+  by the next read of the index.
+"""
+
+import json
+import os
+import shutil
+import struct
+
+import autofile
+from mechlib.filesys import _lock
+
+
+ARCHIVE_NAME = '.archive'
+INDEX_NAME = '.archive.idx'
+LOCS_NAME = '.locs'
+# Compact an archive once this fraction of its data file is no longer indexed
+COMPACT_FRACTION = 0.5
+# Filesystems with one directory per point, by the name of their top directory
+PACKABLE = {
+    'SCANS': 'scan',
+    'CSCANS': 'cscan',
+    'TAU': 'tau',
+}
+
+_ENTRY = struct.Struct('<HQI')
+# The offset of a removal record
+_REMOVED = 2 ** 64 - 1
+# Suffixes of the files of a compaction in progress, and of its ready marker
+_NEW_SUFFIX = '.new'
+_READY_SUFFIX = '.ready'
+
+# Whether each directory holds an archive, and the index and point
+# locators of each archive
+_ARCHIVE_DIRS = {}
+_INDEXES = {}
+_LOCS = {}
+
+
+def read_data_file(dfile, dir_pth, read_):
+    """ Read an autofile data file, from its archive if it is not on disk
+
+        :param dfile: the data file
+        :type dfile: autofile.model.DataFile
+        :param dir_pth: the directory holding the file
+        :type dir_pth: str
+        :param read_: autofile's own read method
+        :type read_: callable
+    """
+    path = dfile.path(dir_pth)
+    reader_ = getattr(dfile, 'reader_', None)
+    if reader_ is None or os.path.exists(path):
+        return read_(dfile, dir_pth)
+    found = find(path)
+    if found is None:
+        # Let autofile report the missing file
+        return read_(dfile, dir_pth)
+    return reader_(read_bytes(*found).decode('utf-8'))
+
+
+def prepare_write(dir_pth):
+    """ Get a directory ready for a data file to be written to it, which
+        writes the point holding it out of its archive if it is packed
+
+        :param dir_pth: the directory the file will be written to
+        :type dir_pth: str
+    """
+    found = _packed_point(dir_pth)
+    if found is not None:
+        _unpack_point(*found)
+        if not os.path.isdir(dir_pth):
+            os.makedirs(dir_pth, exist_ok=True)
+
+
+def remove(path):
+    """ Drop a file or directory, such as a point, from its archive
+
+        The files on disk, if any, are left alone.
+
+        :param path: path to the file or directory
+        :type path: str
+        :return: whether it was in an archive
+        :rtype: bool
+    """
+    path = os.path.normpath(path)
+    for arc_dir in _archive_dirs(path):
+        key = os.path.relpath(path, arc_dir)
+        keys, dirs = index(arc_dir)
+        if key in keys or key in dirs:
+            _append_removal(arc_dir, key)
+            return True
+    return False
+
+
+def series_exists(dsr, *args, **kwargs):
+    """ Determine whether a layer holds a packed point at some locators
+
+        :param dsr: the layer, such as scn_fs[-1]
+        :type dsr: autofile.model.DataSeries
+        :rtype: bool
+    """
+    return is_archived_dir(dsr.path(*args, **kwargs))
+
+
+def series_existing(dsr, locs_lst, *args, **kwargs):
+    """ Add the packed points of a layer to the points that are on disk
+
+        :param dsr: the layer, such as scn_fs[-1]
+        :type dsr: autofile.model.DataSeries
+        :param locs_lst: the locators of the points on disk, from autofile
+        :type locs_lst: list
+        :param args: the arguments `existing` was called with
+        :rtype: list
+    """
+    if kwargs or len(args) > 1:
+        return locs_lst
+    root_locs = args[0] if args else ()
+    return locs_lst + [locs for locs in archived_locs(dsr, root_locs)
+                       if not os.path.isdir(dsr.path(locs))]
+
+
+def append(arc_dir, files):
+    """ Append files to the archive in a directory, creating it if needed
+
+        :param arc_dir: path to the directory holding the archive
+        :type arc_dir: str
+        :param files: the key (path relative to `arc_dir`) and contents of
+            each file
+        :type files: tuple((str, bytes))
+    """
+    data_path = os.path.join(arc_dir, ARCHIVE_NAME)
+    with _lock.locked(data_path):
+        with open(data_path, 'ab') as fobj:
+            offset = fobj.seek(0, os.SEEK_END)
+            entries = []
+            for key, contents in files:
+                fobj.write(contents)
+                key = key.encode('utf-8')
+                entries.append(_ENTRY.pack(len(key), offset, len(contents))
+                               + key)
+                offset += len(contents)
+            fobj.flush()
+            os.fsync(fobj.fileno())
+
+        # The index is written after the data, so it never points past it
+        with open(os.path.join(arc_dir, INDEX_NAME), 'ab') as fobj:
+            fobj.write(b''.join(entries))
+            fobj.flush()
+            os.fsync(fobj.fileno())
+
+    _ARCHIVE_DIRS[os.path.normpath(arc_dir)] = True
+
+
+def _append_removal(arc_dir, key):
+    """ Append a removal record for a key, and everything below it, to the
+        index of an archive
+    """
+    data_path = os.path.join(arc_dir, ARCHIVE_NAME)
+    key = key.encode('utf-8')
+    with _lock.locked(data_path):
+        with open(os.path.join(arc_dir, INDEX_NAME), 'ab') as fobj:
+            fobj.write(_ENTRY.pack(len(key), _REMOVED, 0) + key)
+            fobj.flush()
+            os.fsync(fobj.fileno())
+
+
+def read_bytes(arc_dir, key):
+    """ Read a file from an archive
+
+        :param arc_dir: path to the directory holding the archive
+        :type arc_dir: str
+        :param key: path of the file relative to `arc_dir`
+        :type key: str
+        :rtype: bytes
+    """
+    offset, size = index(arc_dir)[0][key]
+    with open(os.path.join(arc_dir, ARCHIVE_NAME), 'rb') as fobj:
+        fobj.seek(offset)
+        return fobj.read(size)
+
+
+def index(arc_dir):
+    """ The index of an archive, reading it again if it has changed
+
+        :param arc_dir: path to the directory holding the archive
+        :type arc_dir: str
+        :return: the offset and size of each key, and the set of directories
+            that hold a key, relative to `arc_dir`
+        :rtype: (dict[str, (int, int)], set[str])
+    """
+    arc_dir = os.path.normpath(arc_dir)
+    idx_path = os.path.join(arc_dir, INDEX_NAME)
+    try:
+        stat = os.stat(idx_path)
+    except FileNotFoundError:
+        stat = None
+
+    cached = _INDEXES.get(arc_dir)
+    if (stat is not None and cached is not None and
+            cached[:2] == (stat.st_mtime_ns, stat.st_size)):
+        return cached[2:]
+
+    if _finish_compaction(arc_dir):
+        stat = os.stat(idx_path)
+    if stat is None:
+        _INDEXES.pop(arc_dir, None)
+        return {}, set()
+
+    with open(idx_path, 'rb') as fobj:
+        buf = fobj.read()
+    keys, dirs = {}, set()
+    pos = 0
+    # An entry cut short by a crash is ignored
+    while pos + _ENTRY.size <= len(buf):
+        nkey, offset, size = _ENTRY.unpack_from(buf, pos)
+        pos += _ENTRY.size
+        if pos + nkey > len(buf):
+            break
+        key = buf[pos:pos+nkey].decode('utf-8')
+        pos += nkey
+        if offset == _REMOVED:
+            prefix = key + os.sep
+            keys = {key_: val for key_, val in keys.items()
+                    if key_ != key and not key_.startswith(prefix)}
+        else:
+            keys[key] = (offset, size)
+
+    for key in keys:
+        key_dir = os.path.dirname(key)
+        while key_dir and key_dir not in dirs:
+            dirs.add(key_dir)
+            key_dir = os.path.dirname(key_dir)
+
+    _INDEXES[arc_dir] = (stat.st_mtime_ns, stat.st_size, keys, dirs)
+    return keys, dirs
+
+
+def find(path):
+    """ Find the archive holding a file, if there is one
+
+        :param path: path to the file
+        :type path: str
+        :return: the directory holding the archive and the key of the file,
+            or None
+        :rtype: (str, str)
+    """
+    path = os.path.normpath(path)
+    for arc_dir in _archive_dirs(path):
+        key = os.path.relpath(path, arc_dir)
+        if key in index(arc_dir)[0]:
+            return arc_dir, key
+    return None
+
+
+def is_archived_dir(path):
+    """ Determine whether an archive holds files in a directory
+
+        :param path: path to the directory
+        :type path: str
+        :rtype: bool
+    """
+    path = os.path.normpath(path)
+    return any(os.path.relpath(path, arc_dir) in index(arc_dir)[1]
+               for arc_dir in _archive_dirs(path))
+
+
+def archived_locs(dsr, root_locs=()):
+    """ The locators of the packed points of a layer
+
+        :param dsr: the point layer of the filesystem, such as scn_fs[-1]
+        :type dsr: autofile.model.DataSeries
+        :param root_locs: only return the points under these locators
+        :rtype: list
+    """
+    arc_dir = _series_dir(dsr)
+    if arc_dir is None:
+        return []
+
+    root_locs = _normalized(list(root_locs))
+    locs_lst = []
+    for point_key, locs in _point_locs(arc_dir):
+        if locs[:len(root_locs)] != root_locs:
+            continue
+        # Skip the points of other layers in the same archive
+        try:
+            point_path = os.path.normpath(dsr.path(locs))
+        except Exception:  # pylint: disable=broad-except
+            continue
+        if point_path == os.path.join(arc_dir, point_key):
+            locs_lst.append(locs)
+    return locs_lst
+
+
+def pack(fs_, remove=True):
+    """ Move the points of a scan or tau filesystem into its archive
+
+        Each point is appended with its locators, and its directory is only
+        removed once it is in the archive, so packing can be interrupted and
+        run again.
+
+        :param fs_: the filesystem, such as `autofile.fs.scan(zma_path)`
+        :type fs_: tuple(autofile.model.DataSeries)
+        :param remove: remove the point directories once they are packed?
+        :type remove: bool
+        :return: the number of points packed
+        :rtype: int
+    """
+    arc_dir = os.path.normpath(fs_[0].path())
+    npts = 0
+    for locs in series_existing_on_disk(fs_[-1]):
+        point_path = os.path.normpath(fs_[-1].path(locs))
+        point_key = os.path.relpath(point_path, arc_dir)
+        files = [(os.path.join(point_key, LOCS_NAME),
+                  json.dumps(_normalized(locs)).encode('utf-8'))]
+        for dir_path, _, file_names in os.walk(point_path):
+            for name in sorted(file_names):
+                if name.endswith(('.lock', '.tmp')):
+                    continue
+                path = os.path.join(dir_path, name)
+                with open(path, 'rb') as fobj:
+                    files.append((os.path.relpath(path, arc_dir), fobj.read()))
+        append(arc_dir, files)
+        npts += 1
+
+        if remove:
+            shutil.rmtree(point_path)
+            _remove_empty_dirs(os.path.dirname(point_path), arc_dir)
+
+    compact(arc_dir)
+    return npts
+
+
+def compact(arc_dir, min_fraction=COMPACT_FRACTION):
+    """ Rewrite an archive with only the files it still indexes, if enough
+        of its data file is taken up by replaced and removed records
+
+        Like packing, run this while no jobs are using the filesystem.
+
+        :param arc_dir: path to the directory holding the archive
+        :type arc_dir: str
+        :param min_fraction: the fraction of the data file that has to be
+            unused for it to be rewritten
+        :type min_fraction: float
+        :return: the number of bytes reclaimed
+        :rtype: int
+    """
+    arc_dir = os.path.normpath(arc_dir)
+    data_path = os.path.join(arc_dir, ARCHIVE_NAME)
+    idx_path = os.path.join(arc_dir, INDEX_NAME)
+    if not os.path.exists(data_path):
+        return 0
+
+    with _lock.locked(data_path):
+        keys, _ = index(arc_dir)
+        total = os.path.getsize(data_path)
+        nunused = total - sum(size for _, size in keys.values())
+        if nunused <= 0 or nunused < min_fraction * total:
+            return 0
+
+        new_data_path = data_path + _NEW_SUFFIX
+        new_idx_path = idx_path + _NEW_SUFFIX
+        entries = []
+        with open(data_path, 'rb') as src, open(new_data_path, 'wb') as dst:
+            offset = 0
+            for key, (old_offset, size) in sorted(
+                    keys.items(), key=lambda item: item[1][0]):
+                src.seek(old_offset)
+                dst.write(src.read(size))
+                key = key.encode('utf-8')
+                entries.append(_ENTRY.pack(len(key), offset, size) + key)
+                offset += size
+            dst.flush()
+            os.fsync(dst.fileno())
+        with open(new_idx_path, 'wb') as fobj:
+            fobj.write(b''.join(entries))
+            fobj.flush()
+            os.fsync(fobj.fileno())
+
+        # Once the marker is there, the compaction is always finished
+        os.replace(new_idx_path, idx_path + _READY_SUFFIX)
+        _finish_compaction(arc_dir)
+
+    return nunused
+
+
+def unpack(fs_):
+    """ Write the points of a scan or tau filesystem back out of its archive,
+        and remove the archive
+
+        :param fs_: the filesystem, such as `autofile.fs.scan(zma_path)`
+        :type fs_: tuple(autofile.model.DataSeries)
+        :return: the number of files written
+        :rtype: int
+    """
+    arc_dir = os.path.normpath(fs_[0].path())
+    keys, _ = index(arc_dir)
+    nfiles = 0
+    for key in keys:
+        if os.path.basename(key) == LOCS_NAME:
+            continue
+        path = os.path.join(arc_dir, key)
+        # Files written since the point was packed are newer
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _lock.atomic_write(path, read_bytes(arc_dir, key))
+            nfiles += 1
+
+    data_path = os.path.join(arc_dir, ARCHIVE_NAME)
+    idx_path = os.path.join(arc_dir, INDEX_NAME)
+    for path in (idx_path, data_path,
+                 idx_path + _READY_SUFFIX, idx_path + _NEW_SUFFIX,
+                 data_path + _NEW_SUFFIX,
+                 _lock._hidden_path(data_path, _lock.LOCK_SUFFIX)):
+        if os.path.exists(path):
+            os.remove(path)
+    invalidate()
+    return nfiles
+
+
+def pack_tree(save_prefix, unpack_=False):
+    """ Pack (or unpack) every scan and tau filesystem under a save prefix
+
+        Run this while no jobs are writing to the save filesystem.
+
+        :param save_prefix: the save filesystem prefix
+        :type save_prefix: str
+        :param unpack_: unpack the filesystems instead?
+        :type unpack_: bool
+        :return: the number of filesystems, and the number of points packed
+            (or files unpacked)
+        :rtype: (int, int)
+    """
+    nfs, count = 0, 0
+    for path, dirnames, _ in os.walk(save_prefix):
+        for name, fs_name in PACKABLE.items():
+            if name in dirnames:
+                fs_ = getattr(autofile.fs, fs_name)(path)
+                count += unpack(fs_) if unpack_ else pack(fs_)
+                nfs += 1
+                # Points don't hold further scans or samples
+                dirnames.remove(name)
+    invalidate()
+    return nfs, count
+
+
+def series_existing_on_disk(dsr, root_locs=()):
+    """ The locators of the points of a layer that are on disk, leaving out
+        the packed points
+
+        :param dsr: the point layer of the filesystem, such as scn_fs[-1]
+        :type dsr: autofile.model.DataSeries
+        :rtype: list
+    """
+    return [locs for locs in dsr.existing(root_locs)
+            if os.path.isdir(dsr.path(locs))]
+
+
+def invalidate():
+    """ Forget which directories hold archives, after archives are created
+        or removed by another process
+    """
+    _ARCHIVE_DIRS.clear()
+    _INDEXES.clear()
+    _LOCS.clear()
+
+
+def _archive_dirs(path):
+    """ The directories above a path that hold archives, nearest first
+
+        Only the top directories of packable filesystems are checked, so
+        paths elsewhere in the save filesystem cost no more than walking up
+        the path.
+    """
+    dir_path = os.path.dirname(path)
+    while True:
+        if os.path.basename(dir_path) in PACKABLE:
+            has_archive = _ARCHIVE_DIRS.get(dir_path)
+            if has_archive is None:
+                has_archive = os.path.exists(
+                    os.path.join(dir_path, INDEX_NAME))
+                _ARCHIVE_DIRS[dir_path] = has_archive
+            if has_archive:
+                yield dir_path
+        parent = os.path.dirname(dir_path)
+        if parent == dir_path:
+            return
+        dir_path = parent
+
+
+def _packed_point(path):
+    """ The archive directory and key of the packed point holding a path, if
+        it is in one
+    """
+    path = os.path.normpath(path)
+    for arc_dir in _archive_dirs(path):
+        keys, _ = index(arc_dir)
+        key = os.path.relpath(path, arc_dir)
+        while key and key != os.curdir:
+            if os.path.join(key, LOCS_NAME) in keys:
+                return arc_dir, key
+            key = os.path.dirname(key)
+    return None
+
+
+def _unpack_point(arc_dir, point_key):
+    """ Write the files of a packed point out of its archive, and drop it
+        from the archive
+    """
+    keys, _ = index(arc_dir)
+    prefix = point_key + os.sep
+    for key in keys:
+        if not key.startswith(prefix) or os.path.basename(key) == LOCS_NAME:
+            continue
+        path = os.path.join(arc_dir, key)
+        # Files written since the point was packed are newer
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _lock.atomic_write(path, read_bytes(arc_dir, key))
+    os.makedirs(os.path.join(arc_dir, point_key), exist_ok=True)
+    _append_removal(arc_dir, point_key)
+
+
+def _finish_compaction(arc_dir):
+    """ Move the data and index files of a compaction over the old ones, if
+        a compaction is ready; returns whether one was
+    """
+    data_path = os.path.join(arc_dir, ARCHIVE_NAME)
+    idx_path = os.path.join(arc_dir, INDEX_NAME)
+    ready_path = idx_path + _READY_SUFFIX
+    if not os.path.exists(ready_path):
+        return False
+
+    try:
+        if os.path.exists(data_path + _NEW_SUFFIX):
+            os.replace(data_path + _NEW_SUFFIX, data_path)
+        os.replace(ready_path, idx_path)
+    except FileNotFoundError:
+        # Another process finished it
+        pass
+    _INDEXES.pop(arc_dir, None)
+    _LOCS.pop(arc_dir, None)
+    return True
+
+
+def _point_locs(arc_dir):
+    """ The key and locators of each point in an archive, reading them in one
+        pass and caching them until the index changes
+    """
+    keys, _ = index(arc_dir)
+    if not keys:
+        return []
+    version = _INDEXES[arc_dir][:2]
+    cached = _LOCS.get(arc_dir)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    point_locs = []
+    with open(os.path.join(arc_dir, ARCHIVE_NAME), 'rb') as fobj:
+        for key, (offset, size) in keys.items():
+            if os.path.basename(key) == LOCS_NAME:
+                fobj.seek(offset)
+                point_locs.append(
+                    (os.path.dirname(key), json.loads(fobj.read(size))))
+    _LOCS[arc_dir] = (version, point_locs)
+    return point_locs
+
+
+def _series_dir(dsr):
+    """ The top directory of the filesystem a layer belongs to, which is
+        where its archive is
+    """
+    top = dsr
+    while getattr(top, 'root', None) is not None:
+        top = top.root
+    try:
+        return os.path.normpath(top.path())
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+
+def _remove_empty_dirs(dir_path, stop_path):
+    """ Remove empty directories from a directory up to a stopping directory
+    """
+    while dir_path.startswith(stop_path + os.sep):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            return
+        dir_path = os.path.dirname(dir_path)
+
+
+def _normalized(locs):
+    """ Locators as they read back from JSON, with tuples as lists
+    """
+    return json.loads(json.dumps(locs))
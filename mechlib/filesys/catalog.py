@@ -0,0 +1,456 @@
+"""
+  Catalog of the conformers in a save filesystem
+
+  The catalog is an SQLite database in the save prefix, which indexes each
+  conformer directory (keyed by its path relative to the prefix, which
+  encodes the species or reaction locators, the theory locators, and the
+  ring and conformer ids) to its single-point energies, zero-point energy,
+  geometry hash, and file existence flags. It lets `mincnf` list and sort the
+  conformers at a level of theory without walking the directories and
+  reading each conformer's files, which is slow on network filesystems.
+
+  The catalog is optional: it is created by `rebuild` (`automech fs
+  rebuild-index`), and, once it exists, conformers and energies saved through
+  `mechlib.filesys.save` are added to it, and conformers removed by the
+  electronic structure routines are removed from it (`remove_conformer`).
+  Conformers whose directories have gone missing anyway are dropped when
+  they are listed. A conformer directory that is not yet indexed is walked
+  once and then indexed. Anything the catalog does not know about is read
+  from the filesystem, and any database error turns the catalog off for the
+  rest of the process, so it never stops a run.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+
+import autofile
+from phydat import phycon
+from mechlib.amech_io import printer as ioprinter
+
+
+CATALOG_NAME = '.catalog.sqlite'
+TIMEOUT = 60.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS conformers (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    rid TEXT NOT NULL,
+    cid TEXT NOT NULL,
+    geo_hash TEXT,
+    has_geo INTEGER NOT NULL DEFAULT 0,
+    has_zma INTEGER NOT NULL DEFAULT 0,
+    has_hess INTEGER NOT NULL DEFAULT 0,
+    zpe REAL
+);
+CREATE INDEX IF NOT EXISTS conformers_root ON conformers (root);
+CREATE TABLE IF NOT EXISTS energies (
+    path TEXT NOT NULL,
+    thy TEXT NOT NULL,
+    energy REAL NOT NULL,
+    PRIMARY KEY (path, thy)
+);
+"""
+
+# Directory -> catalog path (or None), so that the parent directories are
+# only searched once per process
+_CATALOG_PATHS = {}
+_DISABLED = {'disabled': False}
+
+
+def find_catalog(path):
+    """ Find the catalog that a path in the save filesystem belongs to, by
+        searching it and its parent directories
+
+        :param path: a path in the save filesystem
+        :type path: str
+        :rtype: str or None
+    """
+
+    if _DISABLED['disabled']:
+        return None
+
+    path = os.path.abspath(path)
+    searched = []
+    cat_path = None
+    while True:
+        if path in _CATALOG_PATHS:
+            cat_path = _CATALOG_PATHS[path]
+            break
+        searched.append(path)
+        if os.path.exists(os.path.join(path, CATALOG_NAME)):
+            cat_path = os.path.join(path, CATALOG_NAME)
+            break
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+    for searched_path in searched:
+        _CATALOG_PATHS[searched_path] = cat_path
+
+    return cat_path
+
+
+# Queries used by mincnf
+def conformer_locators(cnf_fs):
+    """ Get the locators of the conformers in a conformer filesystem,
+        from the catalog if it has been indexed, and otherwise by walking
+        the filesystem (and then indexing it)
+
+        :param cnf_fs: CONF object with save filesys prefix
+        :type cnf_fs: autofile.fs.conformer obj
+        :rtype: tuple(list(str))
+    """
+
+    cat_path = find_catalog(cnf_fs[0].path())
+    if cat_path is None:
+        return cnf_fs[-1].existing()
+
+    root = _relpath(cnf_fs[0].path(), cat_path)
+    with _connect(cat_path) as con:
+        if con is not None:
+            if con.execute('SELECT 1 FROM roots WHERE root = ?',
+                           (root,)).fetchone():
+                rows = con.execute(
+                    'SELECT rid, cid FROM conformers WHERE root = ? '
+                    'AND has_geo ORDER BY rid, cid', (root,)).fetchall()
+                # Drop conformers that were removed without updating the
+                # catalog, such as by hand or by an older version
+                locs_lst, gone = [], []
+                for rid, cid in rows:
+                    path = cnf_fs[-1].path([rid, cid])
+                    if os.path.isdir(path):
+                        locs_lst.append([rid, cid])
+                    else:
+                        gone.append(_relpath(path, cat_path))
+                _delete(con, gone)
+                return tuple(locs_lst)
+
+    locs_lst = cnf_fs[-1].existing()
+    index_conformers(cnf_fs, locs_lst)
+    return locs_lst
+
+
+def sort_energies(cnf_fs, locs_lst, sp_locs, zpe=False):
+    """ Get the single-point energies, plus the zero-point energies if
+        requested, of conformers from the catalog
+
+        Conformers that are missing from the catalog or lack the energy are
+        left out, so they can be read from the filesystem instead.
+
+        :param cnf_fs: CONF object with save filesys prefix
+        :type cnf_fs: autofile.fs.conformer obj
+        :param locs_lst: the conformer locators
+        :type locs_lst: tuple(list(str))
+        :param sp_locs: the theory locators of the single-point energies
+        :type sp_locs: tuple(str)
+        :param zpe: add the zero-point energy?
+        :type zpe: bool
+        :rtype: dict[tuple(str), float]
+    """
+
+    cat_path = find_catalog(cnf_fs[0].path())
+    if cat_path is None:
+        return {}
+
+    paths = {_relpath(cnf_fs[-1].path(locs), cat_path): tuple(locs)
+             for locs in locs_lst}
+    ene_dct = {}
+    with _connect(cat_path) as con:
+        if con is not None:
+            rows = con.execute(
+                'SELECT c.path, e.energy, c.zpe FROM conformers AS c '
+                'JOIN energies AS e ON e.path = c.path '
+                'WHERE c.root = ? AND c.has_geo AND e.thy = ?',
+                (_relpath(cnf_fs[0].path(), cat_path), _thy_key(sp_locs)))
+            for path, ene, zpe_ in rows:
+                if path in paths:
+                    if not zpe:
+                        ene_dct[paths[path]] = ene
+                    elif zpe_ is not None:
+                        ene_dct[paths[path]] = ene + zpe_
+
+    return ene_dct
+
+
+# Updates used by save
+def record_conformer(cnf_fs, locs, geo=None, freqs=None):
+    """ Add or update a conformer in the catalog, if there is one
+
+        :param cnf_fs: CONF object with save filesys prefix
+        :type cnf_fs: autofile.fs.conformer obj
+        :param locs: the conformer locators
+        :type locs: list(str)
+        :param geo: the geometry, if it was saved
+        :param freqs: the harmonic frequencies, if they were saved
+    """
+
+    cat_path = find_catalog(cnf_fs[0].path())
+    if cat_path is None:
+        return
+
+    root = _relpath(cnf_fs[0].path(), cat_path)
+    path = _relpath(cnf_fs[-1].path(locs), cat_path)
+    with _connect(cat_path) as con:
+        if con is not None:
+            con.execute(
+                'INSERT INTO conformers (path, root, rid, cid, has_zma) '
+                'VALUES (?, ?, ?, ?, 1) ON CONFLICT (path) DO NOTHING',
+                (path, root, *locs))
+            if geo is not None:
+                con.execute(
+                    'UPDATE conformers SET has_geo = 1, geo_hash = ? '
+                    'WHERE path = ?', (geometry_hash(geo), path))
+            if freqs is not None:
+                con.execute(
+                    'UPDATE conformers SET has_hess = 1, zpe = ? '
+                    'WHERE path = ?', (_zpe(freqs), path))
+
+
+def record_energy(cnf_path, sp_locs, ene):
+    """ Add or update a single-point energy in the catalog, if there is one
+
+        :param cnf_path: path to the conformer the energy is for
+        :type cnf_path: str
+        :param sp_locs: the theory locators of the energy
+        :type sp_locs: tuple(str)
+        :param ene: the energy
+        :type ene: float
+    """
+
+    cat_path = find_catalog(cnf_path)
+    if cat_path is None or ene is None:
+        return
+
+    with _connect(cat_path) as con:
+        if con is not None:
+            con.execute(
+                'INSERT OR REPLACE INTO energies (path, thy, energy) '
+                'VALUES (?, ?, ?)',
+                (_relpath(cnf_path, cat_path), _thy_key(sp_locs), ene))
+
+
+def record_frequencies(cnf_path, freqs):
+    """ Update the zero-point energy of a conformer in the catalog, if there
+        is one
+
+        :param cnf_path: path to the conformer the frequencies are for
+        :type cnf_path: str
+        :param freqs: the harmonic frequencies
+        :type freqs: tuple(float)
+    """
+
+    cat_path = find_catalog(cnf_path)
+    if cat_path is None:
+        return
+
+    with _connect(cat_path) as con:
+        if con is not None:
+            con.execute(
+                'UPDATE conformers SET has_hess = 1, zpe = ? WHERE path = ?',
+                (_zpe(freqs), _relpath(cnf_path, cat_path)))
+
+
+def remove_conformer(cnf_fs, locs):
+    """ Remove a conformer from the catalog, if there is one, after its
+        directory has been removed from the filesystem
+
+        :param cnf_fs: CONF object with save filesys prefix
+        :type cnf_fs: autofile.fs.conformer obj
+        :param locs: the conformer locators
+        :type locs: list(str)
+    """
+
+    cat_path = find_catalog(cnf_fs[0].path())
+    if cat_path is None:
+        return
+
+    with _connect(cat_path) as con:
+        if con is not None:
+            _delete(con, [_relpath(cnf_fs[-1].path(locs), cat_path)])
+
+
+# Indexing
+def index_conformers(cnf_fs, locs_lst):
+    """ Read conformers from the filesystem into the catalog, and mark the
+        conformer filesystem as indexed
+
+        :param cnf_fs: CONF object with save filesys prefix
+        :type cnf_fs: autofile.fs.conformer obj
+        :param locs_lst: the locators of every conformer in the filesystem
+        :type locs_lst: tuple(list(str))
+    """
+
+    cat_path = find_catalog(cnf_fs[0].path())
+    if cat_path is None:
+        return
+
+    root = _relpath(cnf_fs[0].path(), cat_path)
+    rows, ene_rows = [], []
+    for locs in locs_lst:
+        path = cnf_fs[-1].path(locs)
+        geo, freqs = None, None
+        if cnf_fs[-1].file.geometry.exists(locs):
+            geo = cnf_fs[-1].file.geometry.read(locs)
+        if cnf_fs[-1].file.harmonic_frequencies.exists(locs):
+            freqs = cnf_fs[-1].file.harmonic_frequencies.read(locs)
+        zma_fs = autofile.fs.zmatrix(path)
+        rows.append((
+            _relpath(path, cat_path), root, *locs,
+            None if geo is None else geometry_hash(geo),
+            int(geo is not None),
+            int(zma_fs[-1].file.zmatrix.exists((0,))),
+            int(freqs is not None),
+            None if freqs is None else _zpe(freqs)))
+
+        sp_fs = autofile.fs.single_point(path)
+        for sp_locs in sp_fs[-1].existing():
+            if sp_fs[-1].file.energy.exists(sp_locs):
+                ene_rows.append((
+                    _relpath(path, cat_path), _thy_key(sp_locs),
+                    sp_fs[-1].file.energy.read(sp_locs)))
+
+    with _connect(cat_path) as con:
+        if con is not None:
+            con.executemany(
+                'INSERT OR REPLACE INTO conformers VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            con.executemany(
+                'INSERT OR REPLACE INTO energies VALUES (?, ?, ?)', ene_rows)
+            con.execute(
+                'INSERT OR IGNORE INTO roots VALUES (?)', (root,))
+
+
+def rebuild(save_prefix):
+    """ Create the catalog for a save filesystem, or rebuild it from
+        scratch, by walking every conformer filesystem under the prefix
+
+        :param save_prefix: the save filesystem prefix
+        :type save_prefix: str
+        :return: the number of conformers indexed
+        :rtype: int
+    """
+
+    save_prefix = os.path.abspath(save_prefix)
+    cat_path = os.path.join(save_prefix, CATALOG_NAME)
+    tmp_path = cat_path + f'.{os.getpid()}.tmp'
+    with contextlib.closing(sqlite3.connect(tmp_path)) as con:
+        con.executescript(_SCHEMA)
+
+    # Index into a temporary catalog, and then swap it in
+    _CATALOG_PATHS.clear()
+    _CATALOG_PATHS[save_prefix] = tmp_path
+    count = 0
+    try:
+        for cnf_prefix in conformer_prefixes(save_prefix):
+            cnf_fs = autofile.fs.conformer(cnf_prefix)
+            locs_lst = cnf_fs[-1].existing()
+            ioprinter.info_message(
+                f'Indexing {len(locs_lst)} conformers in {cnf_prefix}')
+            index_conformers(cnf_fs, locs_lst)
+            count += len(locs_lst)
+        os.replace(tmp_path, cat_path)
+    finally:
+        _CATALOG_PATHS.clear()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return count
+
+
+def geometry_hash(geo):
+    """ Hash a geometry, rounded so that the hash does not change when the
+        geometry is written and read back
+
+        :param geo: the geometry
+        :type geo: automol geometry data structure
+        :rtype: str
+    """
+    geo_str = ';'.join(
+        f'{sym},' + ','.join(f'{x:.6f}' for x in xyz) for sym, xyz in geo)
+    return hashlib.sha256(geo_str.encode()).hexdigest()[:16]
+
+
+def conformer_prefixes(save_prefix):
+    """ Find the prefix of each conformer filesystem under the save prefix
+
+        :param save_prefix: the save filesystem prefix
+        :type save_prefix: str
+        :rtype: iterator(str)
+    """
+    for path, dirnames, _ in os.walk(save_prefix):
+        if 'CONFS' in dirnames:
+            yield path
+            # The conformers themselves only hold SP, ZMAT, and other layers
+            dirnames.remove('CONFS')
+
+
+def invalidate():
+    """ Forget the catalogs found, and use the catalogs again if they were
+        turned off
+    """
+    _CATALOG_PATHS.clear()
+    _DISABLED['disabled'] = False
+
+
+@contextlib.contextmanager
+def _connect(cat_path):
+    """ Open the catalog in a transaction, yielding None (and turning the
+        catalog off) if it can't be used
+    """
+    try:
+        con = sqlite3.connect(cat_path, timeout=TIMEOUT)
+    except sqlite3.Error as err:
+        _disable(cat_path, err)
+        yield None
+        return
+
+    try:
+        with con:
+            yield con
+    except sqlite3.Error as err:
+        _disable(cat_path, err)
+    finally:
+        con.close()
+
+
+def _delete(con, paths):
+    """ Delete conformers and their energies from the catalog
+    """
+    rows = [(path,) for path in paths]
+    con.executemany('DELETE FROM conformers WHERE path = ?', rows)
+    con.executemany('DELETE FROM energies WHERE path = ?', rows)
+
+
+def _disable(cat_path, err):
+    """ Stop using the catalog for the rest of the process
+    """
+    ioprinter.warning_message(
+        f'Catalog {cat_path} could not be used ({err}); '
+        'reading the filesystem directly instead')
+    _DISABLED['disabled'] = True
+
+
+def _relpath(path, cat_path):
+    """ Path relative to the save prefix holding the catalog
+    """
+    return os.path.relpath(os.path.abspath(path), os.path.dirname(cat_path))
+
+
+def _thy_key(thy_locs):
+    """ Key for a set of theory locators
+    """
+    return json.dumps([str(loc) for loc in thy_locs])
+
+
+def _zpe(freqs):
+    """ Harmonic zero-point energy, counting only the real frequencies
+    """
+    return 0.5 * sum(freq for freq in freqs if freq > 0.) * phycon.WAVEN2EH
@@ -0,0 +1,185 @@
+"""
+  Integrity check of a save filesystem
+
+  `check` finds the conformer filesystems of every species and transition
+  state under the save prefix and checks them in a process pool, reading
+  each conformer's files with the autofile readers. It reports:
+   - no_conformers: a conformer filesystem with no conformers
+   - missing_geometry: a conformer without a geometry
+   - missing_energy: a conformer geometry without any single-point energy
+     (noting if the conformer is not marked complete, in which case another
+     process may still be saving it)
+   - running: a conformer whose geometry info says its job is still running
+   - missing_torsions: a z-matrix with rotors, but no torsions
+   - corrupt_<file>: a file that the autofile reader can't read
+  Each issue is a dictionary with the path of the conformer, relative to
+  the save prefix, the kind of issue, and details.
+"""
+
+import concurrent.futures
+import csv
+import json
+import os
+
+import autofile
+import automol
+from mechlib.filesys._complete import is_complete
+from mechlib.filesys.catalog import conformer_prefixes
+
+
+ISSUE_FIELDS = ('path', 'kind', 'detail')
+
+
+def check(save_prefix, nprocs=None):
+    """ Check every conformer in a save filesystem
+
+        :param save_prefix: the save filesystem prefix
+        :type save_prefix: str
+        :param nprocs: the number of processes (default: the number of CPUs)
+        :type nprocs: int
+        :return: the number of conformers checked, and the issues found
+        :rtype: (int, list(dict))
+    """
+    save_prefix = os.path.abspath(save_prefix)
+    cnf_prefixes = list(conformer_prefixes(save_prefix))
+
+    ncnfs, issues = 0, []
+    with concurrent.futures.ProcessPoolExecutor(nprocs) as executor:
+        for ncnfs_i, issues_i in executor.map(
+                check_conformers, cnf_prefixes,
+                [save_prefix] * len(cnf_prefixes), chunksize=4):
+            ncnfs += ncnfs_i
+            issues.extend(issues_i)
+
+    return ncnfs, issues
+
+
+def check_conformers(cnf_prefix, save_prefix):
+    """ Check the conformers of a conformer filesystem
+
+        :param cnf_prefix: the prefix of the conformer filesystem
+        :type cnf_prefix: str
+        :param save_prefix: the save filesystem prefix, which the paths in the
+            issues are relative to
+        :type save_prefix: str
+        :return: the number of conformers checked, and the issues found
+        :rtype: (int, list(dict))
+    """
+    cnf_fs = autofile.fs.conformer(cnf_prefix)
+    issues = []
+
+    def _issue(path, kind, detail=''):
+        issues.append({'path': os.path.relpath(path, save_prefix),
+                       'kind': kind, 'detail': detail})
+
+    try:
+        locs_lst = cnf_fs[-1].existing()
+    except Exception as err:  # pylint: disable=broad-except
+        _issue(cnf_prefix, 'corrupt_conformers', _error_string(err))
+        return 0, issues
+    if not locs_lst:
+        _issue(cnf_prefix, 'no_conformers')
+
+    for locs in locs_lst:
+        cnf_path = cnf_fs[-1].path(locs)
+
+        # Geometry and geometry info
+        geo, err = _read(cnf_fs[-1].file.geometry, locs)
+        if err is not None:
+            _issue(cnf_path, 'corrupt_geometry', err)
+        elif geo is None:
+            _issue(cnf_path, 'missing_geometry')
+        inf_obj, err = _read(cnf_fs[-1].file.geometry_info, locs)
+        if err is not None:
+            _issue(cnf_path, 'corrupt_info', err)
+        elif (inf_obj is not None and getattr(inf_obj, 'status', None) ==
+                autofile.schema.RunStatus.RUNNING):
+            _issue(cnf_path, 'running')
+
+        # Hessian and frequencies
+        for name in ('hessian', 'harmonic_frequencies'):
+            _, err = _read(getattr(cnf_fs[-1].file, name), locs)
+            if err is not None:
+                _issue(cnf_path, f'corrupt_{name}', err)
+
+        # Energies
+        sp_fs = autofile.fs.single_point(cnf_path)
+        enes = []
+        for sp_locs in sp_fs[-1].existing():
+            ene, err = _read(sp_fs[-1].file.energy, sp_locs)
+            if err is not None:
+                _issue(cnf_path, 'corrupt_energy',
+                       f'{"/".join(map(str, sp_locs))}: {err}')
+            elif ene is not None:
+                enes.append(ene)
+        if geo is not None and not enes:
+            # Another process may still be saving a conformer that isn't
+            # marked complete
+            _issue(cnf_path, 'missing_energy',
+                   '' if is_complete(cnf_path) else 'not marked complete')
+
+        # Z-matrix and torsions
+        zma_fs = autofile.fs.zmatrix(cnf_path)
+        zma, err = _read(zma_fs[-1].file.zmatrix, (0,))
+        if err is not None:
+            _issue(cnf_path, 'corrupt_zmatrix', err)
+        _, tors_err = _read(zma_fs[-1].file.torsions, (0,))
+        if tors_err is not None:
+            _issue(cnf_path, 'corrupt_torsions', tors_err)
+        elif (zma is not None and
+                not zma_fs[-1].file.torsions.exists((0,)) and
+                _has_rotors(zma)):
+            # Torsions are only saved for z-matrices with rotors
+            _issue(cnf_path, 'missing_torsions')
+
+    return len(locs_lst), issues
+
+
+def write_report(issues, path):
+    """ Write the issues to a JSON or CSV file, by its extension
+
+        :param issues: the issues
+        :type issues: list(dict)
+        :param path: path to the report (.json or .csv)
+        :type path: str
+    """
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as fobj:
+            writer = csv.DictWriter(fobj, fieldnames=ISSUE_FIELDS)
+            writer.writeheader()
+            writer.writerows(issues)
+    else:
+        counts = {}
+        for issue in issues:
+            counts[issue['kind']] = counts.get(issue['kind'], 0) + 1
+        with open(path, 'w', encoding='utf-8') as fobj:
+            json.dump({'counts': counts, 'issues': issues}, fobj, indent=1)
+
+
+def _has_rotors(zma):
+    """ Determine whether a z-matrix has rotors, as they are found when its
+        torsions are saved (which, for a transition state, also uses the
+        reaction graph, so this errs on the side of no rotors)
+    """
+    try:
+        return bool(automol.data.rotor.rotors_from_zmatrix(zma))
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def _read(ds_file, locs):
+    """ Read a file if it exists, returning the value (or None, if it
+        doesn't exist) and the error message (or None, if it was read)
+    """
+    try:
+        if not ds_file.exists(locs):
+            return None, None
+        return ds_file.read(locs), None
+    except Exception as err:  # pylint: disable=broad-except
+        return None, _error_string(err)
+
+
+def _error_string(err):
+    """ A one-line description of an error
+    """
+    return f'{type(err).__name__}: {err}'.splitlines()[0]
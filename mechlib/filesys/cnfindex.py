@@ -0,0 +1,283 @@
+"""
+  In-memory uniqueness index of the conformers in a save filesystem
+
+  Saving a conformer checks it against every conformer already saved at the
+  same level of theory: for a duplicate geometry (among conformers with
+  nearly the same energy), for a symmetric duplicate, and for the ring
+  conformer (rid) it belongs to. Reading every saved geometry and energy
+  again for each save makes a sampling run quadratic in file reads.
+
+  The index holds the locators, geometries, and energies (as an array) of
+  the saved conformers of one conformer filesystem and level of theory,
+  along with the ring-fragment Z-Matrix of each rid. It is loaded once per
+  process and kept up to date in place as conformers are saved; `load`
+  only lists the filesystem again, to pick up conformers saved by other
+  processes, and reads the files of those alone.
+"""
+
+import functools
+import os
+
+import numpy
+import autofile
+import automol
+from mechlib.amech_io.printer import info_message
+from mechlib.filesys._complete import wait_for_save
+
+
+# Loaded indexes, by conformer filesystem prefix and theory locators
+_INDEXES = {}
+
+# Energy difference below which conformers are compared by geometry
+ENE_THRESH = 1.0e-5
+
+
+def load(cnf_save_fs, mod_thy_info, refresh=True):
+    """ Load the index of a conformer filesystem, reading only the
+        conformers that aren't in it yet
+
+        :param cnf_save_fs: CONFORMER object with save filesys prefix
+        :type cnf_save_fs: autofile.fs.conformer obj
+        :param mod_thy_info: the theory of the energies
+        :type mod_thy_info: tuple(str)
+        :param refresh: list the filesystem for conformers saved by other
+            processes? (otherwise, only read it the first time)
+        :type refresh: bool
+        :rtype: dict
+    """
+    thy_locs = tuple(mod_thy_info[1:4])
+    key = (os.path.normpath(cnf_save_fs[0].path()), thy_locs)
+    cnf_idx = _INDEXES.get(key)
+    if cnf_idx is None:
+        cnf_idx = _INDEXES[key] = {
+            'thy_locs': thy_locs,
+            'locs': [], 'geos': [], 'enes': numpy.zeros(0),
+            'frag_zmas': {},
+        }
+    elif not refresh:
+        return cnf_idx
+
+    existing = [tuple(locs) for locs in cnf_save_fs[-1].existing()]
+    existing_set = set(existing)
+    keep = [idx for idx, locs in enumerate(cnf_idx['locs'])
+            if locs in existing_set]
+    if len(keep) < len(cnf_idx['locs']):
+        cnf_idx['locs'] = [cnf_idx['locs'][idx] for idx in keep]
+        cnf_idx['geos'] = [cnf_idx['geos'][idx] for idx in keep]
+        cnf_idx['enes'] = cnf_idx['enes'][keep]
+        rids = {locs[0] for locs in cnf_idx['locs']}
+        cnf_idx['frag_zmas'] = {rid: frag for rid, frag
+                                in cnf_idx['frag_zmas'].items()
+                                if rid in rids}
+
+    indexed = set(cnf_idx['locs'])
+    for locs in existing:
+        if locs not in indexed:
+            _read_conformer(cnf_idx, cnf_save_fs, locs)
+
+    return cnf_idx
+
+
+def add(cnf_idx, locs, geo, ene):
+    """ Add a conformer that was just saved to the index
+
+        :param cnf_idx: the index
+        :type cnf_idx: dict
+        :param locs: the locators of the conformer
+        :type locs: tuple(str)
+        :param geo: the geometry of the conformer
+        :type geo: automol geometry data structure
+        :param ene: the energy of the conformer
+        :type ene: float
+    """
+    locs = tuple(locs)
+    if locs in cnf_idx['locs']:
+        return
+    cnf_idx['locs'].append(locs)
+    cnf_idx['geos'].append(geo)
+    cnf_idx['enes'] = numpy.append(cnf_idx['enes'], ene)
+
+
+def saved(cnf_idx, exclude=None):
+    """ The locators, geometries, and energies of the indexed conformers
+
+        :param cnf_idx: the index
+        :type cnf_idx: dict
+        :param exclude: locators of a conformer to leave out
+        :type exclude: tuple(str)
+        :rtype: (list, list, list)
+    """
+    idxs = _indices(cnf_idx, exclude)
+    return ([cnf_idx['locs'][idx] for idx in idxs],
+            [cnf_idx['geos'][idx] for idx in idxs],
+            [float(cnf_idx['enes'][idx]) for idx in idxs])
+
+
+def is_unique(cnf_idx, geo, ene, zrxn=None, exclude=None):
+    """ Determine whether a geometry is unique among the indexed conformers
+
+        As in `conformer._geo_unique`, the geometry is only compared with
+        the others if one of them has nearly the same energy.
+
+        :param cnf_idx: the index
+        :type cnf_idx: dict
+        :param geo: the geometry
+        :type geo: automol geometry data structure
+        :param ene: its energy
+        :type ene: float
+        :param zrxn: the reaction, for a transition state
+        :type zrxn: automol.reac.Reaction
+        :param exclude: locators of a conformer to leave out
+        :type exclude: tuple(str)
+        :rtype: bool
+    """
+    idxs = _indices(cnf_idx, exclude)
+    if not numpy.any(abs(cnf_idx['enes'][idxs] - ene) < ENE_THRESH):
+        return True
+
+    unique, _ = automol.geom.is_unique(
+        geo, [cnf_idx['geos'][idx] for idx in idxs],
+        check_dct=_unique_check_dct(zrxn))
+    return unique
+
+
+def duplicate(cnf_idx, geo, ene, zrxn=None, exclude=None):
+    """ Find the indexed conformer that a geometry is a duplicate of, as in
+        `is_unique`
+
+        :param cnf_idx: the index
+        :type cnf_idx: dict
+        :param geo: the geometry
+        :type geo: automol geometry data structure
+        :param ene: its energy
+        :type ene: float
+        :param zrxn: the reaction, for a transition state
+        :type zrxn: automol.reac.Reaction
+        :param exclude: locators of a conformer to leave out
+        :type exclude: tuple(str)
+        :return: the locators of the duplicate, or None if there is none
+        :rtype: tuple(str)
+    """
+    idxs = _indices(cnf_idx, exclude)
+    if not numpy.any(abs(cnf_idx['enes'][idxs] - ene) < ENE_THRESH):
+        return None
+
+    unique, dup_idx = automol.geom.is_unique(
+        geo, [cnf_idx['geos'][idx] for idx in idxs],
+        check_dct=_unique_check_dct(zrxn))
+    if unique or dup_idx is None:
+        return None
+    return cnf_idx['locs'][idxs[dup_idx]]
+
+
+def symmetric_duplicate(cnf_idx, geo, ene, exclude=None, ethresh=ENE_THRESH):
+    """ Find the indexed conformer that a geometry is a symmetric duplicate
+        of, as in `conformer._sym_unique`
+
+        :param cnf_idx: the index
+        :type cnf_idx: dict
+        :param geo: the geometry
+        :type geo: automol geometry data structure
+        :param ene: its energy
+        :type ene: float
+        :param exclude: locators of a conformer to leave out
+        :type exclude: tuple(str)
+        :return: the locators of the duplicate, or None if there is none
+        :rtype: tuple(str)
+    """
+    idxs = numpy.array(_indices(cnf_idx, exclude), dtype=int)
+    idxs = idxs[abs(cnf_idx['enes'][idxs] - ene) < ethresh]
+    if not len(idxs):
+        return None
+
+    _, sym_idx = automol.geom.is_unique(
+        geo, [cnf_idx['geos'][idx] for idx in idxs],
+        check_dct={'coulomb': 1e-2})
+    if sym_idx is None:
+        return None
+    return cnf_idx['locs'][idxs[sym_idx]]
+
+
+def ring_fragments(cnf_idx):
+    """ The ring-fragment Z-Matrix of each rid in the index, in the order the
+        rids were indexed; each is computed the first time it is needed
+
+        :param cnf_idx: the index
+        :type cnf_idx: dict
+        :return: the rids and their ring-fragment Z-Matrices (None for a
+            species without rings)
+        :rtype: iterator((str, automol Z-Matrix data structure))
+    """
+    seen_rids = set()
+    for locs, geo in zip(cnf_idx['locs'], cnf_idx['geos']):
+        rid = locs[0]
+        if rid in seen_rids:
+            continue
+        seen_rids.add(rid)
+        if rid not in cnf_idx['frag_zmas']:
+            cnf_idx['frag_zmas'][rid] = ring_fragment_zmatrix(geo)
+        yield rid, cnf_idx['frag_zmas'][rid]
+
+
+def ring_fragment_zmatrix(geo):
+    """ The Z-Matrix of the ring fragments of a geometry, or None if it has
+        no rings
+
+        :param geo: the geometry
+        :type geo: automol geometry data structure
+    """
+    frag_geo = automol.geom.ring_fragments_geometry(geo)
+    if frag_geo is None:
+        return None
+    return automol.geom.zmatrix(frag_geo)
+
+
+def invalidate():
+    """ Forget the loaded indexes
+    """
+    _INDEXES.clear()
+
+
+def _unique_check_dct(zrxn):
+    """ The checks for a duplicate geometry, which leave out the torsions
+        of a species
+    """
+    if zrxn is None:
+        return {'dist': 0.3, 'tors': None}
+    return {'dist': 0.3}
+
+
+def _indices(cnf_idx, exclude):
+    """ The positions of the indexed conformers, leaving one out
+    """
+    exclude = None if exclude is None else tuple(exclude)
+    return [idx for idx, locs in enumerate(cnf_idx['locs'])
+            if locs != exclude]
+
+
+def _read_conformer(cnf_idx, cnf_save_fs, locs):
+    """ Read a conformer into the index, waiting for its energy if it may
+        still be being saved; conformers without an energy are left out, to
+        be read again on the next load
+    """
+    if not cnf_save_fs[-1].file.geometry.exists(locs):
+        return
+    path = cnf_save_fs[-1].path(locs)
+    sp_save_fs = autofile.fs.single_point(path)
+    thy_locs = cnf_idx['thy_locs']
+    if not sp_save_fs[-1].file.energy.exists(thy_locs):
+        info_message(
+            f'No energy saved in single point directory for {path}')
+        geo_inf_obj = cnf_save_fs[-1].file.geometry_info.read(locs)
+        last_time = (autofile.schema.utc_time() -
+                     geo_inf_obj.utc_end_time).total_seconds()
+        if not wait_for_save(
+                path,
+                functools.partial(sp_save_fs[-1].file.energy.exists,
+                                  thy_locs),
+                saved_seconds=last_time):
+            return
+
+    add(cnf_idx, locs,
+        cnf_save_fs[-1].file.geometry.read(locs),
+        sp_save_fs[-1].file.energy.read(thy_locs))
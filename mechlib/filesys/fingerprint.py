@@ -0,0 +1,118 @@
+"""
+  Fingerprint pre-filter for matching conformer z-matrices
+
+  `automol.zmat.almost_equal` only matches z-matrices with the same symbols
+  and connectivity whose distances agree to a relative tolerance and whose
+  angles agree to an absolute tolerance. The fingerprint of a z-matrix is
+  its connectivity and its distance and angle values, and the index stacks
+  the fingerprints of many z-matrices into NumPy arrays, so that the
+  z-matrices that could match a given one are found in one vectorized pass.
+  The tolerances are applied as loosely as `almost_equal` could apply them
+  (relative to the larger distance, and to the shortest way around for
+  angles), so no z-matrix that matches is filtered out; `almost_equal` is
+  then called on the few candidates that remain.
+"""
+
+import numpy
+import automol.zmat
+
+
+# Slack for rounding, on top of the tolerances
+EPS = 1e-8
+
+
+def zmatrix_fingerprint(zma):
+    """ The fingerprint of a z-matrix
+
+        :param zma: the z-matrix
+        :type zma: automol z-matrix data structure
+        :return: the symbols and key matrix (or None, if they can't be
+            determined), and the distance and angle values, with NaN for
+            values that aren't defined
+        :rtype: (tuple, numpy.ndarray, numpy.ndarray)
+    """
+    try:
+        signature = (tuple(automol.zmat.symbols(zma)),
+                     tuple(map(tuple, automol.zmat.key_matrix(zma))))
+        val_mat = numpy.array(automol.zmat.value_matrix(zma), dtype=float)
+    except Exception:  # pylint: disable=broad-except
+        return None, numpy.zeros(0), numpy.zeros(0)
+    return signature, val_mat[:, 0], val_mat[:, 1:].ravel()
+
+
+def index(zmas):
+    """ Stack the fingerprints of z-matrices into arrays, grouped by symbols
+        and key matrix
+
+        :param zmas: the z-matrices
+        :type zmas: tuple(automol z-matrix data structure)
+        :return: the index
+        :rtype: dict
+    """
+    return index_fingerprints([zmatrix_fingerprint(zma) for zma in zmas])
+
+
+def index_fingerprints(fps):
+    """ Stack fingerprints into arrays, grouped by symbols and key matrix
+
+        :param fps: the fingerprints, as returned by `zmatrix_fingerprint`
+        :type fps: tuple((tuple, numpy.ndarray, numpy.ndarray))
+        :return: the index
+        :rtype: dict
+    """
+    groups = {}
+    for idx, (signature, dists, angs) in enumerate(fps):
+        groups.setdefault(signature, []).append((idx, dists, angs))
+
+    return {
+        signature: (numpy.array([idx for idx, _, _ in rows]),
+                    numpy.array([dists for _, dists, _ in rows]),
+                    numpy.array([angs for _, _, angs in rows]))
+        for signature, rows in groups.items()}
+
+
+def candidates(zma, fp_index, dist_rtol, ang_atol):
+    """ Find the z-matrices in an index that could be almost equal to a
+        z-matrix
+
+        :param zma: the z-matrix
+        :type zma: automol z-matrix data structure
+        :param fp_index: the fingerprint index of the other z-matrices
+        :type fp_index: dict
+        :param dist_rtol: the relative tolerance for distances
+        :type dist_rtol: float
+        :param ang_atol: the absolute tolerance for angles, in radians
+        :type ang_atol: float
+        :return: the positions of the candidates in the indexed list, in order
+        :rtype: list(int)
+    """
+    signature, dists, angs = zmatrix_fingerprint(zma)
+
+    # Z-matrices without a fingerprint are always candidates
+    idxs = []
+    if None in fp_index:
+        idxs.extend(fp_index[None][0])
+    if signature is None:
+        idxs.extend(idx for group in fp_index.values() for idx in group[0])
+    elif signature in fp_index:
+        grp_idxs, grp_dists, grp_angs = fp_index[signature]
+        idxs.extend(grp_idxs[_close(dists, grp_dists, dist_rtol, ang_atol,
+                                    angs, grp_angs)])
+
+    return sorted(set(map(int, idxs)))
+
+
+def _close(dists, grp_dists, dist_rtol, ang_atol, angs, grp_angs):
+    """ Mask of the rows of a group that are within the tolerances
+    """
+    with numpy.errstate(invalid='ignore'):
+        dist_tol = dist_rtol * numpy.maximum(abs(grp_dists), abs(dists)) + EPS
+        dist_ok = ((abs(grp_dists - dists) <= dist_tol) |
+                   (numpy.isnan(grp_dists) & numpy.isnan(dists)))
+
+        ang_diff = numpy.mod(grp_angs - angs + numpy.pi, 2 * numpy.pi)
+        ang_diff = abs(ang_diff - numpy.pi)
+        ang_ok = ((ang_diff <= ang_atol + EPS) |
+                  (numpy.isnan(grp_angs) & numpy.isnan(angs)))
+
+    return dist_ok.all(axis=1) & ang_ok.all(axis=1)
@@ -0,0 +1,297 @@
+"""
+  Garbage collection for the run filesystem
+
+  Runs leave every job directory behind in the run filesystem, which grows
+  without bound. `find_garbage` walks the run filesystem with parallel
+  threads and finds:
+   - jobs that succeeded, whose results are in the save filesystem (the
+     file the job saves its result to, such as the geometry of an
+     optimization, is in the counterpart of the directory holding the job);
+   - jobs whose info file still says they are running, but with no file
+     modified for longer than a maximum age, so that the job died (runs
+     skip these jobs until they are removed);
+   - job directories for external programs (MESS, ThermP, ProjRot, and so
+     on, from `mechlib.amech_io.job_path`), which are only used while the
+     program runs, once they are older than the maximum age.
+  Failed jobs are kept, since runs use them to decide whether to retry, and
+  so are jobs of kinds whose result file isn't known (such as IRCs).
+
+  `delete` removes the jobs in parallel threads. Each job is checked again
+  just before it is removed, and is renamed out of the way first, so that a
+  job is never left half removed. Directories left empty are only removed
+  within the run or build layer, so that a conformer run directory that a
+  sampler has just created, but not yet launched a job in, is kept.
+"""
+
+import concurrent.futures
+import functools
+import os
+import shutil
+import time
+
+import autofile
+import elstruct
+from mechlib.filesys import archive
+
+
+NTHREADS = 16
+DEFAULT_MAX_AGE = 24 * 3600.
+TRASH_PREFIX = '.gc-trash'
+
+
+def walk(root, prune=None, nthreads=NTHREADS):
+    """ Walk a directory tree, listing the directories in parallel threads
+
+        Unlike `os.walk`, the directories are yielded in no particular order.
+
+        :param root: the top directory
+        :type root: str
+        :param prune: function that takes the path, directory names, and file
+            names of a directory and returns the directory names to descend
+            into (default: all of them)
+        :type prune: callable
+        :param nthreads: the number of threads to list directories with
+        :type nthreads: int
+        :return: the path, directory names, and file names of each directory
+        :rtype: iterator((str, list(str), list(str)))
+    """
+    with concurrent.futures.ThreadPoolExecutor(nthreads) as executor:
+        pending = {executor.submit(_scan, root)}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                path, dirnames, filenames = future.result()
+                yield path, dirnames, filenames
+                if prune is not None:
+                    dirnames = prune(path, dirnames, filenames)
+                pending |= {executor.submit(_scan, os.path.join(path, name))
+                            for name in dirnames}
+
+
+def find_garbage(run_prefix, save_prefix, max_age=DEFAULT_MAX_AGE,
+                 nthreads=NTHREADS):
+    """ Find the jobs in the run filesystem that can be removed
+
+        :param run_prefix: the run filesystem prefix
+        :type run_prefix: str
+        :param save_prefix: the save filesystem prefix
+        :type save_prefix: str
+        :param max_age: how long, in seconds, a running job or an external
+            program job has to be untouched before it is removed
+        :type max_age: float
+        :param nthreads: the number of threads to walk and read with
+        :type nthreads: int
+        :return: the jobs that were saved ('saved'), jobs that died while
+            running ('stale'), and external program jobs ('build'), each as
+            a list of (path, path to check, modification time), where the
+            job is only removed if the file to check is unchanged
+        :rtype: dict[str, list]
+    """
+    run_prefix = os.path.normpath(run_prefix)
+    run_name = _layer_name(autofile.fs.run(run_prefix))
+    bld_name = _layer_name(autofile.fs.build(run_prefix))
+
+    # The directories that hold a run layer; the jobs themselves and the
+    # external program jobs are not walked
+    run_parents, bld_prefixes = [], []
+
+    def _prune(path, dirnames, _):
+        if run_name in dirnames:
+            run_parents.append(path)
+        if bld_name in dirnames:
+            bld_prefixes.append(path)
+        return [name for name in dirnames
+                if name not in (run_name, bld_name) and
+                not name.startswith(TRASH_PREFIX)]
+
+    for _ in walk(run_prefix, prune=_prune, nthreads=nthreads):
+        pass
+
+    now = time.time()
+    garbage = {'saved': [], 'stale': [], 'build': []}
+    with concurrent.futures.ThreadPoolExecutor(nthreads) as executor:
+        for jobs in executor.map(
+                lambda path: _run_jobs(path, run_prefix, save_prefix,
+                                       now - max_age),
+                run_parents):
+            for key, job in jobs:
+                garbage[key].append(job)
+        for jobs in executor.map(
+                lambda path: _build_jobs(path, now - max_age), bld_prefixes):
+            garbage['build'].extend(jobs)
+
+    return garbage
+
+
+def delete(jobs, run_prefix, nthreads=NTHREADS):
+    """ Remove jobs from the run filesystem
+
+        :param jobs: the jobs, as (path, path to check, modification time)
+        :type jobs: list
+        :param run_prefix: the run filesystem prefix, which every job must be
+            under
+        :type run_prefix: str
+        :param nthreads: the number of threads to remove with
+        :type nthreads: int
+        :return: the number of jobs removed
+        :rtype: int
+    """
+    run_prefix = os.path.normpath(run_prefix)
+    for path, _, _ in jobs:
+        assert os.path.normpath(path).startswith(run_prefix + os.sep), (
+            f'{path} is not in the run filesystem {run_prefix}')
+
+    layer_names = {_layer_name(autofile.fs.run(run_prefix)),
+                   _layer_name(autofile.fs.build(run_prefix))} - {None}
+    with concurrent.futures.ThreadPoolExecutor(nthreads) as executor:
+        return sum(executor.map(
+            lambda job: _delete_job(*job, run_prefix, layer_names), jobs))
+
+
+def _scan(path):
+    """ List the directories and files in a directory
+    """
+    dirnames, filenames = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirnames.append(entry.name)
+                else:
+                    filenames.append(entry.name)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        pass
+    return path, dirnames, filenames
+
+
+def _run_jobs(path, run_prefix, save_prefix, cutoff):
+    """ Find the removable jobs in the run layer of a directory
+    """
+    run_fs = autofile.fs.run(path)
+    save_path = os.path.join(save_prefix, os.path.relpath(path, run_prefix))
+    jobs = []
+    for locs in run_fs[-1].existing():
+        info_path = run_fs[-1].file.info.path(locs)
+        try:
+            mtime = os.stat(info_path).st_mtime
+            status = run_fs[-1].file.info.read(locs).status
+        except Exception:  # pylint: disable=broad-except
+            continue
+
+        job_path = run_fs[-1].path(locs)
+        if (status == autofile.schema.RunStatus.SUCCESS and
+                _is_saved(locs[0], save_path)):
+            jobs.append(('saved', (job_path, info_path, mtime)))
+        elif status == autofile.schema.RunStatus.RUNNING:
+            # A job that is still running keeps writing its output
+            newest_path, mtime = _newest(job_path)
+            if mtime < cutoff:
+                jobs.append(('stale', (job_path, newest_path, mtime)))
+    return jobs
+
+
+def _is_saved(job, save_path):
+    """ Determine whether the result of a job is in the save filesystem
+    """
+    name = _saved_file_names().get(job)
+    if name is None:
+        return False
+    path = os.path.join(save_path, name)
+    return os.path.exists(path) or archive.find(path) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _saved_file_names():
+    """ The name of the file each kind of job saves its result to, in the
+        counterpart of the directory holding the job, by job
+    """
+    cnf_ds = autofile.fs.conformer(os.sep)[-1]
+    cnf_locs = [autofile.schema.generate_new_ring_id(),
+                autofile.schema.generate_new_conformer_id()]
+    sp_ds = autofile.fs.single_point(os.sep)[-1]
+    sp_locs = ['hf', 'sto-3g', 'R']
+    paths = {
+        elstruct.Job.OPTIMIZATION: cnf_ds.file.geometry.path(cnf_locs),
+        elstruct.Job.GRADIENT: cnf_ds.file.gradient.path(cnf_locs),
+        elstruct.Job.HESSIAN: cnf_ds.file.hessian.path(cnf_locs),
+        elstruct.Job.VPT2: cnf_ds.file.anharmonic_frequencies.path(cnf_locs),
+        elstruct.Job.MOLPROP: cnf_ds.file.dipole_moment.path(cnf_locs),
+        elstruct.Job.ENERGY: sp_ds.file.energy.path(sp_locs),
+    }
+    return {job: os.path.basename(path) for job, path in paths.items()}
+
+
+def _build_jobs(path, cutoff):
+    """ Find the external program jobs under a directory that are older
+        than a cutoff, judged by their newest file
+    """
+    bld_fs = autofile.fs.build(path)
+    jobs = []
+    for locs in bld_fs[-1].existing():
+        job_path = bld_fs[-1].path(locs)
+        newest_path, mtime = _newest(job_path)
+        if mtime < cutoff:
+            jobs.append((job_path, newest_path, mtime))
+    return jobs
+
+
+def _newest(path):
+    """ The most recently modified file in a directory tree (or the
+        directory itself, if it is newer), and its modification time
+    """
+    newest_path, mtime = path, os.stat(path).st_mtime
+    for dir_path, _, filenames in os.walk(path):
+        for name in filenames:
+            file_path = os.path.join(dir_path, name)
+            try:
+                file_mtime = os.stat(file_path).st_mtime
+            except FileNotFoundError:
+                continue
+            if file_mtime > mtime:
+                newest_path, mtime = file_path, file_mtime
+    return newest_path, mtime
+
+
+def _delete_job(path, check_path, mtime, run_prefix, layer_names):
+    """ Remove a job, if the file to check hasn't changed, renaming it out of
+        the way first; returns 1 if it was removed and 0 if not
+
+        The directories left empty are removed up to the top directory of the
+        run or build layer holding the job. The directory that layer is in
+        is kept, since a run may have just created it for a job it is about
+        to launch.
+    """
+    try:
+        if os.stat(check_path).st_mtime != mtime:
+            return 0
+        dir_path, name = os.path.split(path)
+        trash_path = os.path.join(
+            dir_path, f'{TRASH_PREFIX}-{os.getpid()}-{name}')
+        os.rename(path, trash_path)
+    except OSError:
+        return 0
+
+    shutil.rmtree(trash_path, ignore_errors=True)
+
+    # Remove the directories that are left empty, within the layer
+    while dir_path.startswith(run_prefix + os.sep):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            break
+        if os.path.basename(dir_path) in layer_names:
+            break
+        dir_path = os.path.dirname(dir_path)
+    return 1
+
+
+def _layer_name(fs_):
+    """ The name of the top directory of a filesystem, or None if it doesn't
+        have one
+    """
+    top_path = os.path.normpath(fs_[0].path())
+    prefix = getattr(fs_[0], 'prefix', None)
+    if prefix is not None and os.path.normpath(prefix) == top_path:
+        return None
+    return os.path.basename(top_path)
@@ -0,0 +1,248 @@
+"""
+  Registry of the input z-matrices of the conformers in a filesystem
+
+  Before a sample is optimized, it is checked against the optimizations that
+  are running in the run filesystem and the conformers already saved in the
+  save filesystem, by reading the input of every job and comparing its
+  z-matrix with `automol.zmat.almost_equal`. Reading every input for every
+  sample makes a sampling run quadratic in file reads.
+
+  The registry is a hidden JSON file in the conformer filesystem's trunk
+  directory that holds the fingerprints (see `fingerprint`) of the input
+  z-matrices of each conformer, by its locators:
+   - in the run filesystem, a job is registered with its input z-matrix
+     when it is launched (`running`), and its entry is emptied when it
+     finishes, so only running jobs can match;
+   - in the save filesystem, a conformer is registered with its input
+     z-matrix, and those of its symmetric duplicates, the first time it is
+     looked up.
+  `candidates` finds the conformers whose fingerprints could match a
+  z-matrix, which the caller then checks exactly, as before. Conformers that
+  are not registered (saved, or launched, by another version) are read with
+  a function the caller provides and registered, so each one is only read
+  once, and entries for conformers that have been removed are dropped.
+
+  Any error reading or writing a registry turns the registries off for the
+  rest of the process, and every conformer is then a candidate.
+"""
+
+import contextlib
+import json
+import os
+
+import numpy
+from mechlib.amech_io import printer as ioprinter
+from mechlib.filesys import fingerprint
+from mechlib.filesys._lock import atomic_write
+from mechlib.filesys._lock import locked
+
+
+REGISTRY_NAME = '.zmat_registry.json'
+
+# Loaded registries, by path: (file stamp, entries, entry keys, index)
+_REGISTRIES = {}
+_DISABLED = {'disabled': False}
+
+
+def candidates(cnf_fs, zma, read_zmas, dist_rtol, ang_atol):
+    """ Find the conformers in a filesystem whose registered input
+        z-matrices could be almost equal to a z-matrix
+
+        :param cnf_fs: CONFORMER object with run or save filesys prefix
+        :type cnf_fs: autofile.fs.conformer obj
+        :param zma: the z-matrix
+        :type zma: automol z-matrix data structure
+        :param read_zmas: reads the z-matrices to register for a conformer
+            that isn't registered, given its locators, or returns None to
+            look at it again next time
+        :type read_zmas: callable
+        :param dist_rtol: the relative tolerance for distances
+        :type dist_rtol: float
+        :param ang_atol: the absolute tolerance for angles, in radians
+        :type ang_atol: float
+        :return: the locators of the candidates
+        :rtype: list(tuple(str))
+    """
+    existing = {_key(locs): tuple(locs)
+                for locs in cnf_fs[-1].existing(ignore_bad_formats=True)}
+    path = os.path.join(cnf_fs[0].path(), REGISTRY_NAME)
+    if not existing or _DISABLED['disabled']:
+        return list(existing.values())
+
+    try:
+        entries, keys, fp_index = _load(path)
+        new = {}
+        for key, locs in existing.items():
+            if key not in entries:
+                zmas = read_zmas(locs)
+                if zmas is not None:
+                    new[key] = [_encode(fingerprint.zmatrix_fingerprint(zma_))
+                                for zma_ in zmas]
+        removed = [key for key in entries if key not in existing]
+        if new or removed:
+            _update(path, new, removed)
+            entries, keys, fp_index = _load(path)
+    except (OSError, ValueError) as err:
+        _disable(path, err)
+        return list(existing.values())
+
+    # Conformers that are still unregistered couldn't be read yet, so they
+    # can't match
+    cand_keys = {keys[idx] for idx in fingerprint.candidates(
+        zma, fp_index, dist_rtol, ang_atol)}
+    return [locs for key, locs in existing.items() if key in cand_keys]
+
+
+def register(cnf_prefix, locs, zmas):
+    """ Register the input z-matrices of a conformer
+
+        :param cnf_prefix: the trunk path of the conformer filesystem
+            (`cnf_fs[0].path()`)
+        :type cnf_prefix: str
+        :param locs: the locators of the conformer
+        :type locs: tuple(str)
+        :param zmas: its input z-matrices
+        :type zmas: tuple(automol z-matrix data structure)
+    """
+    _safe_update(
+        cnf_prefix,
+        {_key(locs): [_encode(fingerprint.zmatrix_fingerprint(zma))
+                      for zma in zmas]})
+
+
+def unregister(cnf_prefix, locs):
+    """ Empty the entry of a conformer, so that it no longer matches
+        anything (e.g., when its job finishes)
+
+        :param cnf_prefix: the trunk path of the conformer filesystem
+        :type cnf_prefix: str
+        :param locs: the locators of the conformer
+        :type locs: tuple(str)
+    """
+    _safe_update(cnf_prefix, {_key(locs): []})
+
+
+def forget(cnf_prefix, locs):
+    """ Drop the entry of a conformer, so that it is read again the next
+        time it is looked up (e.g., when a symmetric duplicate is saved)
+
+        :param cnf_prefix: the trunk path of the conformer filesystem
+        :type cnf_prefix: str
+        :param locs: the locators of the conformer
+        :type locs: tuple(str)
+    """
+    _safe_update(cnf_prefix, {}, [_key(locs)])
+
+
+@contextlib.contextmanager
+def running(cnf_prefix, locs, zma):
+    """ Register a job's input z-matrix while it runs
+
+        :param cnf_prefix: the trunk path of the run conformer filesystem
+        :type cnf_prefix: str
+        :param locs: the locators of the conformer the job runs in
+        :type locs: tuple(str)
+        :param zma: the input z-matrix of the job
+        :type zma: automol z-matrix data structure
+    """
+    register(cnf_prefix, locs, (zma,))
+    try:
+        yield
+    finally:
+        unregister(cnf_prefix, locs)
+
+
+def invalidate():
+    """ Forget the loaded registries, and use the registries again if they
+        were turned off
+    """
+    _REGISTRIES.clear()
+    _DISABLED['disabled'] = False
+
+
+def _load(path):
+    """ Read a registry, if it has changed since it was last read
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}, [], {}
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    if path not in _REGISTRIES or _REGISTRIES[path][0] != stamp:
+        entries = _read(path)
+        keys, fps = [], []
+        for key, entry in entries.items():
+            keys.extend([key] * len(entry))
+            fps.extend(map(_decode, entry))
+        _REGISTRIES[path] = (stamp, entries, keys,
+                             fingerprint.index_fingerprints(fps))
+
+    return _REGISTRIES[path][1:]
+
+
+def _read(path):
+    """ Read the entries of a registry
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as fobj:
+        return json.load(fobj)
+
+
+def _update(path, new, removed=()):
+    """ Add, replace, and remove entries in a registry, holding its lock
+    """
+    with locked(path):
+        entries = _read(path)
+        entries.update(new)
+        for key in removed:
+            entries.pop(key, None)
+        atomic_write(path, json.dumps(entries))
+
+
+def _safe_update(cnf_prefix, new, removed=()):
+    """ Update a registry, if the registries are on and the filesystem
+        exists
+    """
+    path = os.path.join(cnf_prefix, REGISTRY_NAME)
+    if _DISABLED['disabled'] or not os.path.isdir(cnf_prefix):
+        return
+    try:
+        _update(path, new, removed)
+    except (OSError, ValueError) as err:
+        _disable(path, err)
+
+
+def _disable(path, err):
+    """ Stop using the registries for the rest of the process
+    """
+    ioprinter.warning_message(
+        f'Z-Matrix registry {path} could not be used ({err}); '
+        'checking every conformer instead')
+    _DISABLED['disabled'] = True
+
+
+def _key(locs):
+    """ Key for a set of conformer locators
+    """
+    return '/'.join(map(str, locs))
+
+
+def _encode(fp):
+    """ A fingerprint, as JSON
+    """
+    signature, dists, angs = fp
+    return [None if signature is None else list(signature),
+            dists.tolist(), angs.tolist()]
+
+
+def _decode(fp_json):
+    """ A fingerprint, from JSON
+    """
+    signature, dists, angs = fp_json
+    if signature is not None:
+        symbs, key_mat = signature
+        signature = (tuple(symbs), tuple(map(tuple, key_mat)))
+    return (signature, numpy.array(dists, dtype=float),
+            numpy.array(angs, dtype=float))
@@ -0,0 +1,122 @@
+"""
+  Layers between the routines and autofile's data file reads and writes
+
+  The save filesystem is read and written through autofile's DataFile and
+  DataSeries classes. `install` routes their methods through three layers,
+  in this order:
+   - archives (`archive`): files of packed scan and tau points are found in
+     and read from their archives;
+   - the read cache (`readcache`): a file is read from memory for as long as
+     it is unchanged on disk, and writes drop it from the cache;
+   - atomic writes (`_lock`): a file is written to a temporary file and then
+     renamed over the target, so readers never see part of a file.
+
+  Nothing is installed on import. The `automech run` and `automech fs` entry
+  points, the `automech.query` functions, and `bin/automated_insert.py` call
+  `install`, and `uninstall` puts autofile's own methods back. Any other
+  caller that reads or writes the save filesystem through autofile must
+  call `install` first: otherwise packed points look deleted, and writes
+  aren't atomic.
+"""
+
+import autofile
+from mechlib.amech_io import printer as ioprinter
+from mechlib.filesys import _lock
+from mechlib.filesys import archive
+from mechlib.filesys import readcache
+
+
+# The methods that are replaced, by class name
+_METHODS = {
+    'DataFile': ('exists', 'read', 'write'),
+    'DataSeries': ('exists', 'existing'),
+}
+# autofile's own methods, while the layers are installed
+_ORIGINALS = {}
+
+
+def install():
+    """ Route autofile data file reads and writes through the layers
+
+        If autofile doesn't have the expected classes and methods, this warns
+        and leaves autofile as it is.
+
+        :return: whether the layers are installed
+        :rtype: bool
+    """
+
+    if _ORIGINALS:
+        return True
+
+    model = getattr(autofile, 'model', None)
+    classes = {name: getattr(model, name, None) for name in _METHODS}
+    missing = [f'{name}.{meth}' for name, meths in _METHODS.items()
+               for meth in meths
+               if not hasattr(classes[name], meth)]
+    if missing:
+        ioprinter.warning_message(
+            'autofile.model is missing ' + ', '.join(missing) + '; '
+            'reading and writing the save filesystem without archives, the '
+            'read cache, or atomic writes')
+        return False
+
+    dfile_cls, ds_cls = classes['DataFile'], classes['DataSeries']
+    file_exists, file_read, file_write = (
+        dfile_cls.exists, dfile_cls.read, dfile_cls.write)
+    series_exists, series_existing = ds_cls.exists, ds_cls.existing
+
+    def _archive_read(dfile, dir_pth):
+        return archive.read_data_file(dfile, dir_pth, file_read)
+
+    def _file_exists(dfile, dir_pth, *args, **kwargs):
+        if file_exists(dfile, dir_pth, *args, **kwargs):
+            return True
+        return (not args and not kwargs and
+                archive.find(dfile.path(dir_pth)) is not None)
+
+    def _file_read(dfile, dir_pth, *args, **kwargs):
+        if args or kwargs:
+            return file_read(dfile, dir_pth, *args, **kwargs)
+        return readcache.cached_read(dfile, dir_pth, _archive_read)
+
+    def _file_write(dfile, val, dir_pth, *args, **kwargs):
+        archive.prepare_write(dir_pth)
+        readcache.invalidate(dfile.path(dir_pth))
+        if args or kwargs:
+            return file_write(dfile, val, dir_pth, *args, **kwargs)
+        return _lock.write_data_file(dfile, val, dir_pth, file_write)
+
+    def _series_exists(dsr, *args, **kwargs):
+        return (series_exists(dsr, *args, **kwargs) or
+                archive.series_exists(dsr, *args, **kwargs))
+
+    def _series_existing(dsr, *args, **kwargs):
+        return archive.series_existing(
+            dsr, series_existing(dsr, *args, **kwargs), *args, **kwargs)
+
+    _ORIGINALS['DataFile'] = (dfile_cls, (file_exists, file_read, file_write))
+    _ORIGINALS['DataSeries'] = (ds_cls, (series_exists, series_existing))
+    dfile_cls.exists = _file_exists
+    dfile_cls.read = _file_read
+    dfile_cls.write = _file_write
+    ds_cls.exists = _series_exists
+    ds_cls.existing = _series_existing
+    return True
+
+
+def uninstall():
+    """ Put autofile's own data file methods back
+    """
+    for name, (cls, meths) in _ORIGINALS.items():
+        for meth_name, meth in zip(_METHODS[name], meths):
+            setattr(cls, meth_name, meth)
+    _ORIGINALS.clear()
+    readcache.invalidate()
+
+
+def installed():
+    """ Determine whether the layers are installed
+
+        :rtype: bool
+    """
+    return bool(_ORIGINALS)
@@ -3,7 +3,6 @@
 """
 
 import os
-import time
 import numpy
 import autofile
 import elstruct
@@ -16,6 +15,9 @@ from automol.geom import hydrogen_bonded_structure
 from autorun import execute_function_in_parallel
 from mechanalyzer.inf import thy as tinfo
 from mechlib.amech_io import printer as ioprinter
+from mechlib.filesys import catalog
+from mechlib.filesys import fingerprint
+from mechlib.filesys._complete import wait_for_save
 
 
 def min_energy_conformer_locators(
@@ -83,7 +85,7 @@ def conformer_locators(
             nprocs=1):
 
         fin_locs_lst, fin_paths_lst = (), ()
-        cnf_locs_lst = cnf_save_fs[-1].existing()
+        cnf_locs_lst = catalog.conformer_locators(cnf_save_fs)
         if cnf_locs_lst:
             cnf_locs_lst, cnf_enes_lst = _sorted_cnf_lsts(
                 cnf_locs_lst, cnf_save_fs, mod_thy_info,
@@ -229,13 +231,24 @@ def _sorted_cnf_lsts(
         fnd_cnf_enes_lst = [10]
         fnd_cnf_locs_lst = cnf_locs_lst
     else:
+        # Take the energies from the catalog where it has them, and read the
+        # rest from the filesystem
+        cat_enes_dct = _catalog_sort_energies(
+            cnf_locs_lst, cnf_save_fs, mod_thy_info,
+            freq_info, sp_info, sort_prop_dct)
+        read_locs_lst = [locs for locs in cnf_locs_lst
+                         if tuple(locs) not in cat_enes_dct]
         args = (
                 cnf_save_fs, mod_thy_info, freq_info,
                 sp_info, sort_prop_dct
                 )
-        locs_enes_dct_lst = execute_function_in_parallel(
-            _parallel_get_sort_energy_parameters, cnf_locs_lst,
-            args, nprocs=nprocs)
+        locs_enes_dct_lst = []
+        if read_locs_lst:
+            locs_enes_dct_lst = list(execute_function_in_parallel(
+                _parallel_get_sort_energy_parameters, read_locs_lst,
+                args, nprocs=nprocs))
+        locs_enes_dct_lst.append(
+            {locs: (ene, None) for locs, ene in cat_enes_dct.items()})
         first_ene = None
         for locs_enes_dct in locs_enes_dct_lst:
             for locs in locs_enes_dct:
@@ -289,28 +302,45 @@ def _sorted_cnf_lsts(
     return cnf_locs_lst, cnf_enes_lst
 
 
-def _wait_for_energy_to_be_saved(cnf_save_fs, locs, sp_fs, sp_info):
+def _catalog_sort_energies(
+        cnf_locs_lst, cnf_save_fs, mod_thy_info,
+        freq_info, sp_info, sort_prop_dct):
+    """ Get the sorting energies of the conformers from the catalog, if the
+        sort only needs the electronic energy, or the electronic energy plus
+        the ZPE at the level of the conformer geometries
+
+        :rtype: dict[tuple(str), float]
+    """
+    sort_prop = _check_prop_requirements(
+        sort_prop_dct, None, None, 0., None)
+    if sort_prop not in ('electronic', 'ground'):
+        return {}
+    # Otherwise, the energies are read from matching conformers at the
+    # frequency level of theory
+    if freq_info is not None and freq_info != mod_thy_info:
+        return {}
+
+    sp_thy_info = mod_thy_info if sp_info is None else sp_info
+    return catalog.sort_energies(
+        cnf_save_fs, cnf_locs_lst, sp_thy_info[1:4],
+        zpe=(sort_prop == 'ground'))
+
+
+def _wait_for_energy_to_be_saved(cnf_save_fs, locs, sp_fs, sp_thy_locs):
     """ in case a geo was just written and its about to write and ene
     """
     ene = None
-    # cnf_path = cnf_save_fs[-1].path(locs)
     if cnf_save_fs[-1].file.geometry_info.exists(locs):
-        # ioprinter.info_message(
-        #     f'No energy saved in single point directory for {cnf_path}')
         geo_inf_obj = cnf_save_fs[-1].file.geometry_info.read(
             locs)
-        geo_path = cnf_save_fs[-1].file.geometry_info.path(locs)
         geo_end_time = geo_inf_obj.utc_end_time
         current_time = autofile.schema.utc_time()
         _time = (current_time - geo_end_time).total_seconds()
-        if _time < 120:
-            wait_time = 120 - _time
-            ioprinter.info_message(
-                f'Geo was saved in the last {_time:3.2f} seconds, '
-                f'waiting for {wait_time:3.2f} seconds')
-            time.sleep(wait_time)
-            if sp_fs[-1].file.energy.exists(sp_info[1:4]):
-                ene = sp_fs[-1].file.energy.read(sp_info[1:4])
+        if wait_for_save(
+                cnf_save_fs[-1].path(locs),
+                lambda: sp_fs[-1].file.energy.exists(sp_thy_locs),
+                saved_seconds=_time):
+            ene = sp_fs[-1].file.energy.read(sp_thy_locs)
     return ene
 
 
@@ -769,7 +799,7 @@ def collect_rrho_params(
                 ene = sp_fs[-1].file.energy.read(sp_thy_info)
             else:
                 ene = _wait_for_energy_to_be_saved(
-                    cnf_save_fs, locs, sp_fs, sp_info)
+                    cnf_save_fs, locs, sp_fs, sp_thy_info)
 
     if freqs is not None:
         freqs = [freq for freq in freqs if freq > 0.]
@@ -898,52 +928,62 @@ def fs_confs_dict(cnf_save_fs, cnf_save_locs_lst,
     dist_tol = 0.1
     if saddle:
         dist_tol = 0.25
+
+    # Read the z-matrices of the structs in cnf_save, and their symmetry
+    # copies, once, and index their fingerprints
+    zmas, cnf_idxs = [], []
+    for locs in cnf_save_locs_lst:
+        cnf_save_path = cnf_save_fs[-1].path(locs)
+        zma_save_fs = autofile.fs.zmatrix(cnf_save_path)
+        zma = zma_save_fs[-1].file.zmatrix.read((0,))
+        sym_zmas = _symmetry_zmatrices(
+            zma, cnf_save_path,
+            'some symmetry structures have a different zmatrix')
+        cnf_idxs.append(list(range(len(zmas), len(zmas) + 1 + len(sym_zmas))))
+        zmas.extend([zma] + sym_zmas)
+    fp_index = fingerprint.index(zmas)
+
     for ini_locs in ini_cnf_save_locs_lst:
 
         match_dct[tuple(ini_locs)] = None
         # Loop over structs in cnf_save, see if they match the current struct
-        # inigeo = ini_cnf_save_fs[-1].file.geometry.read(ini_locs)
-        # inizma = automol.geom.zmatrix(inigeo)
-        # inizma =  ini_cnf_save_fs[-1].file.zmatrix.read(ini_locs)
         ini_cnf_save_path = ini_cnf_save_fs[-1].path(ini_locs)
-        # ioprinter.checking('structures', ini_cnf_save_path)
         ini_zma_save_fs = autofile.fs.zmatrix(ini_cnf_save_path)
-        inizmas = [ini_zma_save_fs[-1].file.zmatrix.read((0,))]
-        ini_sym_fs = autofile.fs.symmetry(ini_cnf_save_path)
-        dtt = automol.zmat.conversion_info(inizmas[0])
-        for sym_locs in ini_sym_fs[-1].existing():
-            geo = ini_sym_fs[-1].file.geometry.read(sym_locs)
-            geo_wdummy = automol.geom.apply_zmatrix_conversion(geo, dtt)
-            try:
-                inizmas.append(automol.zmat.from_geometry(inizmas[0], geo_wdummy))
-            except:
-                print('some structures have a different zmatrix')
+        inizma = ini_zma_save_fs[-1].file.zmatrix.read((0,))
+        inizmas = [inizma] + _symmetry_zmatrices(
+            inizma, ini_cnf_save_path,
+            'some structures have a different zmatrix')
         for inizma in inizmas:
-            for locs in cnf_save_locs_lst:
-                # geo = cnf_save_fs[-1].file.geometry.read(locs)
-                # zma = automol.geom.zmatrix(geo)
-                zma_save_fs = autofile.fs.zmatrix(cnf_save_fs[-1].path(locs))
-                zma = zma_save_fs[-1].file.zmatrix.read((0,))
-                if automol.zmat.almost_equal(
-                        inizma, zma,
+            # Only check the structs that pass the fingerprint pre-filter
+            cands = set(fingerprint.candidates(
+                inizma, fp_index, dist_rtol=dist_tol, ang_atol=.4))
+            for locs, (idx, *sym_idxs) in zip(cnf_save_locs_lst, cnf_idxs):
+                if idx in cands and automol.zmat.almost_equal(
+                        inizma, zmas[idx],
                         dist_rtol=dist_tol, ang_atol=.4):
-                    # cnf_save_path = cnf_save_fs[-1].path(locs)
-                    # ioprinter.info_message(
-                    #     f'- Similar structure found at {cnf_save_path}')
                     match_dct[tuple(ini_locs)] = tuple(locs)
                     break
-                else:
-                    sym_fs = autofile.fs.symmetry(cnf_save_fs[-1].path(locs))
-                    dtt = automol.zmat.conversion_info(zma)
-                    for sym_locs in sym_fs[-1].existing():
-                        geo = sym_fs[-1].file.geometry.read(sym_locs)
-                        geo_wdummy = automol.geom.apply_zmatrix_conversion(geo, dtt)
-                        try:
-                            sym_zma = automol.zmat.from_geometry(zma, geo_wdummy)
-                            if automol.zmat.almost_equal(
-                                    inizma, sym_zma, dist_rtol=dist_tol, ang_atol=.4):
-                                match_dct[tuple(ini_locs)] = tuple(locs)
-                                break
-                        except:
-                            print('some symmetry structures have a different zmatrix')
+                for sym_idx in sym_idxs:
+                    if sym_idx in cands and automol.zmat.almost_equal(
+                            inizma, zmas[sym_idx],
+                            dist_rtol=dist_tol, ang_atol=.4):
+                        match_dct[tuple(ini_locs)] = tuple(locs)
+                        break
     return match_dct
+
+
+def _symmetry_zmatrices(zma, cnf_save_path, warning):
+    """ Read the symmetry copies of a conformer as z-matrices in the form of
+        its z-matrix, skipping those that can't be converted
+    """
+    sym_fs = autofile.fs.symmetry(cnf_save_path)
+    dtt = automol.zmat.conversion_info(zma)
+    sym_zmas = []
+    for sym_locs in sym_fs[-1].existing():
+        geo = sym_fs[-1].file.geometry.read(sym_locs)
+        geo_wdummy = automol.geom.apply_zmatrix_conversion(geo, dtt)
+        try:
+            sym_zmas.append(automol.zmat.from_geometry(zma, geo_wdummy))
+        except:
+            print(warning)
+    return sym_zmas
@@ -11,6 +11,7 @@ from phydat import phycon
 from mechanalyzer.inf import spc as sinfo
 from mechanalyzer.inf import thy as tinfo
 from mechanalyzer.inf import rxn as rinfo
+from mechlib.filesys import scan
 from mechlib.filesys._build import build_fs
 from mechlib.filesys.mincnf import min_energy_conformer_locators
 
@@ -43,24 +44,37 @@ def potential(names, grid_vals, cnf_save_path,
         scn_fs = autofile.fs.scan(zma_path)
     else:
         scn_fs = autofile.fs.cscan(zma_path)
-    # Read the filesystem
-    for idx, vals in enumerate(grid_coords):
 
-        # Get angles in degrees for potential for now
-        vals_conv = tuple(val*phycon.RAD2DEG for val in vals)
-
-        # Get locs for reading filesysten
+    # Get locs for reading filesystem
+    locs_lst, back_locs_lst = [], []
+    for idx, vals in enumerate(grid_coords):
         locs = [names, vals]
         back_locs = [names, back_coords[idx]]
         if constraint_dct is not None:
             locs = [constraint_dct] + locs
             back_locs = [constraint_dct] + back_locs
-        # print('path', scn_fs[-1].path(locs))
+        locs_lst.append(locs)
+        back_locs_lst.append(back_locs)
+
+    # Read the values of interest for all of the points at once
+    read_qtys = (('geometry', read_geom, geoms),
+                 ('gradient', read_grad, grads),
+                 ('hessian', read_hess, hessians),
+                 ('zmatrix', read_zma, zmas))
+    scan_data = scan.load(
+        scn_fs, locs_lst, mod_tors_ene_info[1:4],
+        quantities=['energy'] + [qty for qty, read, _ in read_qtys if read])
+    if read_energy_backstep:
+        back_data = scan.load(scn_fs, back_locs_lst, mod_tors_ene_info[1:4])
 
-        # Read values of interest
-        ene = energy(scn_fs, locs, mod_tors_ene_info)
+    for idx, vals in enumerate(grid_coords):
+
+        # Get angles in degrees for potential for now
+        vals_conv = tuple(val*phycon.RAD2DEG for val in vals)
+
+        ene = scan.point_value(scan_data, 'energy', idx)
         if read_energy_backstep:
-            back_ene = energy(scn_fs, back_locs, mod_tors_ene_info)
+            back_ene = scan.point_value(back_data, 'energy', idx)
             step_ene = None
             if ene is not None:
                 if back_ene is not None:
@@ -84,31 +98,11 @@ def potential(names, grid_vals, cnf_save_path,
         else:
             pot[vals_conv] = (ene - ref_ene) * phycon.EH2KCAL
 
-        if read_geom:
-            if scn_fs[-1].file.geometry.exists(locs):
-                geoms[vals_conv] = scn_fs[-1].file.geometry.read(locs)
-            else:
-                geoms[vals_conv] = None
-
-        if read_grad:
-            if scn_fs[-1].file.gradient.exists(locs):
-                grads[vals_conv] = scn_fs[-1].file.gradient.read(locs)
-            else:
-                grads[vals_conv] = None
-
-        if read_hess:
-            if scn_fs[-1].file.hessian.exists(locs):
-                hessians[vals_conv] = scn_fs[-1].file.hessian.read(locs)
-            else:
-                hessians[vals_conv] = None
-
-        if read_zma:
-            if scn_fs[-1].file.zmatrix.exists(locs):
-                zmas[vals_conv] = scn_fs[-1].file.zmatrix.read(locs)
-            else:
-                zmas[vals_conv] = None
+        for qty, read, dct in read_qtys:
+            if read:
+                dct[vals_conv] = scan.point_value(scan_data, qty, idx)
 
-        paths[vals] = scn_fs[-1].path(locs)
+        paths[vals] = scan_data['paths'][idx]
 
     # If potential has any terms that are not None, ID and remove bad points
     if remove_bad_points and len(names) == 1:
@@ -0,0 +1,183 @@
+"""
+  Process-wide cache of the data read from the save filesystem
+
+  Every read of an autofile data file (geometries, z-matrices, energies,
+  Hessians, gradients, info objects, and so on) goes through this cache once
+  `layers.install` has been called. Entries are keyed on the file path plus
+  its modification time and size, so a file that is rewritten is read again.
+  Entries are evicted, least recently used first, once the total size of the
+  cached files passes a byte budget, which can be set with `configure` or the
+  AUTOMECH_READ_CACHE_MB environment variable (0 turns the cache off).
+
+  Files modified in the last few seconds are not cached, since a second write
+  within the filesystem's timestamp resolution may not change the key, and
+  writes made through autofile drop the entry for the file (`invalidate`).
+  The cache can be used from several threads at once.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+BUDGET_ENV = 'AUTOMECH_READ_CACHE_MB'
+DEFAULT_BUDGET_MB = 256
+RACY_SECONDS = 2.
+
+# Values that can be handed out without copying
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+_CACHE = OrderedDict()
+_LOCK = threading.RLock()
+_STATE = {
+    'budget': None,
+    'nbytes': 0,
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+}
+
+
+def configure(budget_mb=None):
+    """ Set the byte budget of the cache, evicting entries if needed
+
+        :param budget_mb: the budget in MB (default: AUTOMECH_READ_CACHE_MB if
+            set, otherwise 256); 0 turns the cache off
+        :type budget_mb: float
+    """
+    if budget_mb is None:
+        budget_mb = float(os.environ.get(BUDGET_ENV, DEFAULT_BUDGET_MB))
+    _STATE['budget'] = int(budget_mb * 1e6)
+    _evict()
+
+
+def cached_read(dfile, dir_pth, read_):
+    """ Read an autofile data file, from the cache if it is there
+
+        :param dfile: the data file
+        :type dfile: autofile.model.DataFile
+        :param dir_pth: the directory holding the file
+        :type dir_pth: str
+        :param read_: function that reads the file, given `dfile` and
+            `dir_pth`, on a cache miss
+        :type read_: callable
+    """
+
+    if not _budget():
+        return read_(dfile, dir_pth)
+
+    path = dfile.path(dir_pth)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # Let autofile report the missing file
+        return read_(dfile, dir_pth)
+
+    # Each entry is (modification time, size, value)
+    with _LOCK:
+        entry = _CACHE.get(path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns,
+                                               stat.st_size):
+            _CACHE.move_to_end(path)
+            _STATE['hits'] += 1
+            return _copy(entry[2])
+
+        _STATE['misses'] += 1
+        invalidate(path)
+
+    val = read_(dfile, dir_pth)
+    if (stat.st_size <= _budget() and
+            time.time() - stat.st_mtime > RACY_SECONDS):
+        with _LOCK:
+            invalidate(path)
+            _CACHE[path] = (stat.st_mtime_ns, stat.st_size, val)
+            _STATE['nbytes'] += stat.st_size
+            _evict()
+        val = _copy(val)
+
+    return val
+
+
+def invalidate(path=None):
+    """ Drop the cached data for a file, or for every file
+
+        :param path: path to the file (default: all files)
+        :type path: str
+    """
+    with _LOCK:
+        if path is None:
+            _CACHE.clear()
+            _STATE['nbytes'] = 0
+        elif path in _CACHE:
+            _STATE['nbytes'] -= _CACHE.pop(path)[1]
+
+
+def stats():
+    """ Get the hit and miss counts and the size of the cache
+
+        :rtype: dict[str, int]
+    """
+    return {
+        'hits': _STATE['hits'],
+        'misses': _STATE['misses'],
+        'evictions': _STATE['evictions'],
+        'entries': len(_CACHE),
+        'bytes': _STATE['nbytes'],
+        'budget': _budget(),
+    }
+
+
+def stats_string():
+    """ Summarize the cache statistics in a line
+
+        :rtype: str
+    """
+    sts = stats()
+    nreads = sts['hits'] + sts['misses']
+    rate = 100. * sts['hits'] / nreads if nreads else 0.
+    return (f"Save filesystem read cache: {sts['hits']} hits, "
+            f"{sts['misses']} misses ({rate:.1f}% hit rate), "
+            f"{sts['entries']} entries, {sts['bytes'] / 1e6:.1f} MB, "
+            f"{sts['evictions']} evictions")
+
+
+def reset_stats():
+    """ Zero the hit, miss, and eviction counts
+    """
+    _STATE['hits'] = _STATE['misses'] = _STATE['evictions'] = 0
+
+
+def _budget():
+    """ The byte budget, reading it from the environment on first use
+    """
+    if _STATE['budget'] is None:
+        configure()
+    return _STATE['budget']
+
+
+def _evict():
+    """ Evict the least recently used entries until the cache fits its budget
+    """
+    budget = _budget()
+    with _LOCK:
+        while _CACHE and _STATE['nbytes'] > budget:
+            _, entry = _CACHE.popitem(last=False)
+            _STATE['nbytes'] -= entry[1]
+            _STATE['evictions'] += 1
+
+
+def _copy(val):
+    """ Copy a value unless it is immutable, so callers that modify what they
+        read (such as info objects) don't modify the cached value
+    """
+    if isinstance(val, _IMMUTABLE_TYPES):
+        return val
+    if isinstance(val, tuple):
+        try:
+            hash(val)
+            return val
+        except TypeError:
+            pass
+    return copy.deepcopy(val)
@@ -6,6 +6,10 @@ import automol
 import elstruct
 import autofile
 from mechlib.amech_io import printer as ioprinter
+from mechlib.filesys import catalog
+from mechlib.filesys import jobreg
+from mechlib.filesys._lock import update_info
+from mechlib.filesys._complete import mark_complete
 
 
 def atom(sp_ret, cnf_fs, thy_locs, zma,
@@ -31,10 +35,12 @@ def atom(sp_ret, cnf_fs, thy_locs, zma,
     geo = automol.zmat.geometry(zma)
     cnf_fs[-1].file.geometry.write(geo, cnf_locs)
     zma_fs[-1].file.zmatrix.write(zma, zma_locs)
+    catalog.record_conformer(cnf_fs, cnf_locs, geo=geo)
 
     # Save data from energy job
     sp_fs = autofile.fs.single_point(cnf_fs[-1].path(cnf_locs))
     _save_energy(sp_ret, sp_fs, thy_locs)
+    mark_complete(cnf_fs[-1].path(cnf_locs))
 
 
 def _conformer_setup(cnf_fs, rng_locs, tors_locs, zma_locs):
@@ -69,18 +75,21 @@ def conformer(opt_ret, hess_ret, cnf_fs, thy_locs,
         cnf_fs, rng_locs, tors_locs, zma_locs)
 
     # Save data from optimization and hessian jobs
-    _save_geom(opt_ret, cnf_fs, cnf_locs)
+    geo = _save_geom(opt_ret, cnf_fs, cnf_locs)
     _save_zmatrix(opt_ret, zma_fs, zma_locs, init_zma=init_zma)
+    catalog.record_conformer(cnf_fs, cnf_locs, geo=geo)
     _save_energy(opt_ret, sp_fs, thy_locs)
 
     if hess_ret is not None:
-        _save_hessian(hess_ret, cnf_fs, cnf_locs)
+        freqs = _save_hessian(hess_ret, cnf_fs, cnf_locs)
+        catalog.record_conformer(cnf_fs, cnf_locs, freqs=freqs)
 
     # Save ring and cnf samp files, if needed
     init_cnf_samp(cnf_fs, cnf_locs)
 
     # Save auxiliary information for the structure, if needed
     _conformer_aux_info(zma_fs, zma_locs, zrxn=zrxn)
+    mark_complete(cnf_fs[-1].path(cnf_locs))
 
 
 def parsed_conformer(
@@ -95,15 +104,18 @@ def parsed_conformer(
     geo, zma, ene, inf_obj, inp_str = save_info
     _save_geom_parsed(geo, inf_obj, inp_str, cnf_fs, cnf_locs)
     _save_zmatrix_parsed(zma, inf_obj, inp_str, zma_fs, zma_locs)
+    catalog.record_conformer(cnf_fs, cnf_locs, geo=geo)
     _save_energy_parsed(ene, inf_obj, inp_str, sp_fs, thy_locs)
     if hess_ret is not None:
-        _save_hessian(hess_ret, cnf_fs, cnf_locs)
+        freqs = _save_hessian(hess_ret, cnf_fs, cnf_locs)
+        catalog.record_conformer(cnf_fs, cnf_locs, freqs=freqs)
 
     # Save ring and cnf samp files, if needed
     init_cnf_samp(cnf_fs, cnf_locs)
 
     # Save auxiliary information for the structure, if needed
     _conformer_aux_info(zma_fs, zma_locs, zrxn=zrxn)
+    mark_complete(cnf_fs[-1].path(cnf_locs))
 
 
 def sym_indistinct_conformer(geo, cnf_fs, cnf_tosave_locs, cnf_saved_locs, inf_obj=None):
@@ -123,6 +135,10 @@ def sym_indistinct_conformer(geo, cnf_fs, cnf_tosave_locs, cnf_saved_locs, inf_o
     if inf_obj:
         sym_save_fs[-1].file.geometry_info.write(inf_obj, [cnf_tosave_locs[-1]])
 
+    # The conformer's registered input z-matrices no longer cover its
+    # symmetric duplicates
+    jobreg.forget(cnf_fs[0].path(), cnf_saved_locs)
+
 def scan_point_structure(opt_ret, scn_fs, scn_locs, thy_locs, job,
                          init_zma=None, init_geo=None):
     """ save info for the hindered rotor
@@ -144,19 +160,25 @@ def scan_point_structure(opt_ret, scn_fs, scn_locs, thy_locs, job,
 
 def init_cnf_samp(cnf_fs, cnf_locs):
     """ init cnf samp
+
+        The trunk and branch info files are only written if there are none,
+        checking under their locks, so that counts written by other processes
+        in the meantime are kept.
     """
 
-    inf_obj = autofile.schema.info_objects.conformer_trunk(0)
-    inf_obj.nsamp = 1
+    def _init(inf_obj_fn):
+        def _default():
+            inf_obj = inf_obj_fn(0)
+            inf_obj.nsamp = 1
+            return inf_obj
+        return _default
 
-    if not cnf_fs[0].file.info.exists():
-        rinf_obj = autofile.schema.info_objects.conformer_trunk(0)
-        rinf_obj.nsamp = 1
-        cnf_fs[0].file.info.write(rinf_obj)
-    if not cnf_fs[1].file.info.exists([cnf_locs[0]]):
-        cinf_obj = autofile.schema.info_objects.conformer_branch(0)
-        cinf_obj.nsamp = 1
-        cnf_fs[1].file.info.write(cinf_obj, [cnf_locs[0]])
+    update_info(
+        cnf_fs[0], lambda inf_obj: inf_obj,
+        default=_init(autofile.schema.info_objects.conformer_trunk))
+    update_info(
+        cnf_fs[1], lambda inf_obj: inf_obj, locs=[cnf_locs[0]],
+        default=_init(autofile.schema.info_objects.conformer_branch))
 
 
 # Saving other
@@ -184,6 +206,7 @@ def instability(conn_zma, disconn_zmas, cnf_save_fs,
     zma_save_fs[-1].create(zma_locs)
     zma_save_fs[-1].file.zmatrix.write(conn_zma, zma_locs)
     zma_save_fs[-1].file.instability.write(zrxn, zma_locs)
+    catalog.record_conformer(cnf_save_fs, cnf_locs, geo=conn_geo)
 
     # Set and print the save path information
     print(" - Saving...")
@@ -363,6 +386,8 @@ def _save_geom(ret, cnf_fs, cnf_locs):
     geo = elstruct.reader.opt_geometry(prog, out_str)
     _save_geom_parsed(geo, inf_obj, inp_str, cnf_fs, cnf_locs)
 
+    return geo
+
 
 def _save_grad(ret, cnf_fs, cnf_locs):
     """ Saving a geometry
@@ -423,6 +448,7 @@ def _save_energy_parsed(ene, inf_obj, inp_str, sp_fs, sp_locs):
     sp_fs[-1].file.input.write(inp_str, sp_locs)
     sp_fs[-1].file.info.write(inf_obj, sp_locs)
     sp_fs[-1].file.energy.write(ene, sp_locs)
+    catalog.record_energy(sp_fs[0].path(), sp_locs, ene)
 
 
 def _save_energy(ret, sp_fs, sp_locs):
@@ -460,6 +486,8 @@ def _save_hessian(ret, cnf_fs, cnf_locs):
     freqs = elstruct.reader.harmonic_frequencies(prog, out_str)
     _save_hessian_parsed(hess, freqs, inf_obj, inp_str, cnf_fs, cnf_locs)
 
+    return freqs
+
 
 def _save_rotors(zma_fs, zma_locs, zrxn=None):
     """ Save the rotors
@@ -0,0 +1,304 @@
+"""
+  Bulk reader for the points of a coordinate scan
+
+  Reading a scan point by point opens several small files for every point,
+  which adds up to tens of thousands of opens for a multi-dimensional rotor.
+  `load` lists the scan directory once, reads the requested quantities for
+  all of the points in parallel threads, and returns them as NumPy arrays,
+  with a mask for the points that are missing. The arrays are also packed
+  into a hidden .npz file beside the scan, which later loads of the same
+  points use directly, as long as none of the files they were read from has
+  changed since (going by modification times and sizes, which takes one
+  stat for each file rather than an open and a parse).
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+
+import numpy
+import autofile
+from mechlib.filesys import archive
+
+
+NTHREADS = 16
+CACHE_VERSION = 2
+ARRAY_QUANTITIES = ('energy', 'geometry', 'gradient', 'hessian')
+QUANTITIES = ARRAY_QUANTITIES + ('zmatrix',)
+
+
+def load(scn_fs, locs_lst, sp_thy_locs, quantities=('energy',),
+         cache=True, nthreads=NTHREADS):
+    """ Read quantities for a list of scan points
+
+        Energies are read from the single-point filesystem of each point, and
+        the other quantities from the scan point itself. Z-matrices are
+        returned as a list, and are not cached.
+
+        :param scn_fs: SCAN or CSCAN object with save filesys prefix
+        :type scn_fs: autofile.fs.scan obj
+        :param locs_lst: the locators of each point, such as [names, vals]
+        :type locs_lst: tuple(list)
+        :param sp_thy_locs: the theory locators of the energies
+        :type sp_thy_locs: tuple(str)
+        :param quantities: which of 'energy', 'geometry', 'gradient',
+            'hessian', and 'zmatrix' to read
+        :type quantities: tuple(str)
+        :param cache: read and write the .npz cache?
+        :type cache: bool
+        :param nthreads: the number of threads to read with
+        :type nthreads: int
+        :return: a dictionary with the grid values ('grid'), the point paths
+            ('paths'), an array for each quantity (NaN where it is missing),
+            the atomic symbols ('symbols'), and a dictionary of masks
+            ('mask') that are True where each quantity was found
+        :rtype: dict
+    """
+
+    quantities = tuple(quantities)
+    assert all(qty in QUANTITIES for qty in quantities), (
+        f'{quantities} not in {QUANTITIES}')
+
+    paths = [os.path.normpath(scn_fs[-1].path(locs)) for locs in locs_lst]
+    grid = numpy.array([tuple(locs[-1]) for locs in locs_lst], dtype=float)
+
+    # List each scan directory once, rather than checking each point
+    existing = set()
+    for parent in sorted(set(map(os.path.dirname, paths))):
+        try:
+            with os.scandir(parent) as entries:
+                existing.update(os.path.normpath(entry.path)
+                                for entry in entries if entry.is_dir())
+        except FileNotFoundError:
+            pass
+    found = [path in existing or archive.is_archived_dir(path)
+             for path in paths]
+
+    cache_path = _cache_path(paths, sp_thy_locs, quantities)
+    signature = None
+    data = None
+    if cache:
+        signature = _signature(
+            scn_fs, locs_lst, paths, found, sp_thy_locs, quantities)
+        data = _read_cache(cache_path, signature)
+    if data is None:
+        data = _empty_data(grid, paths, quantities)
+    else:
+        # Quantities that are not cached, such as z-matrices, are read
+        for qty in quantities:
+            if qty not in data['mask']:
+                empty = _empty_data(grid, paths, (qty,))
+                data[qty] = empty[qty]
+                data['mask'][qty] = empty['mask'][qty]
+
+    # Read the quantities that are missing, some of which may have been
+    # saved since the cache was written
+    args = []
+    for idx, locs in enumerate(locs_lst):
+        qtys = tuple(qty for qty in quantities
+                     if not data['mask'][qty][idx])
+        if qtys and found[idx]:
+            args.append((idx, locs, qtys))
+    nfound = 0
+    if args:
+        with concurrent.futures.ThreadPoolExecutor(nthreads) as executor:
+            results = executor.map(
+                lambda arg: _read_point(scn_fs, arg[1], paths[arg[0]],
+                                        sp_thy_locs, arg[2]),
+                args)
+            for (idx, _, _), vals in zip(args, results):
+                nfound += _set_point(data, idx, vals)
+
+    # The signature is from before the reads, so a file written while it
+    # was being read makes the next load read it again
+    if cache and (nfound or not os.path.exists(cache_path)) and (
+            os.path.isdir(os.path.dirname(cache_path))):
+        _write_cache(cache_path, data, signature)
+
+    return data
+
+
+def point_value(data, quantity, idx):
+    """ Get a quantity for one point of a loaded scan, in the form autofile
+        reads it in, or None if it is missing
+
+        :param data: a loaded scan (see `load`)
+        :type data: dict
+        :param quantity: 'energy', 'geometry', 'gradient', 'hessian', or
+            'zmatrix'
+        :type quantity: str
+        :param idx: the index of the point
+        :type idx: int
+    """
+
+    if not data['mask'][quantity][idx]:
+        return None
+
+    val = data[quantity][idx]
+    if quantity == 'energy':
+        val = float(val)
+    elif quantity == 'geometry':
+        val = tuple((sym, tuple(map(float, xyz)))
+                    for sym, xyz in zip(data['symbols'], val))
+    elif quantity in ('gradient', 'hessian'):
+        val = tuple(tuple(map(float, row)) for row in val)
+
+    return val
+
+
+def _read_point(scn_fs, locs, path, sp_thy_locs, quantities):
+    """ Read the quantities for a single point
+    """
+    vals = {}
+    if 'energy' in quantities:
+        sp_fs = autofile.fs.single_point(path)
+        if sp_fs[-1].file.energy.exists(sp_thy_locs):
+            vals['energy'] = sp_fs[-1].file.energy.read(sp_thy_locs)
+    for qty in quantities:
+        if qty != 'energy':
+            dfile = getattr(scn_fs[-1].file, qty)
+            if dfile.exists(locs):
+                vals[qty] = dfile.read(locs)
+    return vals
+
+
+def _signature(scn_fs, locs_lst, paths, found, sp_thy_locs, quantities):
+    """ A signature of the files the cached quantities are read from, which
+        changes whenever one of them is written, removed, or packed
+    """
+    sig = []
+    for locs, path, found_ in zip(locs_lst, paths, found):
+        if not found_:
+            sig.append(None)
+            continue
+        for qty in quantities:
+            if qty == 'energy':
+                sp_fs = autofile.fs.single_point(path)
+                file_path = sp_fs[-1].file.energy.path(sp_thy_locs)
+            elif qty in ARRAY_QUANTITIES:
+                file_path = getattr(scn_fs[-1].file, qty).path(locs)
+            else:
+                continue
+            sig.append(_file_signature(file_path))
+    return hashlib.sha256(json.dumps(sig).encode()).hexdigest()
+
+
+def _file_signature(path):
+    """ The modification time and size of a file, or its place in its
+        archive if it is packed, or None if it is missing
+    """
+    try:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except FileNotFoundError:
+        found = archive.find(path)
+        if found is None:
+            return None
+        arc_dir, key = found
+        return list(archive.index(arc_dir)[0][key])
+
+
+def _empty_data(grid, paths, quantities):
+    """ Data for a scan with no points found
+    """
+    npts = len(paths)
+    data = {
+        'grid': grid,
+        'paths': list(paths),
+        'symbols': (),
+        'mask': {qty: numpy.zeros(npts, dtype=bool) for qty in quantities},
+    }
+    for qty in quantities:
+        data[qty] = (numpy.full(npts, numpy.nan) if qty == 'energy' else
+                     [None] * npts if qty == 'zmatrix' else None)
+    return data
+
+
+def _set_point(data, idx, vals):
+    """ Put the values read for a point into the data, allocating the arrays
+        from the first point read, and return the number of values set that
+        are cached
+    """
+    npts = len(data['paths'])
+    for qty, val in vals.items():
+        if qty == 'geometry':
+            data['symbols'] = tuple(sym for sym, _ in val)
+            val = [xyz for _, xyz in val]
+        if qty in ('energy', 'zmatrix'):
+            data[qty][idx] = val
+        else:
+            val = numpy.array(val, dtype=float)
+            if data[qty] is None:
+                data[qty] = numpy.full((npts,) + val.shape, numpy.nan)
+            data[qty][idx] = val
+        data['mask'][qty][idx] = True
+    return sum(qty in ARRAY_QUANTITIES for qty in vals)
+
+
+def _cache_path(paths, sp_thy_locs, quantities):
+    """ Path to the cache for a set of points and quantities, beside the
+        directory of the first point rather than in it, so that writing the
+        cache doesn't change the modification time of the directory
+    """
+    names = [os.path.basename(path) for path in paths]
+    key = json.dumps([CACHE_VERSION, names,
+                      list(map(str, sp_thy_locs)), sorted(quantities)])
+    key = hashlib.sha256(key.encode()).hexdigest()[:16]
+    scan_path = os.path.dirname(paths[0]) if paths else ''
+    dir_path, scan_name = os.path.split(scan_path)
+    return os.path.join(dir_path, f'.{scan_name}-{key}.npz')
+
+
+def _read_cache(cache_path, signature):
+    """ Read the cache, if it exists and none of the files it was read from
+        have changed since it was written
+    """
+    try:
+        with numpy.load(cache_path, allow_pickle=False) as npz:
+            if str(npz['signature']) != signature:
+                return None
+            quantities = json.loads(str(npz['quantities']))
+            data = {
+                'grid': npz['grid'],
+                'paths': [str(path) for path in npz['paths']],
+                'symbols': tuple(str(sym) for sym in npz['symbols']),
+                'mask': {qty: npz[f'mask_{qty}'] for qty in quantities},
+            }
+            for qty in quantities:
+                data[qty] = (npz[qty] if npz[f'mask_{qty}'].any() else
+                             _empty_data(data['grid'], data['paths'],
+                                         (qty,))[qty])
+    except (OSError, KeyError, ValueError):
+        return None
+    return data
+
+
+def _write_cache(cache_path, data, signature):
+    """ Write the cache, atomically
+    """
+    quantities = [qty for qty in data['mask'] if qty in ARRAY_QUANTITIES]
+    arrays = {
+        'signature': signature,
+        'quantities': json.dumps(quantities),
+        'grid': data['grid'],
+        'paths': numpy.array(data['paths'], dtype=str),
+        'symbols': numpy.array(data['symbols'], dtype=str),
+    }
+    for qty in quantities:
+        arrays[f'mask_{qty}'] = data['mask'][qty]
+        if data[qty] is not None:
+            arrays[qty] = data[qty]
+        else:
+            arrays[qty] = numpy.full(len(data['paths']), numpy.nan)
+
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as fobj:
+            numpy.savez(fobj, **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,329 @@
+""" Monte Carlo sampling of structures
+
+    Monte Carlo samples are optimized independently of each other, so rather
+    than optimizing one sample at a time, several optimizations can be kept
+    running at once, as long as there are enough processors for them. Each
+    optimization runs in a worker process (the electronic structure runners
+    change the working directory, so they can't share a process), and the
+    results are saved one at a time, in the calling process, as they come in.
+    The workers send their log messages and profiler spans back to the
+    calling process, since they end without flushing them.
+
+    Sampling can stop before the requested number of samples once it has
+    converged on the low-energy conformers (`sampling_converged`): when none
+    of the last few samples found a new conformer within an energy window of
+    the lowest one, or when the Good-Turing estimate of the chance that the
+    next sample finds a conformer not yet seen in the run (the fraction of
+    samples that found a conformer no other sample found) is small.
+
+    The torsion values of the samples are drawn in batches, as arrays, and
+    each draw is accepted or rejected with
+    `automol.zmat.has_low_relative_repulsion_energy` alone, in the order
+    drawn, so that the samples are the same as drawing them one at a time.
+"""
+
+import concurrent.futures
+import multiprocessing
+
+import numpy
+import automol
+import autofile
+import elstruct
+from mechlib import filesys
+from mechlib.amech_io import printer as ioprinter
+from mechlib.amech_io import profiler
+from mechlib.amech_io.printer import info_message, debug_message
+from mechroutines.es import runner as es_runner
+
+
+# Number of samples a run needs before it can be judged converged
+MIN_CONV_SAMPLES = 10
+
+
+def nconcurrent(nprocs, samp_nprocs=None):
+    """ Determine how many samples to run at once
+
+        :param nprocs: number of processors for each job, from the theory
+        :type nprocs: int
+        :param samp_nprocs: number of processors for all of the sampling
+            jobs together (default: only run one job at a time)
+        :type samp_nprocs: int
+        :rtype: int
+    """
+    if not samp_nprocs:
+        return 1
+    return max(1, samp_nprocs // max(1, int(nprocs)))
+
+
+def run_samples(next_sample, run_sample, save_sample,
+                nremaining, max_attempts, nconc=1, converged=None):
+    """ Run samples until the requested number have been saved, the
+        maximum number have been attempted, or the sampling has converged
+
+        No more samples are in flight than are still needed, so that the
+        number saved doesn't overshoot the number requested. Once the
+        sampling has converged, no new samples are started, but those in
+        flight are still saved.
+
+        :param next_sample: generates a sample, returning the arguments to
+            run it with
+        :type next_sample: callable
+        :param run_sample: runs a sample, returning success and the results;
+            must be a module-level function, to run in a worker process
+        :type run_sample: callable
+        :param save_sample: saves a sample, given its arguments, success, and
+            results, returning the number of samples still needed
+        :type save_sample: callable
+        :param nremaining: number of samples needed
+        :type nremaining: int
+        :param max_attempts: maximum number of samples to run
+        :type max_attempts: int
+        :param nconc: number of samples to run at once
+        :type nconc: int
+        :param converged: checks, after each sample is saved, whether the
+            sampling has converged (default: run all the samples)
+        :type converged: callable
+        :return: number of samples still needed
+        :rtype: int
+    """
+
+    nattempts = 0
+    stop = False
+    if nconc <= 1:
+        while nremaining > 0 and nattempts < max_attempts and not stop:
+            args = next_sample()
+            nattempts += 1
+            nremaining = save_sample(args, *run_sample(*args))
+            stop = converged is not None and converged()
+        return nremaining
+
+    # The pool is shut down before the listener, so that it writes every
+    # message the workers sent
+    mp_context = multiprocessing.get_context()
+    log_queue = mp_context.Queue()
+    executor = concurrent.futures.ProcessPoolExecutor(
+        nconc, mp_context=mp_context, initializer=_init_worker,
+        initargs=(log_queue, ioprinter.log_level(), profiler.start_time()))
+    with ioprinter.log_listener(log_queue), executor:
+        running = {}
+        while True:
+            while (len(running) < min(nconc, nremaining) and
+                   nattempts < max_attempts and not stop):
+                args = next_sample()
+                nattempts += 1
+                running[executor.submit(_run_sample, run_sample, args)] = args
+            if not running:
+                break
+
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                args = running.pop(future)
+                ret, events = future.result()
+                profiler.add_events(events)
+                nremaining = save_sample(args, *ret)
+                stop = stop or (converged is not None and converged())
+
+    return nremaining
+
+
+def _init_worker(log_queue, log_level, profile_start):
+    """ Set up a sampling worker process to send its log messages and
+        profiler spans to the main process
+    """
+    ioprinter.forward_logging(log_queue, log_level)
+    profiler.worker_init(profile_start)
+
+
+def _run_sample(run_sample, args):
+    """ Run a sample in a worker process, returning its results along with
+        the profiler spans it recorded
+    """
+    ret = run_sample(*args)
+    return ret, profiler.take_events()
+
+
+def convergence_tracker(nstall=None, ewin=1.0, unseen_thresh=None):
+    """ Start tracking the conformers found by a sampling run, to decide
+        when it has converged
+
+        :param nstall: stop after this many samples in a row have found no
+            new conformer within the energy window (default: don't)
+        :type nstall: int
+        :param ewin: the energy window above the lowest conformer, in
+            kcal/mol
+        :type ewin: float
+        :param unseen_thresh: stop once the Good-Turing estimate of the
+            chance of finding an unseen conformer falls below this
+            (default: don't)
+        :type unseen_thresh: float
+        :rtype: dict
+    """
+    return {'nstall': nstall, 'ewin': ewin, 'unseen_thresh': unseen_thresh,
+            'nsamp': 0, 'counts': {}, 'last_new': 0, 'converged': False}
+
+
+def record_conformer(tracker, cnf_locs, new, rel_ene):
+    """ Record the conformer that a sample optimized to
+
+        :param tracker: the convergence tracker
+        :type tracker: dict
+        :param cnf_locs: the locators of the conformer
+        :type cnf_locs: tuple(str)
+        :param new: was the conformer saved by this sample?
+        :type new: bool
+        :param rel_ene: energy of the conformer relative to the lowest saved
+            conformer, in kcal/mol
+        :type rel_ene: float
+    """
+    tracker['nsamp'] += 1
+    counts = tracker['counts']
+    counts[cnf_locs] = counts.get(cnf_locs, 0) + 1
+    if new and rel_ene <= tracker['ewin']:
+        tracker['last_new'] = tracker['nsamp']
+
+
+def sampling_converged(tracker, print_debug=True):
+    """ Decide whether a sampling run has converged, logging the decision
+        and its statistics
+
+        :param tracker: the convergence tracker
+        :type tracker: dict
+        :rtype: bool
+    """
+    nsamp = tracker['nsamp']
+    nsingle = sum(1 for count in tracker['counts'].values() if count == 1)
+    unseen = nsingle / nsamp if nsamp else 1.
+    nsince = nsamp - tracker['last_new']
+    stats = (f'{nsamp} samples, {len(tracker["counts"])} conformers '
+             f'({nsingle} found once), chance of an unseen conformer '
+             f'{unseen:.3f}, {nsince} samples since a new conformer within '
+             f'{tracker["ewin"]} kcal/mol of the lowest')
+
+    reasons = []
+    if nsamp >= MIN_CONV_SAMPLES:
+        if tracker['nstall'] is not None and nsince >= tracker['nstall']:
+            reasons.append(f'no new low-energy conformer in {nsince} samples')
+        if (tracker['unseen_thresh'] is not None and
+                unseen < tracker['unseen_thresh']):
+            reasons.append('chance of an unseen conformer below '
+                           f'{tracker["unseen_thresh"]}')
+
+    if reasons:
+        info_message(
+            f'Conformer sampling converged ({"; ".join(reasons)}):', stats)
+        tracker['converged'] = True
+    else:
+        debug_message('Conformer sampling not converged:', stats,
+                      print_debug=print_debug)
+    return tracker['converged']
+
+
+def optimize_sample(samp_zma, cnf_run_path, spc_info, thy_info,
+                    script_str, overwrite, zrxn=None,
+                    frozen_coords_lst=None, retryfail=False, kwargs=None,
+                    registry=None):
+    """ Optimize a sampled structure in a conformer run directory
+
+        :param frozen_coords_lst: coordinates to freeze in each stage of a
+            multi-stage optimization (default: a single optimization)
+        :param registry: the trunk path of the run conformer filesystem and
+            the locators of the conformer, to register the job under in its
+            z-matrix registry while it runs
+        :type registry: (str, tuple(str))
+        :return: success, and the info object, input, and output of the job
+    """
+    if registry is None:
+        return _optimize_sample(
+            samp_zma, cnf_run_path, spc_info, thy_info, script_str,
+            overwrite, zrxn, frozen_coords_lst, retryfail, kwargs)
+    with filesys.jobreg.running(*registry, samp_zma):
+        return _optimize_sample(
+            samp_zma, cnf_run_path, spc_info, thy_info, script_str,
+            overwrite, zrxn, frozen_coords_lst, retryfail, kwargs)
+
+
+def _optimize_sample(samp_zma, cnf_run_path, spc_info, thy_info,
+                     script_str, overwrite, zrxn, frozen_coords_lst,
+                     retryfail, kwargs):
+    """ Optimize a sampled structure in a conformer run directory
+    """
+    kwargs = {} if kwargs is None else kwargs
+    run_fs = autofile.fs.run(cnf_run_path)
+    if frozen_coords_lst is not None:
+        return es_runner.multi_stage_optimization(
+            script_str=script_str,
+            run_fs=run_fs,
+            geo=samp_zma,
+            spc_info=spc_info,
+            thy_info=thy_info,
+            frozen_coords_lst=frozen_coords_lst,
+            zrxn=zrxn,
+            overwrite=overwrite,
+            saddle=bool(zrxn is not None),
+            retryfail=retryfail,
+            **kwargs
+        )
+    return es_runner.execute_job(
+        job=elstruct.Job.OPTIMIZATION,
+        script_str=script_str,
+        run_fs=run_fs,
+        geo=samp_zma,
+        spc_info=spc_info,
+        thy_info=thy_info,
+        zrxn=zrxn,
+        overwrite=overwrite,
+        saddle=bool(zrxn is not None),
+        retryfail=retryfail,
+        **kwargs
+    )
+
+
+def low_repulsion_samples(zma, nsamp, tors_range_dct, ref_zma=None,
+                          max_draws=1001, batch_size=64):
+    """ Draw samples of a Z-Matrix over torsions that have low repulsion
+        energy relative to a reference
+
+        Each sample is drawn up to `max_draws` times; if none of the draws
+        has low repulsion energy, the last one is returned.
+
+        :param zma: the Z-Matrix to sample
+        :type zma: automol Z-Matrix data structure
+        :param nsamp: number of samples
+        :type nsamp: int
+        :param tors_range_dct: the range of each torsion, by name
+        :type tors_range_dct: dict[str: (float, float)]
+        :param ref_zma: the reference Z-Matrix (default: `zma`)
+        :type ref_zma: automol Z-Matrix data structure
+        :param max_draws: maximum number of draws for each sample
+        :type max_draws: int
+        :param batch_size: number of torsion values to draw at once
+        :type batch_size: int
+        :return: the samples, and whether each has low repulsion energy
+        :rtype: (tuple(automol Z-Matrix data structure), tuple(bool))
+    """
+    ref_zma = zma if ref_zma is None else ref_zma
+    names = tuple(tors_range_dct.keys())
+    ranges = numpy.array(tuple(tors_range_dct.values()), dtype=float)
+
+    samp_zmas, lows = [], []
+    pending = []
+    ndraws = 0
+    while len(samp_zmas) < nsamp:
+        if not pending:
+            size = min(batch_size, (nsamp - len(samp_zmas)) * max_draws)
+            pending = list(numpy.random.uniform(
+                ranges[:, 0], ranges[:, 1], size=(size, len(names))))
+        vals = pending.pop(0)
+        ndraws += 1
+
+        samp_zma = automol.zmat.set_values_by_name(
+            zma, dict(zip(names, vals)), angstrom=False, degree=False)
+        low = automol.zmat.has_low_relative_repulsion_energy(
+            samp_zma, ref_zma)
+        if low or ndraws >= max_draws:
+            samp_zmas.append(samp_zma)
+            lows.append(bool(low))
+            ndraws = 0
+
+    return tuple(samp_zmas), tuple(lows)
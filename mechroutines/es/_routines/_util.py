@@ -1,9 +1,16 @@
 """ utilites
 """
 
+import functools
 import numpy
 import automol
+import autofile
+import elstruct
+from phydat import phycon
+from mechlib import filesys
 from mechlib.amech_io.printer import info_message
+from mechlib.filesys import read_nsamp
+from mechroutines.es._routines import _samp
 from automol.extern import Ring_Reconstruction as RR
 from rdkit import Chem, DistanceGeometry
 from rdkit.Chem import AllChem
@@ -41,9 +48,8 @@ def calc_nsampd(cnf_save_fs, cnf_run_fs, rid=None):
 
     if rid is None:
         cnf_save_fs[0].create()
-        if cnf_save_fs[0].file.info.exists():
-            inf_obj_s = cnf_save_fs[0].file.info.read()
-            nsampd = inf_obj_s.nsamp
+        if read_nsamp(cnf_save_fs[0]) is not None:
+            nsampd = read_nsamp(cnf_save_fs[0])
         elif cnf_run_fs[0].file.info.exists():
             inf_obj_r = cnf_run_fs[0].file.info.read()
             nsampd = inf_obj_r.nsamp
@@ -51,9 +57,8 @@ def calc_nsampd(cnf_save_fs, cnf_run_fs, rid=None):
             nsampd = 0
     else:
         cnf_save_fs[1].create([rid])
-        if cnf_save_fs[1].file.info.exists([rid]):
-            inf_obj_s = cnf_save_fs[1].file.info.read([rid])
-            nsampd = inf_obj_s.nsamp
+        if read_nsamp(cnf_save_fs[1], [rid]) is not None:
+            nsampd = read_nsamp(cnf_save_fs[1], [rid])
         elif cnf_run_fs[1].file.info.exists([rid]):
             inf_obj_r = cnf_run_fs[1].file.info.read([rid])
             nsampd = inf_obj_r.nsamp
@@ -306,3 +311,124 @@ def fixings_subs_positions(samp_zma, all_ring_atoms_list, coos, unconnected_keys
         samp_zma = automol.zmat.set_values_by_name(samp_zma, new_key_dct)
 
     return samp_zma
+
+
+def saved_ring_fragments(cnf_save_fs):
+    """ The ring-fragment Z-Matrix of the first conformer of each rid in the
+        save filesystem, read as they are needed
+    """
+    checked_rids = []
+    for locs in cnf_save_fs[-1].existing():
+        current_rid, _ = locs
+        if current_rid in checked_rids:
+            continue
+        checked_rids.append(current_rid)
+        locs_geo = cnf_save_fs[-1].file.geometry.read(locs)
+        yield current_rid, filesys.cnfindex.ring_fragment_zmatrix(locs_geo)
+
+
+def this_conformer_is_running(zma, cnf_run_fs):
+    """ Check the RUN filesystem for similar geometry
+        submissions that are currently running
+
+        Only the jobs whose input Z-Matrices in the registry of the run
+        filesystem are close to it are read and compared
+    """
+    read_zmas = functools.partial(_running_input_zmas, cnf_run_fs)
+    for locs in filesys.jobreg.candidates(
+            cnf_run_fs, zma, read_zmas, dist_rtol=0.018, ang_atol=.2):
+        if _conformer_is_running(zma, cnf_run_fs, locs):
+            return True
+    return False
+
+
+def _conformer_is_running(zma, cnf_run_fs, locs):
+    """ Check if the optimization in a conformer run directory is running
+        from a conformer
+    """
+    job = elstruct.Job.OPTIMIZATION
+    cnf_run_path = cnf_run_fs[-1].path(locs)
+    run_fs = autofile.fs.run(cnf_run_path)
+    run_path = run_fs[-1].path([job])
+    if run_fs[-1].file.info.exists([job]):
+        inf_obj = run_fs[-1].file.info.read([job])
+        status = inf_obj.status
+        if status == autofile.schema.RunStatus.RUNNING:
+            start_time = inf_obj.utc_start_time
+            current_time = autofile.schema.utc_time()
+            if (current_time - start_time).total_seconds() < 3000000:
+                subrun_fs = autofile.fs.subrun(run_path)
+                inp_str = subrun_fs[0].file.input.read([0, 0])
+                inp_str = inp_str.replace('=', '')
+                prog = inf_obj.prog
+                if 'molpro' in prog:
+                    print('Warning: Since using Molpro, check for running '
+                          'conformer is disabled!')
+                else:
+                    inp_zma = elstruct.reader.inp_zmatrix(prog, inp_str)
+                    if automol.zmat.almost_equal(
+                        inp_zma, zma, dist_rtol=0.018, ang_atol=.2):
+                        _hr = (current_time - start_time).total_seconds()/3600.
+                        info_message(
+                            'This conformer was started in the last ' +
+                            f'{_hr:3.4f} hours in {run_path}.')
+                        return True
+        else:
+            # The job finished without being taken out of the registry
+            filesys.jobreg.unregister(cnf_run_fs[0].path(), locs)
+    return False
+
+
+def _running_input_zmas(cnf_run_fs, locs):
+    """ Read the input Z-Matrix of the optimization in a conformer run
+        directory for the registry, if it is running (None if it hasn't
+        started)
+    """
+    job = elstruct.Job.OPTIMIZATION
+    run_fs = autofile.fs.run(cnf_run_fs[-1].path(locs))
+    if not run_fs[-1].file.info.exists([job]):
+        return None
+    inf_obj = run_fs[-1].file.info.read([job])
+    if (inf_obj.status != autofile.schema.RunStatus.RUNNING or
+            'molpro' in inf_obj.prog):
+        return []
+    subrun_fs = autofile.fs.subrun(run_fs[-1].path([job]))
+    inp_str = subrun_fs[0].file.input.read([0, 0]).replace('=', '')
+    inp_zma = elstruct.reader.inp_zmatrix(inf_obj.prog, inp_str)
+    return [] if inp_zma is None else [inp_zma]
+
+
+def saved_input_zmas(cnf_fs, locs):
+    """ Read the input Z-Matrix of a saved conformer, and the Z-Matrices of
+        its symmetric duplicates, for the registry
+    """
+    if not cnf_fs[-1].file.geometry_input.exists(locs):
+        return []
+    inp_str = cnf_fs[-1].file.geometry_input.read(locs).replace('=', '')
+    prog = cnf_fs[-1].file.geometry_info.read(locs).prog
+    inp_zma = elstruct.reader.inp_zmatrix(prog, inp_str)
+    if inp_zma is None:
+        return []
+
+    zmas = [inp_zma]
+    sym_fs = autofile.fs.symmetry(cnf_fs[-1].path(locs))
+    for sym_locs in sym_fs[-1].existing(ignore_bad_formats=True):
+        if sym_fs[-1].file.geometry.exists(sym_locs):
+            try:
+                zmas.append(filesys.save.rebuild_zma_from_opt_geo(
+                    inp_zma, sym_fs[-1].file.geometry.read(sym_locs)))
+            except (AssertionError, IndexError, KeyError, ValueError) as err:
+                # automol can't convert the geometry to the Z-Matrix's format
+                info_message(
+                    f'zmat in different format for {sym_fs[-1].path(sym_locs)}'
+                    f' ({err!r}), not registering it')
+    return zmas
+
+
+def record_conformer(tracker, cnf_locs, new, ene, cnf_idx):
+    """ Record the conformer that a sample optimized to for the convergence
+        of the sampling, with its energy relative to the lowest conformer
+    """
+    min_ene = numpy.min(numpy.append(cnf_idx['enes'], ene))
+    _samp.record_conformer(
+        tracker, cnf_locs, new, (ene - min_ene) * phycon.EH2KCAL)
@@ -1,9 +1,12 @@
 """ es_runners for conformer
 """
 
+import functools
+import os
 import shutil
 import time
 import random
+import numpy
 
 import automol
 import elstruct
@@ -15,6 +18,7 @@ from mechlib.amech_io.printer import info_message, warning_message
 from mechlib.amech_io.printer import debug_message, error_message, obj
 from mechlib.amech_io.printer import existing_path, bad_conformer, checking
 from mechroutines.es import runner as es_runner
+from mechroutines.es._routines import _samp
 from mechroutines.es._routines import _util as util
 from mechroutines.es._routines._geom import remove_imag
 
@@ -151,6 +155,7 @@ def _obtain_ini_geom(spc_dct_i, ini_cnf_save_fs,
             cnf_save_path = ini_cnf_save_fs[-1].path(locs)
             debug_message(f'Removing {cnf_save_path}')
             shutil.rmtree(cnf_save_path)
+            filesys.catalog.remove_conformer(ini_cnf_save_fs, locs)
 
     if geo_init is None:
         if 'geo_inp' in spc_dct_i:
@@ -309,7 +314,7 @@ def single_conformer(zma, spc_info, mod_thy_info,
                 cid = autofile.schema.generate_new_conformer_id()
                 locs = (rid, cid)
                 
-    if this_conformer_is_running(zma, cnf_run_fs):
+    if util.this_conformer_is_running(zma, cnf_run_fs):
         skip_job = True
     elif this_conformer_was_run_in_save(zma, cnf_save_fs):
         skip_job = True
@@ -335,20 +340,21 @@ def single_conformer(zma, spc_info, mod_thy_info,
 
         # Run the optimization
         info_message('Optimizing a single conformer...')
-        success, ret = es_runner.execute_job(
-            job=elstruct.Job.OPTIMIZATION,
-            script_str=script_str,
-            run_fs=run_fs,
-            geo=zma,
-            spc_info=spc_info,
-            thy_info=mod_thy_info,
-            zrxn=zrxn,
-            overwrite=overwrite,
-            frozen_coordinates=(),
-            saddle=bool(zrxn is not None),
-            retryfail=retryfail,
-            **kwargs
-        )
+        with filesys.jobreg.running(cnf_run_fs[0].path(), locs, zma):
+            success, ret = es_runner.execute_job(
+                job=elstruct.Job.OPTIMIZATION,
+                script_str=script_str,
+                run_fs=run_fs,
+                geo=zma,
+                spc_info=spc_info,
+                thy_info=mod_thy_info,
+                zrxn=zrxn,
+                overwrite=overwrite,
+                frozen_coordinates=(),
+                saddle=bool(zrxn is not None),
+                retryfail=retryfail,
+                **kwargs
+            )
 
         if success:
             inf_obj, _, out_str = ret
@@ -364,31 +370,18 @@ def single_conformer(zma, spc_info, mod_thy_info,
                 sym_id = _sym_unique(
                     geo, ene, saved_geos, saved_enes)
                 if sym_id is None:
-                    if cnf_save_fs[0].file.info.exists():
-                        debug_message(
-                            'inf_obj path', cnf_save_fs[0].path())
-                        rinf_obj = cnf_save_fs[0].file.info.read()
-                        rinf = rinf_obj
-                        debug_message(
-                            'inf_obj for r', rinf)
-                        rnsampd = rinf_obj.nsamp
-                        rnsampd += 1
-                        rinf.nsamp = rnsampd
-                    else:
-                        rinf = autofile.schema.info_objects.conformer_trunk(0)
-                        rinf.nsamp = 1
-                    if cnf_save_fs[1].file.info.exists([locs[0]]):
-                        cinf_obj_s = cnf_save_fs[1].file.info.read([locs[0]])
-                        cinf = cinf_obj_s
-                        cnsampd = cinf_obj_s.nsamp
-                        cnsampd += 1
-                        cinf.nsamp = cnsampd
-                    else:
-                        cinf = autofile.schema.info_objects.conformer_branch(0)
-                        cinf.nsamp = 1
+                    # Count the sample in the trunk and branch info,
+                    # without losing counts from other processes
                     cnf_save_fs[1].create([locs[0]])
-                    cnf_save_fs[0].file.info.write(rinf)
-                    cnf_save_fs[1].file.info.write(cinf, [locs[0]])
+                    rinf = filesys.increment_nsamp(
+                        cnf_save_fs[0],
+                        default=functools.partial(
+                            autofile.schema.info_objects.conformer_trunk, 0))
+                    debug_message('inf_obj for r', rinf)
+                    filesys.increment_nsamp(
+                        cnf_save_fs[1], [locs[0]],
+                        default=functools.partial(
+                            autofile.schema.info_objects.conformer_branch, 0))
                     filesys.save.conformer(
                         ret, None, cnf_save_fs, mod_thy_info[1:],
                         zrxn=zrxn, init_zma=zma,
@@ -421,8 +414,20 @@ def conformer_sampling(zma, spc_info, thy_info,
                        zrxn=None, two_stage=False,
                        retryfail=False, resave=False,
                        repulsion_thresh=40.0, print_debug=True,
-                       **kwargs):
+                       nconc=1, conv_nsamp=None, conv_ewin=1.0,
+                       conv_unseen=None, **kwargs):
     """ run sampling algorithm to find conformers
+
+        :param nconc: number of sample optimizations to run at once
+        :type nconc: int
+        :param conv_nsamp: stop once this many samples in a row have found
+            no new conformer within `conv_ewin` of the lowest one
+        :type conv_nsamp: int
+        :param conv_ewin: energy window for new conformers, in kcal/mol
+        :type conv_ewin: float
+        :param conv_unseen: stop once the estimated chance of finding an
+            unseen conformer falls below this
+        :type conv_unseen: float
     """
 
     # Check if any saving needs to be done before hand
@@ -433,7 +438,6 @@ def conformer_sampling(zma, spc_info, thy_info,
 
     # Build filesys
     cnf_save_fs[1].create([rid])
-    inf_obj = autofile.schema.info_objects.conformer_branch(0)
 
     # Set the samples
     nsamp, tors_range_dct = util.calc_nsamp(
@@ -452,97 +456,100 @@ def conformer_sampling(zma, spc_info, thy_info,
         info_message(
             f'Running {nsamp-nsampd} samples...', newline=1)
 
-    # Generate all of the conformers, as needed
-    samp_idx = 1
-    samp_attempt_idx = 1
-    while True:
-        nsamp = nsamp0 - nsampd
-        # Break the while loop if enough sampls completed
-        if nsamp <= 0:
-            info_message(
-                'Requested number of samples have been completed.',
-                'Conformer search complete.')
-            break
-        if samp_attempt_idx == brk_tot_samp:
-            info_message(
-                f'Max sample num: 5*{nsamp} attempted, ending search',
-                'Run again if more samples desired.')
-            break
-
-        # Run the conformer sampling
-        if nsampd > 0:
-            samp_zma, = automol.zmat.samples(zma, 1, tors_range_dct)
+    # Generate all of the conformers, as needed, running up to nconc
+    # optimizations at once and saving them one at a time
+    tors_names = tuple(tors_range_dct.keys()) if tors_range_dct else ()
+    print('two_stage test:', two_stage, tors_names)
+    frozen_coords_lst = (
+        (tors_names, ()) if two_stage and tors_names else None)
+    state = {'nsampd': nsampd, 'samp_idx': 1, 'ref_running': False,
+             'samp_zmas': []}
+
+    # Stop early once the low-energy conformers have all been found, if
+    # requested
+    tracker = _samp.convergence_tracker(
+        nstall=conv_nsamp, ewin=conv_ewin, unseen_thresh=conv_unseen)
+    converged = None
+    if conv_nsamp is not None or conv_unseen is not None:
+        converged = functools.partial(
+            _samp.sampling_converged, tracker, print_debug=print_debug)
+
+    def _next_sample():
+        # Start from the reference Z-Matrix, unless it has been run
+        if state['nsampd'] > 0 or state['ref_running']:
+            if not state['samp_zmas']:
+                info_message(
+                    'Generating sample Z-Matrices that do not have',
+                    'high intramolecular repulsion...')
+                samp_zmas, lows = _samp.low_repulsion_samples(
+                    zma, nconc, tors_range_dct)
+                if not all(lows):
+                    debug_message(
+                        'No sample with low repulsion found for',
+                        f'{lows.count(False)} samples; using them anyway',
+                        print_debug=print_debug)
+                state['samp_zmas'] = list(samp_zmas)
+            samp_zma = state['samp_zmas'].pop(0)
         else:
             samp_zma = zma
-
-        info_message(
-            'Generating sample Z-Matrix that does not have',
-            'high intramolecular repulsion...')
-        bad_geo_cnt = 0
-        while not automol.zmat.has_low_relative_repulsion_energy(samp_zma, zma) and bad_geo_cnt < 1000:
-            if print_debug:
-                warning_message('Structure has high repulsion.')
-                warning_message(
-                    'Generating new sample Z-Matrix')
-            samp_zma, = automol.zmat.samples(zma, 1, tors_range_dct)
-            bad_geo_cnt += 1
+            state['ref_running'] = True
 
         cid = autofile.schema.generate_new_conformer_id()
         locs = [rid, cid]
-
         cnf_run_fs[-1].create(locs)
         cnf_run_path = cnf_run_fs[-1].path(locs)
-        run_fs = autofile.fs.run(cnf_run_path)
 
-        info_message(f"Run {samp_idx}/{tot_samp}")
-        tors_names = tuple(tors_range_dct.keys())
-        print('two_stage test:', two_stage, tors_names)
-        if two_stage and tors_names:
-            frozen_coords_lst = (tors_names, ())
-            success, ret = es_runner.multi_stage_optimization(
-                script_str=script_str,
-                run_fs=run_fs,
-                geo=samp_zma,
-                spc_info=spc_info,
-                thy_info=thy_info,
-                frozen_coords_lst=frozen_coords_lst,
-                zrxn=zrxn,
-                overwrite=overwrite,
-                saddle=bool(zrxn is not None),
-                retryfail=retryfail,
-                **kwargs
-            )
-        else:
-            success, ret = es_runner.execute_job(
-                job=elstruct.Job.OPTIMIZATION,
-                script_str=script_str,
-                run_fs=run_fs,
-                geo=samp_zma,
-                spc_info=spc_info,
-                thy_info=thy_info,
-                zrxn=zrxn,
-                overwrite=overwrite,
-                saddle=bool(zrxn is not None),
-                retryfail=retryfail,
-                **kwargs
-            )
+        info_message(f"Run {state['samp_idx']}/{tot_samp}")
+        return (samp_zma, cnf_run_path, spc_info, thy_info,
+                script_str, overwrite, zrxn, frozen_coords_lst,
+                retryfail, kwargs, (cnf_run_fs[0].path(), tuple(locs)))
 
-        # save function added here
+    def _save_sample(args, success, ret):
+        samp_zma, cnf_run_path = args[:2]
+        if samp_zma is zma:
+            state['ref_running'] = False
         if success:
-            save_conformer(
+            locs = [rid, os.path.basename(cnf_run_path)]
+            cnf_idx = filesys.cnfindex.load(cnf_save_fs, thy_info)
+            known_locs = set(cnf_idx['locs'])
+            cnf_locs = save_conformer(
                 ret, cnf_run_fs, cnf_save_fs, locs, thy_info,
                 zrxn=zrxn, orig_ich=spc_info[0], rid_traj=True,
                 init_zma=samp_zma)
-
-            nsampd = util.calc_nsampd(cnf_save_fs, cnf_run_fs, rid)
-            nsampd += 1
-            samp_idx += 1
-            inf_obj.nsamp = nsampd
-            cnf_save_fs[1].file.info.write(inf_obj, [rid])
+            if cnf_locs is not None:
+                inf_obj_temp, _, out_str = ret
+                util.record_conformer(
+                    tracker, cnf_locs, cnf_locs not in known_locs,
+                    elstruct.reader.energy(
+                        inf_obj_temp.prog, inf_obj_temp.method, out_str),
+                    cnf_idx)
+
+            inf_obj = filesys.increment_nsamp(
+                cnf_save_fs[1], [rid],
+                default=functools.partial(
+                    autofile.schema.info_objects.conformer_branch, 0),
+                start=util.calc_nsampd(cnf_save_fs, cnf_run_fs, rid))
+            state['nsampd'] = inf_obj.nsamp
+            state['samp_idx'] += 1
             cnf_run_fs[1].file.info.write(inf_obj, [rid])
+        return nsamp0 - state['nsampd']
 
-        # Increment attempt counter
-        samp_attempt_idx += 1
+    nremaining = _samp.run_samples(
+        _next_sample, _samp.optimize_sample, _save_sample,
+        nsamp0 - nsampd, brk_tot_samp - 1, nconc=nconc,
+        converged=converged)
+    if nremaining <= 0:
+        info_message(
+            'Requested number of samples have been completed.',
+            'Conformer search complete.')
+    elif tracker['converged']:
+        info_message(
+            f'Conformer search converged with {nremaining} of the',
+            'requested samples left to run.')
+    else:
+        info_message(
+            f'Max sample num: 5*{nsamp0} attempted, ending search',
+            'Run again if more samples desired.')
 
 
 def _num_samp_zmas(ring_atoms, nsamp_par):
@@ -566,7 +573,6 @@ def ring_conformer_sampling(
 
     # Build filesys
     cnf_save_fs[0].create()
-    inf_obj = autofile.schema.info_objects.conformer_trunk(0)
 
     # Set up torsions
     geo = automol.zmat.geometry(zma)
@@ -656,35 +662,36 @@ def ring_conformer_sampling(
         tors_names = tuple(set(names
                                for tors_dct in ring_tors_dct.values()
                                for names in tors_dct.keys()))
-        if two_stage and tors_names:
-            frozen_coords_lst = (tors_names, ())
-            success, ret = es_runner.multi_stage_optimization(
-                script_str=script_str,
-                run_fs=run_fs,
-                geo=samp_zma,
-                spc_info=spc_info,
-                thy_info=thy_info,
-                frozen_coords_lst=frozen_coords_lst,
-                zrxn=zrxn,
-                overwrite=overwrite,
-                saddle=bool(zrxn is not None),
-                retryfail=retryfail,
-                **kwargs
-            )
-        else:
-            success, ret = es_runner.execute_job(
-                job=elstruct.Job.OPTIMIZATION,
-                script_str=script_str,
-                run_fs=run_fs,
-                geo=samp_zma,
-                spc_info=spc_info,
-                thy_info=thy_info,
-                zrxn=zrxn,
-                overwrite=overwrite,
-                saddle=bool(zrxn is not None),
-                retryfail=retryfail,
-                **kwargs
-            )
+        with filesys.jobreg.running(cnf_run_fs[0].path(), locs, samp_zma):
+            if two_stage and tors_names:
+                frozen_coords_lst = (tors_names, ())
+                success, ret = es_runner.multi_stage_optimization(
+                    script_str=script_str,
+                    run_fs=run_fs,
+                    geo=samp_zma,
+                    spc_info=spc_info,
+                    thy_info=thy_info,
+                    frozen_coords_lst=frozen_coords_lst,
+                    zrxn=zrxn,
+                    overwrite=overwrite,
+                    saddle=bool(zrxn is not None),
+                    retryfail=retryfail,
+                    **kwargs
+                )
+            else:
+                success, ret = es_runner.execute_job(
+                    job=elstruct.Job.OPTIMIZATION,
+                    script_str=script_str,
+                    run_fs=run_fs,
+                    geo=samp_zma,
+                    spc_info=spc_info,
+                    thy_info=thy_info,
+                    zrxn=zrxn,
+                    overwrite=overwrite,
+                    saddle=bool(zrxn is not None),
+                    retryfail=retryfail,
+                    **kwargs
+                )
 
         # save function added here
         if success:
@@ -693,11 +700,13 @@ def ring_conformer_sampling(
                 zrxn=zrxn, orig_ich=spc_info[0], rid_traj=False,
                 init_zma=samp_zma)
 
-            nsampd = util.calc_nsampd(cnf_save_fs, cnf_run_fs)
-            nsampd += 1
+            inf_obj = filesys.increment_nsamp(
+                cnf_save_fs[0],
+                default=functools.partial(
+                    autofile.schema.info_objects.conformer_trunk, 0),
+                start=util.calc_nsampd(cnf_save_fs, cnf_run_fs))
+            nsampd = inf_obj.nsamp
             samp_idx += 1
-            inf_obj.nsamp = nsampd
-            cnf_save_fs[0].file.info.write(inf_obj)
             cnf_run_fs[0].file.info.write(inf_obj)
 
 
@@ -745,10 +754,15 @@ def save_conformer(ret, cnf_run_fs, cnf_save_fs, locs, thy_info, zrxn=None,
     """ save the conformers that have been found so far
           # Only go through save procedure if conf not in save
           # may need to get geo, ene, etc; maybe make function
+
+        :return: the locators of the conformer the structure was saved as,
+            or is a duplicate of (None, if it isn't viable)
+        :rtype: tuple(str)
     """
 
-    saved_locs, saved_geos, saved_enes = _saved_cnf_info(
-        cnf_save_fs, thy_info, locs)
+    # The saved conformers, from the index of this filesystem
+    cnf_idx = filesys.cnfindex.load(cnf_save_fs, thy_info)
+    cnf_locs = None
 
     inf_obj, _, out_str = ret
     prog = inf_obj.prog
@@ -772,15 +786,23 @@ def save_conformer(ret, cnf_run_fs, cnf_save_fs, locs, thy_info, zrxn=None,
 
     # Determine uniqueness of conformer, save if needed
     if viable:
-        if _geo_unique(geo, ene, saved_geos, saved_enes, zrxn):
-            sym_id = _sym_unique(
-                geo, ene, saved_geos, saved_enes)
-            print('save_conformer locs:', locs, sym_id)
-            if sym_id is None:
+        if filesys.cnfindex.is_unique(
+                cnf_idx, geo, ene, zrxn=zrxn, exclude=locs):
+            sym_locs = filesys.cnfindex.symmetric_duplicate(
+                cnf_idx, geo, ene, exclude=locs)
+            if sym_locs is not None:
+                print(' - Structure is not symmetrically unique.')
+            print('save_conformer locs:', locs, sym_locs)
+            if sym_locs is None:
                 filesys.save.conformer(
                     ret, None, cnf_save_fs, thy_info[1:],
                     init_zma=init_zma,  zrxn=zrxn,
                     rng_locs=(locs[0],), tors_locs=(locs[1],))
+                if cnf_save_fs[-1].exists(locs):
+                    filesys.cnfindex.add(cnf_idx, locs, geo, ene)
+                cnf_locs = tuple(locs)
+            else:
+                cnf_locs = tuple(sym_locs)
             # else:
             #     sym_locs = saved_locs[sym_id]
             #     filesys.save.sym_indistinct_conformer(
@@ -792,9 +814,13 @@ def save_conformer(ret, cnf_run_fs, cnf_save_fs, locs, thy_info, zrxn=None,
             #         cnf_run_path = cnf_run_fs[-1].path(locs)
             #         shutil.rmtree(cnf_run_path)
         else:
+            bad_conformer('not unique')
+            cnf_locs = filesys.cnfindex.duplicate(
+                cnf_idx, geo, ene, zrxn=zrxn, exclude=locs)
             if cnf_save_fs[-1].exists(locs):
                 cnf_save_path = cnf_save_fs[-1].path(locs)
                 shutil.rmtree(cnf_save_path)
+                filesys.catalog.remove_conformer(cnf_save_fs, locs)
             if cnf_run_fs[-1].exists(locs):
                 cnf_run_path = cnf_run_fs[-1].path(locs)
                 shutil.rmtree(cnf_run_path)
@@ -806,53 +832,15 @@ def save_conformer(ret, cnf_run_fs, cnf_save_fs, locs, thy_info, zrxn=None,
             rid = locs[0]
         filesys.mincnf.traj_sort(cnf_save_fs, thy_info, rid=rid)
 
+    return cnf_locs
+
 
 def _saved_cnf_info(cnf_save_fs, mod_thy_info, orig_locs=None):
     """ get the locs, geos and enes for saved conformers
     """
 
-    saved_locs = list(cnf_save_fs[-1].existing())
-    saved_locs = [locs for locs in saved_locs if not locs == orig_locs]
-    saved_geos = [cnf_save_fs[-1].file.geometry.read(locs)
-                  for locs in saved_locs]
-    found_saved_locs = []
-    found_saved_geos = []
-    found_saved_enes = []
-    for idx, locs in enumerate(saved_locs):
-        path = cnf_save_fs[-1].path(locs)
-        print('saved cnf path', path)
-        sp_save_fs = autofile.fs.single_point(path)
-        if sp_save_fs[-1].file.energy.exists(mod_thy_info[1:4]):
-            found_saved_enes.append(sp_save_fs[-1].file.energy.read(
-                mod_thy_info[1:4]))
-            found_saved_locs.append(saved_locs[idx])
-            found_saved_geos.append(saved_geos[idx])
-        else:
-            info_message(
-                f'No energy saved in single point directory for {path}')
-            # geo_inf_obj = cnf_save_fs[-1].file.geometry_info.read(
-            #     mod_thy_info[1:4])
-            geo_inf_obj = cnf_save_fs[-1].file.geometry_info.read(
-                locs)
-            geo_end_time = geo_inf_obj.utc_end_time
-            current_time = autofile.schema.utc_time()
-            if (current_time - geo_end_time).total_seconds() < 120:
-                last_time = (current_time - geo_end_time).total_seconds()
-                wait_time = 120 - last_time
-                info_message(
-                    f'Geo was saved in the last {last_time:3.2f} seconds, '
-                    f'waiting for {wait_time:3.2f} seconds')
-                time.sleep(wait_time)
-                if sp_save_fs[-1].file.energy.exists(mod_thy_info[1:4]):
-                    found_saved_enes.append(sp_save_fs[-1].file.energy.read(
-                        mod_thy_info[1:4]))
-                    found_saved_locs.append(saved_locs[idx])
-                    found_saved_geos.append(saved_geos[idx])
-                    info_message('the energy is now found')
-                else:
-                    info_message('waiting helped nothing')
-
-    return found_saved_locs, found_saved_geos, found_saved_enes
+    cnf_idx = filesys.cnfindex.load(cnf_save_fs, mod_thy_info)
+    return filesys.cnfindex.saved(cnf_idx, exclude=orig_locs)
 
 
 def _init_geom_is_running(cnf_run_fs):
@@ -895,80 +883,54 @@ def _init_geom_is_running(cnf_run_fs):
 
 def this_conformer_was_run_in_save(zma, cnf_fs):
     """ Assess if a conformer was run in save
+
+        Only the conformers whose input Z-Matrices in the registry of the
+        save filesystem are close to it are read and compared
     """
-    running = False
-    for locs in cnf_fs[-1].existing(ignore_bad_formats=True):
-        cnf_path = cnf_fs[-1].path(locs)
-        if cnf_fs[-1].file.geometry_input.exists(locs):
-            inp_str = cnf_fs[-1].file.geometry_input.read(locs)
-            inp_str = inp_str.replace('=', '')
-            inf_obj = cnf_fs[-1].file.geometry_info.read(locs)
-            prog = inf_obj.prog
-            try:
-                inp_zma = elstruct.reader.inp_zmatrix(prog, inp_str)
-                if automol.zmat.almost_equal(inp_zma, zma,
-                                             dist_rtol=0.018, ang_atol=.2):
-                    info_message(
-                        f'This conformer was already run in {cnf_path}.')
-                    running = True
-                    break
-            except:
-                info_message(f'Program {prog} lacks inp ZMA reader for check')
-            sym_fs = autofile.fs.symmetry(cnf_path)
-            for sym_locs in sym_fs[-1].existing(ignore_bad_formats=True):
-                if sym_fs[-1].file.geometry.exists(sym_locs):
-                    sym_geo = sym_fs[-1].file.geometry.read(sym_locs)
-                    try:
-                        sym_zma = filesys.save.rebuild_zma_from_opt_geo(
-                            inp_zma, sym_geo)
-                        if automol.zmat.almost_equal(
-                                sym_zma, zma,
-                                dist_rtol=0.018, ang_atol=.2):
-                            info_message(
-                                f'This conformer was already run in sym of {cnf_path}.')
-                            running = True
-                        break
-                    except:
-                        print('zmat in different format')
-    return running
+    for locs in filesys.jobreg.candidates(
+            cnf_fs, zma, functools.partial(util.saved_input_zmas, cnf_fs),
+            dist_rtol=0.018, ang_atol=.2):
+        if _conformer_was_run_in_save(zma, cnf_fs, locs):
+            return True
+    return False
 
 
-def this_conformer_is_running(zma, cnf_run_fs):
-    """ Check the RUN filesystem for similar geometry
-        submissions that are currently running
+def _conformer_was_run_in_save(zma, cnf_fs, locs):
+    """ Assess if a saved conformer, or one of its symmetric duplicates,
+        was run from a conformer
     """
-
     running = False
-    job = elstruct.Job.OPTIMIZATION
-    for locs in cnf_run_fs[-1].existing(ignore_bad_formats=True):
-        cnf_run_path = cnf_run_fs[-1].path(locs)
-        run_fs = autofile.fs.run(cnf_run_path)
-        run_path = run_fs[-1].path([job])
-        if run_fs[-1].file.info.exists([job]):
-            inf_obj = run_fs[-1].file.info.read([job])
-            status = inf_obj.status
-            if status == autofile.schema.RunStatus.RUNNING:
-                start_time = inf_obj.utc_start_time
-                current_time = autofile.schema.utc_time()
-                if (current_time - start_time).total_seconds() < 3000000:
-                    subrun_fs = autofile.fs.subrun(run_path)
-                    inp_str = subrun_fs[0].file.input.read([0, 0])
-                    inp_str = inp_str.replace('=', '')
-                    prog = inf_obj.prog
-                    if 'molpro' in prog:
-                        print('Warning: Since using Molpro, check for running '
-                              'conformer is disabled!')
-                        running = False
-                    else:
-                        inp_zma = elstruct.reader.inp_zmatrix(prog, inp_str)
-                        if automol.zmat.almost_equal(
-                            inp_zma, zma, dist_rtol=0.018, ang_atol=.2):
-                            _hr = (current_time - start_time).total_seconds()/3600.
-                            info_message(
-                                'This conformer was started in the last ' +
-                                f'{_hr:3.4f} hours in {run_path}.')
-                            running = True
-                            break
+    cnf_path = cnf_fs[-1].path(locs)
+    if cnf_fs[-1].file.geometry_input.exists(locs):
+        inp_str = cnf_fs[-1].file.geometry_input.read(locs)
+        inp_str = inp_str.replace('=', '')
+        inf_obj = cnf_fs[-1].file.geometry_info.read(locs)
+        prog = inf_obj.prog
+        try:
+            inp_zma = elstruct.reader.inp_zmatrix(prog, inp_str)
+            if automol.zmat.almost_equal(inp_zma, zma,
+                                         dist_rtol=0.018, ang_atol=.2):
+                info_message(
+                    f'This conformer was already run in {cnf_path}.')
+                return True
+        except:
+            info_message(f'Program {prog} lacks inp ZMA reader for check')
+        sym_fs = autofile.fs.symmetry(cnf_path)
+        for sym_locs in sym_fs[-1].existing(ignore_bad_formats=True):
+            if sym_fs[-1].file.geometry.exists(sym_locs):
+                sym_geo = sym_fs[-1].file.geometry.read(sym_locs)
+                try:
+                    sym_zma = filesys.save.rebuild_zma_from_opt_geo(
+                        inp_zma, sym_geo)
+                    if automol.zmat.almost_equal(
+                            sym_zma, zma,
+                            dist_rtol=0.018, ang_atol=.2):
+                        info_message(
+                            f'This conformer was already run in sym of {cnf_path}.')
+                        running = True
+                    break
+                except:
+                    print('zmat in different format')
     return running
 
 
@@ -1181,6 +1143,12 @@ def unique_fs_confs(cnf_save_fs, cnf_save_locs_lst,
         in the ini_cnf_save_fs.
     """
 
+    # Convert the structs in cnf_save to z-matrices once, and index their
+    # fingerprints
+    zmas = [automol.geom.zmatrix(cnf_save_fs[-1].file.geometry.read(locs))
+            for locs in cnf_save_locs_lst]
+    fp_index = filesys.fingerprint.index(zmas)
+
     uni_ini_cnf_save_locs = []
     for ini_locs in ini_cnf_save_locs_lst:
 
@@ -1193,11 +1161,11 @@ def unique_fs_confs(cnf_save_fs, cnf_save_locs_lst,
         # inizma =  ini_cnf_save_fs[-1].file.zmatrix.read(ini_locs)
         ini_cnf_save_path = ini_cnf_save_fs[-1].path(ini_locs)
         checking('structures', ini_cnf_save_path)
-        for locs in cnf_save_locs_lst:
-            geo = cnf_save_fs[-1].file.geometry.read(locs)
-            zma = automol.geom.zmatrix(geo)
-            # zma =  cnf_save_fs[-1].file.zmatrix.read(locs)
-            if automol.zmat.almost_equal(inizma, zma,
+        # Only check the structs that pass the fingerprint pre-filter
+        for idx in filesys.fingerprint.candidates(
+                inizma, fp_index, dist_rtol=0.1, ang_atol=.4):
+            locs = cnf_save_locs_lst[idx]
+            if automol.zmat.almost_equal(inizma, zmas[idx],
                                          dist_rtol=0.1, ang_atol=.4):
                 cnf_save_path = cnf_save_fs[-1].path(locs)
                 info_message(
@@ -1212,32 +1180,31 @@ def unique_fs_confs(cnf_save_fs, cnf_save_locs_lst,
     return uni_ini_cnf_save_locs
 
 
-def rng_loc_for_geo(geo, cnf_save_fs):
+def rng_loc_for_geo(geo, cnf_save_fs, cnf_idx=None):
     """ Find the ring-conf locators for a given geometry in the
         conformamer save filesystem
+
+        :param cnf_idx: the uniqueness index of the filesystem, to find the
+            ring-conf locators in without reading the filesystem
+        :type cnf_idx: dict
     """
 
+    if cnf_idx is not None:
+        rid_frags = filesys.cnfindex.ring_fragments(cnf_idx)
+    else:
+        rid_frags = util.saved_ring_fragments(cnf_save_fs)
+
     rid = None
-    frag_geo = automol.geom.ring_fragments_geometry(geo)
-    if frag_geo is not None:
-        frag_zma = automol.geom.zmatrix(frag_geo)
-    checked_rids = []
-    for locs in cnf_save_fs[-1].existing():
-        current_rid, _ = locs
-        if current_rid in checked_rids:
-            continue
-        checked_rids.append(current_rid)
-        locs_geo = cnf_save_fs[-1].file.geometry.read(locs)
-        frag_locs_geo = automol.geom.ring_fragments_geometry(locs_geo)
-        if frag_locs_geo is None or frag_geo is None:
-            rid = locs[0]
+    frag_zma = filesys.cnfindex.ring_fragment_zmatrix(geo)
+    for current_rid, frag_locs_zma in rid_frags:
+        if frag_locs_zma is None or frag_zma is None:
+            rid = current_rid
             break
-        frag_locs_zma = automol.geom.zmatrix(frag_locs_geo)
         # for now: set tolerances to include all ring puckering
         # previous tolerances: dist_rtol=0.15, ang_atol=.45):
         if automol.zmat.almost_equal(frag_locs_zma, frag_zma,
                                      dist_rtol=150., ang_atol=45.):
-            rid = locs[0]
+            rid = current_rid
             break
 
     return rid
@@ -17,6 +17,7 @@ import autorun
 from phydat import phycon, symm
 from mechlib.amech_io import printer as ioprinter
 from mechlib.amech_io import job_path
+from mechlib.filesys import catalog
 from mechroutines.es import runner as es_runner
 from mechroutines.es.runner._par import qchem_params
 from mechroutines.es._routines.conformer import save_conformer
@@ -118,6 +119,8 @@ def run_energy(zma, geo, spc_info, thy_info,
             sp_save_fs[-1].file.input.write(inp_str, thy_info[1:4])
             sp_save_fs[-1].file.info.write(inf_obj, thy_info[1:4])
             sp_save_fs[-1].file.energy.write(ene, thy_info[1:4])
+            if not highspin:
+                catalog.record_energy(geo_save_path, thy_info[1:4], ene)
             ioprinter.save_energy(sp_save_path)
 
     else:
@@ -663,6 +666,7 @@ def _hess_freqs(geo, geo_save_fs, save_path, locs, run_prefix, overwrite):
             geo_save_fs[-1].json.harmonic_frequencies.write(freqs, locs)
         else:
             geo_save_fs[-1].file.harmonic_frequencies.write(freqs, locs)
+        catalog.record_frequencies(save_path, freqs)
         ioprinter.save_frequencies(save_path)
 
     else:
@@ -752,6 +756,7 @@ def _assess_imags(freqs, ref_freqs,
         cnf_save_path = cnf_save_fs[-1].path(locs)
         shutil.rmtree(cnf_run_path)
         shutil.rmtree(cnf_save_path)
+        catalog.remove_conformer(cnf_save_fs, locs)
         print('Based on checks, saddle-point conformer likely bad. '
               'Removing conformer from both RUN and SAVE filesystem at\n'
               f'{cnf_run_path}\n'
@@ -1,6 +1,7 @@
 """ es_runners
 """
 
+import functools
 import numpy
 import automol
 import elstruct
@@ -11,9 +12,17 @@ from mechlib.amech_io.printer import reading, info_message
 from mechlib.amech_io.printer import debug_message, warning_message
 from mechlib.amech_io.printer import save_geo, save_energy
 from mechroutines.es import runner as es_runner
+from mechroutines.es._routines import _samp
 from mechroutines.es._routines import _util as util
 
 
+# Number of samples to draw at once
+BATCH_SIZE = 64
+
+# Temperatures (K) to assess the convergence of the partition function at
+PF_TEMPS = (300., 500., 750., 1000., 1500.)
+
+
 def tau_sampling(zma, ref_ene, spc_info,
                  mod_thy_info,
                  tau_run_fs, tau_save_fs,
@@ -21,9 +30,14 @@ def tau_sampling(zma, ref_ene, spc_info,
                  db_style='directory',
                  nsamp_par=(False, 3, 3, 1, 50, 50),
                  tors_names=(),
-                 zrxn=None, resave=False,
+                 zrxn=None, resave=False, conv_pf_err=None,
                  **kwargs):
     """ Sample over torsions optimizing all other coordinates
+
+        :param conv_pf_err: stop sampling once the relative standard error
+            of the partition function, in percent, falls below this at
+            every temperature
+        :type conv_pf_err: float
     """
 
     if resave:
@@ -45,6 +59,8 @@ def tau_sampling(zma, ref_ene, spc_info,
         nsamp_par=nsamp_par,
         tors_names=tors_names,
         zrxn=zrxn,
+        ref_ene=ref_ene,
+        conv_pf_err=conv_pf_err,
         **kwargs,
     )
 
@@ -64,8 +80,15 @@ def run_tau(zma, spc_info, thy_info,
             tau_run_fs, tau_save_fs, script_str, overwrite,
             nsamp_par=(False, 3, 3, 1, 50, 50),
             tors_names=(),
-            zrxn=None, **kwargs):
+            zrxn=None, ref_ene=None, conv_pf_err=None, **kwargs):
     """ run sampling algorithm to find tau dependent geometries
+
+        :param ref_ene: the reference energy of the partition function
+        :type ref_ene: float
+        :param conv_pf_err: stop sampling once the relative standard error
+            of the partition function from the samples of this run, in
+            percent, falls below this at every temperature
+        :type conv_pf_err: float
     """
 
     # Set the filesystem objects
@@ -91,9 +114,10 @@ def run_tau(zma, spc_info, thy_info,
             f'Running {num_to_samp} samples...', newline=1)
     samp_idx = 1
 
-    # Set the filesystem objects
-    inf_obj = autofile.schema.info_objects.tau_trunk(0, tors_range_dct)
-
+    # Draw the samples in batches, as they are needed; each is drawn once,
+    # and only run if it has low repulsion
+    samp_zmas = []
+    samp_enes = []
     while True:
         nsamp = nsamp0 - nsampd
 
@@ -104,7 +128,10 @@ def run_tau(zma, spc_info, thy_info,
                 'Tau sampling complete.')
             break
 
-        samp_zma, = automol.zmat.samples(zma, 1, tors_range_dct)
+        if not samp_zmas:
+            samp_zmas = list(zip(*_samp.low_repulsion_samples(
+                zma, min(nsamp, BATCH_SIZE), tors_range_dct, max_draws=1)))
+        samp_zma, low_repulsion = samp_zmas.pop(0)
         tid = autofile.schema.generate_new_tau_id()
         locs = [tid]
 
@@ -118,7 +145,7 @@ def run_tau(zma, spc_info, thy_info,
         info_message(
             'Generating sample Z-Matrix that does not have',
             'high intramolecular repulsion...')
-        if automol.zmat.has_low_relative_repulsion_energy(samp_zma, zma):
+        if low_repulsion:
             debug_message('ZMA fine.')
             es_runner.run_job(
                 job=elstruct.Job.OPTIMIZATION,
@@ -132,6 +159,13 @@ def run_tau(zma, spc_info, thy_info,
                 frozen_coordinates=tors_range_dct.keys(),
                 **kwargs
             )
+            if conv_pf_err is not None:
+                success, ret = es_runner.read_job(
+                    job=elstruct.Job.OPTIMIZATION, run_fs=run_fs)
+                if success:
+                    inf_obj_r, _, out_str = ret
+                    samp_enes.append(elstruct.reader.energy(
+                        inf_obj_r.prog, inf_obj_r.method, out_str))
         else:
             warning_message('repulsive ZMA:')
             inp_str = elstruct.writer.optimization(
@@ -149,17 +183,18 @@ def run_tau(zma, spc_info, thy_info,
             warning_message(
                 'geometry for bad ZMA at', tau_run_fs[-1].path(locs))
 
-        if tau_save_fs[0].file.info.exists():
-            inf_obj_s = tau_save_fs[0].file.info.read()
-            nsampd = inf_obj_s.nsamp
-        elif tau_run_fs[0].file.info.exists():
-            inf_obj_r = tau_run_fs[0].file.info.read()
-            nsampd = inf_obj_r.nsamp
-        nsampd += 1
-        inf_obj.nsamp = nsampd
-        tau_save_fs[0].file.info.write(inf_obj)
+        inf_obj = filesys.increment_nsamp(
+            tau_save_fs[0],
+            default=functools.partial(
+                autofile.schema.info_objects.tau_trunk, 0, tors_range_dct),
+            start=util.calc_nsampd(tau_save_fs, tau_run_fs, rid=None))
+        nsampd = inf_obj.nsamp
         tau_run_fs[0].file.info.write(inf_obj)
 
+        if conv_pf_err is not None and ref_ene is not None:
+            if _pf_converged(samp_enes, ref_ene, conv_pf_err):
+                break
+
 
 def save_tau(tau_run_fs, tau_save_fs, mod_thy_info, db_style='directory'):
     """ save the tau dependent geometries that have been found so far
@@ -255,35 +290,70 @@ def save_tau(tau_run_fs, tau_save_fs, mod_thy_info, db_style='directory'):
         filesys.mincnf.traj_sort(tau_save_fs, mod_thy_info)
 
 
-def assess_pf_convergence(tau_save_fs, ref_ene,
-                          temps=(300., 500., 750., 1000., 1500.)):
+def assess_pf_convergence(tau_save_fs, ref_ene, temps=PF_TEMPS):
     """ Determine how much the partition function has converged
     """
 
     # Calculate sigma values at various temperatures for the PF
     for temp in temps:
-        sumq = 0.
-        sum2 = 0.
-        idx = 0
         debug_message('integral convergence for T = ', temp)
         inf_obj_s = tau_save_fs[0].file.info.read()
         nsamp = inf_obj_s.nsamp
         saved_locs = tau_save_fs[-1].json_existing()
         ratio = len(saved_locs) / float(nsamp)
-        for locs in saved_locs:
-            idx += 1
-            ene = tau_save_fs[-1].json.energy.read(locs)
-            ene = (ene - ref_ene) * phycon.EH2KCAL
-            tmp = numpy.exp(-ene*349.7/(0.695*temp))
-            sumq = sumq + tmp
-            sum2 = sum2 + tmp**2
-            sigma = numpy.sqrt(
-                (abs(sum2/float(idx)-(sumq/float(idx))**2))/float(idx))
-            debug_message(
-                sumq/float(idx), sigma, 100.*sigma*float(idx)/sumq, idx)
+        enes = [tau_save_fs[-1].json.energy.read(locs)
+                for locs in saved_locs]
+        pfs, sigmas, errs = pf_standard_error(enes, ref_ene, temp)
+        for idx, (pf_, sigma, err) in enumerate(zip(pfs, sigmas, errs)):
+            debug_message(pf_, sigma, err, idx + 1)
         info_message('Ratio of good to sampled geometries: ', ratio)
 
 
+def pf_standard_error(enes, ref_ene, temp):
+    """ Monte Carlo estimate of the partition function at a temperature,
+        and its standard error, after each sample
+
+        :param enes: the energies of the samples
+        :type enes: tuple(float)
+        :param ref_ene: the reference energy
+        :type ref_ene: float
+        :param temp: the temperature, in K
+        :type temp: float
+        :return: the estimates, their standard errors, and their relative
+            standard errors, in percent
+        :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    enes = (numpy.array(enes, dtype=float) - ref_ene) * phycon.EH2KCAL
+    tmp = numpy.exp(-enes*349.7/(0.695*temp))
+    idx = numpy.arange(1, len(tmp) + 1)
+    sumq = numpy.cumsum(tmp)
+    sum2 = numpy.cumsum(tmp**2)
+    sigma = numpy.sqrt(abs(sum2/idx - (sumq/idx)**2)/idx)
+    return sumq/idx, sigma, 100.*sigma*idx/sumq
+
+
+def _pf_converged(enes, ref_ene, conv_pf_err, temps=PF_TEMPS):
+    """ Decide whether the partition function from the samples has
+        converged, logging the decision and its statistics
+    """
+    if len(enes) < _samp.MIN_CONV_SAMPLES:
+        return False
+
+    errs = [pf_standard_error(enes, ref_ene, temp)[2][-1] for temp in temps]
+    stats = ', '.join(f'{err:.2f}% at {temp:g} K'
+                      for temp, err in zip(temps, errs))
+    if max(errs) < conv_pf_err:
+        info_message(
+            f'Tau sampling converged after {len(enes)} optimized samples:',
+            f'partition function errors of {stats},',
+            f'all below {conv_pf_err}%.')
+        return True
+    debug_message(
+        f'Tau sampling not converged after {len(enes)} optimized samples:',
+        f'partition function errors of {stats}.')
+    return False
+
+
 def _check_vma(zma, tau_save_fs):
     """ Assess of the vma matches the zma used to sample.
         Write the vma if needed.
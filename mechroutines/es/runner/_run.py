@@ -5,6 +5,7 @@ import functools
 import elstruct
 import autofile
 import automol
+from mechlib.amech_io import profiler
 from . import _seq as optseq
 
 
@@ -64,19 +65,20 @@ def execute_job(job, script_str, run_fs,
     """ Both ruBoth runs and reads electrouct jobs
     """
 
-    run_job(job, script_str, run_fs,
-            geo, spc_info, thy_info,
-            zrxn=zrxn,
-            errors=errors,
-            options_mat=options_mat,
-            retryfail=retryfail,
-            feedback=feedback,
-            frozen_coordinates=frozen_coordinates,
-            freeze_dummy_atoms=freeze_dummy_atoms,
-            overwrite=overwrite,
-            **kwargs)
-
-    success, ret = read_job(job, run_fs)
+    with profiler.span(job, 'job', spc=spc_info[0]):
+        run_job(job, script_str, run_fs,
+                geo, spc_info, thy_info,
+                zrxn=zrxn,
+                errors=errors,
+                options_mat=options_mat,
+                retryfail=retryfail,
+                feedback=feedback,
+                frozen_coordinates=frozen_coordinates,
+                freeze_dummy_atoms=freeze_dummy_atoms,
+                overwrite=overwrite,
+                **kwargs)
+
+        success, ret = read_job(job, run_fs)
 
     return success, ret
 
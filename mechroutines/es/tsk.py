@@ -14,6 +14,7 @@ from mechlib.filesys import build_fs
 from mechlib.filesys import root_locs
 from mechlib.amech_io import printer as ioprinter
 from mechroutines.es._routines import conformer
+from mechroutines.es._routines import _samp
 from mechroutines.es._routines import hr
 from mechroutines.es._routines import tau
 from mechroutines.es.ts import findts
@@ -233,6 +234,13 @@ def conformer_tsk(job, spc_dct, spc_name,
             two_stage = saddle
             mc_nsamp = spc_dct_i['mc_nsamp']
             resave = es_keyword_dct['resave']
+            nconc = _samp.nconcurrent(
+                nprocs, es_keyword_dct.get('samp_nprocs'))
+            conv_dct = {
+                'conv_nsamp': es_keyword_dct.get('conv_nsamp'),
+                'conv_ewin': es_keyword_dct.get('conv_ewin', 1.0),
+                'conv_unseen': es_keyword_dct.get('conv_unseen'),
+            }
 
             # Read the geometry and zma from the ini file system
             geo = ini_cnf_save_fs[-1].file.geometry.read(ini_locs)
@@ -280,7 +288,7 @@ def conformer_tsk(job, spc_dct, spc_name,
                 zrxn=zrxn, two_stage=two_stage,
                 retryfail=retryfail, resave=resave,
                 repulsion_thresh=40.0, print_debug=print_debug,
-                **kwargs)
+                nconc=nconc, **conv_dct, **kwargs)
             
             visited_rids.add(rid)
             if True:
@@ -323,7 +331,7 @@ def conformer_tsk(job, spc_dct, spc_name,
                             zrxn=zrxn, two_stage=two_stage,
                             retryfail=retryfail, resave=False,
                             repulsion_thresh=40.0, print_debug=print_debug,
-                            **kwargs)
+                            nconc=nconc, **conv_dct, **kwargs)
                 
 
 
@@ -710,6 +718,7 @@ def tau_tsk(job, spc_dct, spc_name,
                 nsamp_par=nsamp_par,
                 tors_names=tors_names,
                 zrxn=zrxn, resave=resave,
+                conv_pf_err=es_keyword_dct.get('conv_pf_err'),
                 **kwargs)
 
         elif job in ('energy', 'grad'):
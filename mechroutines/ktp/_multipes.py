@@ -5,6 +5,7 @@ import numpy
 import mess_io
 import mechanalyzer
 from mechlib.amech_io import reader
+from mechlib.amech_io import printer as ioprinter
 from mechroutines.models.typ import is_abstraction_pes
 
 
@@ -59,12 +60,11 @@ def energy_dist_params(pesgrp_num, pes_param_dct, hot_enes_dct, rxn_chan_str):
         energy_dct, _, _, _ = mess_io.reader.pes(rxn_chan_str)
         max_ene = []
         max_ene_ped = []
-        print(rxn_chan_str)
-        print('peds', pes_peds)
+        ioprinter.debug_message(rxn_chan_str)
+        ioprinter.debug_message('peds', pes_peds)
         for ped in pes_peds:
             reacs, prods = ped.split('=')
-            print('ene dct test')
-            print(energy_dct)
+            ioprinter.debug_message('ene dct test\n', energy_dct)
             try:
                 ene_bw = energy_dct[reacs] - energy_dct[prods]
             except KeyError as keyerr:
@@ -146,7 +146,7 @@ def _full_mess_v1(energy_trans_str, rxn_chan_str, dats,
     base_mess_path = rate_paths_dct[pes_inf]['base-v1']
     ioprinter.obj('line_plus')
     ioprinter.writing('MESS input file', base_mess_path)
-    ioprinter.debug_message('MESS Input:\n\n'+mess_inp_str)
+    ioprinter.debug_message('MESS Input:\n', mess_inp_str)
     autorun.write_input(
         base_mess_path, mess_inp_str,
         aux_dct=dats, input_name='mess.inp')
@@ -184,7 +184,7 @@ def _full_mess_v1(energy_trans_str, rxn_chan_str, dats,
         ioprinter.writing('New Well-Extended MESS input file '
                           f'at path {base_mess_path}')
         print('  - Warning, old base input overwritten.')
-        ioprinter.debug_message('MESS Input:\n\n'+wext_mess_inp_str_nolump)
+        ioprinter.debug_message('MESS Input:\n', wext_mess_inp_str_nolump)
         autorun.write_input(
             base_mess_path, wext_mess_inp_str_nolump,
             aux_dct=dats, input_name='mess.inp')
@@ -207,7 +207,7 @@ def _full_mess_v1(energy_trans_str, rxn_chan_str, dats,
         ioprinter.obj('line_plus')
         ioprinter.writing('New Well-Extended MESS input file '
                           f'at path {wext_mess_path}')
-        ioprinter.debug_message('MESS Input:\n\n'+wext_mess_inp_str)
+        ioprinter.debug_message('MESS Input:\n', wext_mess_inp_str)
         autorun.write_input(
             wext_mess_path, wext_mess_inp_str,
             aux_dct=dats, input_name='mess.inp')
@@ -257,7 +257,7 @@ def _full_mess_v2(energy_trans_str, rxn_chan_str, dats,
     base_mess_path = rate_paths_dct[pes_inf]['base-v2']
     ioprinter.obj('line_plus')
     ioprinter.writing('MESS input file', base_mess_path)
-    ioprinter.debug_message('MESS Input:\n\n'+mess_inp_str)
+    ioprinter.debug_message('MESS Input:\n', mess_inp_str)
     autorun.write_input(
         base_mess_path, mess_inp_str,
         aux_dct=dats, input_name='mess.inp')
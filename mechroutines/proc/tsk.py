@@ -114,8 +114,8 @@ def run_tsk(tsk, obj_queue,
                 csv_data['tfreq'].update(species_csv_data['tfreq'])
                 csv_data['allfreq'].update(species_csv_data['allfreq'])
                 csv_data['scalefactor'].update(species_csv_data['scalefactor'])
-                print("species: ",species_csv_data)
-                print("total: ", csv_data)
+                ioprinter.debug_message('species: ', species_csv_data)
+                ioprinter.debug_message('total: ', csv_data)
             else:
                 csv_data.update(species_csv_data)
     # Write a report that details what data is missing
@@ -178,7 +178,7 @@ def _run_task_for_locs_lst(
         elif 'geo' in tsk:
             csv_data_i, miss_data_i = collect.geometry(
                 spc_name, locs, locs_path, cnf_fs, mod_thy_info)
-            print(csv_data_i)
+            ioprinter.debug_message(csv_data_i)
             csv_data[label] = csv_data_i
         elif 'date' in tsk:
             csv_data_i, date_headers, miss_data_i = collect.time_stamp(
@@ -188,7 +188,7 @@ def _run_task_for_locs_lst(
         elif 'molden' in tsk:
             csv_data_i, miss_data_i = collect.molden(
                 spc_name, locs, locs_path, cnf_fs, mod_thy_info)
-            print(csv_data_i)
+            ioprinter.debug_message(csv_data_i)
             csv_data[label] = csv_data_i
 
         elif 'zma' in tsk:
@@ -200,7 +200,7 @@ def _run_task_for_locs_lst(
             csv_data_i, miss_data_i = collect.torsions(
                 spc_name, locs, locs_path, spc_dct_i, spc_mod_dct_i,
                 mod_thy_info, run_prefix, save_prefix)
-            print(csv_data_i)
+            ioprinter.debug_message(csv_data_i)
             csv_data[label] = csv_data_i
 
         elif 'hess_json' in tsk:
@@ -276,7 +276,7 @@ def _run_task_for_locs_lst(
                 pes_mod_dct_i, locs, locs_path,
                 cnf_fs, run_prefix, save_prefix)
             csv_data_i, _, miss_data_i = ret
-            print(csv_data_i)
+            ioprinter.debug_message(csv_data_i)
             csv_data[label] = csv_data_i
 
         if 'pf' in tsk or 'weight' in tsk:
@@ -295,7 +295,7 @@ def _run_task_for_locs_lst(
                 spc_name, spc_dct_i, spc_mod_dct_i,
                 proc_keyword_dct, thy_dct,
                 cnf_fs, locs, locs_path, run_prefix, save_prefix, mod_thy_info)
-            print(csv_data_i)
+            ioprinter.debug_message(csv_data_i)
             csv_data[label] = csv_data_i
 
         if miss_data_i is not None:
@@ -0,0 +1,48 @@
+"""Shared fixtures for the tests of the save and run filesystems
+"""
+
+import pytest
+
+THY_LOCS = ("hf", "sto-3g", "R")
+# Water, in bohr, and a geometry that isn't a duplicate of it
+GEO = (("O", (0.0, 0.0, 0.0)), ("H", (0.0, 0.0, 1.8)), ("H", (1.7, 0.0, -0.5)))
+OTHER_GEO = (("O", (0.0, 0.0, 0.0)), ("H", (0.0, 0.0, 2.6)), ("H", (2.5, 0.0, 0.7)))
+
+
+@pytest.fixture
+def thy_locs():
+    """The theory locators that energies are saved at"""
+    return THY_LOCS
+
+
+@pytest.fixture
+def geo():
+    """A water geometry"""
+    return GEO
+
+
+@pytest.fixture
+def other_geo():
+    """A water geometry that isn't a duplicate of `geo`"""
+    return OTHER_GEO
+
+
+@pytest.fixture
+def make_conformer():
+    """Create a conformer in a conformer filesystem, writing its geometry and
+    energy if they are given, and return its locators"""
+    autofile = pytest.importorskip("autofile")
+
+    def _make_conformer(cnf_fs, geo=None, ene=None, rid=None):
+        rid = autofile.schema.generate_new_ring_id() if rid is None else rid
+        locs = (rid, autofile.schema.generate_new_conformer_id())
+        cnf_fs[-1].create(locs)
+        if geo is not None:
+            cnf_fs[-1].file.geometry.write(geo, locs)
+        if ene is not None:
+            sp_fs = autofile.fs.single_point(cnf_fs[-1].path(locs))
+            sp_fs[-1].create(THY_LOCS)
+            sp_fs[-1].file.energy.write(ene, THY_LOCS)
+        return locs
+
+    return _make_conformer
@@ -0,0 +1,162 @@
+"""Tests for the packed archives of scan and tau filesystems
+"""
+
+import os
+import shutil
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+pytest.importorskip("automol")
+
+from mechlib.filesys import archive, layers, readcache  # noqa: E402
+
+THY_LOCS = ("hf", "sto-3g", "R")
+GEO = (("O", (0.0, 0.0, 0.0)), ("H", (0.0, 0.0, 1.8)), ("H", (1.7, 0.0, -0.5)))
+
+
+@pytest.fixture
+def installed():
+    """Install the layers for the test, with empty caches"""
+    readcache.invalidate()
+    archive.invalidate()
+    assert layers.install()
+    yield
+    layers.uninstall()
+    archive.invalidate()
+
+
+def make_scan(prefix, enes):
+    """Save a scan point, with a geometry and an energy, for each energy"""
+    scn_fs = autofile.fs.scan(str(prefix))
+    locs_lst = []
+    for idx, ene in enumerate(enes):
+        locs = [["D5"], [float(idx)]]
+        scn_fs[-1].create(locs)
+        scn_fs[-1].file.geometry.write(GEO, locs)
+        sp_fs = autofile.fs.single_point(scn_fs[-1].path(locs))
+        sp_fs[-1].create(THY_LOCS)
+        sp_fs[-1].file.energy.write(ene, THY_LOCS)
+        locs_lst.append(locs)
+    return scn_fs, locs_lst
+
+
+def test_append(tmp_path):
+    """Test that appended files read back, with later records winning"""
+    arc_dir = str(tmp_path)
+    archive.append(arc_dir, [("a/x", b"1"), ("a/b/y", b"22")])
+    archive.append(arc_dir, [("a/x", b"333")])
+
+    keys, dirs = archive.index(arc_dir)
+    assert sorted(keys) == ["a/b/y", "a/x"]
+    assert dirs == {"a", "a/b"}
+    assert archive.read_bytes(arc_dir, "a/x") == b"333"
+    assert archive.read_bytes(arc_dir, "a/b/y") == b"22"
+
+    # A record cut short by a crash is ignored
+    with open(os.path.join(arc_dir, archive.INDEX_NAME), "ab") as fobj:
+        fobj.write(b"\x05\x00\x00")
+    assert sorted(archive.index(arc_dir)[0]) == ["a/b/y", "a/x"]
+
+
+def test_remove(tmp_path):
+    """Test that removal records drop everything below a key, until it is
+    appended again"""
+    arc_dir = str(tmp_path / "SCANS")
+    os.makedirs(arc_dir)
+    archive.append(arc_dir, [("a/x", b"1"), ("a/b/y", b"2"), ("c/z", b"3")])
+
+    assert archive.remove(os.path.join(arc_dir, "a"))
+    assert not archive.remove(os.path.join(arc_dir, "d"))
+    keys, dirs = archive.index(arc_dir)
+    assert list(keys) == ["c/z"]
+    assert dirs == {"c"}
+
+    archive.append(arc_dir, [("a/x", b"4")])
+    assert archive.read_bytes(arc_dir, "a/x") == b"4"
+
+
+def test_compact(tmp_path, monkeypatch):
+    """Test that archives are compacted once enough of their data is unused,
+    and that a compaction cut short is finished by the next read"""
+    arc_dir = str(tmp_path / "SCANS")
+    os.makedirs(arc_dir)
+    data_path = os.path.join(arc_dir, archive.ARCHIVE_NAME)
+    archive.append(arc_dir, [("a/x", b"1" * 100), ("b/y", b"2" * 100)])
+    archive.append(arc_dir, [("b/y", b"3" * 50)])
+    assert archive.compact(arc_dir) == 0
+    assert os.path.getsize(data_path) == 250
+
+    archive.remove(os.path.join(arc_dir, "a"))
+    with monkeypatch.context() as mpatch:
+        mpatch.setattr(archive, "_finish_compaction", lambda _: False)
+        assert archive.compact(arc_dir) == 200
+    assert os.path.getsize(data_path) == 250
+
+    archive.invalidate()
+    keys, dirs = archive.index(arc_dir)
+    assert list(keys) == ["b/y"]
+    assert dirs == {"b"}
+    assert archive.read_bytes(arc_dir, "b/y") == b"3" * 50
+    assert os.path.getsize(data_path) == 50
+    assert not [
+        name for name in os.listdir(arc_dir) if name.endswith((".new", ".ready"))
+    ]
+
+
+def test_pack__compact(installed, tmp_path):
+    """Test that packing points again after writing to them doesn't grow the
+    archive without bound"""
+    scn_fs, locs_lst = make_scan(tmp_path, [-76.0, -75.9])
+    arc_dir = scn_fs[0].path()
+    data_path = os.path.join(arc_dir, archive.ARCHIVE_NAME)
+    for idx in range(6):
+        assert archive.pack(scn_fs) == (2 if idx == 0 else 1)
+        keys, _ = archive.index(arc_dir)
+        live = sum(size for _, size in keys.values())
+        assert os.path.getsize(data_path) < live / (1.0 - archive.COMPACT_FRACTION)
+        scn_fs[-1].file.geometry.write(GEO, locs_lst[0])
+
+    assert sorted(scn_fs[-1].existing()) == sorted(locs_lst)
+
+
+def test_find(tmp_path):
+    """Test that only archives at the top of packable filesystems are found"""
+    for name in ("SCANS", "OTHER"):
+        arc_dir = str(tmp_path / name)
+        os.makedirs(arc_dir)
+        archive.append(arc_dir, [("a/x", b"1")])
+
+    assert archive.find(str(tmp_path / "SCANS" / "a" / "x")) == (
+        str(tmp_path / "SCANS"),
+        "a/x",
+    )
+    assert archive.find(str(tmp_path / "OTHER" / "a" / "x")) is None
+
+
+def test_write_packed_point(installed, tmp_path):
+    """Test that writing to a packed point writes it out of the archive"""
+    scn_fs, locs_lst = make_scan(tmp_path, [-76.0, -75.9])
+    assert archive.pack(scn_fs) == 2
+
+    # Run the point again, at another level
+    locs = locs_lst[0]
+    sp_fs = autofile.fs.single_point(scn_fs[-1].path(locs))
+    sp_fs[-1].create(("hf", "cc-pvdz", "R"))
+    sp_fs[-1].file.energy.write(-76.1, ("hf", "cc-pvdz", "R"))
+
+    # The point is all on disk, and only listed once
+    geo_path = scn_fs[-1].file.geometry.path(locs)
+    assert os.path.exists(geo_path)
+    assert os.path.exists(sp_fs[-1].file.energy.path(THY_LOCS))
+    assert archive.find(geo_path) is None
+    assert sorted(scn_fs[-1].existing()) == sorted(locs_lst)
+
+    # Removing its directory removes it for good
+    shutil.rmtree(scn_fs[-1].path(locs))
+    assert scn_fs[-1].existing() == [locs_lst[1]]
+    assert not scn_fs[-1].file.geometry.exists(locs)
+
+    # So does removing a packed point from the archive
+    assert archive.remove(scn_fs[-1].path(locs_lst[1]))
+    assert not scn_fs[-1].existing()
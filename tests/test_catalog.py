@@ -0,0 +1,93 @@
+"""Tests for the save filesystem conformer catalog
+"""
+
+import shutil
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+pytest.importorskip("automol")
+
+from mechlib.filesys import catalog  # noqa: E402
+
+
+@pytest.fixture
+def save_prefix(tmp_path):
+    """A save filesystem, with the catalog lookups reset around the test"""
+    catalog.invalidate()
+    yield tmp_path
+    catalog.invalidate()
+
+
+@pytest.fixture
+def make_conformers(make_conformer, geo):
+    """Save a conformer, with a geometry and an energy, for each energy"""
+
+    def _make_conformers(prefix, enes):
+        cnf_fs = autofile.fs.conformer(str(prefix))
+        return cnf_fs, [list(make_conformer(cnf_fs, geo, ene)) for ene in enes]
+
+    return _make_conformers
+
+
+def test_rebuild(save_prefix, make_conformers, thy_locs):
+    """Test that the catalog lists and sorts the conformers it indexed"""
+    cnf_fs, locs_lst = make_conformers(save_prefix / "SPC", [-76.0, -76.2])
+    assert catalog.find_catalog(cnf_fs[0].path()) is None
+
+    assert catalog.rebuild(str(save_prefix)) == 2
+    assert catalog.find_catalog(cnf_fs[0].path()) is not None
+    assert sorted(catalog.conformer_locators(cnf_fs)) == sorted(locs_lst)
+
+    ene_dct = catalog.sort_energies(cnf_fs, locs_lst, thy_locs)
+    assert ene_dct == {
+        tuple(locs_lst[0]): pytest.approx(-76.0),
+        tuple(locs_lst[1]): pytest.approx(-76.2),
+    }
+    # Levels that weren't run are left out, to be read from the filesystem
+    assert not catalog.sort_energies(cnf_fs, locs_lst, ("hf", "cc-pvdz", "R"))
+
+
+def test_record(save_prefix, make_conformers, thy_locs, geo):
+    """Test that saved conformers and energies are added to the catalog"""
+    cnf_fs, locs_lst = make_conformers(save_prefix / "SPC", [-76.0])
+    catalog.rebuild(str(save_prefix))
+
+    (new_locs,) = make_conformers(save_prefix / "SPC", [-76.3])[1]
+    catalog.record_conformer(cnf_fs, new_locs, geo=geo)
+    catalog.record_energy(cnf_fs[-1].path(new_locs), thy_locs, -76.3)
+    catalog.record_frequencies(cnf_fs[-1].path(new_locs), (-100.0, 1000.0, 3000.0))
+
+    locs_lst = catalog.conformer_locators(cnf_fs)
+    assert len(locs_lst) == 2
+    assert new_locs in list(locs_lst)
+    ene_dct = catalog.sort_energies(cnf_fs, locs_lst, thy_locs, zpe=True)
+    # Only the new conformer has a zero-point energy
+    assert list(ene_dct) == [tuple(new_locs)]
+    assert ene_dct[tuple(new_locs)] == pytest.approx(
+        -76.3 + catalog._zpe((1000.0, 3000.0))
+    )
+
+
+def test_remove_conformer(save_prefix, make_conformers, thy_locs):
+    """Test that removed conformers are dropped from the catalog"""
+    cnf_fs, locs_lst = make_conformers(save_prefix / "SPC", [-76.0, -76.1, -76.2])
+    catalog.rebuild(str(save_prefix))
+
+    # Removed through the catalog
+    shutil.rmtree(cnf_fs[-1].path(locs_lst[0]))
+    catalog.remove_conformer(cnf_fs, locs_lst[0])
+    # Removed behind the catalog's back
+    shutil.rmtree(cnf_fs[-1].path(locs_lst[1]))
+
+    assert list(catalog.conformer_locators(cnf_fs)) == [locs_lst[2]]
+    assert catalog.sort_energies(cnf_fs, locs_lst, thy_locs) == {
+        tuple(locs_lst[2]): pytest.approx(-76.2)
+    }
+
+
+def test_geometry_hash(geo):
+    """Test that the geometry hash ignores round-off"""
+    geo_ = tuple((sym, tuple(x + 1e-9 for x in xyz)) for sym, xyz in geo)
+    assert catalog.geometry_hash(geo_) == catalog.geometry_hash(geo)
+    assert catalog.geometry_hash(geo[::-1]) != catalog.geometry_hash(geo)
@@ -0,0 +1,73 @@
+"""Tests for the integrity check of the save filesystem
+"""
+
+import csv
+import json
+import os
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+elstruct = pytest.importorskip("elstruct")
+
+from mechlib.filesys import catalog, check  # noqa: E402
+
+
+@pytest.fixture
+def issues(tmp_path, make_conformer, geo):
+    """Save a conformer with a missing energy, one with a corrupt hessian, and one
+    that is still running, and return the issues of each by kind"""
+    cnf_fs = autofile.fs.conformer(str(tmp_path / "SPC"))
+    missing_locs = make_conformer(cnf_fs, geo)
+    corrupt_locs = make_conformer(cnf_fs, geo, -76.0)
+    with open(cnf_fs[-1].file.hessian.path(corrupt_locs), "w") as fobj:
+        fobj.write("not a hessian\n")
+    running_locs = make_conformer(cnf_fs, geo, -76.0)
+    inf_obj = autofile.schema.info_objects.run(
+        job=elstruct.Job.OPTIMIZATION,
+        prog="psi4",
+        version="",
+        method="hf",
+        basis="sto-3g",
+        status=autofile.schema.RunStatus.RUNNING,
+    )
+    cnf_fs[-1].file.geometry_info.write(inf_obj, running_locs)
+
+    def _path(locs):
+        return os.path.relpath(cnf_fs[-1].path(locs), tmp_path)
+
+    return {
+        "missing_energy": _path(missing_locs),
+        "corrupt_hessian": _path(corrupt_locs),
+        "running": _path(running_locs),
+    }
+
+
+def test_check_conformers(tmp_path, issues):
+    """Test that each issue is found, with the path of its conformer"""
+    assert list(catalog.conformer_prefixes(str(tmp_path))) == [str(tmp_path / "SPC")]
+    ncnfs, found = check.check_conformers(str(tmp_path / "SPC"), str(tmp_path))
+    assert ncnfs == 3
+    assert {i["kind"]: i["path"] for i in found} == issues
+
+    found_dct = {i["kind"]: i for i in found}
+    assert found_dct["missing_energy"]["detail"] == "not marked complete"
+    assert found_dct["corrupt_hessian"]["detail"]
+    assert check.check(str(tmp_path), nprocs=1) == (ncnfs, found)
+
+
+def test_write_report(tmp_path, issues):
+    """Test that the issues are written to JSON, with their counts, and to CSV"""
+    _, found = check.check_conformers(str(tmp_path / "SPC"), str(tmp_path))
+
+    json_path = str(tmp_path / "report.json")
+    check.write_report(found, json_path)
+    with open(json_path, encoding="utf-8") as fobj:
+        report = json.load(fobj)
+    assert report["counts"] == dict.fromkeys(issues, 1)
+    assert report["issues"] == found
+
+    csv_path = str(tmp_path / "report.csv")
+    check.write_report(found, csv_path)
+    with open(csv_path, newline="", encoding="utf-8") as fobj:
+        assert list(csv.DictReader(fobj)) == found
@@ -0,0 +1,85 @@
+"""Tests for the uniqueness index of the conformers in a save filesystem
+"""
+
+import shutil
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+automol = pytest.importorskip("automol")
+
+from mechlib.filesys import cnfindex  # noqa: E402
+
+
+@pytest.fixture
+def cnf_fs(tmp_path):
+    """A conformer save filesystem, with the loaded indexes reset"""
+    cnfindex.invalidate()
+    yield autofile.fs.conformer(str(tmp_path))
+    cnfindex.invalidate()
+
+
+@pytest.fixture
+def mod_thy_info(thy_locs):
+    """The theory of the saved energies"""
+    return ("psi4", *thy_locs)
+
+
+def test_load(cnf_fs, mod_thy_info, make_conformer, geo, other_geo):
+    """Test that saved conformers are indexed, and that listing the filesystem
+    again picks up conformers saved and removed since"""
+    rid = autofile.schema.generate_new_ring_id()
+    locs1 = make_conformer(cnf_fs, geo, -76.0, rid=rid)
+    cnf_idx = cnfindex.load(cnf_fs, mod_thy_info)
+    assert cnf_idx["locs"] == [locs1]
+    assert cnfindex.load(cnf_fs, mod_thy_info) is cnf_idx
+
+    locs2 = make_conformer(cnf_fs, other_geo, -75.9, rid=rid)
+    assert cnfindex.load(cnf_fs, mod_thy_info, refresh=False)["locs"] == [locs1]
+    cnfindex.load(cnf_fs, mod_thy_info)
+    locs_lst, _, enes = cnfindex.saved(cnf_idx)
+    assert locs_lst == [locs1, locs2]
+    assert enes == pytest.approx([-76.0, -75.9])
+    assert cnfindex.saved(cnf_idx, exclude=locs1)[0] == [locs2]
+
+    shutil.rmtree(cnf_fs[-1].path(locs1))
+    cnfindex.load(cnf_fs, mod_thy_info)
+    assert cnf_idx["locs"] == [locs2]
+    assert list(cnf_idx["enes"]) == pytest.approx([-75.9])
+
+
+def test_duplicate(cnf_fs, mod_thy_info, make_conformer, geo, other_geo):
+    """Test that geometries are only compared among conformers with nearly
+    the same energy"""
+    rid = autofile.schema.generate_new_ring_id()
+    locs = make_conformer(cnf_fs, geo, -76.0, rid=rid)
+    cnf_idx = cnfindex.load(cnf_fs, mod_thy_info)
+
+    assert not cnfindex.is_unique(cnf_idx, geo, -76.0)
+    assert cnfindex.duplicate(cnf_idx, geo, -76.0) == locs
+    assert cnfindex.is_unique(cnf_idx, geo, -75.0)
+    assert cnfindex.duplicate(cnf_idx, geo, -75.0) is None
+    assert cnfindex.is_unique(cnf_idx, geo, -76.0, exclude=locs)
+
+    # Conformers added in place are compared without reading them
+    new_locs = (rid, autofile.schema.generate_new_conformer_id())
+    cnfindex.add(cnf_idx, new_locs, other_geo, -75.5)
+    cnfindex.add(cnf_idx, new_locs, other_geo, -75.5)
+    assert cnf_idx["locs"] == [locs, new_locs]
+    assert cnfindex.duplicate(cnf_idx, other_geo, -75.5) == new_locs
+
+
+def test_ring_fragments(cnf_fs, mod_thy_info, make_conformer, geo, other_geo):
+    """Test that each rid is listed once, without a ring fragment for a
+    species without rings"""
+    rid1 = autofile.schema.generate_new_ring_id()
+    rid2 = autofile.schema.generate_new_ring_id()
+    make_conformer(cnf_fs, geo, -76.0, rid=rid1)
+    make_conformer(cnf_fs, other_geo, -75.9, rid=rid1)
+    make_conformer(cnf_fs, geo, -75.8, rid=rid2)
+    cnf_idx = cnfindex.load(cnf_fs, mod_thy_info)
+
+    assert sorted(cnfindex.ring_fragments(cnf_idx)) == sorted(
+        [(rid1, None), (rid2, None)]
+    )
+    assert cnfindex.ring_fragment_zmatrix(geo) is None
@@ -0,0 +1,86 @@
+"""Tests for the z-matrix fingerprint pre-filter
+"""
+
+import numpy
+import pytest
+
+automol = pytest.importorskip("automol")
+pytest.importorskip("autofile")
+
+from mechlib.filesys import fingerprint  # noqa: E402
+
+# Hydrogen peroxide, in bohr
+GEO = (
+    ("O", (0.0, 1.3, -0.1)),
+    ("O", (0.0, -1.3, -0.1)),
+    ("H", (1.5, 1.7, 0.9)),
+    ("H", (-1.5, -1.7, 0.9)),
+)
+
+
+def perturbed(zma, rng, dist_scale, ang_scale):
+    """Perturb the values of a z-matrix at random"""
+    val_dct = automol.zmat.value_dictionary(zma, angstrom=False, degree=False)
+    new_dct = {}
+    for name, val in val_dct.items():
+        if name.startswith("R"):
+            new_dct[name] = val * (1.0 + rng.uniform(-dist_scale, dist_scale))
+        else:
+            new_dct[name] = val + rng.uniform(-ang_scale, ang_scale)
+    return automol.zmat.set_values_by_name(
+        zma, new_dct, angstrom=False, degree=False
+    )
+
+
+@pytest.mark.parametrize("dist_rtol, ang_atol", [(0.1, 0.4), (0.05, 0.2)])
+def test_candidates(dist_rtol, ang_atol):
+    """Test that every z-matrix `almost_equal` matches is a candidate"""
+    rng = numpy.random.default_rng(0)
+    zma = automol.geom.zmatrix(GEO)
+    zmas = [perturbed(zma, rng, 2 * dist_rtol, 2 * ang_atol) for _ in range(200)]
+    fp_index = fingerprint.index(zmas)
+
+    ncand = 0
+    for ref_zma in zmas[:20]:
+        cands = fingerprint.candidates(ref_zma, fp_index, dist_rtol, ang_atol)
+        matches = [
+            idx
+            for idx, zma_ in enumerate(zmas)
+            if automol.zmat.almost_equal(
+                ref_zma, zma_, dist_rtol=dist_rtol, ang_atol=ang_atol
+            )
+        ]
+        assert set(matches) <= set(cands)
+        ncand += len(cands)
+    # The pre-filter leaves most of the z-matrices out
+    assert ncand < 20 * len(zmas) / 2
+
+
+def test_candidates__dihedral_wrap():
+    """Test that dihedrals are compared the shortest way around"""
+    zma = automol.geom.zmatrix(GEO)
+    (dih_name,) = automol.zmat.dihedral_angle_names(zma)
+    zma1 = automol.zmat.set_values_by_name(
+        zma, {dih_name: numpy.pi - 0.05}, degree=False
+    )
+    zma2 = automol.zmat.set_values_by_name(
+        zma, {dih_name: -numpy.pi + 0.05}, degree=False
+    )
+    fp_index = fingerprint.index([zma2])
+    assert fingerprint.candidates(zma1, fp_index, 0.1, 0.4) == [0]
+    assert fingerprint.candidates(zma1, fp_index, 0.1, 0.05) == []
+
+
+def test_candidates__signature():
+    """Test that z-matrices of other species aren't candidates, and z-matrices
+    without a fingerprint always are"""
+    zma = automol.geom.zmatrix(GEO)
+    other_zma = automol.geom.zmatrix(GEO[:3])
+    fp_index = fingerprint.index_fingerprints(
+        [
+            fingerprint.zmatrix_fingerprint(other_zma),
+            fingerprint.zmatrix_fingerprint(zma),
+            (None, numpy.zeros(0), numpy.zeros(0)),
+        ]
+    )
+    assert fingerprint.candidates(zma, fp_index, 0.1, 0.4) == [1, 2]
@@ -0,0 +1,122 @@
+"""Tests for the garbage collection of the run filesystem
+"""
+
+import os
+import time
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+elstruct = pytest.importorskip("elstruct")
+
+from mechlib.filesys import gc  # noqa: E402
+
+MAX_AGE = 3600.0
+
+
+@pytest.fixture
+def prefixes(tmp_path):
+    """The run and save filesystem prefixes"""
+    return str(tmp_path / "run"), str(tmp_path / "save")
+
+
+def make_job(cnf_run_fs, locs, job, status):
+    """Create a job, with its info file, in a conformer run directory, and
+    return its path"""
+    cnf_run_fs[-1].create(locs)
+    run_fs = autofile.fs.run(cnf_run_fs[-1].path(locs))
+    run_fs[-1].create([job])
+    inf_obj = autofile.schema.info_objects.run(
+        job=job, prog="psi4", version="", method="hf", basis="sto-3g", status=status
+    )
+    run_fs[-1].file.info.write(inf_obj, [job])
+    return run_fs[-1].path([job])
+
+
+def age(path, seconds):
+    """Set back the modification times of a directory tree"""
+    mtime = time.time() - seconds
+    for dir_path, _, filenames in os.walk(path):
+        for name in [*filenames, "."]:
+            os.utime(os.path.join(dir_path, name), (mtime, mtime))
+
+
+def test_find_garbage(prefixes, make_conformer, geo):
+    """Test that saved jobs are removed, and failed jobs and jobs of unknown
+    kinds are kept"""
+    run_prefix, save_prefix = prefixes
+    cnf_run_fs = autofile.fs.conformer(run_prefix)
+    cnf_save_fs = autofile.fs.conformer(save_prefix)
+    locs = make_conformer(cnf_save_fs, geo)
+    status = autofile.schema.RunStatus
+    saved_path = make_job(cnf_run_fs, locs, elstruct.Job.OPTIMIZATION, status.SUCCESS)
+    # Jobs whose results aren't saved
+    make_job(cnf_run_fs, locs, elstruct.Job.HESSIAN, status.SUCCESS)
+    make_job(cnf_run_fs, locs, elstruct.Job.IRCF, status.SUCCESS)
+    unsaved_locs = make_conformer(cnf_save_fs)
+    make_job(cnf_run_fs, unsaved_locs, elstruct.Job.OPTIMIZATION, status.SUCCESS)
+    failed_locs = make_conformer(cnf_save_fs, geo)
+    make_job(cnf_run_fs, failed_locs, elstruct.Job.OPTIMIZATION, status.FAILURE)
+
+    garbage = gc.find_garbage(run_prefix, save_prefix, max_age=MAX_AGE)
+    assert [path for path, _, _ in garbage["saved"]] == [saved_path]
+    assert not garbage["stale"] and not garbage["build"]
+
+    assert gc.delete(garbage["saved"], run_prefix) == 1
+    assert not os.path.exists(saved_path)
+    assert len(autofile.fs.run(cnf_run_fs[-1].path(locs))[-1].existing()) == 2
+
+
+def test_find_garbage__running(prefixes, make_conformer):
+    """Test that running jobs are only removed once they are older than the
+    maximum age, and that the conformer run directory is kept"""
+    run_prefix, save_prefix = prefixes
+    cnf_run_fs = autofile.fs.conformer(run_prefix)
+    locs = make_conformer(autofile.fs.conformer(save_prefix))
+    job_path = make_job(
+        cnf_run_fs, locs, elstruct.Job.OPTIMIZATION, autofile.schema.RunStatus.RUNNING
+    )
+    with open(os.path.join(job_path, "output.dat"), "w") as fobj:
+        fobj.write("running")
+
+    age(job_path, 2 * MAX_AGE)
+    os.utime(os.path.join(job_path, "output.dat"))
+    garbage = gc.find_garbage(run_prefix, save_prefix, max_age=MAX_AGE)
+    assert not garbage["stale"]
+
+    age(job_path, 2 * MAX_AGE)
+    garbage = gc.find_garbage(run_prefix, save_prefix, max_age=MAX_AGE)
+    assert [path for path, _, _ in garbage["stale"]] == [job_path]
+
+    assert gc.delete(garbage["stale"], run_prefix) == 1
+    assert not os.path.exists(os.path.dirname(job_path))
+    assert os.path.isdir(cnf_run_fs[-1].path(locs))
+
+
+def test_delete(prefixes, tmp_path):
+    """Test that jobs that changed since they were found are kept, and that
+    paths outside the run filesystem are refused"""
+    run_prefix, _ = prefixes
+    job_path = os.path.join(run_prefix, "SPC", "RUN", "OPT")
+    os.makedirs(job_path)
+    check_path = os.path.join(job_path, "output.dat")
+    with open(check_path, "w") as fobj:
+        fobj.write("running")
+    job = (job_path, check_path, os.stat(check_path).st_mtime)
+
+    age(job_path, MAX_AGE)
+    assert gc.delete([job], run_prefix) == 0
+    assert os.path.exists(check_path)
+
+    job = (job_path, check_path, os.stat(check_path).st_mtime)
+    assert gc.delete([job], run_prefix) == 1
+    assert not os.path.exists(job_path)
+    assert os.path.isdir(os.path.join(run_prefix, "SPC"))
+
+    other_path = str(tmp_path / "other")
+    os.makedirs(other_path)
+    with pytest.raises(AssertionError):
+        gc.delete([(other_path, other_path, 0.0)], run_prefix)
+    with pytest.raises(AssertionError):
+        gc.delete([(run_prefix + "-other", other_path, 0.0)], run_prefix)
+    assert os.path.exists(other_path)
@@ -0,0 +1,101 @@
+"""Tests for the subtask history database and cost model
+"""
+
+import pytest
+
+from automech.subtasks import _3history
+
+
+def record(path, key, chi, size, wall_time, status="OK", task="conf_samp"):
+    """Record a single-core, single-worker run"""
+    _3history.record_run(
+        task=task,
+        key=key,
+        chi=chi,
+        theory="lvl_wbs",
+        nprocs=1,
+        nworkers=1,
+        size=size,
+        wall_time=wall_time,
+        peak_rss=1.0,
+        status=status,
+        path=path,
+    )
+
+
+def test_predicted_work(tmp_path):
+    """Test the predicted work for known, new, and unknown species"""
+    path = tmp_path / "history.sqlite"
+    record(path, "1", "InChI=1S/CH4/h1H4", 1, 1.0)
+    record(path, "1", "InChI=1S/CH4/h1H4", 1, 3.0)
+    record(path, "2", "InChI=1S/C4H10/c1-3-4-2/h3-4H2,1-2H3", 4, 16.0)
+    # Failed runs and other tasks are left out
+    record(path, "1", "InChI=1S/CH4/h1H4", 1, 100.0, status="ERROR")
+    record(path, "1", "InChI=1S/CH4/h1H4", 1, 100.0, task="hr_scan")
+
+    works = _3history.predicted_work(
+        "conf_samp",
+        "lvl_wbs",
+        keys=["1", "2", "3"],
+        chis=["InChI=1S/CH4/h1H4", "InChI=1S/C2H6/c1-2/h1-2H3", None],
+        sizes=[1, 2, None],
+        path=path,
+    )
+    # The average of the previous runs
+    assert works[0] == pytest.approx(2.0)
+    # The power law through (1, 2) and (4, 16) is 2 * size ** 1.5
+    assert works[1] == pytest.approx(2.0 * 2**1.5)
+    assert works[2] is None
+
+
+def test_predicted_work__pes(tmp_path):
+    """Test that PES subtasks are averaged for each PES, not pooled"""
+    path = tmp_path / "history.sqlite"
+    record(path, "1: 1", None, None, 1.0)
+    record(path, "2: 1", None, None, 9.0)
+
+    works = _3history.predicted_work(
+        "conf_samp",
+        "lvl_wbs",
+        keys=["1: 1", "2: 1", "3: 1"],
+        chis=[None, None, None],
+        sizes=[None, None, None],
+        path=path,
+    )
+    assert works == [pytest.approx(1.0), pytest.approx(9.0), None]
+
+
+def test_predicted_work__no_database(tmp_path):
+    """Test that nothing is predicted without a database"""
+    path = tmp_path / "history.sqlite"
+    works = _3history.predicted_work(
+        "conf_samp", None, keys=["1"], chis=[None], sizes=[None], path=path
+    )
+    assert works == [None]
+    assert not path.exists()
+
+
+@pytest.mark.parametrize(
+    "works, total_nworkers, nworkers",
+    [
+        ([1.0, 1.0], 4, [2, 2]),
+        ([3.0, 1.0], 8, [6, 2]),
+        ([100.0, 1.0], 4, [4, 1]),
+        ([0.0, 0.0], 4, [1, 1]),
+    ],
+)
+def test_balanced_worker_counts(works, total_nworkers, nworkers):
+    """Test that workers are distributed in proportion to the work"""
+    assert _3history.balanced_worker_counts(works, total_nworkers) == nworkers
+
+
+def test_linear_fit():
+    """Test the least-squares line fit"""
+    assert _3history._linear_fit([]) is None
+    assert _3history._linear_fit([(0.0, 1.0), (1.0, 3.0)]) == pytest.approx(
+        (1.0, 2.0)
+    )
+    # Points with the same abscissa give a flat line through their mean
+    assert _3history._linear_fit([(1.0, 1.0), (1.0, 3.0)]) == pytest.approx(
+        (2.0, 0.0)
+    )
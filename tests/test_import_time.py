@@ -0,0 +1,65 @@
+"""Startup-time benchmark for the AutoMech CLI
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+IMPORT_BUDGET = 0.5  # seconds
+HEAVY_MODULES = (
+    "automol",
+    "autofile",
+    "drivers",
+    "elstruct",
+    "mechlib",
+    "mechroutines",
+    "mess_io",
+    "ratefit",
+    "thermfit",
+)
+
+
+def import_times(statement: str) -> dict[str, float]:
+    """Get the cumulative import time of each module imported by a statement
+
+    :param statement: The Python statement to run, in a fresh interpreter
+    :return: A dictionary mapping module names onto cumulative import times, in seconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        # Other tests change the working directory
+        cwd=Path(__file__).parent.parent,
+    )
+    time_dct = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        time_dct[name.strip()] = int(cumulative) / 1e6
+    return time_dct
+
+
+@pytest.mark.parametrize("module", ["automech.cli", "automech.subtasks._1status"])
+def test_import_modules(module: str):
+    """Test that the CLI doesn't import the chemistry libraries"""
+    time_dct = import_times(f"import {module}")
+    heavy = sorted(m for m in time_dct if m.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"{module} imports {heavy}"
+
+
+def test_import_budget():
+    """Test that `automech check-log` starts within the import budget"""
+    time_dct = import_times("import automech.cli")
+    assert (
+        time_dct["automech.cli"] < IMPORT_BUDGET
+    ), f"`import automech.cli` took {time_dct['automech.cli']:.2f} s"
+
+
+if __name__ == "__main__":
+    test_import_budget()
@@ -0,0 +1,89 @@
+"""Tests for the registry of the input z-matrices of conformers
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+automol = pytest.importorskip("automol")
+
+from mechlib.filesys import jobreg  # noqa: E402
+
+TOLS = {"dist_rtol": 0.018, "ang_atol": 0.2}
+
+
+@pytest.fixture
+def cnf_fs(tmp_path):
+    """A conformer filesystem, with the registries reset"""
+    jobreg.invalidate()
+    yield autofile.fs.conformer(str(tmp_path))
+    jobreg.invalidate()
+
+
+def test_candidates(cnf_fs, make_conformer, geo, other_geo):
+    """Test that conformers are read once, and only close ones are candidates"""
+    zma = automol.geom.zmatrix(geo)
+    rid = autofile.schema.generate_new_ring_id()
+    locs1, locs2, locs3 = (make_conformer(cnf_fs, rid=rid) for _ in range(3))
+    zma_dct = {locs1: [zma], locs2: [automol.geom.zmatrix(other_geo)], locs3: None}
+    nreads = {}
+
+    def read_zmas(locs):
+        nreads[locs] = nreads.get(locs, 0) + 1
+        return zma_dct[locs]
+
+    for _ in range(2):
+        assert jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS) == [locs1]
+    assert nreads == {locs1: 1, locs2: 1, locs3: 2}
+
+    # A conformer that couldn't be read before is registered once it can be
+    zma_dct[locs3] = [zma]
+    assert sorted(jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS)) == sorted(
+        [locs1, locs3]
+    )
+
+    # Removed conformers are dropped, and forgotten ones read again
+    shutil.rmtree(cnf_fs[-1].path(locs3))
+    jobreg.forget(cnf_fs[0].path(), locs1)
+    assert jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS) == [locs1]
+    assert nreads[locs1] == 2
+    with open(os.path.join(cnf_fs[0].path(), jobreg.REGISTRY_NAME)) as fobj:
+        assert len(json.load(fobj)) == 2
+
+
+def test_running(cnf_fs, make_conformer, geo):
+    """Test that a job only matches while it runs"""
+    zma = automol.geom.zmatrix(geo)
+    locs = make_conformer(cnf_fs)
+
+    def read_zmas(_):
+        raise AssertionError("A registered conformer was read")
+
+    with jobreg.running(cnf_fs[0].path(), locs, zma):
+        assert jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS) == [locs]
+    assert jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS) == []
+
+
+def test_candidates__disabled(cnf_fs, make_conformer, geo, other_geo):
+    """Test that every conformer is a candidate, for the rest of the process,
+    once the registry can't be read"""
+    zma = automol.geom.zmatrix(geo)
+    locs_lst = [make_conformer(cnf_fs) for _ in range(2)]
+    reg_path = os.path.join(cnf_fs[0].path(), jobreg.REGISTRY_NAME)
+    with open(reg_path, "w") as fobj:
+        fobj.write("{")
+
+    def read_zmas(_):
+        return [automol.geom.zmatrix(other_geo)]
+
+    cands = jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS)
+    assert sorted(cands) == sorted(locs_lst)
+
+    # The registry is not used again, even once it could be
+    os.remove(reg_path)
+    cands = jobreg.candidates(cnf_fs, zma, read_zmas, **TOLS)
+    assert sorted(cands) == sorted(locs_lst)
+    assert not os.path.exists(reg_path)
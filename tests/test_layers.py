@@ -0,0 +1,147 @@
+"""Tests for the atomic write, read cache, and archive layers of the save filesystem
+"""
+
+import os
+import time
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+pytest.importorskip("automol")
+
+from mechlib.filesys import _lock, archive, layers, readcache  # noqa: E402
+
+THY_LOCS = ("hf", "sto-3g", "R")
+SCN_LOCS = [["D5"], [1.5]]
+GEO = (("O", (0.0, 0.0, 0.0)), ("H", (0.0, 0.0, 1.8)), ("H", (1.7, 0.0, -0.5)))
+
+
+@pytest.fixture
+def installed():
+    """Install the layers for the test, with empty caches"""
+    readcache.invalidate()
+    readcache.reset_stats()
+    archive.invalidate()
+    assert layers.install()
+    yield
+    layers.uninstall()
+    archive.invalidate()
+
+
+def make_energy(prefix, ene):
+    """Save an energy in a single-point filesystem"""
+    sp_fs = autofile.fs.single_point(str(prefix))
+    sp_fs[-1].create(THY_LOCS)
+    sp_fs[-1].file.energy.write(ene, THY_LOCS)
+    return sp_fs
+
+
+def age(path, seconds=60.0):
+    """Set the modification time of a file to some time ago, so that it is cached"""
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def assert_geometries_equal(geo1, geo2):
+    """Assert that two geometries are equal, up to round-off"""
+    assert [s for s, _ in geo1] == [s for s, _ in geo2]
+    for (_, xyz1), (_, xyz2) in zip(geo1, geo2):
+        assert xyz1 == pytest.approx(xyz2, abs=1e-5)
+
+
+def test_install(installed):
+    """Test that the layers are only installed once, and can be removed"""
+    dfile_cls = autofile.model.DataFile
+    read = dfile_cls.read
+    assert layers.installed()
+    assert layers.install()
+    assert dfile_cls.read is read
+
+    layers.uninstall()
+    assert not layers.installed()
+    assert dfile_cls.read is not read
+    # Installing again works, for the fixture to tear down
+    assert layers.install()
+
+
+def test_atomic_write(installed, tmp_path, monkeypatch):
+    """Test that data files are written to a temporary file and renamed"""
+    replaced = []
+    replace = os.replace
+
+    def _replace(src, dst):
+        replaced.append((os.path.basename(src), os.path.basename(dst)))
+        replace(src, dst)
+
+    monkeypatch.setattr(_lock.os, "replace", _replace)
+    sp_fs = make_energy(tmp_path, -76.0)
+
+    path = sp_fs[-1].file.energy.path(THY_LOCS)
+    assert (
+        f".{os.path.basename(path)}.{os.getpid()}.tmp",
+        os.path.basename(path),
+    ) in replaced
+    assert sp_fs[-1].file.energy.read(THY_LOCS) == pytest.approx(-76.0)
+    assert not [n for n in os.listdir(os.path.dirname(path)) if n.endswith(".tmp")]
+
+
+def test_read_cache(installed, tmp_path):
+    """Test that reads are cached until the file changes"""
+    sp_fs = make_energy(tmp_path, -76.0)
+    path = sp_fs[-1].file.energy.path(THY_LOCS)
+    age(path)
+
+    assert sp_fs[-1].file.energy.read(THY_LOCS) == pytest.approx(-76.0)
+    assert sp_fs[-1].file.energy.read(THY_LOCS) == pytest.approx(-76.0)
+    assert readcache.stats()["hits"] == 1
+    assert readcache.stats()["entries"] == 1
+
+    # Writes through autofile drop the entry
+    sp_fs[-1].file.energy.write(-76.5, THY_LOCS)
+    assert path not in readcache._CACHE
+    age(path)
+    assert sp_fs[-1].file.energy.read(THY_LOCS) == pytest.approx(-76.5)
+
+    # Writes behind autofile's back change the modification time
+    with open(path, "w") as fobj:
+        fobj.write("-77.0\n")
+    age(path, seconds=30.0)
+    assert sp_fs[-1].file.energy.read(THY_LOCS) == pytest.approx(-77.0)
+
+
+def test_read_cache__racy(installed, tmp_path):
+    """Test that files modified just now are not cached"""
+    sp_fs = make_energy(tmp_path, -76.0)
+    sp_fs[-1].file.energy.read(THY_LOCS)
+    assert readcache.stats()["entries"] == 0
+
+
+def test_archive(installed, tmp_path):
+    """Test that packed points read the same as unpacked ones"""
+    scn_fs = autofile.fs.scan(str(tmp_path))
+    scn_fs[-1].create(SCN_LOCS)
+    scn_fs[-1].file.geometry.write(GEO, SCN_LOCS)
+    point_path = scn_fs[-1].path(SCN_LOCS)
+
+    assert archive.pack(scn_fs) == 1
+    assert not os.path.exists(point_path)
+    assert archive.find(scn_fs[-1].file.geometry.path(SCN_LOCS)) is not None
+
+    assert scn_fs[-1].exists(SCN_LOCS)
+    assert scn_fs[-1].existing() == [SCN_LOCS]
+    assert scn_fs[-1].file.geometry.exists(SCN_LOCS)
+    assert_geometries_equal(scn_fs[-1].file.geometry.read(SCN_LOCS), GEO)
+    assert not scn_fs[-1].file.hessian.exists(SCN_LOCS)
+
+    # Without the layers, the point is gone
+    layers.uninstall()
+    assert not scn_fs[-1].file.geometry.exists(SCN_LOCS)
+    assert not scn_fs[-1].existing()
+    layers.install()
+
+    # Unpacking puts it back on disk
+    assert archive.unpack(scn_fs) > 0
+    assert os.path.isdir(point_path)
+    assert archive.find(scn_fs[-1].file.geometry.path(SCN_LOCS)) is None
+    assert_geometries_equal(scn_fs[-1].file.geometry.read(SCN_LOCS), GEO)
+
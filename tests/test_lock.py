@@ -0,0 +1,78 @@
+"""Tests for the locked updates and atomic writes of the save filesystem
+"""
+
+import functools
+import multiprocessing
+import os
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+pytest.importorskip("automol")
+
+from mechlib.filesys import _lock  # noqa: E402
+
+
+def add_one(path, count):
+    """Add one to the number in a file, `count` times, holding its lock"""
+    for _ in range(count):
+        with _lock.locked(path):
+            with open(path) as fobj:
+                val = int(fobj.read())
+            _lock.atomic_write(path, f"{val + 1}\n")
+
+
+def test_atomic_write(tmp_path):
+    """Test that files are replaced whole, without leaving temporary files"""
+    path = str(tmp_path / "energy")
+    _lock.atomic_write(path, "-76.0\n")
+    _lock.atomic_write(path, b"-76.5\n")
+    with open(path) as fobj:
+        assert fobj.read() == "-76.5\n"
+    assert os.listdir(tmp_path) == ["energy"]
+
+
+def test_locked(tmp_path):
+    """Test that concurrent read-modify-write updates are not lost"""
+    path = str(tmp_path / "count")
+    _lock.atomic_write(path, "0\n")
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=add_one, args=(path, 50)) for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+    with open(path) as fobj:
+        assert int(fobj.read()) == 200
+
+
+def increment(prefix, count):
+    """Add one to the sample count of a conformer trunk, `count` times"""
+    cnf_fs = autofile.fs.conformer(str(prefix))
+    default = functools.partial(autofile.schema.info_objects.conformer_trunk, 0)
+    for _ in range(count):
+        _lock.increment_nsamp(cnf_fs[0], default=default)
+
+
+def test_increment_nsamp(tmp_path):
+    """Test that concurrent sample counts are not lost"""
+    cnf_fs = autofile.fs.conformer(str(tmp_path))
+    cnf_fs[0].create()
+    assert _lock.read_nsamp(cnf_fs[0]) is None
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=increment, args=(tmp_path, 25)) for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    assert _lock.read_nsamp(cnf_fs[0]) == 100
+
+    # A count from the run filesystem is incremented from, if it is higher
+    default = functools.partial(autofile.schema.info_objects.conformer_trunk, 0)
+    inf_obj = _lock.increment_nsamp(cnf_fs[0], default=default, start=150)
+    assert inf_obj.nsamp == 151
+    inf_obj = _lock.increment_nsamp(cnf_fs[0], default=default, start=10)
+    assert inf_obj.nsamp == 152
@@ -0,0 +1,57 @@
+"""Tests for the log messages of worker processes
+"""
+
+import concurrent.futures
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("phydat")
+
+from mechlib.amech_io import printer, profiler  # noqa: E402
+
+
+def work(idx):
+    """Log a message and record a span in a worker process"""
+    with profiler.span("work", "job"):
+        printer.info_message(f"worker message {idx}")
+    return idx, profiler.take_events()
+
+
+def init_worker(queue, level, start):
+    """Send the messages and spans of a worker process to the main process"""
+    printer.forward_logging(queue, level)
+    profiler.worker_init(start)
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    """A buffered log file, with the default logging restored afterwards"""
+    path = tmp_path / "mechdriver.log"
+    printer.configure_logging(console=False, log_path=str(path))
+    profiler.enable()
+    yield path
+    profiler.disable()
+    printer.configure_logging()
+
+
+def test_forward_logging(log_path):
+    """Test that the messages and spans of pool workers reach the main process"""
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    executor = concurrent.futures.ProcessPoolExecutor(
+        2,
+        mp_context=ctx,
+        initializer=init_worker,
+        initargs=(queue, printer.log_level(), profiler.start_time()),
+    )
+    with printer.log_listener(queue), executor:
+        for _, events in executor.map(work, range(4)):
+            profiler.add_events(events)
+    printer.flush_logging()
+
+    lines = log_path.read_text().splitlines()
+    assert sorted(line.strip() for line in lines if "worker message" in line) == [
+        f"worker message {idx}" for idx in range(4)
+    ]
+    assert "work" in profiler.summary_string()
@@ -0,0 +1,89 @@
+"""Tests for the query index of the file system
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+automol = pytest.importorskip("automol")
+
+from automech import query  # noqa: E402
+
+
+def make_species(root_path, smi):
+    """Create the directory of a species, and return its path"""
+    spc_fs = autofile.fs.species(str(root_path))
+    locs = [automol.smiles.chi(smi), 0, 1]
+    spc_fs[-1].create(locs)
+    return spc_fs[-1].path(locs)
+
+
+@pytest.fixture
+def root_path(tmp_path):
+    """A file system, with the directory listings of this process reset"""
+    query._LISTINGS.clear()
+    yield tmp_path
+    query._LISTINGS.clear()
+
+
+def test_species_paths(root_path, monkeypatch):
+    """Test that species are found, and that the index is used once built"""
+    ch4_path = make_species(root_path, "C")
+    (none_path,) = query.base_species_paths_from_root(str(root_path), ["CC"])
+    assert none_path is None
+    assert os.path.exists(os.path.join(root_path, query.INDEX_NAME))
+
+    def _refresh(*_):
+        raise AssertionError("The file system was listed again")
+
+    monkeypatch.setattr(query, "_refresh", _refresh)
+    assert query.base_species_path_from_root(str(root_path), "C") == ch4_path
+
+    # Species missing again are not looked for until the refresh is due
+    assert query.base_species_paths_from_root(str(root_path), ["CC"]) == [None]
+
+
+def test_species_paths__new(root_path, monkeypatch):
+    """Test that species added since the index was built are found"""
+    make_species(root_path, "C")
+    query.base_species_paths_from_root(str(root_path), ["C"])
+
+    monkeypatch.setattr(query, "REFRESH_SECONDS", 0.0)
+    c2h6_path = make_species(root_path, "CC")
+    assert query.base_species_paths_from_root(str(root_path), ["CC", "C"])[0] == (
+        c2h6_path
+    )
+
+    con = sqlite3.connect(os.path.join(root_path, query.INDEX_NAME))
+    assert len(list(con.execute("SELECT * FROM species"))) == 2
+    con.close()
+
+
+def test_lookup__read_only(root_path):
+    """Test that lookups work from memory if the index can't be written"""
+    ch4_path = make_species(root_path, "C")
+    index_path = os.path.join(root_path, query.INDEX_NAME)
+    con = sqlite3.connect(index_path)
+    con.executescript(query._SCHEMA)
+    con.close()
+
+    con = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    with pytest.raises(sqlite3.OperationalError):
+        con.execute("INSERT INTO species VALUES ('key', 'path')")
+    key = json.dumps(automol.smiles.chi("C"))
+    assert query._lookup(con, str(root_path), "species", [key]) == [ch4_path]
+    con.close()
+
+
+def test_layers(root_path):
+    """Test that queries read the file system through the layers"""
+    layers = pytest.importorskip("mechlib.filesys.layers")
+    layers.uninstall()
+    try:
+        assert not query.conformers_locators_from_prefix(str(root_path))
+        assert layers.installed()
+    finally:
+        layers.uninstall()
@@ -0,0 +1,115 @@
+"""Tests for the retry policy for failed subtask workers
+"""
+
+import textwrap
+
+import pytest
+
+from automech.subtasks import _2run
+from automech.subtasks._5retry import (
+    Failure,
+    RetryPolicy,
+    classify_failure,
+    escalate_theory_dat,
+    escalated_resources,
+    retry_delay,
+    should_retry,
+)
+
+THEORY_DAT = textwrap.dedent(
+    """
+    level lvl_wbs
+        method = wb97xd
+        basis = 6-31g*
+        program = gaussian16
+        mem = 20
+        nprocs = 8
+    end level
+
+    level lvl_b2t
+        method = b2plypd3
+        basis = cc-pvtz
+        program = gaussian16
+        nprocs = 9  # for 36 procs, request 9 to run 4 in parallel
+    end level
+    """
+)
+
+
+@pytest.mark.parametrize(
+    "line, returncode, peak_rss, mem, failure",
+    [
+        ("MemoryError", 1, None, None, Failure.OOM),
+        ("slurmstepd: error: Detected 1 oom-kill event(s)", 1, None, None, Failure.OOM),
+        ("Error: SCF failed to converge", 1, None, None, Failure.SCF),
+        ("/bin/sh: line 1: 12345 Killed  automech run", 137, 1.0, 20, Failure.KILLED),
+        ("Killed", None, 19.5, 20, Failure.OOM),
+        ("Terminated", None, None, None, Failure.KILLED),
+        ("Connection to node1 closed by remote host.", 255, None, None, Failure.KILLED),
+        (
+            "slurmstepd: error: *** STEP CANCELLED DUE TO SIGTERM ***",
+            1,
+            None,
+            None,
+            Failure.KILLED,
+        ),
+        ("Process killed by signal 9", 1, None, None, Failure.KILLED),
+        # A lost process, going by its exit code only
+        (None, -9, None, None, Failure.KILLED),
+        # Ordinary errors that only mention signals or termination
+        ("ValueError: signal-to-noise ratio too low", 1, None, None, Failure.OTHER),
+        ("Normal termination of Gaussian", 1, None, None, Failure.OTHER),
+        ("Calculation terminated abnormally", 1, None, None, Failure.OTHER),
+        (None, 1, None, None, Failure.OTHER),
+    ],
+)
+def test_classify_failure(line, returncode, peak_rss, mem, failure):
+    """Test the classification of worker failures"""
+    assert classify_failure(line, returncode, peak_rss, mem) == failure
+
+
+def test_retry_policy():
+    """Test the retry decisions, delays, and escalated resources"""
+    policy = RetryPolicy(max_attempts=3, backoff=10.0, backoff_factor=3.0)
+    assert should_retry(policy, Failure.OOM, 1)
+    assert should_retry(policy, Failure.KILLED, 2)
+    assert not should_retry(policy, Failure.KILLED, 3)
+    assert not should_retry(policy, Failure.SCF, 1)
+    assert not should_retry(policy, Failure.OTHER, 1)
+
+    assert [retry_delay(policy, a) for a in (1, 2, 3)] == [10.0, 30.0, 90.0]
+
+    assert escalated_resources(policy, Failure.OOM, 20, 8) == (30, 8)
+    assert escalated_resources(policy, Failure.OOM, 1, 8) == (2, 8)
+    assert escalated_resources(policy, Failure.KILLED, 20, 8) == (20, 8)
+
+
+def test_escalate_theory_dat():
+    """Test that existing keys are replaced and missing keys are added"""
+    theory_dat = escalate_theory_dat(THEORY_DAT, "lvl_wbs", 30, 12)
+    assert "    mem = 30\n    nprocs = 12\nend level" in theory_dat
+
+    theory_dat = escalate_theory_dat(THEORY_DAT, "lvl_b2t", 30, 9)
+    assert "nprocs = 9  # for 36 procs" in theory_dat
+    assert "    mem = 30\nend level\n" in theory_dat
+    # The other level is left alone
+    assert "    mem = 20\n    nprocs = 8\n" in theory_dat
+
+    assert escalate_theory_dat(THEORY_DAT, "lvl_ccsd", 30, 9) == THEORY_DAT
+
+
+def test_escalate_subtask_theory(tmp_path):
+    """Test that escalating one worker leaves the shared theory.dat alone"""
+    (tmp_path / "inp").mkdir()
+    (tmp_path / "inp" / "theory.dat").write_text(THEORY_DAT)
+    assert _2run.worker_theory_args(tmp_path, "out0.log") == []
+
+    _2run.escalate_subtask_theory(tmp_path, "out0.log", "lvl_b2t", 30, 9)
+    _2run.escalate_subtask_theory(tmp_path, "out0.log", "lvl_b2t", 45, 9)
+    assert (tmp_path / "inp" / "theory.dat").read_text() == THEORY_DAT
+    assert "mem = 45" in _2run.worker_theory_path(tmp_path, "out0.log").read_text()
+    assert _2run.worker_theory_args(tmp_path, "out0.log") == [
+        "-T",
+        "inp/theory_out0.dat",
+    ]
+    assert _2run.worker_theory_args(tmp_path, "out1.log") == []
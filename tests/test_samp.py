@@ -0,0 +1,192 @@
+"""Tests for the Monte Carlo sampling of structures
+"""
+
+import numpy
+import pytest
+
+automol = pytest.importorskip("automol")
+pytest.importorskip("autofile")
+pytest.importorskip("elstruct")
+
+from mechroutines.es._routines import _samp  # noqa: E402
+
+# Hydroxymethyl hydroperoxide, in bohr, with a crowded OOH torsion
+GEO = (
+    ("C", (0.0, 0.0, 0.0)),
+    ("O", (2.6, 0.0, 0.0)),
+    ("O", (3.5, 2.4, 0.0)),
+    ("H", (5.3, 2.3, 0.4)),
+    ("O", (-0.9, 2.4, 0.3)),
+    ("H", (-2.7, 2.3, 0.2)),
+    ("H", (-0.7, -1.0, 1.7)),
+    ("H", (-0.7, -1.0, -1.7)),
+)
+
+
+def run_sample(idx, success):
+    """Run a dummy sample, in a worker process if there are several"""
+    return success, idx
+
+
+class Sampler:
+    """Draws dummy samples and saves them, counting the samples in flight"""
+
+    def __init__(self, nremaining, success=True, nconverge=None):
+        self.nremaining = nremaining
+        self.success = success
+        self.nconverge = nconverge
+        self.nstarted = 0
+        self.saved = []
+
+    def next_sample(self):
+        """Draw a sample, checking that no more are in flight than needed"""
+        assert self.nstarted - len(self.saved) < self.nremaining
+        self.nstarted += 1
+        return self.nstarted, self.success
+
+    def save_sample(self, args, success, idx):
+        """Save a sample, returning the number still needed"""
+        assert args[0] == idx
+        self.saved.append(idx)
+        if success:
+            self.nremaining -= 1
+        return self.nremaining
+
+    def converged(self):
+        """Whether enough samples have been saved to stop"""
+        return self.nconverge is not None and len(self.saved) >= self.nconverge
+
+
+@pytest.mark.parametrize("nconc", [1, 3])
+def test_run_samples(nconc):
+    """Test that exactly the samples needed are run"""
+    sampler = Sampler(5)
+    nremaining = _samp.run_samples(
+        sampler.next_sample, run_sample, sampler.save_sample, 5, 20, nconc=nconc
+    )
+    assert nremaining == 0
+    assert sampler.nstarted == 5
+    assert sorted(sampler.saved) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("nconc", [1, 3])
+def test_run_samples__failures(nconc):
+    """Test that sampling stops at the maximum number of attempts when every
+    sample fails"""
+    sampler = Sampler(5, success=False)
+    nremaining = _samp.run_samples(
+        sampler.next_sample, run_sample, sampler.save_sample, 5, 7, nconc=nconc
+    )
+    assert nremaining == 5
+    assert sampler.nstarted == 7
+    assert len(sampler.saved) == 7
+
+
+@pytest.mark.parametrize("nconc", [1, 3])
+def test_run_samples__converged(nconc):
+    """Test that no samples are started once the sampling has converged, and
+    that the samples in flight are saved"""
+    sampler = Sampler(10, nconverge=1)
+    nremaining = _samp.run_samples(
+        sampler.next_sample,
+        run_sample,
+        sampler.save_sample,
+        10,
+        20,
+        nconc=nconc,
+        converged=sampler.converged,
+    )
+    assert sampler.nstarted == nconc
+    assert len(sampler.saved) == nconc
+    assert nremaining == 10 - nconc
+
+
+def record(tracker, nsamp, new=False, rel_ene=0.0, distinct=False):
+    """Record samples that found the same conformer, or distinct ones, and
+    return whether the sampling converged after each"""
+    convs = []
+    for idx in range(nsamp):
+        cnf_locs = (f"d{tracker['nsamp']}" if distinct else "r0", "c0")
+        _samp.record_conformer(tracker, cnf_locs, new, rel_ene)
+        convs.append(_samp.sampling_converged(tracker))
+    return convs
+
+
+def test_sampling_converged__min_samples():
+    """Test that sampling doesn't stop before the minimum number of samples"""
+    tracker = _samp.convergence_tracker(nstall=1, unseen_thresh=1.1)
+    nmin = _samp.MIN_CONV_SAMPLES
+    assert record(tracker, nmin) == [False] * (nmin - 1) + [True]
+    # Once converged, the sampling stays converged
+    assert record(tracker, 1, new=True, distinct=True) == [True]
+
+
+def test_sampling_converged__nstall():
+    """Test that sampling stops once no new conformer within the energy window
+    was found in the last `nstall` samples"""
+    nmin = _samp.MIN_CONV_SAMPLES
+    tracker = _samp.convergence_tracker(nstall=5, ewin=1.0)
+    assert not any(record(tracker, nmin, new=True, distinct=True))
+    # New conformers above the energy window don't count
+    assert not any(record(tracker, 4, new=True, rel_ene=2.0, distinct=True))
+    assert record(tracker, 1) == [True]
+
+    tracker = _samp.convergence_tracker(nstall=5, ewin=1.0)
+    assert not any(record(tracker, nmin, new=True, distinct=True))
+    assert not any(record(tracker, 4))
+    assert not any(record(tracker, 1, new=True, rel_ene=0.5, distinct=True))
+    assert not any(record(tracker, 4))
+    assert record(tracker, 1) == [True]
+
+
+def test_sampling_converged__unseen():
+    """Test that sampling stops once few samples found a conformer no other
+    sample found"""
+    nmin = _samp.MIN_CONV_SAMPLES
+    tracker = _samp.convergence_tracker(unseen_thresh=0.2)
+    assert not any(record(tracker, nmin, new=True, distinct=True))
+
+    # Eight of the ten samples found a conformer no other sample found
+    for unseen_thresh, convs in [(0.85, [False, True]), (0.8, [False, False])]:
+        tracker = _samp.convergence_tracker(unseen_thresh=unseen_thresh)
+        record(tracker, nmin - 2, distinct=True)
+        assert record(tracker, 2) == convs
+
+
+@pytest.fixture
+def zma_tors():
+    """A z-matrix, and the full range of each of its dihedrals"""
+    zma = automol.geom.zmatrix(GEO)
+    names = automol.zmat.dihedral_angle_names(zma)
+    return zma, {name: (-numpy.pi, numpy.pi) for name in names}
+
+
+def test_low_repulsion_samples(zma_tors):
+    """Test that automol alone decides which draws have low repulsion"""
+    zma, tors_range_dct = zma_tors
+    numpy.random.seed(0)
+    samp_zmas, lows = _samp.low_repulsion_samples(
+        zma, 20, tors_range_dct, max_draws=1
+    )
+    assert len(samp_zmas) == 20
+    assert list(lows) == [
+        automol.zmat.has_low_relative_repulsion_energy(samp_zma, zma)
+        for samp_zma in samp_zmas
+    ]
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_low_repulsion_samples__batch_size(zma_tors, batch_size):
+    """Test that drawing in batches gives the same samples as drawing one at
+    a time"""
+    zma, tors_range_dct = zma_tors
+    numpy.random.seed(1)
+    ref_zmas, ref_lows = _samp.low_repulsion_samples(
+        zma, 5, tors_range_dct, max_draws=20, batch_size=1
+    )
+    numpy.random.seed(1)
+    samp_zmas, lows = _samp.low_repulsion_samples(
+        zma, 5, tors_range_dct, max_draws=20, batch_size=batch_size
+    )
+    assert lows == ref_lows
+    assert samp_zmas == ref_zmas
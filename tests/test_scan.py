@@ -0,0 +1,88 @@
+"""Tests for the bulk reader for the points of a coordinate scan
+"""
+
+import os
+
+import pytest
+
+autofile = pytest.importorskip("autofile")
+automol = pytest.importorskip("automol")
+
+from mechlib.filesys import scan  # noqa: E402
+
+THY_LOCS = ("hf", "sto-3g", "R")
+GEO = (("O", (0.0, 0.0, 0.0)), ("H", (0.0, 0.0, 1.8)), ("H", (1.7, 0.0, -0.5)))
+
+
+def make_scan(prefix, enes):
+    """Save a scan point, with a geometry, z-matrix, and energy, for each energy"""
+    scn_fs = autofile.fs.scan(str(prefix))
+    zma = automol.geom.zmatrix(GEO)
+    locs_lst = []
+    for idx, ene in enumerate(enes):
+        locs = [["D5"], [float(idx)]]
+        scn_fs[-1].create(locs)
+        scn_fs[-1].file.geometry.write(GEO, locs)
+        scn_fs[-1].file.zmatrix.write(zma, locs)
+        write_energy(scn_fs, locs, ene)
+        locs_lst.append(locs)
+    return scn_fs, locs_lst
+
+
+def write_energy(scn_fs, locs, ene):
+    """Write the energy of a scan point"""
+    sp_fs = autofile.fs.single_point(scn_fs[-1].path(locs))
+    sp_fs[-1].create(THY_LOCS)
+    sp_fs[-1].file.energy.write(ene, THY_LOCS)
+
+
+def test_load(tmp_path):
+    """Test that the quantities of each point are read, with a mask"""
+    scn_fs, locs_lst = make_scan(tmp_path, [-76.0, -75.9])
+    locs_lst.append([["D5"], [2.0]])
+
+    data = scan.load(scn_fs, locs_lst, THY_LOCS, ("energy", "geometry"))
+    assert list(data["mask"]["energy"]) == [True, True, False]
+    assert data["energy"][:2] == pytest.approx([-76.0, -75.9])
+    assert data["symbols"] == ("O", "H", "H")
+    assert scan.point_value(data, "energy", 1) == pytest.approx(-75.9)
+    assert scan.point_value(data, "geometry", 2) is None
+
+
+def test_load__zmatrix(tmp_path):
+    """Test that z-matrices are read when the other quantities are cached"""
+    scn_fs, locs_lst = make_scan(tmp_path, [-76.0, -75.9])
+
+    for _ in range(2):
+        data = scan.load(scn_fs, locs_lst, THY_LOCS, ("energy", "zmatrix"))
+        assert list(data["mask"]["zmatrix"]) == [True, True]
+        assert scan.point_value(data, "zmatrix", 0) == (
+            scn_fs[-1].file.zmatrix.read(locs_lst[0])
+        )
+        assert data["energy"] == pytest.approx([-76.0, -75.9])
+
+
+def test_load__overwrite(tmp_path):
+    """Test that the cache is not used once a file it was read from changes"""
+    scn_fs, locs_lst = make_scan(tmp_path, [-76.0, -75.9])
+    scan.load(scn_fs, locs_lst, THY_LOCS)
+    cache_path = scan._cache_path(
+        [os.path.normpath(scn_fs[-1].path(locs)) for locs in locs_lst],
+        THY_LOCS,
+        ("energy",),
+    )
+    assert os.path.exists(cache_path)
+
+    # Overwriting an energy doesn't change the scan directories
+    write_energy(scn_fs, locs_lst[1], -75.85)
+    data = scan.load(scn_fs, locs_lst, THY_LOCS)
+    assert data["energy"] == pytest.approx([-76.0, -75.85])
+
+    # Points saved since are read, along with the cached ones
+    locs_lst.append([["D5"], [2.0]])
+    data = scan.load(scn_fs, locs_lst, THY_LOCS)
+    assert list(data["mask"]["energy"]) == [True, True, False]
+    scn_fs[-1].create(locs_lst[2])
+    write_energy(scn_fs, locs_lst[2], -75.8)
+    data = scan.load(scn_fs, locs_lst, THY_LOCS)
+    assert data["energy"] == pytest.approx([-76.0, -75.85, -75.8])
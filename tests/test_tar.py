@@ -0,0 +1,112 @@
+"""Tests for the incremental archives of the run and save filesystems
+"""
+
+import os
+import shutil
+import tarfile
+
+from automech.subtasks import _4archive
+
+
+def write(path, text):
+    """Write a file, creating its directory"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def contents(dir_path):
+    """The text of each file in a directory tree, by relative path"""
+    return {
+        str(path.relative_to(dir_path)): path.read_text()
+        for path in dir_path.rglob("*")
+        if path.is_file()
+    }
+
+
+def chunk_members(arch_path, name):
+    """The entries in a chunk, relative to the archived directory"""
+    with tarfile.open(arch_path / name, "r") as tar:
+        return sorted(m.name.split("/", 1)[1] for m in tar)
+
+
+def test_tar_directory(tmp_path):
+    """Test that archiving again only adds the modified entries, and that the
+    directory is restored with their latest versions"""
+    dir_path = tmp_path / "save"
+    arch_path = tmp_path / "save.archive"
+    write(dir_path / "a" / "1.txt", "a" * 100)
+    write(dir_path / "b" / "2.txt", "b" * 100)
+    _4archive.tar_directory(dir_path, nprocs=1)
+
+    write(dir_path / "a" / "1.txt", "new")
+    _4archive.tar_directory(dir_path, nprocs=1)
+    manifest = _4archive.read_manifest(arch_path)
+    chunk_names = manifest[_4archive.ManifestKey.chunks]
+    assert chunk_names == ["000000.tgz", "000001.tgz"]
+    assert chunk_members(arch_path, chunk_names[1]) == ["a/1.txt"]
+    assert sorted(os.listdir(arch_path)) == [*chunk_names, _4archive.MANIFEST_FILE]
+
+    expected = contents(dir_path)
+    shutil.rmtree(dir_path)
+    _4archive.untar_directory(dir_path, nprocs=1)
+    assert contents(dir_path) == expected
+
+
+def test_tar_directory__unused_chunks(tmp_path):
+    """Test that chunks no entry refers to are deleted, and that the entries
+    left in mostly unused chunks are archived again"""
+    dir_path = tmp_path / "save"
+    arch_path = tmp_path / "save.archive"
+    write(dir_path / "a" / "1.txt", "a" * 10000)
+    write(dir_path / "b" / "2.txt", "b")
+    _4archive.tar_directory(dir_path, nprocs=1)
+    write(dir_path / "c" / "3.txt", "c")
+    _4archive.tar_directory(dir_path, nprocs=1)
+
+    # Most of the first chunk is the old version of 1.txt
+    write(dir_path / "a" / "1.txt", "new")
+    _4archive.tar_directory(dir_path, nprocs=1)
+    chunk_names = _4archive.read_manifest(arch_path)[_4archive.ManifestKey.chunks]
+    assert chunk_names == ["000001.tgz", "000002.tgz"]
+    assert chunk_members(arch_path, "000002.tgz") == ["a", "a/1.txt", "b", "b/2.txt"]
+
+    # Nothing refers to the second chunk once c/ is removed
+    shutil.rmtree(dir_path / "c")
+    _4archive.tar_directory(dir_path, nprocs=1)
+    chunk_names = _4archive.read_manifest(arch_path)[_4archive.ManifestKey.chunks]
+    assert chunk_names == ["000002.tgz"]
+    assert sorted(os.listdir(arch_path)) == [*chunk_names, _4archive.MANIFEST_FILE]
+
+    expected = contents(dir_path)
+    shutil.rmtree(dir_path)
+    _4archive.untar_directory(dir_path, nprocs=1)
+    assert contents(dir_path) == expected
+
+
+def test_untar_directory__subpaths(tmp_path):
+    """Test that a single subtree is restored on its own"""
+    dir_path = tmp_path / "save"
+    write(dir_path / "a" / "1.txt", "a")
+    write(dir_path / "ab" / "2.txt", "ab")
+    write(dir_path / "b" / "3.txt", "b")
+    _4archive.tar_directory(dir_path, nprocs=1)
+
+    shutil.rmtree(dir_path)
+    _4archive.untar_directory(dir_path, subpaths=["a/"], nprocs=1)
+    assert contents(dir_path) == {"a/1.txt": "a"}
+
+
+def test_untar_directory__legacy(tmp_path):
+    """Test that a legacy archive is extracted"""
+    dir_path = tmp_path / "save"
+    write(dir_path / "a" / "1.txt", "a")
+    with tarfile.open(tmp_path / "save.tgz", "w:gz") as tar:
+        tar.add(dir_path, arcname="save")
+
+    shutil.rmtree(dir_path)
+    _4archive.untar_directory(dir_path, nprocs=1)
+    assert contents(dir_path) == {"a/1.txt": "a"}
+
+    # A missing archive leaves the directory alone
+    _4archive.untar_directory(tmp_path / "run", nprocs=1)
+    assert not (tmp_path / "run").exists()
@@ -0,0 +1,58 @@
+"""Tests for the convergence of tau sampling
+"""
+
+import numpy
+import pytest
+
+pytest.importorskip("automol")
+pytest.importorskip("autofile")
+pytest.importorskip("elstruct")
+phycon = pytest.importorskip("phydat.phycon")
+
+from mechroutines.es._routines import _samp, tau  # noqa: E402
+
+REF_ENE = -154.05
+ENES = (-154.051, -154.048, -154.0503, -154.049, -154.0521, -154.047, -154.0498)
+
+
+def loop_pf_standard_error(enes, ref_ene, temp):
+    """The estimates of `assess_pf_convergence` before they were vectorized"""
+    sumq = 0.0
+    sum2 = 0.0
+    idx = 0
+    vals = []
+    for ene in enes:
+        idx += 1
+        ene = (ene - ref_ene) * phycon.EH2KCAL
+        tmp = numpy.exp(-ene * 349.7 / (0.695 * temp))
+        sumq = sumq + tmp
+        sum2 = sum2 + tmp**2
+        sigma = numpy.sqrt(
+            (abs(sum2 / float(idx) - (sumq / float(idx)) ** 2)) / float(idx)
+        )
+        vals.append((sumq / float(idx), sigma, 100.0 * sigma * float(idx) / sumq))
+    return vals
+
+
+@pytest.mark.parametrize("temp", tau.PF_TEMPS)
+def test_pf_standard_error(temp):
+    """Test that the estimates after each sample match the old loop"""
+    pfs, sigmas, errs = tau.pf_standard_error(ENES, REF_ENE, temp)
+    ref_vals = loop_pf_standard_error(ENES, REF_ENE, temp)
+    assert list(zip(pfs, sigmas, errs)) == [pytest.approx(val) for val in ref_vals]
+
+
+def test_pf_converged():
+    """Test that the partition function is only converged with enough samples,
+    and once its relative error is below the threshold"""
+    nmin = _samp.MIN_CONV_SAMPLES
+    enes = [REF_ENE] * nmin
+    assert not tau._pf_converged(enes[:-1], REF_ENE, 1.0)
+    assert tau._pf_converged(enes, REF_ENE, 1.0)
+
+    enes = list(ENES) * nmin
+    err = max(
+        tau.pf_standard_error(enes, REF_ENE, temp)[2][-1] for temp in tau.PF_TEMPS
+    )
+    assert not tau._pf_converged(enes, REF_ENE, err)
+    assert tau._pf_converged(enes, REF_ENE, err * 1.01)